@@ -3,7 +3,8 @@ from .models import (
     Profile, Course, Unit, VideoUnit, AudioUnit, PresentationUnit,
     TextUnit, PageUnit, Quiz, Question, Assignment, ScormPackage,
     Survey, Enrollment, UnitProgress, AssignmentSubmission,
-    QuizAttempt, Leaderboard, MediaMetadata
+    QuizAttempt, Leaderboard, MediaMetadata, TestBank, Test, TestQuestion,
+    TestAttempt
 )
 
 
@@ -120,3 +121,29 @@ class MediaMetadataAdmin(admin.ModelAdmin):
     list_display = ['file_name', 'file_type', 'uploaded_by', 'uploaded_at']
     list_filter = ['file_type', 'uploaded_at']
     search_fields = ['file_name']
+
+
+@admin.register(TestBank)
+class TestBankAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'created_by', 'created_at']
+    list_filter = ['category']
+    search_fields = ['name']
+
+
+@admin.register(Test)
+class TestAdmin(admin.ModelAdmin):
+    list_display = ['title', 'course', 'test_type', 'passing_score', 'max_attempts', 'time_limit_minutes']
+    list_filter = ['test_type']
+    search_fields = ['title']
+
+
+@admin.register(TestQuestion)
+class TestQuestionAdmin(admin.ModelAdmin):
+    list_display = ['test_bank', 'test', 'question_type', 'difficulty', 'question_text', 'points']
+    list_filter = ['question_type', 'difficulty']
+
+
+@admin.register(TestAttempt)
+class TestAttemptAdmin(admin.ModelAdmin):
+    list_display = ['test', 'user', 'attempt_number', 'status', 'score', 'passed', 'started_at']
+    list_filter = ['status', 'passed', 'started_at']
@@ -0,0 +1,268 @@
+"""Question banks, tests and graded test attempts (DDL tables 16-20).
+
+Bank questions are written once and referenced by any number of tests
+through ``TestQuestionLink``, so reusing one in another course adds a row
+instead of a copy.  Questions written for one test carry its ``test_id``
+and are linked the same way.
+
+Tests are graded by the quiz engine (``courses.grading``).  A test's linked
+questions compile into the same cached ``AnswerKey``; the DDL question types
+map onto the quiz types, and essays always wait for a trainer.
+``correct_answer`` is a TEXT column: a value that parses as JSON (an
+option index, a list of blanks) is used decoded, anything else as text.  Each
+submitted answer becomes a ``TestAnswer`` row holding its correctness and
+points, for item analysis.  An attempt with answers waiting for review has
+no ``passed`` until ``review_test_attempt`` settles them and records the
+trainer in ``graded_by``.
+
+Bank search filters on bank, category, type and difficulty through
+``idx_test_questions_filter``.  Text goes through the stored
+``search_vector`` column (question text and explanation), whose GIN index
+answers ``websearch_to_tsquery`` matches.  Postgres' ``pg_trgm`` is not
+assumed to be installed.  Matches stay newest first, so a page stops after
+its rows.  ``ordering=relevance`` ranks by ``ts_rank`` instead, which reads
+the vector of every match: fine for narrow searches, but a word in a tenth
+of a 100k bank costs about 50 ms.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .delivery import delivered_questions, new_seed
+from .enrollments import parse_uuids
+from .grading import AnswerKey, AttemptError, compile_question, deadline, describe, grade, percentage, settle_reviews
+from .models import Test, TestAnswer, TestAttempt, TestQuestion, TestQuestionLink
+
+
+TEST_KEY_CACHE_SECONDS = getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_SECONDS', 3600)
+SEARCH_CONFIG = 'english'
+# DDL question type -> courses.grading question type
+GRADED_AS = {
+    'mcq': 'multiple_choice',
+    'true_false': 'true_false',
+    'short_answer': 'free_text',
+    'essay': 'free_text',
+    'fill_blank': 'fill_blank',
+}
+
+
+def search_questions(queryset, params):
+    """Filter bank questions by ``test_bank``, ``category``, ``type``, ``difficulty`` and text ``q``.
+
+    With ``q``, ``ordering=relevance`` puts the best matches first.
+    """
+    for param, lookup in (
+        ('test_bank', 'test_bank_id'),
+        ('category', 'test_bank__category'),
+        ('type', 'question_type'),
+        ('difficulty', 'difficulty'),
+    ):
+        value = params.get(param)
+        if value:
+            if lookup == 'test_bank_id' and not parse_uuids([value])[0]:
+                raise ValueError("'test_bank' must be a UUID")
+            queryset = queryset.filter(**{lookup: value})
+    text = (params.get('q') or '').strip()
+    if text:
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.filter(search_vector=query)
+        if params.get('ordering') == 'relevance':
+            # ordered by the expression rather than an annotation, so the paginator's COUNT skips ranking
+            queryset = queryset.order_by(SearchRank(F('search_vector'), query).desc(), 'created_at', 'id')
+    return queryset
+
+
+def set_test_questions(test, question_ids):
+    """Make ``question_ids`` (bank questions, or this test's own) the test's questions, in order."""
+    ids, invalid = parse_uuids(question_ids if isinstance(question_ids, list) else [])
+    if invalid or not isinstance(question_ids, list):
+        raise ValueError("'question_ids' must be a list of UUIDs")
+    if len(ids) != len(question_ids):
+        raise ValueError("'question_ids' contains duplicates")
+    usable = set(TestQuestion.objects.filter(
+        Q(test_bank__isnull=False) | Q(test_id=test.pk), id__in=ids,
+    ).values_list('id', flat=True))
+    missing = [str(qid) for qid in ids if qid not in usable]
+    if missing:
+        raise ValueError('not bank questions or questions of this test: ' + ', '.join(missing))
+    with transaction.atomic():
+        TestQuestionLink.objects.filter(test=test).delete()
+        TestQuestionLink.objects.bulk_create(
+            TestQuestionLink(test=test, question_id=qid, sequence_order=position) for position, qid in enumerate(ids)
+        )
+        invalidate_test_key(test.pk)
+    return ids
+
+
+# --- answer keys -------------------------------------------------------------------
+
+def _stored_answer(text):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return text
+
+
+def compile_test_key(test_id):
+    test = Test.objects.values(
+        'module_id', 'course_id', 'passing_score', 'max_attempts', 'time_limit_minutes', 'show_correct_answers',
+        'randomize_questions',
+    ).get(pk=test_id)
+    rows = TestQuestionLink.objects.filter(test_id=test_id).order_by('sequence_order', 'id').values_list(
+        'question_id', 'question__question_type', 'question__options', 'question__correct_answer', 'question__points',
+    )
+    questions = tuple(
+        compile_question(qid, GRADED_AS.get(kind), options, None if kind == 'essay' else _stored_answer(answer), points)
+        for qid, kind, options, answer, points in rows
+    )
+    return AnswerKey(
+        str(test_id), test['module_id'], test['course_id'], questions, sum(q.points for q in questions),
+        test['passing_score'], test['max_attempts'], test['time_limit_minutes'], test['show_correct_answers'],
+        test['randomize_questions'], None,
+    )
+
+
+def test_key_cache_key(test_id):
+    return f'test_answer_key:{test_id}'
+
+
+def test_key(test_id):
+    key = test_key_cache_key(test_id)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_test_key(test_id)
+        cache.set(key, compiled, TEST_KEY_CACHE_SECONDS)
+    return compiled
+
+
+def invalidate_test_key(*test_ids):
+    """Drop cached keys now and after commit, as ``stats.invalidate_enrollment_stats`` does."""
+    keys = [test_key_cache_key(tid) for tid in test_ids if tid is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def question_changed(question_id):
+    """A question was edited or deleted: every test using it needs a new key."""
+    invalidate_test_key(*TestQuestionLink.objects.filter(question_id=question_id).values_list('test_id', flat=True))
+
+
+# --- attempts ------------------------------------------------------------------------
+
+def question_payload(questions, with_answers=False):
+    """Test questions as a learner sees them, in the given order."""
+    fields = ['id', 'question_type', 'question_text', 'options', 'points', 'difficulty']
+    if with_answers:
+        fields += ['correct_answer', 'explanation']
+    rows = {str(row['id']): row for row in TestQuestion.objects.filter(id__in=[q.id for q in questions]).values(*fields)}
+    return [{**rows[q.id], 'id': q.id} for q in questions if q.id in rows]
+
+
+def _time_out(attempt, closed_at):
+    attempt.status, attempt.score, attempt.points_earned, attempt.passed = 'timed_out', 0, 0, False
+    attempt.submitted_at = closed_at
+    attempt.save(update_fields=['status', 'score', 'points_earned', 'passed', 'submitted_at', 'updated_at'])
+
+
+def start_test_attempt(test_id, user, now=None):
+    """(attempt, created): the learner's attempt in progress, or the next numbered one if allowed."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # the test row lock serialises starts, so attempt numbers and max_attempts hold under concurrency
+        if not Test.objects.select_for_update().filter(pk=test_id).exists():
+            raise AttemptError('Test not found', status=404)
+        key = test_key(test_id)
+        attempts = TestAttempt.objects.filter(test_id=test_id, user=user)
+        current = attempts.filter(status='in_progress').order_by('-attempt_number').first()
+        if current is not None:
+            ends = deadline(key, current.started_at)
+            if ends is None or now <= ends:
+                return current, False
+            _time_out(current, ends)
+        used = attempts.aggregate(n=Max('attempt_number'))['n'] or 0
+        if not key.attempts_allowed or used < key.attempts_allowed:
+            return TestAttempt.objects.create(
+                test_id=test_id, user=user, attempt_number=used + 1, seed=new_seed(), started_at=now,
+            ), True
+    raise AttemptError('No attempts left', status=403)
+
+
+def _answer_row(attempt, question_id, answer, correct, points):
+    return TestAnswer(
+        attempt=attempt,
+        question_id=question_id,
+        answer_text=answer if isinstance(answer, str) else None,
+        selected_options=None if answer is None or isinstance(answer, str) else answer,
+        is_correct=correct,
+        points_earned=points,
+    )
+
+
+def submit_test_attempt(attempt_id, user, answers, now=None):
+    """Grade an attempt in progress, storing one ``TestAnswer`` per delivered question."""
+    if not isinstance(answers, dict):
+        raise AttemptError("'answers' must be an object keyed by question id")
+    now = now or timezone.now()
+    with transaction.atomic():
+        attempt = TestAttempt.objects.select_for_update().filter(pk=attempt_id, user=user).first()
+        if attempt is None:
+            raise AttemptError('Attempt not found', status=404)
+        if attempt.status != 'in_progress':
+            raise AttemptError('Attempt already submitted', status=409)
+        key = test_key(attempt.test_id)
+        ends = deadline(key, attempt.started_at)
+        late = ends is not None and now > ends
+        if late:
+            _time_out(attempt, ends)
+        else:
+            result = grade(key, answers, delivered_questions(key, attempt.seed))
+            TestAnswer.objects.bulk_create(
+                _answer_row(attempt, qid, answers.get(qid), correct, points)
+                for qid, correct, points in result['questions']
+            )
+            attempt.status = 'completed'
+            attempt.score, attempt.passed = result['score'], result['passed']
+            attempt.points_earned = result['earned_points']
+            attempt.submitted_at = now
+            attempt.time_spent_minutes = int((now - attempt.started_at).total_seconds() // 60)
+            attempt.save()
+    if late:
+        raise AttemptError('Time limit exceeded; the attempt was closed unscored', status=409)
+    return attempt, describe(key, result)
+
+
+def review_test_attempt(attempt_id, reviewer, reviews, now=None):
+    """Mark a completed attempt's answers that wait for review ({question_id: correct}) and rescore it."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        attempt = TestAttempt.objects.select_for_update().filter(pk=attempt_id).first()
+        if attempt is None:
+            raise AttemptError('Attempt not found', status=404)
+        if attempt.status != 'completed':
+            raise AttemptError('Attempt not submitted yet', status=409)
+        key = test_key(attempt.test_id)
+        rows = {str(row.question_id): row for row in attempt.answers.all()}
+        reviews = settle_reviews([qid for qid, row in rows.items() if row.is_correct is None], reviews)
+        points = {q.id: q.points for q in key.questions}
+        changed = []
+        for question_id, correct in reviews.items():
+            row = rows[question_id]
+            row.is_correct, row.points_earned = correct, points.get(question_id, 0) if correct else 0
+            row.updated_at = now
+            changed.append(row)
+        TestAnswer.objects.bulk_update(changed, ['is_correct', 'points_earned', 'updated_at'])
+        earned = sum(row.points_earned for row in rows.values())
+        total = sum(points.get(question_id, 0) for question_id in rows)
+        attempt.points_earned, attempt.score = earned, percentage(earned, total)
+        pending = any(row.is_correct is None for row in rows.values())
+        attempt.passed = None if pending else attempt.score >= key.passing_score
+        attempt.graded_by, attempt.graded_at = reviewer, now
+        attempt.save()
+    return attempt
@@ -0,0 +1,151 @@
+"""Which modules a learner may open, and when the locked ones unlock.
+
+Rules come from ``ModuleSequencing``:
+
+* ``preceding_module`` orders a module after another one: it cannot unlock
+  before its predecessor does.
+* ``prerequisite_completed`` additionally requires the learner to have
+  completed the predecessor (``ModuleCompletion.is_completed`` or a
+  completed ``UnitProgress``, the same rule as ``courses.progress``).
+* ``drip_feed_rule`` delays the unlock by ``drip_feed_delay_days``, counted
+  from enrollment (``time_based``) or from completing the predecessor
+  (``completion_based``).
+
+The per-course graph is topologically sorted once and cached until the
+course's units or rules change; a request then costs two small queries (the
+enrollment and the learner's completions) and one pass over the modules.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Coalesce
+
+from .models import ModuleCompletion, ModuleSequencing, Unit, UnitProgress
+
+
+GRAPH_CACHE_SECONDS = getattr(settings, 'COURSE_GRAPH_CACHE_SECONDS', 3600)
+DRIP_FEED_RULES = ('none', 'time_based', 'completion_based')
+
+Node = namedtuple('Node', 'module_id preceding_id requires_completion drip_feed_rule delay_days')
+
+
+def graph_cache_key(course_id):
+    return f'course_graph:{course_id}'
+
+
+def _topological(nodes):
+    """Order ``nodes`` (a dict by module ID) so every predecessor comes first; nodes on a cycle go last."""
+    children = {}
+    roots = []
+    for node in nodes.values():
+        if node.preceding_id in nodes:
+            children.setdefault(node.preceding_id, []).append(node.module_id)
+        else:
+            roots.append(node.module_id)
+    order = []
+    while roots:
+        module_id = roots.pop()
+        order.append(module_id)
+        roots.extend(children.get(module_id, ()))
+    if len(order) < len(nodes):
+        placed = set(order)
+        order.extend(module_id for module_id in nodes if module_id not in placed)
+    return order
+
+
+def build_course_graph(course_id):
+    """(nodes in sequence order, module IDs in topological order) for a course."""
+    rules = {
+        rule['module_id']: rule
+        for rule in ModuleSequencing.objects.filter(course_id=course_id).values(
+            'module_id', 'preceding_module_id', 'prerequisite_completed', 'drip_feed_rule', 'drip_feed_delay_days',
+        )
+    }
+    nodes = {}
+    for module_id in Unit.objects.filter(course_id=course_id).order_by('sequence_order').values_list('id', flat=True):
+        rule = rules.get(module_id)
+        if rule is None:
+            nodes[module_id] = Node(module_id, None, False, 'none', 0)
+        else:
+            nodes[module_id] = Node(
+                module_id, rule['preceding_module_id'], rule['prerequisite_completed'],
+                rule['drip_feed_rule'], rule['drip_feed_delay_days'] or 0,
+            )
+    return list(nodes.values()), _topological(nodes)
+
+
+def course_graph(course_id):
+    key = graph_cache_key(course_id)
+    graph = cache.get(key)
+    if graph is None:
+        graph = build_course_graph(course_id)
+        cache.set(key, graph, GRAPH_CACHE_SECONDS)
+    return graph
+
+
+def invalidate_course_graph(*course_ids):
+    """Drop cached graphs now and after commit, as ``stats.invalidate_enrollment_stats`` does."""
+    keys = [graph_cache_key(cid) for cid in course_ids if cid is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def evaluate(nodes, topo_order, assigned_at, completions, now):
+    """Per-module availability rows, in sequence order.
+
+    Unlock times are filled in topological order, so each module reads its
+    predecessor's final value; ``None`` means the module waits on a
+    prerequisite the learner has not completed.  ``completions`` maps module
+    IDs to the learner's completion time.
+    """
+    by_id = {node.module_id: node for node in nodes}
+    unlock = {}
+    for module_id in topo_order:
+        node = by_id[module_id]
+        at = assigned_at
+        if node.preceding_id is not None:
+            if node.preceding_id in by_id:
+                # a predecessor on a cycle has no entry yet, which keeps the module locked
+                before = unlock.get(node.preceding_id)
+                at = max(at, before) if before is not None else None
+            done = completions.get(node.preceding_id)
+            if node.requires_completion or node.drip_feed_rule == 'completion_based':
+                at = max(at, done) if (at is not None and done is not None) else None
+        if at is not None and node.delay_days and node.drip_feed_rule != 'none':
+            start = assigned_at if node.drip_feed_rule == 'time_based' else at
+            at = max(at, start + timedelta(days=node.delay_days))
+        unlock[module_id] = at
+    return [
+        {
+            'module_id': str(node.module_id),
+            'available': unlock[node.module_id] is not None and unlock[node.module_id] <= now,
+            'unlock_at': unlock[node.module_id].isoformat() if unlock[node.module_id] else None,
+            'waiting_for': (
+                str(node.preceding_id) if unlock[node.module_id] is None and node.preceding_id else None
+            ),
+        }
+        for node in nodes
+    ]
+
+
+def learner_availability(enrollment, now):
+    """Availability of every module in ``enrollment.course`` for ``enrollment.user``."""
+    nodes, topo_order = course_graph(enrollment.course_id)
+    # completed by either source, as in the progress rollups; one UNION query
+    via_completion = ModuleCompletion.objects.filter(
+        user_id=enrollment.user_id, module__course_id=enrollment.course_id, is_completed=True,
+    ).values_list('module_id', Coalesce('completed_at', 'updated_at'))
+    via_progress = UnitProgress.objects.filter(
+        enrollment_id=enrollment.id, status='completed',
+    ).values_list('unit_id', Coalesce('completed_at', 'started_at', 'created_at'))
+    completions = {}
+    for module_id, at in via_completion.union(via_progress, all=True):
+        # the earliest record is when the module was first completed
+        if module_id not in completions or at < completions[module_id]:
+            completions[module_id] = at
+    return evaluate(nodes, topo_order, enrollment.assigned_at, completions, now)
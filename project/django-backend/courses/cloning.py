@@ -0,0 +1,76 @@
+"""Deep course duplication.
+
+Copies the course row, its units, every unit subtype table, quiz questions
+and ``ModuleSequencing`` rules.  Each table is read once and written with one
+``bulk_create``; primary keys are UUIDs assigned on instantiation, so old-to-new
+IDs are remapped in memory before anything is inserted.  Media is shared, not
+copied: subtype URLs and storage paths point at the same files.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Course, Unit, VideoUnit, AudioUnit, PresentationUnit, TextUnit, PageUnit,
+    Quiz, Question, Assignment, ScormPackage, Survey, ModuleSequencing,
+)
+
+
+CLONE_BATCH_SIZE = 1000
+# one-to-one unit subtype tables, copied row for row
+SUBTYPE_MODELS = (
+    VideoUnit, AudioUnit, PresentationUnit, TextUnit, PageUnit, Quiz,
+    Assignment, ScormPackage, Survey,
+)
+
+
+def _copy(instance, **overrides):
+    """Unsaved copy of ``instance`` with a fresh primary key."""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    values.update(overrides)
+    return type(instance)(**values)
+
+
+def clone_course(course, created_by):
+    """Duplicate ``course`` as a draft owned by ``created_by`` and return the copy."""
+    now = timezone.now()
+    with transaction.atomic():
+        dup = _copy(course, title=f"{course.title} (copy)", status='draft', created_by_id=created_by.pk, created_at=now)
+        dup.save(force_insert=True)
+
+        units = {}
+        for unit in Unit.objects.filter(course=course).order_by('sequence_order'):
+            units[unit.pk] = _copy(unit, course_id=dup.pk, created_at=now)
+        Unit.objects.bulk_create(units.values(), batch_size=CLONE_BATCH_SIZE)
+
+        quizzes = {}
+        for model in SUBTYPE_MODELS:
+            copies = []
+            for row in model.objects.filter(unit__course=course):
+                copy = _copy(row, unit_id=units[row.unit_id].pk)
+                if model is Quiz:
+                    quizzes[row.pk] = copy
+                copies.append(copy)
+            model.objects.bulk_create(copies, batch_size=CLONE_BATCH_SIZE)
+
+        Question.objects.bulk_create(
+            [
+                _copy(question, quiz_id=quizzes[question.quiz_id].pk)
+                for question in Question.objects.filter(quiz__unit__course=course)
+            ],
+            batch_size=CLONE_BATCH_SIZE,
+        )
+
+        rules = []
+        for rule in ModuleSequencing.objects.filter(course=course, module__course=course):
+            # a prerequisite outside this course cannot be remapped; the copy drops it
+            preceding = units.get(rule.preceding_module_id)
+            rules.append(_copy(
+                rule, course_id=dup.pk, module_id=units[rule.module_id].pk,
+                preceding_module_id=preceding.pk if preceding else None, created_at=now,
+            ))
+        ModuleSequencing.objects.bulk_create(rules, batch_size=CLONE_BATCH_SIZE)
+    return dup
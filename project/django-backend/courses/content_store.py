@@ -0,0 +1,272 @@
+"""MongoDB content repository for ``module_content_items``, ``media_files`` and ``test_question_media``.
+
+The collections, validators and indexes are declared in ``courses.mongo_schema``.
+This module is the app's only way in:
+
+* One ``MongoClient`` per process.  pymongo pools connections inside the
+  client and is thread-safe, so ``get_client`` creates it lazily from
+  ``MONGODB_URI`` and every request and worker thread shares it.  The
+  pool is sized by ``MONGODB_MAX_POOL_SIZE``.  Tests hand in a
+  ``mongomock.MongoClient`` (or a client for a local ``mongod``) with
+  ``set_client``.
+* A module's (or question's) items are saved as a whole list with one
+  ``bulk_write``.  Items that carry an ``id`` are upserted, new ones are
+  inserted with client-side ObjectIds, and anything no longer listed is
+  deleted (as the last operation).  ``sequence_order`` follows list
+  position.  ``ordered=True`` (the default) stops at the first failed
+  write.  ``ordered=False`` lets the server apply the rest, which is
+  faster for large lists.
+* Reads are projected to the fields the caller needs (``LIST_FIELDS`` by
+  default) and go through ``idx_module_id_sequence_order``, which covers
+  both the filter and the sort.
+"""
+import mimetypes
+import os
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DeleteMany, InsertOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+MONGODB_URI = getattr(settings, 'MONGODB_URI', 'mongodb://localhost:27017')
+MONGODB_DB = getattr(settings, 'MONGODB_DB', 'lms')
+MONGODB_MAX_POOL_SIZE = getattr(settings, 'MONGODB_MAX_POOL_SIZE', 50)
+MONGODB_TIMEOUT_MS = getattr(settings, 'MONGODB_TIMEOUT_MS', 5000)
+
+MODULE_ITEMS = 'module_content_items'
+MEDIA_FILES = 'media_files'
+QUESTION_MEDIA = 'test_question_media'
+MODULE_ORDER_INDEX = 'idx_module_id_sequence_order'
+
+CONTENT_TYPES = ('video', 'pdf', 'ppt', 'document', 'link')
+QUESTION_MEDIA_TYPES = ('image', 'video', 'audio')
+# what a module's item list needs; get_item returns everything
+LIST_FIELDS = (
+    'title', 'content_type', 'file_reference', 'thumbnail_url', 'duration_seconds', 'sequence_order',
+    'metadata.mime_type',
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # connect=False: no sockets until first use, so forking servers do not share them
+                _client = MongoClient(
+                    MONGODB_URI, maxPoolSize=MONGODB_MAX_POOL_SIZE, serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+                    connect=False, tz_aware=True,
+                )
+    return _client
+
+
+def set_client(client):
+    """Replace the process-wide client (tests); returns the previous one."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
+
+
+def get_db():
+    return get_client()[MONGODB_DB]
+
+
+def _projection(fields):
+    return None if fields is None else {field: 1 for field in fields}
+
+
+def _object_id(value, label):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError(f'{label}: id must be an ObjectId')
+
+
+def serialize(doc):
+    """JSON-safe copy of a document: ``_id`` becomes ``id``."""
+    doc = dict(doc)
+    if '_id' in doc:
+        doc['id'] = str(doc.pop('_id'))
+    return doc
+
+
+def _replace_children(collection, parent_field, parent_id, docs, ordered):
+    """Make ``docs`` (each with an ``_id``) the complete set of children of ``parent_id``."""
+    now = timezone.now()
+    keep = [doc['_id'] for doc in docs]
+    claimed = [doc['_id'] for doc in docs if not doc.get('_new')]
+    if claimed and get_db()[collection].count_documents({'_id': {'$in': claimed}, parent_field: {'$ne': parent_id}}):
+        raise ValueError(f'item ids must belong to this {parent_field[:-3]}')
+    ops = []
+    for doc in docs:
+        new = doc.pop('_new', False)
+        fields = {key: value for key, value in doc.items() if key not in ('_id', 'created_at', 'updated_at')}
+        fields['updated_at'] = now
+        if new:
+            ops.append(InsertOne({'_id': doc['_id'], **fields, 'created_at': now}))
+        else:
+            ops.append(UpdateOne(
+                {'_id': doc['_id'], parent_field: parent_id},
+                {'$set': fields, '$setOnInsert': {'created_at': now}},
+                upsert=True,
+            ))
+    # last, so an ordered write that fails part-way has not dropped anything yet
+    ops.append(DeleteMany({parent_field: parent_id, '_id': {'$nin': keep}}))
+    try:
+        result = get_db()[collection].bulk_write(ops, ordered=ordered)
+    except BulkWriteError as exc:
+        errors = exc.details.get('writeErrors', [])
+        first = errors[0].get('errmsg', '') if errors else ''
+        raise ValueError(f'{len(errors)} write(s) rejected: {first}')
+    return {
+        'inserted': result.inserted_count + result.upserted_count,
+        'updated': result.modified_count,
+        'deleted': result.deleted_count,
+        'ids': [str(i) for i in keep],
+    }
+
+
+# --- module_content_items ------------------------------------------------------
+
+def _content_item(module_id, position, item):
+    label = f'item {position}'
+    if not isinstance(item, dict):
+        raise ValueError(f'{label} must be an object')
+    content_type = item.get('content_type')
+    if content_type not in CONTENT_TYPES:
+        raise ValueError(f"{label}: content_type must be one of {', '.join(CONTENT_TYPES)}")
+    for field in ('title', 'file_reference'):
+        if not isinstance(item.get(field), str) or not item[field]:
+            raise ValueError(f'{label}: {field} is required')
+    for field in ('file_size_bytes', 'duration_seconds'):
+        value = item.get(field)
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0):
+            raise ValueError(f'{label}: {field} must be a non-negative number')
+
+    metadata = dict(item.get('metadata') or {})
+    ext = os.path.splitext(item['file_reference'])[1].lstrip('.').lower()
+    metadata.setdefault('format', ext or content_type)
+    metadata.setdefault('mime_type', mimetypes.guess_type(item['file_reference'])[0] or 'application/octet-stream')
+
+    doc = {key: value for key, value in item.items() if key not in ('id', 'module_id', 'sequence_order')}
+    doc.update(module_id=module_id, sequence_order=position, metadata=metadata)
+    if item.get('id'):
+        doc['_id'] = _object_id(item['id'], label)
+    else:
+        doc['_id'], doc['_new'] = ObjectId(), True
+    return doc
+
+
+def save_module_items(module_id, items, ordered=True):
+    """Replace a module's content items with ``items`` in one bulk write.
+
+    Raises ``ValueError`` (before writing anything) for malformed items, and
+    for writes the server rejects.  Returns inserted/updated/deleted counts
+    and the item IDs in order.
+    """
+    module_id = str(module_id)
+    if not isinstance(items, list):
+        raise ValueError("'items' must be a list")
+    docs = [_content_item(module_id, position, item) for position, item in enumerate(items)]
+    if len({doc['_id'] for doc in docs}) != len(docs):
+        raise ValueError('an item id is listed more than once')
+    return _replace_children(MODULE_ITEMS, 'module_id', module_id, docs, ordered)
+
+
+def module_items(module_id, fields=LIST_FIELDS):
+    """A module's items in sequence order, projected to ``fields`` (None for whole documents)."""
+    cursor = (
+        get_db()[MODULE_ITEMS]
+        .find({'module_id': str(module_id)}, _projection(fields))
+        .sort([('module_id', ASCENDING), ('sequence_order', ASCENDING)])
+        .hint(MODULE_ORDER_INDEX)
+    )
+    return [serialize(doc) for doc in cursor]
+
+
+def items_for_modules(module_ids, fields=LIST_FIELDS):
+    """{module_id: [items]} for many modules in one query (a course outline)."""
+    ids = [str(module_id) for module_id in module_ids]
+    grouped = {module_id: [] for module_id in ids}
+    if not ids:
+        return grouped
+    cursor = (
+        get_db()[MODULE_ITEMS]
+        .find({'module_id': {'$in': ids}}, _projection(('module_id',) + tuple(fields)))
+        .sort([('module_id', ASCENDING), ('sequence_order', ASCENDING)])
+        .hint(MODULE_ORDER_INDEX)
+    )
+    for doc in cursor:
+        grouped[doc['module_id']].append(serialize(doc))
+    return grouped
+
+
+def get_item(item_id, fields=None):
+    doc = get_db()[MODULE_ITEMS].find_one({'_id': _object_id(item_id, 'item')}, _projection(fields))
+    return serialize(doc) if doc else None
+
+
+def delete_module_items(module_id):
+    return get_db()[MODULE_ITEMS].delete_many({'module_id': str(module_id)}).deleted_count
+
+
+# --- test_question_media -------------------------------------------------------
+
+def save_question_media(question_id, items, ordered=True):
+    """Replace a question's media with ``items``; same contract as ``save_module_items``."""
+    question_id = str(question_id)
+    if not isinstance(items, list):
+        raise ValueError("'items' must be a list")
+    docs = []
+    for position, item in enumerate(items):
+        label = f'media {position}'
+        if not isinstance(item, dict) or item.get('media_type') not in QUESTION_MEDIA_TYPES:
+            raise ValueError(f"{label}: media_type must be one of {', '.join(QUESTION_MEDIA_TYPES)}")
+        if not isinstance(item.get('file_reference'), str) or not item['file_reference']:
+            raise ValueError(f'{label}: file_reference is required')
+        doc = {key: value for key, value in item.items() if key not in ('id', 'question_id')}
+        doc['question_id'] = question_id
+        if item.get('id'):
+            doc['_id'] = _object_id(item['id'], label)
+        else:
+            doc['_id'], doc['_new'] = ObjectId(), True
+        docs.append(doc)
+    return _replace_children(QUESTION_MEDIA, 'question_id', question_id, docs, ordered)
+
+
+def media_for_questions(question_ids, fields=('media_type', 'file_reference', 'metadata')):
+    """{question_id: [media]} for many questions in one query (uses ``idx_question_id``)."""
+    ids = [str(question_id) for question_id in question_ids]
+    grouped = {question_id: [] for question_id in ids}
+    if ids:
+        for doc in get_db()[QUESTION_MEDIA].find({'question_id': {'$in': ids}}, _projection(('question_id',) + tuple(fields))):
+            grouped[doc['question_id']].append(serialize(doc))
+    return grouped
+
+
+# --- media_files ---------------------------------------------------------------
+
+def media_files_by_status(encoding_status, limit=100, fields=('file_type', 'title', 'file_path', 'encoding_status')):
+    """Oldest media files in one encoding state (``idx_encoding_status``)."""
+    cursor = (
+        get_db()[MEDIA_FILES].find({'encoding_status': encoding_status}, _projection(fields))
+        .sort('created_at', ASCENDING).limit(limit)
+    )
+    return [serialize(doc) for doc in cursor]
+
+
+def set_encoding_status(file_ids, encoding_status):
+    """Move many media files to ``encoding_status`` with one ``update_many``; returns how many changed."""
+    ids = [_object_id(file_id, 'media file') for file_id in file_ids]
+    return get_db()[MEDIA_FILES].update_many(
+        {'_id': {'$in': ids}}, {'$set': {'encoding_status': encoding_status, 'updated_at': timezone.now()}},
+    ).modified_count
@@ -0,0 +1,58 @@
+"""Which questions an attempt is given, and in what order.
+
+Each attempt stores a random 63-bit ``seed``.  Every question in the quiz's
+cached answer key (``courses.grading``) is ranked by a keyed hash of the
+seed and the question ID:
+
+* With ``Quiz.questions_per_attempt`` set, the attempt gets that many of
+  the lowest-ranked questions.  This is a uniform draw from the pool.
+  Adding or removing a pool question changes at most one question of an
+  existing attempt's draw.
+* With ``randomize_questions`` set, the questions come in rank order.
+  Otherwise they come in authored ``order``.
+
+The same seed always yields the same questions, so resuming or regrading
+an attempt re-derives them instead of storing a list.  Nothing is shuffled
+in the database.  Attempts without a seed (older ones, and one-step
+submissions, which only untimed quizzes without a draw accept) get every
+question in authored order.
+"""
+import hashlib
+import heapq
+import secrets
+
+from .models import Question
+
+
+def new_seed():
+    return secrets.randbits(63)
+
+
+def _rank(seed, question_id):
+    digest = hashlib.blake2b(question_id.encode(), digest_size=8, key=seed.to_bytes(8, 'big')).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def draws_subset(key):
+    return bool(key.questions_per_attempt) and key.questions_per_attempt < len(key.questions)
+
+
+def delivered_questions(key, seed):
+    """The compiled questions an attempt with ``seed`` is given, in delivery order."""
+    if seed is None or not (key.randomize_questions or draws_subset(key)):
+        return key.questions
+    if draws_subset(key):
+        ranked = heapq.nsmallest(key.questions_per_attempt, key.questions, key=lambda q: _rank(seed, q.id))
+    else:
+        ranked = sorted(key.questions, key=lambda q: _rank(seed, q.id))
+    if key.randomize_questions:
+        return tuple(ranked)
+    chosen = {q.id for q in ranked}
+    return tuple(q for q in key.questions if q.id in chosen)
+
+
+def question_payload(questions, with_answers=False):
+    """Questions as a learner sees them, in the given order; ``correct_answer`` only if ``with_answers``."""
+    fields = ['id', 'type', 'text', 'options', 'points'] + (['correct_answer'] if with_answers else [])
+    rows = {str(row['id']): row for row in Question.objects.filter(id__in=[q.id for q in questions]).values(*fields)}
+    return [{**rows[q.id], 'id': q.id} for q in questions if q.id in rows]
@@ -0,0 +1,154 @@
+"""Set-based course assignment.
+
+Resolves an audience of explicit users and team members in a handful of
+queries, diffs it against the course's existing enrollments in one query and
+inserts the remainder in chunks with ``INSERT ... ON CONFLICT DO NOTHING
+RETURNING``, so the counts report only the rows that were really created.
+"""
+import uuid
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Profile, Enrollment, TeamMember
+from .stats import invalidate_enrollment_stats
+
+
+# Rows per INSERT statement; keeps statements well under Postgres' parameter limit.
+ENROLLMENT_BATCH_SIZE = 1000
+# IDs per `IN (...)` lookup when resolving explicit users.
+LOOKUP_CHUNK_SIZE = 10000
+
+
+def parse_uuids(values):
+    """Split ``values`` into (valid UUIDs in first-seen order, invalid raw values)."""
+    valid, invalid, seen = [], [], set()
+    for value in values or []:
+        try:
+            parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except (TypeError, ValueError, AttributeError):
+            invalid.append(value)
+            continue
+        if parsed not in seen:
+            seen.add(parsed)
+            valid.append(parsed)
+    return valid, invalid
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_enrollments(course, assigned_by, user_ids, batch_size=ENROLLMENT_BATCH_SIZE):
+    """Insert 'assigned' enrollments for ``user_ids``, ignoring rows that already exist.
+
+    ``course`` and ``assigned_by`` may be instances or primary keys.  Returns
+    the set of user ids that were actually inserted, so rows dropped as
+    conflicts (a concurrent assignment of the same learner) are not counted.
+    """
+    course_id = getattr(course, 'pk', course)
+    assigned_by_id = getattr(assigned_by, 'pk', assigned_by)
+    inserted = set()
+    for chunk in _chunks(user_ids, batch_size):
+        inserted.update(_insert_chunk(course_id, assigned_by_id, chunk))
+    if inserted:
+        # the inserts bypass post_save, so invalidate the course's cached stats here
+        invalidate_enrollment_stats(course_id)
+    return inserted
+
+
+def _insert_chunk(course_id, assigned_by_id, chunk):
+    if connection.vendor != 'postgresql':
+        with transaction.atomic():
+            existing = set(
+                Enrollment.objects.filter(course_id=course_id, user_id__in=chunk).values_list('user_id', flat=True)
+            )
+            Enrollment.objects.bulk_create(
+                [Enrollment(course_id=course_id, user_id=uid, assigned_by_id=assigned_by_id, status='assigned') for uid in chunk],
+                ignore_conflicts=True,
+            )
+        return {uid for uid in chunk if uid not in existing}
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO enrollments (id, course_id, user_id, assigned_by_id, status, progress_percentage, assigned_at)
+            SELECT gen_random_uuid(), %s, u.user_id, %s, 'assigned', 0, %s
+            FROM unnest(%s::uuid[]) AS u(user_id)
+            ON CONFLICT (course_id, user_id) DO NOTHING
+            RETURNING user_id
+        """, [course_id, assigned_by_id, timezone.now(), [str(uid) for uid in chunk]])
+        return {uuid.UUID(str(row[0])) for row in cursor.fetchall()}
+
+
+def resolve_audience(user_ids=None, team_ids=None):
+    """Resolve explicit users and team members into assignment targets.
+
+    Returns ``(targets, report)`` where ``targets`` maps each user id to the
+    target that first claimed it (``'users'`` or a team id string) and
+    ``report`` carries the per-target counters filled in by ``assign_course``.
+    """
+    user_uuids, invalid_users = parse_uuids(user_ids)
+    team_uuids, invalid_teams = parse_uuids(team_ids)
+
+    existing_users = set()
+    for chunk in _chunks(user_uuids, LOOKUP_CHUNK_SIZE):
+        existing_users.update(Profile.objects.filter(id__in=chunk).values_list('id', flat=True))
+
+    targets = {}
+    report = {
+        'users': {
+            'requested': len(user_uuids) + len(invalid_users),
+            'created': 0,
+            'already_enrolled': 0,
+            'not_found': len(invalid_users) + len(user_uuids) - len(existing_users),
+        },
+        'teams': {},
+    }
+    for uid in user_uuids:
+        if uid in existing_users:
+            targets.setdefault(uid, 'users')
+
+    for tid in team_uuids:
+        report['teams'][str(tid)] = {'members': 0, 'created': 0, 'already_enrolled': 0, 'duplicates': 0}
+    for raw in invalid_teams:
+        report['teams'][str(raw)] = {'members': 0, 'created': 0, 'already_enrolled': 0, 'duplicates': 0}
+
+    if team_uuids:
+        members = TeamMember.objects.filter(team_id__in=team_uuids).values_list('team_id', 'user_id')
+        for tid, uid in members.iterator(chunk_size=LOOKUP_CHUNK_SIZE):
+            key = str(tid)
+            report['teams'][key]['members'] += 1
+            if uid in targets:
+                # already claimed by an explicit user id or an earlier team
+                report['teams'][key]['duplicates'] += 1
+                continue
+            targets[uid] = key
+
+    return targets, report
+
+
+def assign_course(course, assigned_by, user_ids=None, team_ids=None, batch_size=ENROLLMENT_BATCH_SIZE):
+    """Enroll explicit users and team members in ``course``.
+
+    Existing enrollments are skipped and rows are inserted with
+    ``ignore_conflicts`` so a concurrent assignment of the same learner cannot
+    fail the whole batch.  Returns a summary with totals and per-target counts.
+    """
+    targets, report = resolve_audience(user_ids, team_ids)
+
+    enrolled = set(Enrollment.objects.filter(course=course).values_list('user_id', flat=True))
+
+    pending = [uid for uid in targets if uid not in enrolled]
+    with transaction.atomic():
+        inserted = insert_enrollments(course, assigned_by, pending, batch_size=batch_size)
+
+    for uid, target in targets.items():
+        bucket = report['users'] if target == 'users' else report['teams'][target]
+        if uid in inserted:
+            bucket['created'] += 1
+        else:
+            bucket['already_enrolled'] += 1
+
+    report['created'] = len(inserted)
+    report['skipped'] = len(targets) - len(inserted)
+    return report
@@ -0,0 +1,408 @@
+"""Server-side quiz grading.
+
+A quiz's questions are compiled once into an ``AnswerKey``, which is cached
+until a question or the quiz settings change.  In the key, every expected
+answer is already normalised: option texts and indices become option
+indices, text is whitespace-collapsed and case-folded, and sets and pairs
+are frozen.  Grading an attempt is then one dictionary pass with no queries:
+each submitted answer is normalised the same way and compared.
+
+Answer formats (``QuizAttempt.answers`` is ``{question_id: answer}``):
+
+* ``multiple_choice`` - an option index or option text.
+* ``multiple_answer`` - a list of indices or texts; the set must match exactly.
+* ``true_false`` - ``true``/``false`` (booleans or strings).
+* ``fill_blank`` - a string, or a list with one entry per blank.  The
+  ``correct_answer`` entry for each blank is a string or a list of accepted
+  alternatives.
+* ``matching`` - ``{left: right}`` or a list of ``[left, right]`` pairs.
+* ``ordering`` - the items (indices or texts) in order.
+* ``free_text`` - compared with the accepted answers in ``correct_answer``.
+  Without any, the question waits for a trainer (``pending_review``).
+
+A question whose ``correct_answer`` cannot be compiled is also reported as
+pending review rather than silently marking everyone wrong.
+Only the questions delivered to the attempt count (``courses.delivery``).
+``score`` is the percentage of their points earned, and ``passed`` means
+``score >= passing_score``.  While a question waits for review the score
+counts it as unearned and ``passed`` is ``None``; ``review_attempt`` stores
+the trainer's verdicts in ``QuizAttempt.reviews`` and grades again.
+The learner's best score is kept on their
+``UnitProgress`` row for the quiz unit.  ``start_attempt`` and ``submit_attempt``
+enforce ``attempts_allowed`` (0 for unlimited) and ``time_limit``
+(minutes, plus ``QUIZ_SUBMIT_GRACE_SECONDS`` for network latency).
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .delivery import delivered_questions, draws_subset, new_seed
+from .models import Question, Quiz, QuizAttempt, UnitProgress
+
+
+ANSWER_KEY_CACHE_SECONDS = getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_SECONDS', 3600)
+SUBMIT_GRACE_SECONDS = getattr(settings, 'QUIZ_SUBMIT_GRACE_SECONDS', 30)
+BOOLEANS = {'true': True, 'false': False}
+
+AnswerKey = namedtuple(
+    'AnswerKey',
+    'quiz_id unit_id course_id questions total_points passing_score attempts_allowed time_limit show_answers '
+    'randomize_questions questions_per_attempt',
+)
+# choices maps option index and normalised option text to the index; answer is the raw correct_answer
+CompiledQuestion = namedtuple('CompiledQuestion', 'id type points choices expected answer')
+
+
+class AttemptError(ValueError):
+    """Attempt rule violated; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# --- normalisation ---------------------------------------------------------------
+# each returns a hashable canonical form, or None when the value cannot be an answer
+
+def _text(value):
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return ' '.join(str(value).split()).casefold()
+
+
+def _choice(value, choices):
+    if isinstance(value, bool):
+        return None
+    return choices.get(value if isinstance(value, int) else _text(value))
+
+
+def _item(value, choices):
+    """Ordering item: an option when the question has options, otherwise text."""
+    return _choice(value, choices) if choices else _text(value)
+
+
+def _choice_set(value, choices):
+    if not isinstance(value, (list, tuple)):
+        return None
+    picked = frozenset(_choice(v, choices) for v in value)
+    return None if None in picked else picked
+
+
+def _boolean(value, choices):
+    if isinstance(value, bool):
+        return value
+    return BOOLEANS.get(_text(value)) if isinstance(value, str) else None
+
+
+def _blanks(value, choices):
+    values = value if isinstance(value, (list, tuple)) else [value]
+    texts = tuple(_text(v) for v in values)
+    return None if None in texts else texts
+
+
+def _pairs(value, choices):
+    if isinstance(value, dict):
+        value = value.items()
+    elif not isinstance(value, (list, tuple)):
+        return None
+    pairs = []
+    for pair in value:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+            return None
+        pairs.append((_text(pair[0]), _text(pair[1])))
+    pairs = frozenset(pairs)
+    return None if any(None in pair for pair in pairs) else pairs
+
+
+def _sequence(value, choices):
+    if not isinstance(value, (list, tuple)):
+        return None
+    items = tuple(_item(v, choices) for v in value)
+    return None if None in items else items
+
+
+def _accepted(value, choices):
+    """free_text: the set of accepted texts."""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    accepted = frozenset(_text(v) for v in values if _text(v))
+    return accepted or None
+
+
+# --- per-type matchers (submitted answer, compiled question) -> bool --------------
+
+def _equal(normalise):
+    return lambda answer, q: normalise(answer, q.choices) == q.expected
+
+
+def _match_blanks(answer, q):
+    given = _blanks(answer, q.choices)
+    return given is not None and len(given) == len(q.expected) and all(
+        text in accepted for text, accepted in zip(given, q.expected)
+    )
+
+
+def _match_free_text(answer, q):
+    return _text(answer) in q.expected
+
+
+def _expected_blanks(value, choices):
+    values = value if isinstance(value, (list, tuple)) else [value]
+    expected = tuple(_accepted(v, choices) for v in values)
+    return None if not expected or None in expected else expected
+
+
+# type: (how correct_answer compiles, how an answer is checked against it)
+QUESTION_GRADERS = {
+    'multiple_choice': (_choice, _equal(_choice)),
+    'multiple_answer': (_choice_set, _equal(_choice_set)),
+    'true_false': (_boolean, _equal(_boolean)),
+    'fill_blank': (_expected_blanks, _match_blanks),
+    'matching': (_pairs, _equal(_pairs)),
+    'ordering': (_sequence, _equal(_sequence)),
+    'free_text': (_accepted, _match_free_text),
+}
+
+
+def compile_question(question_id, question_type, options, correct_answer, points):
+    choices = {}
+    for index, option in enumerate(options if isinstance(options, list) else []):
+        text = option.get('text', option.get('label')) if isinstance(option, dict) else option
+        choices[index] = index
+        if _text(text) is not None:
+            choices.setdefault(_text(text), index)
+    compile_expected = QUESTION_GRADERS.get(question_type, (None, None))[0]
+    expected = None
+    if compile_expected is not None and correct_answer not in (None, '', [], {}):
+        expected = compile_expected(correct_answer, choices)
+    return CompiledQuestion(str(question_id), question_type, points or 0, choices, expected, correct_answer)
+
+
+def compile_answer_key(quiz_id):
+    quiz = Quiz.objects.values(
+        'unit_id', 'unit__course_id', 'passing_score', 'attempts_allowed', 'time_limit', 'show_answers',
+        'randomize_questions', 'questions_per_attempt',
+    ).get(pk=quiz_id)
+    questions = tuple(
+        compile_question(*row)
+        for row in Question.objects.filter(quiz_id=quiz_id).order_by('order', 'id').values_list(
+            'id', 'type', 'options', 'correct_answer', 'points',
+        )
+    )
+    return AnswerKey(
+        str(quiz_id), quiz['unit_id'], quiz['unit__course_id'], questions, sum(q.points for q in questions),
+        quiz['passing_score'], quiz['attempts_allowed'], quiz['time_limit'], quiz['show_answers'],
+        quiz['randomize_questions'], quiz['questions_per_attempt'],
+    )
+
+
+def answer_key_cache_key(quiz_id):
+    return f'quiz_answer_key:{quiz_id}'
+
+
+def answer_key(quiz_id):
+    key = answer_key_cache_key(quiz_id)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_answer_key(quiz_id)
+        cache.set(key, compiled, ANSWER_KEY_CACHE_SECONDS)
+    return compiled
+
+
+def invalidate_answer_key(*quiz_ids):
+    """Drop cached keys now and after commit, as ``stats.invalidate_enrollment_stats`` does."""
+    keys = [answer_key_cache_key(qid) for qid in quiz_ids if qid is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# --- grading ---------------------------------------------------------------------
+
+def check(q, answer):
+    """Whether ``answer`` is right for compiled question ``q``; ``None`` while it waits for review."""
+    if q.expected is None:
+        return None
+    return answer is not None and QUESTION_GRADERS[q.type][1](answer, q)
+
+
+def percentage(earned, total):
+    return round(100 * earned / total) if total else 0
+
+
+def grade(key, answers, delivered=None, reviews=None):
+    """Score ``answers`` ({question_id: answer}) against a compiled ``key``; no queries.
+
+    ``delivered`` limits grading to the questions an attempt was given (see
+    ``courses.delivery``); by default every question counts.  ``reviews``
+    ({question_id: correct}) settles questions that wait for review; until
+    every one is settled, ``passed`` is ``None``.
+    """
+    reviews = reviews or {}
+    total = key.total_points if delivered is None else sum(q.points for q in delivered)
+    earned = 0
+    questions = []
+    pending = []
+    for q in key.questions if delivered is None else delivered:
+        correct = check(q, answers.get(q.id))
+        if correct is None:
+            correct = reviews.get(q.id)
+        if correct is None:
+            pending.append(q.id)
+        elif correct:
+            earned += q.points
+        questions.append((q.id, correct, q.points if correct else 0))
+    score = percentage(earned, total)
+    return {
+        'score': score,
+        'passed': None if pending else score >= key.passing_score,
+        'earned_points': earned,
+        'total_points': total,
+        'pending_review': pending,
+        'questions': questions,
+    }
+
+
+def describe(key, result):
+    """``result`` for a response: per-question outcomes, with the answers when the quiz shows them."""
+    answers = {q.id: q.answer for q in key.questions} if key.show_answers else None
+    questions = []
+    for question_id, correct, points in result['questions']:
+        row = {'id': question_id, 'correct': correct, 'points': points}
+        if answers is not None:
+            row['correct_answer'] = answers[question_id]
+        questions.append(row)
+    return {**result, 'questions': questions}
+
+
+def chosen_options(q, answer):
+    """The options ``answer`` picks (indices, or ``True``/``False``), for distractor counts; empty for other types."""
+    if q.type == 'multiple_choice':
+        picked = _choice(answer, q.choices)
+        return () if picked is None else (picked,)
+    if q.type == 'multiple_answer':
+        return tuple(_choice_set(answer, q.choices) or ())
+    if q.type == 'true_false':
+        picked = _boolean(answer, q.choices)
+        return () if picked is None else (picked,)
+    return ()
+
+
+def deadline(key, started_at):
+    if not key.time_limit or key.time_limit <= 0:
+        return None
+    return started_at + timedelta(minutes=key.time_limit, seconds=SUBMIT_GRACE_SECONDS)
+
+
+def record_unit_score(key, user_id, score):
+    """Keep the learner's best score on their ``UnitProgress`` row for the quiz unit, if there is one."""
+    UnitProgress.objects.filter(
+        unit_id=key.unit_id, enrollment__user_id=user_id, enrollment__course_id=key.course_id,
+    ).update(score=Greatest(Coalesce(F('score'), Value(0)), Value(score)))
+
+
+def _close_unscored(attempt, closed_at):
+    attempt.score, attempt.passed, attempt.completed_at = 0, False, closed_at
+    attempt.save(update_fields=['score', 'passed', 'completed_at'])
+
+
+def start_attempt(quiz_id, user, now=None, seeded=True):
+    """(attempt, created): the learner's open attempt, or a new one if an attempt is left.
+
+    An open attempt whose time is up is closed unscored first; it still counts.
+    New attempts get a delivery seed unless ``seeded`` is false (every question, in order).
+    Unseeded attempts are refused (409) for timed quizzes and quizzes that draw
+    a subset of questions: those must be started first so the clock and the draw hold.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # the quiz row lock serialises starts, so two tabs cannot both take the last attempt
+        if not Quiz.objects.select_for_update().filter(pk=quiz_id).exists():
+            raise AttemptError('Quiz not found', status=404)
+        key = answer_key(quiz_id)
+        if not seeded and (deadline(key, now) is not None or draws_subset(key)):
+            raise AttemptError('This quiz is timed or draws its questions; start an attempt first', status=409)
+        attempts = QuizAttempt.objects.filter(quiz_id=quiz_id, user=user)
+        current = attempts.filter(completed_at__isnull=True).order_by('-started_at').first()
+        if current is not None:
+            ends = deadline(key, current.started_at)
+            if ends is None or now <= ends:
+                return current, False
+            _close_unscored(current, ends)
+        exhausted = key.attempts_allowed and key.attempts_allowed > 0 and attempts.count() >= key.attempts_allowed
+        if not exhausted:
+            seed = new_seed() if seeded else None
+            return QuizAttempt.objects.create(quiz_id=quiz_id, user=user, answers={}, seed=seed, started_at=now), True
+    # raised outside the transaction so closing the expired attempt is kept
+    raise AttemptError('No attempts left', status=403)
+
+
+def submit_attempt(attempt_id, user, answers, now=None):
+    """Grade and close an open attempt; returns ``(attempt, result)``.
+
+    A submission after the time limit closes the attempt unscored and raises
+    ``AttemptError`` (409).
+    """
+    if not isinstance(answers, dict):
+        raise AttemptError("'answers' must be an object keyed by question id")
+    now = now or timezone.now()
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update().filter(pk=attempt_id, user=user).first()
+        if attempt is None:
+            raise AttemptError('Attempt not found', status=404)
+        if attempt.completed_at is not None:
+            raise AttemptError('Attempt already submitted', status=409)
+        key = answer_key(attempt.quiz_id)
+        ends = deadline(key, attempt.started_at)
+        late = ends is not None and now > ends
+        if late:
+            _close_unscored(attempt, ends)
+        else:
+            delivered = delivered_questions(key, attempt.seed)
+            question_ids = {q.id for q in delivered}
+            attempt.answers = {qid: answer for qid, answer in answers.items() if qid in question_ids}
+            result = grade(key, attempt.answers, delivered, attempt.reviews)
+            attempt.score, attempt.passed, attempt.completed_at = result['score'], result['passed'], now
+            attempt.save(update_fields=['answers', 'score', 'passed', 'completed_at'])
+            record_unit_score(key, user.pk, result['score'])
+    if late:
+        raise AttemptError('Time limit exceeded; the attempt was closed unscored', status=409)
+    return attempt, describe(key, result)
+
+
+def settle_reviews(pending, reviews):
+    """Validate a trainer's ``{question_id: correct}`` for the ``pending`` question ids; raises ``AttemptError``."""
+    if not isinstance(reviews, dict) or not reviews:
+        raise AttemptError("'reviews' must be an object of question id -> true/false")
+    unknown = set(reviews) - set(pending)
+    if unknown:
+        raise AttemptError(f'Not waiting for review: {", ".join(sorted(unknown))}')
+    if not all(isinstance(correct, bool) for correct in reviews.values()):
+        raise AttemptError("'reviews' values must be true or false")
+    return reviews
+
+
+def review_attempt(attempt_id, reviews):
+    """Settle a submitted attempt's questions that wait for review; returns ``(attempt, result)``."""
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update().filter(pk=attempt_id).first()
+        if attempt is None:
+            raise AttemptError('Attempt not found', status=404)
+        if attempt.completed_at is None:
+            raise AttemptError('Attempt not submitted yet', status=409)
+        key = answer_key(attempt.quiz_id)
+        answers = attempt.answers if isinstance(attempt.answers, dict) else {}
+        delivered = delivered_questions(key, attempt.seed)
+        pending = grade(key, answers, delivered, attempt.reviews)['pending_review']
+        attempt.reviews = {**attempt.reviews, **settle_reviews(pending, reviews)}
+        result = grade(key, answers, delivered, attempt.reviews)
+        attempt.score, attempt.passed = result['score'], result['passed']
+        attempt.save(update_fields=['reviews', 'score', 'passed'])
+        record_unit_score(key, attempt.user_id, result['score'])
+    return attempt, describe(key, result)
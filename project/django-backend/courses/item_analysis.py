@@ -0,0 +1,236 @@
+"""Item analysis for quiz questions: difficulty, discrimination and distractors.
+
+``refresh_item_analysis`` reads a quiz's completed attempts after its
+watermark (``QuizAnalysisState``), in ``(completed_at, id)`` order through
+``idx_quiz_attempts_completed``, ``ITEM_ANALYSIS_CHUNK_SIZE`` at a time.
+Each chunk is graded in memory against the cached answer key, only for the
+questions the attempt was given (``courses.delivery``).  Learners give the
+same few answers over and over, so each distinct answer to a question is
+graded once per chunk.  The chunk then adds to
+running sums on one ``QuestionStatistic`` row per question, and the
+watermark moves in the same transaction, so every attempt is counted once
+even if a refresh stops part-way.  Attempts completed within
+``ITEM_ANALYSIS_SETTLE_SECONDS`` are left for the next refresh, so a
+submission that commits late cannot fall behind the watermark.  Attempts
+closed unscored with no answers (timed out) are skipped.
+
+The sums are enough for every statistic, so reading them never touches the
+attempts:
+
+* difficulty - the p-value, the share of graded responses that were correct;
+* discrimination - the point-biserial correlation between answering the
+  question correctly and the attempt's score as graded now (the question's
+  own points included);
+* distractors - how often each option was picked, for choice and
+  true/false questions.
+
+Adding, editing or deleting a question changes past outcomes, and so does a
+regrade.  Both call ``reset_item_analysis`` (the question through
+``courses.signals``), and the next refresh reads every attempt again.
+"""
+import math
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .delivery import delivered_questions
+from .grading import answer_key, check, chosen_options, percentage
+from .models import Question, QuestionStatistic, QuizAnalysisState, QuizAttempt
+
+
+ITEM_ANALYSIS_CHUNK_SIZE = getattr(settings, 'ITEM_ANALYSIS_CHUNK_SIZE', 5000)
+SETTLE_SECONDS = getattr(settings, 'ITEM_ANALYSIS_SETTLE_SECONDS', 60)
+SUMS = ('delivered', 'omitted', 'graded', 'correct', 'score_sum', 'score_sq_sum', 'correct_score_sum')
+
+
+def _option_key(choice):
+    return str(choice).lower()
+
+
+def _pending_attempts(quiz_id, state, cutoff):
+    attempts = QuizAttempt.objects.filter(
+        quiz_id=quiz_id, completed_at__isnull=False, completed_at__lte=cutoff,
+    ).exclude(answers={})
+    if state.last_completed_at is not None:
+        last = state.last_completed_at
+        attempts = attempts.filter(Q(completed_at__gt=last) | Q(completed_at=last, id__gt=state.last_attempt_id))
+    return attempts.order_by('completed_at', 'id')
+
+
+def _accumulate(key, rows):
+    """Per-question sums and option counts for one chunk of ``(answers, seed)`` rows."""
+    sums = {q.id: [0] * len(SUMS) + [Counter()] for q in key.questions}
+    # (question id, answer type, answer) -> (correct, option keys); answers repeat, so each is normalised
+    # once.  The type keeps True and 1 apart, which compare equal but do not grade alike.
+    outcomes = {}
+    for answers, seed in rows:
+        answers = answers if isinstance(answers, dict) else {}
+        given = []
+        earned = total = 0
+        for q in delivered_questions(key, seed):
+            answer = answers.get(q.id)
+            memo = (q.id, type(answer), answer)
+            try:
+                outcome = outcomes[memo]
+            except KeyError:
+                outcome = outcomes[memo] = _outcome(q, answer)
+            except TypeError:  # lists and objects are not hashable
+                outcome = _outcome(q, answer)
+            given.append((q.id, answer is None, outcome))
+            total += q.points
+            if outcome[0]:
+                earned += q.points
+        score = percentage(earned, total)
+        for question_id, omitted, (correct, picks) in given:
+            row = sums[question_id]
+            row[0] += 1
+            row[1] += omitted
+            if correct is not None:
+                row[2] += 1
+                row[4] += score
+                row[5] += score * score
+                if correct:
+                    row[3] += 1
+                    row[6] += score
+            if picks:
+                row[7].update(picks)
+    return {question_id: row for question_id, row in sums.items() if row[0]}
+
+
+def _outcome(q, answer):
+    return check(q, answer), tuple(_option_key(choice) for choice in chosen_options(q, answer))
+
+
+def _merge(quiz_id, sums):
+    existing = {str(stat.pk): stat for stat in QuestionStatistic.objects.select_for_update().filter(pk__in=list(sums))}
+    # a question deleted since the key was cached has nothing to attach to
+    live = {str(pk) for pk in Question.objects.filter(id__in=list(sums)).values_list('id', flat=True)}
+    changed, created = [], []
+    for question_id, row in sums.items():
+        if question_id not in live:
+            continue
+        stat = existing.get(question_id)
+        if stat is None:
+            stat = QuestionStatistic(question_id=question_id, quiz_id=quiz_id)
+            created.append(stat)
+        else:
+            changed.append(stat)
+        for name, value in zip(SUMS, row):
+            setattr(stat, name, getattr(stat, name) + value)
+        counts = Counter(stat.choice_counts)
+        counts.update(row[7])
+        stat.choice_counts = dict(counts)
+    QuestionStatistic.objects.bulk_create(created)
+    QuestionStatistic.objects.bulk_update(changed, [*SUMS, 'choice_counts', 'updated_at'])
+
+
+def refresh_item_analysis(quiz_id, chunk_size=ITEM_ANALYSIS_CHUNK_SIZE, now=None):
+    """Fold the quiz's attempts completed since the watermark into its statistics; returns how many.
+
+    Raises ``Quiz.DoesNotExist`` for an unknown quiz.
+    """
+    key = answer_key(quiz_id)
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=SETTLE_SECONDS)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            # the state row lock keeps two refreshes from counting the same chunk
+            state, _ = QuizAnalysisState.objects.select_for_update().get_or_create(quiz_id=quiz_id)
+            rows = list(_pending_attempts(quiz_id, state, cutoff).values_list(
+                'completed_at', 'id', 'answers', 'seed',
+            )[:chunk_size])
+            if rows:
+                _merge(quiz_id, _accumulate(key, [row[2:] for row in rows]))
+                state.last_completed_at, state.last_attempt_id = rows[-1][0], rows[-1][1]
+                state.attempts += len(rows)
+            state.refreshed_at = now
+            state.save()
+        processed += len(rows)
+        if len(rows) < chunk_size:
+            return processed
+
+
+def reset_item_analysis(quiz_id):
+    """Forget a quiz's statistics; the next refresh reads every attempt again."""
+    with transaction.atomic():
+        QuizAnalysisState.objects.filter(quiz_id=quiz_id).delete()
+        QuestionStatistic.objects.filter(quiz_id=quiz_id).delete()
+
+
+# --- statistics --------------------------------------------------------------------
+
+def point_biserial(stat):
+    """Correlation between answering correctly and the attempt score; ``None`` when undefined."""
+    n, correct = stat.graded, stat.correct
+    if not n or correct in (0, n):
+        return None
+    mean = stat.score_sum / n
+    variance = stat.score_sq_sum / n - mean * mean
+    if variance <= 0:
+        return None
+    mean_correct = stat.correct_score_sum / correct
+    mean_wrong = (stat.score_sum - stat.correct_score_sum) / (n - correct)
+    p = correct / n
+    return (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def _distractors(q, options, stat):
+    if q.type == 'true_false':
+        choices = [(True, 'True'), (False, 'False')]
+        expected = {q.expected}
+    elif q.type in ('multiple_choice', 'multiple_answer'):
+        choices = [
+            (index, option.get('text', option.get('label')) if isinstance(option, dict) else option)
+            for index, option in enumerate(options if isinstance(options, list) else [])
+        ]
+        expected = q.expected if isinstance(q.expected, frozenset) else {q.expected}
+    else:
+        return None
+    counts = stat.choice_counts if stat else {}
+    delivered = stat.delivered if stat else 0
+    return [
+        {
+            'option': choice,
+            'text': text,
+            'correct': choice in expected,
+            'count': counts.get(_option_key(choice), 0),
+            'share': round(counts.get(_option_key(choice), 0) / delivered, 3) if delivered else None,
+        }
+        for choice, text in choices
+    ]
+
+
+def item_statistics(quiz_id):
+    """The quiz's statistics as last refreshed, one entry per question in authored order."""
+    key = answer_key(quiz_id)
+    state = QuizAnalysisState.objects.filter(quiz_id=quiz_id).first()
+    stats = {str(stat.pk): stat for stat in QuestionStatistic.objects.filter(quiz_id=quiz_id)}
+    questions = {str(row['id']): row for row in Question.objects.filter(quiz_id=quiz_id).values('id', 'text', 'options')}
+    items = []
+    for q in key.questions:
+        stat = stats.get(q.id)
+        discrimination = point_biserial(stat) if stat else None
+        items.append({
+            'id': q.id,
+            'type': q.type,
+            'text': questions.get(q.id, {}).get('text'),
+            'delivered': stat.delivered if stat else 0,
+            'omitted': stat.omitted if stat else 0,
+            'graded': stat.graded if stat else 0,
+            'correct': stat.correct if stat else 0,
+            'difficulty': round(stat.correct / stat.graded, 3) if stat and stat.graded else None,
+            'discrimination': None if discrimination is None else round(discrimination, 3),
+            'distractors': _distractors(q, questions.get(q.id, {}).get('options'), stat),
+        })
+    return {
+        'quiz': str(quiz_id),
+        'attempts': state.attempts if state else 0,
+        'analysed_through': state.last_completed_at if state else None,
+        'refreshed_at': state.refreshed_at if state else None,
+        'questions': items,
+    }
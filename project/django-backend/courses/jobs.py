@@ -0,0 +1,148 @@
+"""Background enrollment jobs.
+
+``EnrollmentJob`` rows are the queue: a request records a job and returns
+immediately, and a worker (the in-process thread pool, or the
+``process_enrollment_jobs`` management command) claims it and writes
+enrollments chunk by chunk.  Each chunk commits together with the job's
+checkpoint, so a worker that dies mid-run leaves a job that another worker can
+pick up from the next chunk once its heartbeat goes stale.  The audience is
+resolved once and stored on the job, so the chunks a resumed job walks are the
+ones it was checkpointing, whatever happened to team membership meanwhile.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .enrollments import resolve_audience, insert_enrollments
+from .models import Enrollment, EnrollmentJob
+
+
+logger = logging.getLogger(__name__)
+
+JOB_CHUNK_SIZE = getattr(settings, 'ENROLLMENT_JOB_CHUNK_SIZE', 1000)
+JOB_WORKERS = getattr(settings, 'ENROLLMENT_JOB_WORKERS', 2)
+# A running job whose heartbeat is older than this is considered abandoned.
+JOB_STALE_SECONDS = getattr(settings, 'ENROLLMENT_JOB_STALE_SECONDS', 300)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='enrollment-job')
+    return _executor
+
+
+def submit_enrollment_job(course, requested_by, user_ids=None, team_ids=None):
+    """Record a job and hand it to the local worker pool once the row is committed."""
+    job = EnrollmentJob.objects.create(
+        course=course,
+        requested_by=requested_by,
+        user_ids=[str(u) for u in user_ids or []],
+        team_ids=[str(t) for t in team_ids or []],
+        chunk_size=JOB_CHUNK_SIZE,
+    )
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.id))
+    return job
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        process_enrollment_job(job_id)
+    except Exception:
+        logger.exception('Enrollment job %s failed', job_id)
+    finally:
+        close_old_connections()
+
+
+def claimable_jobs():
+    """Queued jobs plus running jobs whose worker stopped sending heartbeats."""
+    stale_before = timezone.now() - timedelta(seconds=JOB_STALE_SECONDS)
+    return EnrollmentJob.objects.filter(
+        Q(status='queued') | Q(status='running', heartbeat_at__lt=stale_before)
+    )
+
+
+def claim_job(job_id=None):
+    """Atomically mark a claimable job as running and return it (or None)."""
+    with transaction.atomic():
+        qs = claimable_jobs().select_for_update(skip_locked=True).order_by('created_at')
+        if job_id is not None:
+            qs = qs.filter(id=job_id)
+        job = qs.first()
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = 'running'
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+        return job
+
+
+def process_enrollment_job(job_id=None):
+    """Claim a job and run it to completion, resuming after its last checkpoint.
+
+    Returns the finished job, or None when there was nothing to claim.
+    """
+    job = claim_job(job_id)
+    if job is None:
+        return None
+    try:
+        _run_job(job)
+    except Exception as exc:
+        EnrollmentJob.objects.filter(id=job.id).update(
+            status='failed', error=str(exc), finished_at=timezone.now()
+        )
+        raise
+    job.refresh_from_db()
+    return job
+
+
+def _run_job(job):
+    if job.targets is None:
+        targets, _ = resolve_audience(job.user_ids, job.team_ids)
+        job.targets = [str(uid) for uid in sorted(targets)]
+        job.total = len(job.targets)
+        job.save(update_fields=['targets', 'total'])
+    audience = [uuid.UUID(uid) for uid in job.targets]
+
+    size = job.chunk_size
+    first = job.last_chunk + 1
+    for index in range(first, (len(audience) + size - 1) // size):
+        chunk = audience[index * size:(index + 1) * size]
+        with transaction.atomic():
+            enrolled = set(
+                Enrollment.objects.filter(course_id=job.course_id, user_id__in=chunk).values_list('user_id', flat=True)
+            )
+            pending = [uid for uid in chunk if uid not in enrolled]
+            inserted = insert_enrollments(job.course_id, job.requested_by_id, pending, batch_size=size)
+            job.processed += len(chunk)
+            job.created_count += len(inserted)
+            job.skipped += len(chunk) - len(inserted)
+            job.last_chunk = index
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['processed', 'created_count', 'skipped', 'last_chunk', 'heartbeat_at'])
+
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+
+
+def estimate_remaining_seconds(job):
+    """Linear ETA from the throughput so far; None until the first chunk lands."""
+    if job.status == 'completed':
+        return 0
+    if not job.started_at or not job.processed or not job.total:
+        return None
+    elapsed = ((job.heartbeat_at or timezone.now()) - job.started_at).total_seconds()
+    remaining = max(job.total - job.processed, 0)
+    return round(elapsed / job.processed * remaining, 1)
@@ -0,0 +1,302 @@
+"""Incremental leaderboard ranking.
+
+Every learner has one ``Leaderboard`` row per course plus a global row
+(``course`` NULL).  Ranks use competition ranking: a learner's rank is one
+plus the number of learners in the same scope with strictly more points.
+With that definition, moving a learner from ``old`` to ``new`` points only
+changes the rank of rows whose points lie in ``[old, new)`` (or ``[new, old)``
+when points drop), and the learner's new rank is the old one adjusted by the
+size of that band.  An event therefore costs a banded ``COUNT`` and ``UPDATE``
+on the ``(course, total_points)`` index instead of a full re-rank of the scope.
+
+Every event also moves the learner's global row, so banding it on every event
+would serialise all point events site-wide behind one lock.  The global rows
+are instead re-ranked in batches: an event only updates the row's points, and
+``ranked_points`` keeps the score its stored rank was computed for.
+``refresh_ranks`` takes the rows where the two differ, merges the point
+ranges they moved through and re-ranks just those ranges, one UPDATE per
+range.  The ``refresh_leaderboard_ranks`` command runs it, on a schedule or
+as a worker (``--loop``).  Reads never re-rank: ``top`` and ``neighbours``
+serve the ranks as last refreshed (``ranked_points`` is the score behind
+each), and leave out global rows that have never been ranked.
+
+``rebuild_leaderboards`` recomputes points from the ``user_progress`` rollups
+and re-ranks with a window function; it backs the ``rebuild_leaderboard``
+command.
+"""
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+
+from .models import Leaderboard
+
+
+POINTS_PER_UNIT = getattr(settings, 'LEADERBOARD_POINTS_PER_UNIT', 10)
+# first key of the two-part advisory lock taken while a scope is re-ranked
+_LOCK_NAMESPACE = 7311
+# rows whose stored rank predates their current points
+_UNRANKED = Q(ranked_points__isnull=True) | ~Q(ranked_points=F('total_points'))
+
+
+def _lock_scope(course_id):
+    """Serialize rank maintenance per scope for the rest of the transaction."""
+    if connection.vendor != 'postgresql':
+        return
+    key = zlib.crc32(str(course_id or 'global').encode()) - 2 ** 31
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [_LOCK_NAMESPACE, key])
+
+
+def _scope(course_id):
+    return Leaderboard.objects.filter(course_id=course_id)
+
+
+def record_points(user_id, course_id, units=0, quiz=0, activity=0, create=True):
+    """Apply a points event to the learner's course row and global row.
+
+    ``units`` is a change in completed units, ``quiz`` a change in quiz score
+    and ``activity`` any other points (assignment grades).  Rows are created
+    on first activity, even when it scores nothing, unless ``create`` is false.
+    """
+    delta = units * POINTS_PER_UNIT + quiz + activity
+    if not (units or quiz or activity or create):
+        return
+    _apply(user_id, course_id, units, quiz, activity, delta, create)
+    _apply_global(user_id, units, quiz, activity, delta, create)
+
+
+def _rank_for(scope, points):
+    """Competition rank a newcomer with ``points`` takes, from the nearest existing row.
+
+    The best row at or below ``points`` already holds that rank; if there is
+    none, the newcomer goes after the last row.  Both are one-row index reads.
+    """
+    below = scope.filter(total_points__lte=points).order_by('-total_points', 'rank').values_list('rank', flat=True).first()
+    if below is not None:
+        return below
+    last = scope.order_by('total_points').values_list('rank', 'total_points').first()
+    if last is None:
+        return 1
+    rank, lowest = last
+    return rank + scope.filter(total_points=lowest).count()
+
+
+def _apply(user_id, course_id, units, quiz, activity, delta, create):
+    with transaction.atomic():
+        _lock_scope(course_id)
+        scope = _scope(course_id)
+        current = scope.filter(user_id=user_id).values_list('id', 'total_points', 'rank').first()
+        if current is None:
+            if not create:
+                return
+            new = delta
+            rank = _rank_for(scope, new)
+            # everyone below the newcomer drops one place
+            scope.filter(total_points__lt=new).update(rank=F('rank') + 1)
+            Leaderboard.objects.create(
+                user_id=user_id, course_id=course_id, total_points=new, ranked_points=new,
+                completed_units=units, quiz_score_total=quiz, activity_points=activity, rank=rank,
+            )
+            return
+
+        if not (units or quiz or activity):
+            return
+        row_id, old, rank = current
+        new = old + delta
+        # only rows between the old and new score change places with this one
+        if new > old:
+            rank -= scope.filter(total_points__gt=old, total_points__lte=new).exclude(id=row_id).count()
+            scope.filter(total_points__gte=old, total_points__lt=new).exclude(id=row_id).update(rank=F('rank') + 1)
+        elif new < old:
+            rank += scope.filter(total_points__gt=new, total_points__lte=old).exclude(id=row_id).count()
+            scope.filter(total_points__gte=new, total_points__lt=old).exclude(id=row_id).update(rank=F('rank') - 1)
+        Leaderboard.objects.filter(id=row_id).update(
+            total_points=new,
+            ranked_points=new,
+            completed_units=F('completed_units') + units,
+            quiz_score_total=F('quiz_score_total') + quiz,
+            activity_points=F('activity_points') + activity,
+            rank=rank,
+        )
+
+
+def _apply_global(user_id, units, quiz, activity, delta, create):
+    """Move the learner's global row; its rank waits for ``refresh_ranks``."""
+    if not (units or quiz or activity):
+        if create and not _scope(None).filter(user_id=user_id).exists():
+            _create_global(user_id, 0, 0, 0, 0)
+        return
+    updated = _scope(None).filter(user_id=user_id).update(
+        total_points=F('total_points') + delta,
+        completed_units=F('completed_units') + units,
+        quiz_score_total=F('quiz_score_total') + quiz,
+        activity_points=F('activity_points') + activity,
+    )
+    if not updated and create and not _create_global(user_id, delta, units, quiz, activity):
+        # a concurrent event created the row first
+        _apply_global(user_id, units, quiz, activity, delta, create=False)
+
+
+def _create_global(user_id, points, units, quiz, activity):
+    try:
+        with transaction.atomic():
+            # no ranked_points: a newcomer pushes down every row below it
+            Leaderboard.objects.create(
+                user_id=user_id, course_id=None, total_points=points,
+                completed_units=units, quiz_score_total=quiz, activity_points=activity,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def _moved_ranges(scope):
+    """Merged ``[low, high]`` point ranges the scope's unranked rows moved through.
+
+    ``low`` is None for a range reaching the bottom of the scope (newcomers
+    push down every row below them).
+    """
+    moves = []
+    for ranked, points in scope.filter(_UNRANKED).values_list('ranked_points', 'total_points'):
+        moves.append((None, points) if ranked is None else (min(ranked, points), max(ranked, points)))
+    moves.sort(key=lambda move: (move[0] is not None, move[0] or 0))
+    merged = []
+    for low, high in moves:
+        if merged and (low is None or low <= merged[-1][1]):
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+def refresh_ranks(course_id=None):
+    """Re-rank the rows of a scope whose points moved since they were ranked; returns the ranges done.
+
+    Each merged range is re-ranked in one statement: a row's rank is the
+    number of rows above the range plus its window rank within the range.
+    ``ranked_points`` is set from the same snapshot, so a row that moves again
+    while this runs is left for the next refresh.
+    """
+    scope = _scope(course_id)
+    if not scope.filter(_UNRANKED).exists():
+        return 0
+    with transaction.atomic():
+        _lock_scope(course_id)
+        ranges = _moved_ranges(scope)
+        for low, high in ranges:
+            _rerank_range(course_id, low, high)
+    return len(ranges)
+
+
+def _rerank_range(course_id, low, high):
+    scope = _scope(course_id)
+    above = scope.filter(total_points__gt=high).count()
+    band = scope.filter(total_points__lte=high)
+    if low is not None:
+        band = band.filter(total_points__gte=low)
+    if connection.vendor != 'postgresql':
+        rows = list(band.order_by('-total_points').values_list('id', 'total_points'))
+        ahead = {}
+        for position, (_, points) in enumerate(rows):
+            ahead.setdefault(points, position)
+        Leaderboard.objects.bulk_update(
+            [Leaderboard(id=row_id, rank=above + 1 + ahead[points], ranked_points=points) for row_id, points in rows],
+            ['rank', 'ranked_points'],
+        )
+        return
+    table = Leaderboard._meta.db_table
+    sql, params = band.values('id', 'total_points').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} lb SET rank = r.rank, ranked_points = r.total_points
+            FROM (
+                SELECT b.id, b.total_points, %s + RANK() OVER (ORDER BY b.total_points DESC) AS rank
+                FROM ({sql}) b
+            ) r
+            WHERE lb.id = r.id AND (lb.rank IS DISTINCT FROM r.rank OR lb.ranked_points IS DISTINCT FROM r.total_points)
+        """, [above, *params])
+
+
+def ranked(course_id=None):
+    """The scope's rows that hold a rank; a new global row has none until ``refresh_ranks``."""
+    scope = _scope(course_id)
+    # course rows are ranked as they are created
+    return scope if course_id is not None else scope.filter(ranked_points__isnull=False)
+
+
+def top(course_id=None, limit=10):
+    """The first ``limit`` rows of a scope, best first."""
+    return ranked(course_id).select_related('user', 'course').order_by('rank', 'user_id')[:limit]
+
+
+def neighbours(user_id, course_id=None, k=5):
+    """The learner's row with up to ``k`` rows either side, or None if unranked.
+
+    Each side reads the learner's ties first and then the next ranks, so
+    every read is an index range scan on ``(course, rank, user)``, or on
+    ``(rank, user)`` for the global scope.
+    """
+    scope = ranked(course_id).select_related('user', 'course')
+    mine = scope.filter(user_id=user_id).first()
+    if mine is None:
+        return None
+    above = list(scope.filter(rank=mine.rank, user_id__lt=user_id).order_by('-user_id')[:k])
+    if len(above) < k:
+        above += scope.filter(rank__lt=mine.rank).order_by('-rank', '-user_id')[:k - len(above)]
+    below = list(scope.filter(rank=mine.rank, user_id__gt=user_id).order_by('user_id')[:k])
+    if len(below) < k:
+        below += scope.filter(rank__gt=mine.rank).order_by('rank', 'user_id')[:k - len(below)]
+    return list(reversed(above)) + [mine] + below
+
+
+def rebuild_leaderboards(course_ids=None):
+    """Recompute points from ``user_progress`` and re-rank, all in SQL.
+
+    Limited to the given courses when provided (global rows are always
+    recomputed, since they aggregate every course).
+    """
+    table = Leaderboard._meta.db_table
+    course_filter = ''
+    params = [POINTS_PER_UNIT]
+    if course_ids is not None:
+        course_filter = 'AND up.course_id = ANY(%s::uuid[])'
+        params.append([str(cid) for cid in course_ids])
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {table} (id, user_id, course_id, total_points, completed_units,
+                                 quiz_score_total, activity_points, rank, updated_at)
+            SELECT gen_random_uuid(), up.user_id, up.course_id,
+                   up.modules_completed * %s + up.total_points_earned,
+                   up.modules_completed, up.quiz_score_total,
+                   up.total_points_earned - up.quiz_score_total, 0, now()
+            FROM user_progress up
+            WHERE true {course_filter}
+            ON CONFLICT (user_id, course_id) DO UPDATE SET
+                total_points = EXCLUDED.total_points,
+                completed_units = EXCLUDED.completed_units,
+                quiz_score_total = EXCLUDED.quiz_score_total,
+                activity_points = EXCLUDED.activity_points,
+                updated_at = now()
+        """, params)
+        cursor.execute(f"DELETE FROM {table} WHERE course_id IS NULL")
+        cursor.execute(f"""
+            INSERT INTO {table} (id, user_id, course_id, total_points, completed_units,
+                                 quiz_score_total, activity_points, rank, updated_at)
+            SELECT gen_random_uuid(), user_id, NULL, SUM(total_points), SUM(completed_units),
+                   SUM(quiz_score_total), SUM(activity_points), 0, now()
+            FROM {table} WHERE course_id IS NOT NULL
+            GROUP BY user_id
+        """)
+        rank_filter = 'WHERE course_id IS NULL' + (' OR course_id = ANY(%s::uuid[])' if course_ids is not None else ' OR true')
+        cursor.execute(f"""
+            UPDATE {table} lb SET rank = ranked.rank, ranked_points = ranked.total_points
+            FROM (
+                SELECT id, total_points, RANK() OVER (PARTITION BY course_id ORDER BY total_points DESC) AS rank
+                FROM {table} {rank_filter}
+            ) ranked
+            WHERE lb.id = ranked.id
+              AND (lb.rank IS DISTINCT FROM ranked.rank OR lb.ranked_points IS DISTINCT FROM ranked.total_points)
+        """, params[1:])
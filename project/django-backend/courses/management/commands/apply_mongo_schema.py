@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from courses import mongo_schema
+from courses.content_store import get_db
+
+
+class Command(BaseCommand):
+    help = 'Bring MongoDB collections, validators and indexes in line with courses.mongo_schema'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Print the plan without changing anything')
+        parser.add_argument('--prune', action='store_true', help='Also drop indexes the schema does not declare')
+        parser.add_argument('--sample', action='store_true', help='Upsert a demo content item (DEBUG only)')
+
+    def handle(self, *args, **options):
+        if options['sample'] and not settings.DEBUG:
+            raise CommandError('--sample is for development databases; refusing with DEBUG off')
+        db = get_db()
+        state = mongo_schema.read_state(db)
+        steps = mongo_schema.plan(state, prune=options['prune'])
+        for line in mongo_schema.format_plan(steps):
+            self.stdout.write(line)
+        for line in mongo_schema.index_report(state):
+            self.stdout.write(f'  {line}')
+        if options['dry_run']:
+            return
+        applied = mongo_schema.apply(db, steps, version=mongo_schema.server_version(db))
+        self.stdout.write(f'applied {len(applied)} step(s)')
+        if options['sample']:
+            mongo_schema.insert_sample(db, timezone.now())
+            self.stdout.write('sample content item present')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from courses.media_store import MEDIA_GC_GRACE_HOURS, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Expire unused upload records and delete stored media blobs that nothing references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=MEDIA_GC_GRACE_HOURS,
+                            help='Keep blobs uploaded within this many hours even if unused')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        result = collect_garbage(options['hours'], dry_run=options['dry_run'])
+        verb = 'would delete' if options['dry_run'] else 'deleted'
+        self.stdout.write(f"{verb} {result['uploads']} upload record(s), {result['blobs']} blob(s), {result['bytes']} bytes")
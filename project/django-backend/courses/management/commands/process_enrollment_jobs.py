@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.jobs import process_enrollment_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued (or abandoned) background enrollment jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                job = process_enrollment_job()
+            except Exception as exc:
+                # the job is already marked failed; carry on with the rest of the queue
+                self.stderr.write(f'job failed: {exc}')
+                continue
+            if job is not None:
+                self.stdout.write(f'{job.id}: {job.status} ({job.created_count} created, {job.skipped} skipped)')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
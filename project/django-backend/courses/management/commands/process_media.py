@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.media_processing import process_media
+
+
+class Command(BaseCommand):
+    help = 'Extract duration, dimensions and thumbnails for pending (or abandoned) media uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new uploads')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                media = process_media()
+            except Exception as exc:
+                # the row is already marked failed; carry on with the rest of the queue
+                self.stderr.write(f'processing failed: {exc}')
+                continue
+            if media is not None:
+                self.stdout.write(f'{media.id}: {media.file_name} processed in {media.processing_ms} ms')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from courses.uploads import UPLOAD_SESSION_TTL_HOURS, purge_stale_sessions
+
+
+class Command(BaseCommand):
+    help = 'Abort chunked uploads that have been idle too long and delete their parts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=UPLOAD_SESSION_TTL_HOURS,
+                            help='Idle time after which an upload is abandoned')
+
+    def handle(self, *args, **options):
+        count = purge_stale_sessions(options['hours'])
+        self.stdout.write(f'aborted {count} stale upload(s)')
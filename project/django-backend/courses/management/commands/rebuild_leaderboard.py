@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from courses.leaderboard import rebuild_leaderboards
+from courses.models import Leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute leaderboard points from user_progress rollups and re-rank every scope'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', dest='courses', help='Limit course rows to a course id (repeatable)')
+
+    def handle(self, *args, **options):
+        rebuild_leaderboards(course_ids=options['courses'])
+        self.stdout.write(f'Leaderboard rebuilt ({Leaderboard.objects.count()} rows)')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from courses.progress import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild user_progress rollups (and enrollment progress) from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', dest='courses', help='Limit to a course id (repeatable)')
+        parser.add_argument('--courses-per-batch', type=int, default=50, help='Courses rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or list(Course.objects.values_list('id', flat=True))
+        step = max(options['courses_per_batch'], 1)
+        written = 0
+        for start in range(0, len(course_ids), step):
+            written += rebuild_rollups(course_ids=course_ids[start:start + step])
+        self.stdout.write(f'Rebuilt {written} progress rows across {len(course_ids)} courses')
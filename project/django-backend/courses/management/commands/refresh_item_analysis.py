@@ -0,0 +1,26 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.item_analysis import ITEM_ANALYSIS_CHUNK_SIZE, refresh_item_analysis
+from courses.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Fold quiz attempts completed since the last run into the per-question item analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', help='Quizzes to refresh (default: all)')
+        parser.add_argument('--chunk-size', type=int, default=ITEM_ANALYSIS_CHUNK_SIZE, help='Attempts read per batch')
+
+    def handle(self, *args, **options):
+        quiz_ids = options['quiz_ids'] or Quiz.objects.values_list('id', flat=True)
+        total = 0
+        for quiz_id in quiz_ids:
+            try:
+                processed = refresh_item_analysis(quiz_id, chunk_size=options['chunk_size'])
+            except (Quiz.DoesNotExist, ValidationError):
+                raise CommandError(f'No quiz {quiz_id}')
+            if processed:
+                self.stdout.write(f'{quiz_id}: {processed} attempts')
+            total += processed
+        self.stdout.write(f'processed={total}')
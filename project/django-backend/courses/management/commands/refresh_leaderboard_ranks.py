@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.leaderboard import refresh_ranks
+
+
+class Command(BaseCommand):
+    help = 'Re-rank global leaderboard rows whose points moved since they were last ranked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep re-ranking as points move')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            ranges = refresh_ranks()
+            if ranges or not options['loop']:
+                self.stdout.write(f'ranges={ranges}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
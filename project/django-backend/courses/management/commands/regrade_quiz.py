@@ -0,0 +1,21 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Quiz
+from courses.regrading import REGRADE_CHUNK_SIZE, regrade_quiz
+
+
+class Command(BaseCommand):
+    help = "Rescore a quiz's submitted attempts against its current answer key and update rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id')
+        parser.add_argument('--chunk-size', type=int, default=REGRADE_CHUNK_SIZE, help='Attempts read and written per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        try:
+            report = regrade_quiz(options['quiz_id'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except (Quiz.DoesNotExist, ValidationError):
+            raise CommandError(f"No quiz {options['quiz_id']}")
+        self.stdout.write(', '.join(f'{name}={value}' for name, value in report.items()))
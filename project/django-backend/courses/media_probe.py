@@ -0,0 +1,211 @@
+"""Read duration, dimensions and page counts from media file headers.
+
+``probe`` seeks through MP4/MOV boxes, the first MP3 frame (plus its
+Xing/Info header), the WAV chunk list and the PPTX zip directory, and lets
+Pillow parse image headers; PDFs are scanned block by block for page
+objects.  No decoder or external tool is needed.  Anything it does not
+recognise comes back with every field ``None``.
+"""
+import io
+import os
+import re
+import struct
+import zipfile
+
+from PIL import Image
+
+
+THUMBNAIL_SIZE = (320, 320)
+SNIFF_BYTES = 64
+
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = (44100, 48000, 32000)
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+PDF_COUNT = re.compile(rb'/Count\s+(\d+)')
+PPTX_SLIDE = re.compile(r'ppt/slides/slide\d+\.xml$')
+
+
+def _empty():
+    return {'duration': None, 'width': None, 'height': None, 'page_count': None}
+
+
+def sniff(head, file_name):
+    """Container kind from the first bytes (and, for zip files, the name)."""
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:5] == b'%PDF-':
+        return 'pdf'
+    if head[:4] == b'PK\x03\x04' and os.path.splitext(file_name)[1].lower() == '.pptx':
+        return 'pptx'
+    return 'image'
+
+
+def _boxes(f, start, end):
+    """(type, payload start, box end) for each ISO-BMFF box between ``start`` and ``end``."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header)
+        offset = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            offset = 16
+        elif size == 0:
+            size = end - pos
+        if size < offset:
+            return
+        yield kind, pos + offset, min(pos + size, end)
+        pos += size
+
+
+def _find(f, start, end, kind):
+    return next(((s, e) for k, s, e in _boxes(f, start, end) if k == kind), None)
+
+
+def probe_mp4(f, size):
+    details = _empty()
+    moov = _find(f, 0, size, b'moov')
+    if moov is None:
+        return details
+    for kind, start, end in _boxes(f, *moov):
+        if kind == b'mvhd':
+            f.seek(start)
+            version = f.read(1)[0]
+            f.seek(start + (20 if version == 1 else 12))
+            if version == 1:
+                timescale, duration = struct.unpack('>IQ', f.read(12))
+            else:
+                timescale, duration = struct.unpack('>II', f.read(8))
+            if timescale:
+                details['duration'] = round(duration / timescale)
+        elif kind == b'trak' and details['width'] is None:
+            tkhd = _find(f, start, end, b'tkhd')
+            if tkhd is None:
+                continue
+            f.seek(tkhd[0])
+            version = f.read(1)[0]
+            # width and height are 16.16 fixed point after the transformation matrix
+            f.seek(tkhd[0] + (88 if version == 1 else 76))
+            width, height = struct.unpack('>II', f.read(8))
+            if width and height:
+                details['width'], details['height'] = width >> 16, height >> 16
+    return details
+
+
+def probe_mp3(f, size):
+    details = _empty()
+    head = f.read(10)
+    audio_start = 0
+    if head[:3] == b'ID3':
+        tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | head[9] & 0x7F
+        audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    f.seek(audio_start)
+    window = f.read(64 * 1024)
+    for i in range(len(window) - 4):
+        b1, b2, b3 = window[i + 1], window[i + 2], window[i + 3]
+        if window[i] != 0xFF or b1 & 0xE0 != 0xE0:
+            continue
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue  # reserved values, or not Layer III
+        mpeg1 = version == 3
+        sample_rate = MP3_SAMPLE_RATES[rate_index] // {3: 1, 2: 2, 0: 4}[version]
+        bitrate = MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+        samples_per_frame = 1152 if mpeg1 else 576
+        mono = b3 >> 6 == 3
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = window[i + 4 + side_info:i + 4 + side_info + 12]
+        if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 1:
+            frames = struct.unpack('>I', xing[8:12])[0]
+            details['duration'] = round(frames * samples_per_frame / sample_rate)
+        else:
+            details['duration'] = round((size - audio_start - i) * 8 / bitrate)
+        break
+    return details
+
+
+def probe_wav(f, size):
+    details = _empty()
+    byte_rate = None
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        kind, length = struct.unpack('<4sI', f.read(8))
+        if kind == b'fmt ':
+            byte_rate = struct.unpack('<I', f.read(12)[8:12])[0]
+        elif kind == b'data' and byte_rate:
+            details['duration'] = round(length / byte_rate)
+            break
+        pos += 8 + length + (length & 1)
+    return details
+
+
+def probe_pdf(f, size):
+    details = _empty()
+    pages, counts, tail = 0, [], b''
+    while True:
+        block = f.read(1024 * 1024)
+        data = tail + block
+        # matches starting in the last few bytes wait for the next block, so none is split or seen twice
+        cut = max(len(data) - 64, 0) if block else len(data)
+        pages += sum(1 for m in PDF_PAGE.finditer(data) if m.start() < cut)
+        counts.extend(int(m.group(1)) for m in PDF_COUNT.finditer(data) if m.start() < cut)
+        if not block:
+            break
+        tail = data[cut:]
+    # page objects inside compressed object streams are invisible; fall back to the page tree
+    details['page_count'] = pages or (max(counts) if counts else None)
+    return details
+
+
+def probe_pptx(f, size):
+    details = _empty()
+    with zipfile.ZipFile(f) as archive:
+        details['page_count'] = sum(1 for name in archive.namelist() if PPTX_SLIDE.match(name))
+    return details
+
+
+def probe_image(f, size):
+    details = _empty()
+    try:
+        with Image.open(f) as image:
+            details['width'], details['height'] = image.size
+    except (OSError, Image.DecompressionBombError):
+        pass
+    return details
+
+
+PROBES = {
+    'mp4': probe_mp4, 'mp3': probe_mp3, 'wav': probe_wav,
+    'pdf': probe_pdf, 'pptx': probe_pptx, 'image': probe_image,
+}
+
+
+def probe(f, file_name, size):
+    """Details of the seekable binary file ``f``: duration (seconds), width, height, page_count."""
+    head = f.read(SNIFF_BYTES)
+    f.seek(0)
+    return PROBES[sniff(head, file_name)](f, size)
+
+
+def thumbnail(f):
+    """JPEG thumbnail bytes for an image file, or None."""
+    try:
+        with Image.open(f) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            out = io.BytesIO()
+            image.convert('RGB').save(out, 'JPEG', quality=85)
+            return out.getvalue()
+    except (OSError, Image.DecompressionBombError):
+        return None
@@ -0,0 +1,211 @@
+"""Background media processing.
+
+``MediaMetadata.processing_status`` is the queue.  ``store_media`` leaves new
+rows ``pending`` and, once the upload has committed, hands the ID to the
+in-process pool; the upload request does nothing else.  The pool has
+``MEDIA_PROCESSING_WORKERS`` threads, so at most that many files are read at
+once.  The ``process_media`` command drains the same queue from a separate
+process.  It also picks up rows whose worker died, once they have been
+``processing`` for longer than ``MEDIA_PROCESSING_STALE_SECONDS``.
+
+A worker claims a row and reads the file's headers (``courses.media_probe``).
+It writes duration, dimensions, page count and (for images) a thumbnail,
+and copies duration and slide count onto units that use the file and have
+none yet.  The wall time of each job goes into ``processing_ms``.  Uploads
+deduplicated against an already processed blob copy its results without
+opening the file.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction, close_old_connections
+from django.db.models import Aggregate, Avg, Count, FloatField, Max, Q
+from django.utils import timezone
+
+from . import media_probe
+from .models import AudioUnit, MediaMetadata, PresentationUnit, VideoUnit
+
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_WORKERS = getattr(settings, 'MEDIA_PROCESSING_WORKERS', 2)
+PROCESSING_STALE_SECONDS = getattr(settings, 'MEDIA_PROCESSING_STALE_SECONDS', 600)
+DETAIL_FIELDS = ('duration', 'width', 'height', 'page_count', 'thumbnail_path')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PROCESSING_WORKERS, thread_name_prefix='media-processing')
+    return _executor
+
+
+def queue_processing(media):
+    """Hand ``media`` to the local pool once the surrounding transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, media.id))
+
+
+def _run_in_thread(media_id):
+    close_old_connections()
+    try:
+        process_media(media_id)
+    except Exception:
+        logger.exception('Processing media %s failed', media_id)
+    finally:
+        close_old_connections()
+
+
+def claimable_media():
+    """Pending rows plus rows whose worker has been at it for too long."""
+    stale_before = timezone.now() - timedelta(seconds=PROCESSING_STALE_SECONDS)
+    return MediaMetadata.objects.filter(
+        Q(processing_status='pending') | Q(processing_status='processing', processing_started_at__lt=stale_before)
+    )
+
+
+def claim_media(media_id=None):
+    """Atomically mark a claimable row as processing and return it (or None)."""
+    with transaction.atomic():
+        qs = claimable_media().select_for_update(skip_locked=True).order_by('uploaded_at')
+        if media_id is not None:
+            qs = qs.filter(id=media_id)
+        media = qs.first()
+        if media is None:
+            return None
+        media.processing_status = 'processing'
+        media.processing_started_at = timezone.now()
+        media.save(update_fields=['processing_status', 'processing_started_at'])
+        return media
+
+
+def process_media(media_id=None):
+    """Claim a row, extract its details and record them.
+
+    Returns the processed row, or None when there was nothing to claim.
+    """
+    media = claim_media(media_id)
+    if media is None:
+        return None
+    started = time.perf_counter()
+    try:
+        details = _details(media)
+    except Exception as exc:
+        MediaMetadata.objects.filter(id=media.id).update(
+            processing_status='failed', processing_error=str(exc), processed_at=timezone.now(),
+            processing_ms=_elapsed_ms(started),
+        )
+        raise
+    with transaction.atomic():
+        for field, value in details.items():
+            setattr(media, field, value)
+        media.processing_status = 'completed'
+        media.processing_error = None
+        media.processed_at = timezone.now()
+        media.processing_ms = _elapsed_ms(started)
+        media.save(update_fields=DETAIL_FIELDS + ('processing_status', 'processing_error', 'processed_at', 'processing_ms'))
+        apply_to_units(media)
+    logger.info('Processed media %s (%s) in %d ms', media.id, media.file_name, media.processing_ms)
+    return media
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000)
+
+
+def _details(media):
+    if media.blob_id:
+        done = (
+            MediaMetadata.objects.filter(blob_id=media.blob_id, processing_status='completed')
+            .exclude(id=media.id).values(*DETAIL_FIELDS).first()
+        )
+        if done:
+            return done
+    with default_storage.open(media.storage_path, 'rb') as f:
+        details = media_probe.probe(f, media.file_name, media.file_size or default_storage.size(media.storage_path))
+        details['thumbnail_path'] = None
+        if details['width'] and not details['duration']:
+            f.seek(0)
+            data = media_probe.thumbnail(f)
+            if data:
+                details['thumbnail_path'] = _save_thumbnail(media, data)
+    return details
+
+
+def _save_thumbnail(media, data):
+    key = media.blob.sha256 if media.blob_id else media.id
+    name = f'thumbnails/{key}.jpg'
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(data))
+
+
+def apply_to_units(media):
+    """Fill in duration / slide count on units using this file that have none yet."""
+    if media.duration:
+        VideoUnit.objects.filter(video_storage_path=media.storage_path, duration=0).update(duration=media.duration)
+        AudioUnit.objects.filter(audio_storage_path=media.storage_path, duration=0).update(duration=media.duration)
+    if media.page_count:
+        PresentationUnit.objects.filter(file_storage_path=media.storage_path, slide_count=0).update(
+            slide_count=media.page_count,
+        )
+
+
+def fill_unit_details(unit):
+    """For units attached after their file was processed; called before a unit subtype is saved."""
+    if isinstance(unit, PresentationUnit):
+        path, field, source = unit.file_storage_path, 'slide_count', 'page_count'
+    elif isinstance(unit, VideoUnit):
+        path, field, source = unit.video_storage_path, 'duration', 'duration'
+    else:
+        path, field, source = unit.audio_storage_path, 'duration', 'duration'
+    if not path or getattr(unit, field):
+        return
+    value = (
+        MediaMetadata.objects.filter(storage_path=path, processing_status='completed', **{f'{source}__gt': 0})
+        .values_list(source, flat=True).first()
+    )
+    if value:
+        setattr(unit, field, value)
+
+
+class Percentile(Aggregate):
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def processing_metrics():
+    """Queue depth by status and per-file-type job timings (milliseconds)."""
+    queue = dict(
+        MediaMetadata.objects.values_list('processing_status').annotate(n=Count('id')).order_by()
+    )
+    timings = (
+        MediaMetadata.objects.filter(processing_status__in=('completed', 'failed'), processing_ms__isnull=False)
+        .values('file_type')
+        .annotate(
+            jobs=Count('id'),
+            failed=Count('id', filter=Q(processing_status='failed')),
+            avg_ms=Avg('processing_ms'),
+            p50_ms=Percentile('processing_ms', 0.5),
+            p95_ms=Percentile('processing_ms', 0.95),
+            max_ms=Max('processing_ms'),
+        )
+        .order_by('file_type')
+    )
+    return {
+        'workers': PROCESSING_WORKERS,
+        'queue': {status: queue.get(status, 0) for status, _ in MediaMetadata.PROCESSING_STATUSES},
+        'by_file_type': [
+            {**row, **{key: round(row[key], 1) for key in ('avg_ms', 'p50_ms', 'p95_ms')}} for row in timings
+        ],
+    }
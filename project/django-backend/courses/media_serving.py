@@ -0,0 +1,208 @@
+"""Authorized media file responses with byte ranges and conditional GET.
+
+``media_response`` answers ``GET``/``HEAD`` for one file under
+``MEDIA_ROOT``:
+
+* ``ETag`` is the SHA-256 for content-addressed blobs (``blobs/``) and
+  their thumbnails, otherwise size and mtime.  ``Last-Modified`` is the
+  mtime.  ``If-None-Match`` / ``If-Modified-Since`` answer ``304`` through
+  Django's ``get_conditional_response``.
+* A single ``Range: bytes=`` range is answered with ``206`` and only that
+  slice is read.  ``If-Range`` is honoured, and an unsatisfiable range gets
+  ``416``.  Multi-range requests get the whole file, which RFC 9110 allows.
+* Content-addressed paths never change, so they are cached for a year.
+  Everything else is revalidated on each use.
+* With ``MEDIA_SERVE_OFFLOAD`` set, the body is left to the front-end server
+  (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd) once
+  access and preconditions have been checked here; it does the ranges
+  itself.
+
+``can_access`` decides who may read a path.  Trainers, managers and admins
+may read any path.  The uploader may read their own files.  A learner may
+read files used by a unit of a course they are enrolled in.  Decisions are
+cached briefly because a video player sends a range request for every seek.
+Media elements cannot send an ``Authorization`` header, so ``sign_path``
+issues short-lived URLs that carry the user instead.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from .media_store import BLOB_PREFIX, UNIT_MEDIA_FIELDS
+from .models import Enrollment, MediaMetadata
+
+
+SERVE_BLOCK_SIZE = 64 * 1024
+IMMUTABLE_PREFIXES = (BLOB_PREFIX, 'thumbnails/')
+OFFLOAD = getattr(settings, 'MEDIA_SERVE_OFFLOAD', '')
+ACCEL_REDIRECT_PREFIX = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+SIGNED_URL_SECONDS = getattr(settings, 'MEDIA_SIGNED_URL_SECONDS', 3600)
+ACCESS_CACHE_SECONDS = getattr(settings, 'MEDIA_ACCESS_CACHE_SECONDS', 60)
+STAFF_ROLES = ('trainer', 'manager', 'admin')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+DIGEST_RE = re.compile(r'([0-9a-f]{64})(\.[^/]*)?$')
+
+
+class MediaNegotiation(DefaultContentNegotiation):
+    """Media elements send Accept: video/*, image/* and the like; never answer those with 406."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def sign_path(path, user):
+    return signing.dumps({'p': path, 'u': str(user.pk)}, salt='media')
+
+
+def signed_user_id(path, token):
+    """User ID carried by ``token`` if it was issued for ``path`` and has not expired, else None."""
+    try:
+        payload = signing.loads(token, salt='media', max_age=SIGNED_URL_SECONDS)
+    except signing.BadSignature:
+        return None
+    return payload.get('u') if payload.get('p') == path else None
+
+
+def can_access(user, path):
+    if user.is_superuser or getattr(user, 'primary_role', '') in STAFF_ROLES:
+        return True
+    # paths are user-controlled; hash them into a key every cache backend accepts
+    key = f'media_access:{user.pk}:{hashlib.sha1(path.encode()).hexdigest()}'
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = _can_access(user, path)
+        cache.set(key, allowed, ACCESS_CACHE_SECONDS)
+    return allowed
+
+
+def _can_access(user, path):
+    # a thumbnail is readable by whoever may read the file it was made from
+    paths = [path] + list(MediaMetadata.objects.filter(thumbnail_path=path).values_list('storage_path', flat=True)[:1])
+    if MediaMetadata.objects.filter(storage_path__in=paths, uploaded_by=user).exists():
+        return True
+    used_in = Q()
+    for model, field in UNIT_MEDIA_FIELDS:
+        used_in |= Q(course_id__in=model.objects.filter(**{f'{field}__in': paths}).values('unit__course_id'))
+    return Enrollment.objects.filter(used_in, user=user).exists()
+
+
+def file_etag(path, stat):
+    match = DIGEST_RE.search(path) if path.startswith(IMMUTABLE_PREFIXES) else None
+    if match:
+        return quote_etag(match.group(1))
+    return f'W/"{stat.st_size:x}-{int(stat.st_mtime * 1000):x}"'
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single ``bytes=`` range, None to serve it all, or ``'unsatisfiable'``."""
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None  # syntactically invalid ranges are ignored
+    if start >= size:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: only use the range when the client's copy is still current."""
+    condition = request.headers.get('If-Range')
+    if not condition:
+        return True
+    if condition.startswith(('"', 'W/')):
+        # weak validators never match for If-Range
+        return not etag.startswith('W/') and condition == etag
+    return parse_http_date_safe(condition) == last_modified
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(SERVE_BLOCK_SIZE, length))
+            if not block:
+                return
+            length -= len(block)
+            yield block
+
+
+def media_response(request, name, content_type=None):
+    """Response for ``name`` in ``default_storage`` after access has been checked; None if missing."""
+    try:
+        full_path = default_storage.path(name)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        return None
+    if not os.path.isfile(full_path):
+        return None
+
+    etag = file_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            'private, max-age=31536000, immutable' if name.startswith(IMMUTABLE_PREFIXES) else 'private, no-cache'
+        ),
+    }
+    # 304 / 412 come back with the validators set
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified, response=None)
+    if conditional is not None:
+        for header, value in headers.items():
+            conditional[header] = value
+        return conditional
+
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if OFFLOAD:
+        response = HttpResponse(content_type=content_type)
+        if OFFLOAD == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX + name
+        else:
+            response['X-Sendfile'] = full_path
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    size = stat.st_size
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is not None and not _range_applies(request, etag, last_modified):
+        byte_range = None
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = max(end - start + 1, 0)
+    body = () if request.method == 'HEAD' else _read(full_path, start, length)
+    response = StreamingHttpResponse(body, content_type=content_type, status=206 if byte_range else 200)
+    for header, value in headers.items():
+        response[header] = value
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
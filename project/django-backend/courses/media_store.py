@@ -0,0 +1,246 @@
+"""Content-addressed media storage.
+
+An upload is hashed (SHA-256) before anything is written.  The content is
+stored once, as a ``MediaBlob`` under ``blobs/<aa>/<digest><ext>``; each upload
+still gets its own ``MediaMetadata`` row (name, type, uploader), pointing at
+the shared blob and its storage path, and is queued for background
+processing (``courses.media_processing``).  Re-uploading a file therefore costs
+a hash pass and one row, and duplicating a course already shares its media
+paths.
+
+Units reference media through their ``*_storage_path`` columns
+(``UNIT_MEDIA_FIELDS``).  ``count_references`` recounts them into
+``MediaBlob.ref_count`` with one grouped query per column; the counts are
+recomputed rather than kept up to date by signals because course cloning
+copies paths with ``bulk_create``.  Other uses of an upload (a video URL, a
+profile image, a submission, text or page content) embed the path its
+``MediaMetadata`` row handed out; ``MEDIA_MENTION_FIELDS`` lists those
+columns, and a mention is matched on the blob digest.
+
+``collect_garbage`` first expires upload records older than the grace period
+whose file no unit uses or mentions, with their thumbnails.  It then deletes
+blobs that have no upload record left, that no unit uses and that nobody has
+uploaded within the grace period, rechecking both kinds of reference with
+the candidate rows locked.  Deleting a unit is therefore enough to free its
+file one grace period later.  ``store_media`` locks the blob row it
+deduplicates against, so a collection never removes a file that is being
+attached.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum, TextField
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .media_processing import queue_processing
+from .models import (
+    AssignmentSubmission, AudioUnit, MediaBlob, MediaMetadata, PageUnit, PresentationUnit, Profile, ScormPackage,
+    TextUnit, VideoUnit,
+)
+
+
+BLOB_PREFIX = 'blobs/'
+HASH_BLOCK_SIZE = 1024 * 1024
+MEDIA_GC_GRACE_HOURS = getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24)
+UNIT_MEDIA_FIELDS = (
+    (VideoUnit, 'video_storage_path'),
+    (AudioUnit, 'audio_storage_path'),
+    (PresentationUnit, 'file_storage_path'),
+    (ScormPackage, 'file_storage_path'),
+)
+# columns that may embed a blob path inside a URL or content
+MEDIA_MENTION_FIELDS = (
+    (VideoUnit, 'video_url'),
+    (AudioUnit, 'audio_url'),
+    (PresentationUnit, 'file_url'),
+    (ScormPackage, 'file_url'),
+    (TextUnit, 'content'),
+    (PageUnit, 'content'),
+    (Profile, 'profile_image_url'),
+    (AssignmentSubmission, 'submission_file_url'),
+)
+MENTIONED_DIGEST = re.compile(re.escape(BLOB_PREFIX) + r'[0-9a-f]{2}/([0-9a-f]{64})')
+
+
+def hash_stream(stream):
+    """(hex SHA-256, size) of everything left in ``stream``, read block by block."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        block = stream.read(HASH_BLOCK_SIZE)
+        if not block:
+            return digest.hexdigest(), size
+        digest.update(block)
+        size += len(block)
+
+
+def blob_path(digest, file_name):
+    # keep the extension so the storage backend serves a sensible Content-Type
+    ext = os.path.splitext(file_name)[1].lower()[:16]
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest}{ext}'
+
+
+def _write_blob(open_stream, digest, size, file_name, now):
+    path = default_storage.save(blob_path(digest, file_name), File(open_stream(), name=file_name))
+    if default_storage.size(path) != size:
+        default_storage.delete(path)
+        raise ValueError('content changed while it was being stored')
+    try:
+        with transaction.atomic():
+            return MediaBlob.objects.create(
+                sha256=digest, storage_path=path, size=size, created_at=now, last_referenced_at=now,
+            )
+    except IntegrityError:
+        # a concurrent upload of the same content won the insert
+        default_storage.delete(path)
+        return MediaBlob.objects.select_for_update().get(sha256=digest)
+
+
+def store_media(open_stream, *, file_name, file_type, mime_type, uploaded_by, digest=None, size=None):
+    """Record an upload, writing its content only if no blob has the same digest.
+
+    ``open_stream`` returns a readable stream positioned at the start of the
+    content on every call; it is read once to hash (skipped when ``digest``
+    and ``size`` are given) and once more if a new blob has to be written.
+    The caller owns the streams.  Returns ``(MediaMetadata, deduplicated)``.
+    """
+    if digest is None or size is None:
+        digest, size = hash_stream(open_stream())
+    mime_type = mime_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    now = timezone.now()
+    with transaction.atomic():
+        # the row lock keeps collect_garbage off this blob until the new reference is committed
+        blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+        deduplicated = blob is not None
+        if deduplicated:
+            blob.last_referenced_at = now
+            blob.save(update_fields=['last_referenced_at'])
+        else:
+            blob = _write_blob(open_stream, digest, size, file_name, now)
+        media = MediaMetadata.objects.create(
+            storage_path=blob.storage_path, blob=blob, file_name=file_name, file_type=file_type,
+            file_size=size, mime_type=mime_type, uploaded_by=uploaded_by,
+        )
+        queue_processing(media)
+    return media, deduplicated
+
+
+def _unit_references(paths=None):
+    """Counter of blob storage path -> number of units using it, optionally limited to ``paths``."""
+    counts = Counter()
+    for model, field in UNIT_MEDIA_FIELDS:
+        lookup = {f'{field}__in': paths} if paths is not None else {f'{field}__startswith': BLOB_PREFIX}
+        rows = model.objects.filter(**lookup).values_list(field).annotate(n=Count('pk')).order_by()
+        for path, n in rows:
+            counts[path] += n
+    return counts
+
+
+def count_references():
+    """Refresh ``MediaBlob.ref_count`` from the unit tables; returns how many counts changed."""
+    counts = _unit_references()
+    changed = []
+    for blob in MediaBlob.objects.only('id', 'storage_path', 'ref_count').iterator(chunk_size=2000):
+        n = counts.get(blob.storage_path, 0)
+        if blob.ref_count != n:
+            blob.ref_count = n
+            changed.append(blob)
+    MediaBlob.objects.bulk_update(changed, ['ref_count'], batch_size=1000)
+    return len(changed)
+
+
+def _mentioned_digests():
+    """Digests of the blobs whose paths appear in ``MEDIA_MENTION_FIELDS``."""
+    digests = set()
+    for model, field in MEDIA_MENTION_FIELDS:
+        texts = (
+            model.objects.annotate(text=Cast(field, TextField())).filter(text__contains=BLOB_PREFIX)
+            .values_list('text', flat=True)
+        )
+        for text in texts.iterator(chunk_size=2000):
+            digests.update(MENTIONED_DIGEST.findall(text))
+    return digests
+
+
+def _expired_uploads(cutoff):
+    """``(id, blob_id, thumbnail_path)`` of upload records from before ``cutoff`` that no unit uses or mentions."""
+    rows = list(
+        MediaMetadata.objects.filter(uploaded_at__lt=cutoff, blob__isnull=False)
+        .values_list('id', 'blob_id', 'storage_path', 'blob__sha256', 'thumbnail_path')
+    )
+    if not rows:
+        return []
+    used = _unit_references(list({row[2] for row in rows}))
+    mentioned = _mentioned_digests()
+    return [
+        (pk, blob_id, thumbnail) for pk, blob_id, path, digest, thumbnail in rows
+        if path not in used and digest not in mentioned
+    ]
+
+
+def collect_garbage(grace_hours=MEDIA_GC_GRACE_HOURS, dry_run=False):
+    """Expire unused upload records, then delete blobs with none left and no unit reference.
+
+    Returns ``{'uploads', 'blobs', 'bytes'}``.
+    """
+    count_references()
+    cutoff = timezone.now() - timedelta(hours=grace_hours)
+    expired = _expired_uploads(cutoff)
+    expired_ids = [pk for pk, _, _ in expired]
+    with transaction.atomic():
+        uploads = MediaMetadata.objects.all()
+        if dry_run:
+            uploads = uploads.exclude(id__in=expired_ids)
+        elif expired_ids:
+            MediaMetadata.objects.filter(id__in=expired_ids).delete()
+        candidates = list(
+            MediaBlob.objects.select_for_update(skip_locked=True)
+            .filter(ref_count=0, last_referenced_at__lt=cutoff)
+            .exclude(Exists(uploads.filter(blob_id=OuterRef('pk'))))
+            .only('id', 'storage_path', 'size')
+        )
+        # a unit or an upload may have been pointed at one of them since the recount
+        live = _unit_references([blob.storage_path for blob in candidates]) if candidates else {}
+        uploaded = set(
+            uploads.filter(blob_id__in=[blob.id for blob in candidates]).values_list('blob_id', flat=True)
+        ) if candidates else set()
+        garbage = [blob for blob in candidates if blob.storage_path not in live and blob.id not in uploaded]
+        if garbage and not dry_run:
+            ids = {blob.id for blob in garbage}
+            # thumbnails are named after the blob, so they go with it
+            paths = [blob.storage_path for blob in garbage]
+            paths += sorted({thumbnail for _, blob_id, thumbnail in expired if thumbnail and blob_id in ids})
+            MediaBlob.objects.filter(id__in=ids).delete()
+            transaction.on_commit(lambda: [default_storage.delete(path) for path in paths])
+    return {'uploads': len(expired), 'blobs': len(garbage), 'bytes': sum(blob.size for blob in garbage)}
+
+
+def storage_report():
+    """Space used by blobs against what storing every upload separately would have used."""
+    count_references()
+    blobs = MediaBlob.objects.aggregate(
+        blobs=Count('id'),
+        stored_bytes=Coalesce(Sum('size'), 0),
+        unit_references=Coalesce(Sum('ref_count'), 0),
+        unreferenced_blobs=Count('id', filter=Q(ref_count=0)),
+    )
+    uploads = MediaMetadata.objects.filter(blob__isnull=False).aggregate(
+        uploads=Count('id'),
+        uploaded_bytes=Coalesce(Sum('file_size'), 0),
+    )
+    saved = uploads['uploaded_bytes'] - blobs['stored_bytes']
+    return {
+        **blobs,
+        **uploads,
+        'saved_bytes': saved,
+        'saved_ratio': round(saved / uploads['uploaded_bytes'], 4) if uploads['uploaded_bytes'] else 0.0,
+    }
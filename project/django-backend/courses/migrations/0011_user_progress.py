@@ -0,0 +1,88 @@
+# Generated by Django 5.0.1 on 2026-10-17 12:34
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_enrollment_jobs'),
+    ]
+
+    # `user_progress` is part of the provided DDL, so it may already exist: create it
+    # only when missing and add the rollup helper column, then record the model state.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                    CREATE TABLE IF NOT EXISTS user_progress (
+                      progress_id          UUID PRIMARY KEY,
+                      user_id              UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                      course_id            UUID NOT NULL REFERENCES courses(course_id) ON DELETE CASCADE,
+                      completion_percentage INTEGER DEFAULT 0 CHECK (completion_percentage >= 0 AND completion_percentage <= 100),
+                      total_points_earned  INTEGER DEFAULT 0,
+                      average_score        INTEGER DEFAULT 0,
+                      time_spent_minutes   INTEGER DEFAULT 0,
+                      modules_completed    INTEGER DEFAULT 0,
+                      total_modules        INTEGER DEFAULT 0,
+                      tests_passed         INTEGER DEFAULT 0,
+                      tests_attempted      INTEGER DEFAULT 0,
+                      assignments_submitted INTEGER DEFAULT 0,
+                      assignments_graded   INTEGER DEFAULT 0,
+                      started_at           TIMESTAMP,
+                      completed_at         TIMESTAMP,
+                      last_activity        TIMESTAMP,
+                      created_at           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      updated_at           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      CONSTRAINT uq_user_progress UNIQUE (user_id, course_id)
+                    );
+                    ALTER TABLE user_progress ADD COLUMN IF NOT EXISTS quiz_score_total BIGINT NOT NULL DEFAULT 0;
+                    CREATE INDEX IF NOT EXISTS idx_user_progress_user   ON user_progress (user_id);
+                    CREATE INDEX IF NOT EXISTS idx_user_progress_course ON user_progress (course_id);
+                    """,
+                    reverse_sql="""
+                    ALTER TABLE user_progress DROP COLUMN IF EXISTS quiz_score_total;
+                    """,
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='UserProgress',
+                    fields=[
+                        ('progress_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('completion_percentage', models.IntegerField(default=0)),
+                        ('total_points_earned', models.IntegerField(default=0)),
+                        ('average_score', models.IntegerField(default=0)),
+                        ('time_spent_minutes', models.IntegerField(default=0)),
+                        ('modules_completed', models.IntegerField(default=0)),
+                        ('total_modules', models.IntegerField(default=0)),
+                        ('tests_passed', models.IntegerField(default=0)),
+                        ('tests_attempted', models.IntegerField(default=0)),
+                        ('assignments_submitted', models.IntegerField(default=0)),
+                        ('assignments_graded', models.IntegerField(default=0)),
+                        ('quiz_score_total', models.BigIntegerField(default=0)),
+                        ('started_at', models.DateTimeField(blank=True, null=True)),
+                        ('completed_at', models.DateTimeField(blank=True, null=True)),
+                        ('last_activity', models.DateTimeField(blank=True, null=True)),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('course', models.ForeignKey(db_column='course_id', on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='courses.course')),
+                        ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'user_progress',
+                        'indexes': [models.Index(fields=['course'], name='idx_user_progress_course')],
+                    },
+                ),
+                migrations.AddConstraint(
+                    model_name='userprogress',
+                    constraint=models.UniqueConstraint(fields=('user', 'course'), name='uq_user_progress'),
+                ),
+            ],
+        ),
+    ]
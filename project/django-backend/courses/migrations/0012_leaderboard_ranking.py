@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_user_progress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['course', 'total_points'], name='idx_leaderboard_points'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['course', 'rank', 'user'], name='idx_leaderboard_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboard',
+            constraint=models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('user',), name='uq_leaderboard_global_user'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-17 12:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_leaderboard_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unitprogress',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['submitted_at', 'id'], name='idx_submissions_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['assigned_at', 'id'], name='idx_enrollments_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'assigned_at', 'id'], name='idx_enrollments_course_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['started_at', 'id'], name='idx_quiz_attempts_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='unitprogress',
+            index=models.Index(fields=['created_at', 'id'], name='idx_unit_progress_keyset'),
+        ),
+    ]
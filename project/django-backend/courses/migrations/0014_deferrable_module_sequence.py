@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:09
+
+import django.db.models.constraints
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='unit',
+            name='uq_module_sequence',
+        ),
+        migrations.AddConstraint(
+            model_name='unit',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['IMMEDIATE'], fields=('course', 'sequence_order'), name='uq_module_sequence'),
+        ),
+    ]
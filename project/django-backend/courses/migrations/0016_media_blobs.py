@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:17
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediametadata',
+            name='storage_path',
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('storage_path', models.CharField(max_length=500, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_referenced_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'media_blobs',
+                'indexes': [models.Index(fields=['ref_count', 'last_referenced_at'], name='idx_media_blob_gc')],
+            },
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='uploads', to='courses.mediablob'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediametadata',
+            name='page_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='processing_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='processing_ms',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='mediametadata',
+            name='thumbnail_path',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mediametadata',
+            index=models.Index(fields=['processing_status', 'processing_started_at'], name='idx_media_processing'),
+        ),
+    ]
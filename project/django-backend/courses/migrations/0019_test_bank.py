@@ -0,0 +1,196 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_quiz_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Test',
+            fields=[
+                ('id', models.UUIDField(db_column='test_id', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=500)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('test_type', models.CharField(choices=[('quiz', 'Quiz'), ('test', 'Test'), ('exam', 'Exam'), ('assessment', 'Assessment')], default='test', max_length=30)),
+                ('time_limit_minutes', models.IntegerField(blank=True, null=True)),
+                ('passing_score', models.IntegerField(default=70)),
+                ('max_attempts', models.IntegerField(default=1)),
+                ('randomize_questions', models.BooleanField(default=False)),
+                ('show_correct_answers', models.BooleanField(default=False)),
+                ('points_possible', models.IntegerField(default=100)),
+                ('is_mandatory', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(blank=True, db_column='course_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tests', to='courses.course')),
+                ('created_by', models.ForeignKey(db_column='created_by', on_delete=django.db.models.deletion.PROTECT, related_name='tests', to=settings.AUTH_USER_MODEL)),
+                ('module', models.ForeignKey(blank=True, db_column='module_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tests', to='courses.unit')),
+            ],
+            options={
+                'db_table': 'tests',
+            },
+        ),
+        migrations.CreateModel(
+            name='TestAttempt',
+            fields=[
+                ('id', models.UUIDField(db_column='attempt_id', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('attempt_number', models.IntegerField()),
+                ('seed', models.BigIntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('time_spent_minutes', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('in_progress', 'In Progress'), ('completed', 'Completed'), ('abandoned', 'Abandoned'), ('timed_out', 'Timed Out')], default='in_progress', max_length=30)),
+                ('score', models.IntegerField(blank=True, null=True)),
+                ('points_earned', models.IntegerField(default=0)),
+                ('passed', models.BooleanField(blank=True, null=True)),
+                ('graded_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('graded_by', models.ForeignKey(blank=True, db_column='graded_by', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('test', models.ForeignKey(db_column='test_id', on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='courses.test')),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='test_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'test_attempts',
+            },
+        ),
+        migrations.CreateModel(
+            name='TestBank',
+            fields=[
+                ('id', models.UUIDField(db_column='test_bank_id', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('category', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(db_column='created_by', on_delete=django.db.models.deletion.PROTECT, related_name='test_banks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'test_bank',
+            },
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='test_bank',
+            field=models.ForeignKey(blank=True, db_column='test_bank_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tests', to='courses.testbank'),
+        ),
+        migrations.CreateModel(
+            name='TestQuestion',
+            fields=[
+                ('id', models.UUIDField(db_column='question_id', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('question_text', models.TextField()),
+                ('question_type', models.CharField(choices=[('mcq', 'Multiple Choice'), ('true_false', 'True/False'), ('short_answer', 'Short Answer'), ('essay', 'Essay'), ('fill_blank', 'Fill in the Blank')], max_length=30)),
+                ('options', models.JSONField(blank=True, null=True)),
+                ('correct_answer', models.TextField(blank=True, null=True)),
+                ('points', models.IntegerField(default=1)),
+                ('difficulty', models.CharField(blank=True, choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=20, null=True)),
+                ('explanation', models.TextField(blank=True, null=True)),
+                ('sequence_order', models.IntegerField(blank=True, null=True)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('question_text', 'explanation', config='english'), output_field=django.contrib.postgres.search.SearchVectorField())),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('test', models.ForeignKey(blank=True, db_column='test_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='own_questions', to='courses.test')),
+                ('test_bank', models.ForeignKey(blank=True, db_column='test_bank_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='courses.testbank')),
+            ],
+            options={
+                'db_table': 'test_questions',
+            },
+        ),
+        migrations.CreateModel(
+            name='TestAnswer',
+            fields=[
+                ('id', models.UUIDField(db_column='answer_id', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('answer_text', models.TextField(blank=True, null=True)),
+                ('selected_options', models.JSONField(blank=True, null=True)),
+                ('is_correct', models.BooleanField(blank=True, null=True)),
+                ('points_earned', models.IntegerField(default=0)),
+                ('feedback', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.ForeignKey(db_column='attempt_id', on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='courses.testattempt')),
+                ('question', models.ForeignKey(db_column='question_id', on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='courses.testquestion')),
+            ],
+            options={
+                'db_table': 'test_answers',
+            },
+        ),
+        migrations.CreateModel(
+            name='TestQuestionLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence_order', models.IntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_links', to='courses.testquestion')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='courses.test')),
+            ],
+            options={
+                'db_table': 'test_question_links',
+            },
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='questions',
+            field=models.ManyToManyField(related_name='used_in', through='courses.TestQuestionLink', to='courses.testquestion'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['user'], name='idx_test_attempts_user'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['test'], name='idx_test_attempts_test'),
+        ),
+        migrations.AddConstraint(
+            model_name='testattempt',
+            constraint=models.UniqueConstraint(fields=('test', 'user', 'attempt_number'), name='uq_test_attempt'),
+        ),
+        migrations.AddIndex(
+            model_name='testbank',
+            index=models.Index(fields=['category'], name='idx_test_bank_category'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_test_questions_search'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestion',
+            index=models.Index(fields=['test_bank', 'question_type', 'difficulty'], name='idx_test_questions_filter'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestion',
+            index=models.Index(fields=['created_at', 'id'], name='idx_test_questions_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='testanswer',
+            index=models.Index(fields=['question'], name='idx_test_answers_question'),
+        ),
+        migrations.AddConstraint(
+            model_name='testanswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='uq_test_answer'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestionlink',
+            index=models.Index(fields=['test', 'sequence_order'], name='idx_test_question_link_order'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestionlink',
+            index=models.Index(fields=['question'], name='idx_test_question_link_q'),
+        ),
+        migrations.AddConstraint(
+            model_name='testquestionlink',
+            constraint=models.UniqueConstraint(fields=('test', 'question'), name='uq_test_question_link'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(fields=['course'], name='idx_tests_course'),
+        ),
+    ]
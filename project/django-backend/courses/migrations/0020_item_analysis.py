@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_test_bank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistic',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistic', serialize=False, to='courses.question')),
+                ('delivered', models.IntegerField(default=0)),
+                ('omitted', models.IntegerField(default=0)),
+                ('graded', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_sq_sum', models.BigIntegerField(default=0)),
+                ('correct_score_sum', models.BigIntegerField(default=0)),
+                ('choice_counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'quiz_question_statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizAnalysisState',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analysis_state', serialize=False, to='courses.quiz')),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_id', models.UUIDField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'quiz_analysis_state',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'completed_at', 'id'], name='idx_quiz_attempts_completed'),
+        ),
+        migrations.AddField(
+            model_name='questionstatistic',
+            name='quiz',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='courses.quiz'),
+        ),
+    ]
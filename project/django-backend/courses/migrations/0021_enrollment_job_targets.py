@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_item_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollmentjob',
+            name='targets',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_enrollment_job_targets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboard',
+            name='ranked_points',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        # existing ranks are current for the points rows already hold
+        migrations.RunSQL(
+            sql='UPDATE leaderboard SET ranked_points = total_points',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(condition=models.Q(('ranked_points__isnull', True), models.Q(('ranked_points', models.F('total_points')), _negated=True), _connector='OR'), fields=['course'], name='idx_leaderboard_unranked'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0022_leaderboard_ranked_points'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='reviews',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='passed',
+            field=models.BooleanField(blank=True, default=False, null=True),
+        ),
+    ]
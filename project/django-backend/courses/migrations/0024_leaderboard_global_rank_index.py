@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0023_quiz_attempt_reviews'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(condition=models.Q(('course__isnull', True)), fields=['rank', 'user'], name='idx_leaderboard_global_rank'),
+        ),
+    ]
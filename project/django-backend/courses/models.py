@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import uuid
 
@@ -31,6 +34,31 @@ class Profile(AbstractUser):
         return f"{self.first_name} {self.last_name}".strip()
 
 
+def _count_per_course(model, **filters):
+    """Correlated COUNT(*) of ``model`` rows for the outer course; 0 when there are none."""
+    counts = (
+        model.objects.filter(course=models.OuterRef('pk'), **filters)
+        .order_by().values('course').annotate(n=models.Count('*')).values('n')
+    )
+    return Coalesce(models.Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_list_stats(self):
+        """Annotate unit and enrollment counts for list pages.
+
+        Each count is a separate correlated subquery so the unit and
+        enrollment joins never multiply each other's rows.
+        """
+        return self.select_related('created_by').annotate(
+            units_count=_count_per_course(Unit),
+            enrolled_count=_count_per_course(Enrollment),
+            assigned_count=_count_per_course(Enrollment, status='assigned'),
+            in_progress_count=_count_per_course(Enrollment, status='in_progress'),
+            completed_count=_count_per_course(Enrollment, status='completed'),
+        )
+
+
 class Course(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='course_id')
     title = models.CharField(max_length=500)
@@ -46,11 +74,26 @@ class Course(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         db_table = 'courses'
         ordering = ['-created_at']
 
 
+class UnitQuerySet(models.QuerySet):
+    # reverse one-to-one accessors for every unit subtype table
+    SUBTYPE_RELATIONS = (
+        'video_details', 'audio_details', 'presentation_details', 'text_details',
+        'page_details', 'quiz_details', 'assignment_details', 'scorm_details',
+        'survey_details',
+    )
+
+    def with_details(self):
+        """Load all subtype rows (and quiz questions) up front for nested serialization."""
+        return self.select_related(*self.SUBTYPE_RELATIONS).prefetch_related('quiz_details__questions')
+
+
 class Unit(models.Model):
     """Mapped to the DDL `modules` table (module-level metadata)."""
 
@@ -82,11 +125,17 @@ class Unit(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UnitQuerySet.as_manager()
+
     class Meta:
         db_table = 'modules'
         ordering = ['course', 'sequence_order']
         constraints = [
-            models.UniqueConstraint(fields=['course', 'sequence_order'], name='uq_module_sequence')
+            # checked per statement, so a reorder can permute positions in one UPDATE (see courses/unit_order.py)
+            models.UniqueConstraint(
+                fields=['course', 'sequence_order'], name='uq_module_sequence',
+                deferrable=models.Deferrable.IMMEDIATE,
+            )
         ]
 
     @property
@@ -167,6 +216,8 @@ class Quiz(models.Model):
     attempts_allowed = models.IntegerField(default=1)
     show_answers = models.BooleanField(default=False)
     randomize_questions = models.BooleanField(default=False)
+    # draw this many questions per attempt from the quiz's pool; null delivers them all
+    questions_per_attempt = models.PositiveIntegerField(blank=True, null=True)
     mandatory_completion = models.BooleanField(default=False)
 
     class Meta:
@@ -261,6 +312,11 @@ class Enrollment(models.Model):
     class Meta:
         db_table = 'enrollments'
         unique_together = ['course', 'user']
+        indexes = [
+            # keyset pagination keys (see courses/pagination.py)
+            models.Index(fields=['assigned_at', 'id'], name='idx_enrollments_keyset'),
+            models.Index(fields=['course', 'assigned_at', 'id'], name='idx_enrollments_course_keyset'),
+        ]
 
 
 class UnitProgress(models.Model):
@@ -276,10 +332,14 @@ class UnitProgress(models.Model):
     score = models.IntegerField(blank=True, null=True)
     started_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = 'unit_progress'
         unique_together = ['enrollment', 'unit']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='idx_unit_progress_keyset'),
+        ]
 
 
 class AssignmentSubmission(models.Model):
@@ -302,6 +362,9 @@ class AssignmentSubmission(models.Model):
 
     class Meta:
         db_table = 'assignment_submissions'
+        indexes = [
+            models.Index(fields=['submitted_at', 'id'], name='idx_submissions_keyset'),
+        ]
 
 
 class QuizAttempt(models.Model):
@@ -309,13 +372,57 @@ class QuizAttempt(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
     user = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='quiz_attempts')
     score = models.IntegerField(default=0)
-    passed = models.BooleanField(default=False)
+    # null while a question waits for a trainer's review (courses.grading)
+    passed = models.BooleanField(default=False, blank=True, null=True)
     answers = models.JSONField(default=dict)
+    # {question_id: correct} given by a trainer for questions that wait for review
+    reviews = models.JSONField(default=dict, blank=True)
+    # which questions the attempt got, and in what order, is derived from this (courses.delivery)
+    seed = models.BigIntegerField(blank=True, null=True)
     started_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         db_table = 'quiz_attempts'
+        indexes = [
+            models.Index(fields=['started_at', 'id'], name='idx_quiz_attempts_keyset'),
+            # item-analysis watermark (courses.item_analysis)
+            models.Index(fields=['quiz', 'completed_at', 'id'], name='idx_quiz_attempts_completed'),
+        ]
+
+
+class QuestionStatistic(models.Model):
+    """Running item-analysis sums for one quiz question, over graded attempts (``courses.item_analysis``)."""
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='statistic')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_statistics')
+    delivered = models.IntegerField(default=0)
+    omitted = models.IntegerField(default=0)
+    # delivered and not waiting for review; the sums below cover these responses
+    graded = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sq_sum = models.BigIntegerField(default=0)
+    correct_score_sum = models.BigIntegerField(default=0)
+    # option index (or "true"/"false") -> times picked
+    choice_counts = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'quiz_question_statistics'
+
+
+class QuizAnalysisState(models.Model):
+    """How far item analysis has read a quiz's completed attempts."""
+
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='analysis_state')
+    attempts = models.IntegerField(default=0)
+    last_completed_at = models.DateTimeField(blank=True, null=True)
+    last_attempt_id = models.UUIDField(blank=True, null=True)
+    refreshed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'quiz_analysis_state'
 
 
 class Leaderboard(models.Model):
@@ -327,11 +434,28 @@ class Leaderboard(models.Model):
     quiz_score_total = models.IntegerField(default=0)
     activity_points = models.IntegerField(default=0)
     rank = models.IntegerField(default=0)
+    # the points ``rank`` was computed for; differs from total_points while a
+    # global row waits for courses.leaderboard.refresh_ranks
+    ranked_points = models.IntegerField(blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'leaderboard'
         unique_together = ['user', 'course']
+        constraints = [
+            # unique_together does not cover the course-less (global) row, since NULLs never collide
+            models.UniqueConstraint(fields=['user'], condition=models.Q(course__isnull=True), name='uq_leaderboard_global_user'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'total_points'], name='idx_leaderboard_points'),
+            models.Index(fields=['course', 'rank', 'user'], name='idx_leaderboard_rank'),
+            # Postgres does not order by the index above for ``course IS NULL``, so the global scope has its own
+            models.Index(fields=['rank', 'user'], name='idx_leaderboard_global_rank', condition=models.Q(course__isnull=True)),
+            models.Index(
+                fields=['course'], name='idx_leaderboard_unranked',
+                condition=models.Q(ranked_points__isnull=True) | ~models.Q(ranked_points=models.F('total_points')),
+            ),
+        ]
 
 
 class ModuleSequencing(models.Model):
@@ -426,9 +550,36 @@ class TeamMember(models.Model):
         constraints = [models.UniqueConstraint(fields=['team', 'user'], name='team_member_pk')]
 
 
-class MediaMetadata(models.Model):
+class MediaBlob(models.Model):
+    """One stored file, shared by every upload with the same content (see ``courses.media_store``)."""
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
     storage_path = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField()
+    # units whose storage path points here, as of the last recount
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'media_blobs'
+        indexes = [models.Index(fields=['ref_count', 'last_referenced_at'], name='idx_media_blob_gc')]
+
+
+class MediaMetadata(models.Model):
+    # same values as encoding_status in the Mongo media_files schema
+    PROCESSING_STATUSES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # shared by all uploads of the same blob
+    storage_path = models.CharField(max_length=500, db_index=True)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='uploads')
     file_name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=50)
     file_size = models.BigIntegerField(blank=True, null=True)
@@ -438,6 +589,293 @@ class MediaMetadata(models.Model):
     height = models.IntegerField(blank=True, null=True)
     uploaded_by = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='uploaded_media')
     uploaded_at = models.DateTimeField(default=timezone.now)
+    # filled in by the background pipeline (courses.media_processing)
+    page_count = models.IntegerField(blank=True, null=True)
+    thumbnail_path = models.CharField(max_length=500, blank=True, null=True)
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUSES, default='pending')
+    processing_error = models.TextField(blank=True, null=True)
+    processing_started_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    processing_ms = models.IntegerField(blank=True, null=True)
 
     class Meta:
         db_table = 'media_metadata'
+        indexes = [
+            models.Index(fields=['processing_status', 'processing_started_at'], name='idx_media_processing'),
+        ]
+
+
+class EnrollmentJob(models.Model):
+    """Background course assignment; doubles as the DB-backed work queue."""
+
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollment_jobs')
+    requested_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    user_ids = models.JSONField(default=list)
+    team_ids = models.JSONField(default=list)
+    # the resolved audience, sorted, frozen on the first run so a resumed job
+    # walks the same list even if team membership changed in between
+    targets = models.JSONField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    chunk_size = models.IntegerField(default=1000)
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    # index of the last chunk of ``targets`` fully written; resuming starts at last_chunk + 1
+    last_chunk = models.IntegerField(default=-1)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'enrollment_jobs'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'heartbeat_at'], name='idx_enrollment_job_status')]
+
+
+class UserProgress(models.Model):
+    """Per-learner, per-course rollup (DDL `user_progress`), maintained by courses.progress."""
+
+    progress_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='course_progress', db_column='user_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='user_progress', db_column='course_id')
+    completion_percentage = models.IntegerField(default=0)
+    total_points_earned = models.IntegerField(default=0)
+    average_score = models.IntegerField(default=0)
+    time_spent_minutes = models.IntegerField(default=0)
+    modules_completed = models.IntegerField(default=0)
+    total_modules = models.IntegerField(default=0)
+    tests_passed = models.IntegerField(default=0)
+    tests_attempted = models.IntegerField(default=0)
+    assignments_submitted = models.IntegerField(default=0)
+    assignments_graded = models.IntegerField(default=0)
+    # running sum of quiz attempt scores so average_score stays exact under delta updates
+    quiz_score_total = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    last_activity = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_progress'
+        constraints = [models.UniqueConstraint(fields=['user', 'course'], name='uq_user_progress')]
+        indexes = [models.Index(fields=['course'], name='idx_user_progress_course')]
+
+
+class UploadSession(models.Model):
+    """Chunked, resumable media upload in progress (see courses.uploads)."""
+
+    STATUSES = [
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=50, default='general')
+    mime_type = models.CharField(max_length=100, blank=True, null=True)
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUSES, default='uploading')
+    # hex SHA-256 of the assembled file, set on completion
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+    media = models.ForeignKey(MediaMetadata, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        indexes = [models.Index(fields=['status', 'updated_at'], name='idx_upload_session_status')]
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_chunk_size(self, index):
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+
+
+class UploadChunk(models.Model):
+    """One received chunk of an ``UploadSession``; a row per chunk keeps parallel PUTs independent."""
+
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.IntegerField()
+    size = models.IntegerField()
+    sha256 = models.CharField(max_length=64)
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'upload_chunks'
+        constraints = [models.UniqueConstraint(fields=['session', 'index'], name='uq_upload_chunk')]
+
+
+# --- test bank (DDL tables 16-20) ------------------------------------------------
+
+class TestBank(models.Model):
+    """A reusable pool of questions; tests reference its questions instead of copying them."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='test_bank_id')
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    category = models.CharField(max_length=100, blank=True, null=True)
+    created_by = models.ForeignKey(Profile, on_delete=models.PROTECT, related_name='test_banks', db_column='created_by')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'test_bank'
+        indexes = [models.Index(fields=['category'], name='idx_test_bank_category')]
+
+
+class Test(models.Model):
+    TEST_TYPES = [('quiz', 'Quiz'), ('test', 'Test'), ('exam', 'Exam'), ('assessment', 'Assessment')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='test_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='tests', blank=True, null=True, db_column='course_id')
+    module = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='tests', blank=True, null=True, db_column='module_id')
+    test_bank = models.ForeignKey(TestBank, on_delete=models.SET_NULL, related_name='tests', blank=True, null=True, db_column='test_bank_id')
+    title = models.CharField(max_length=500)
+    description = models.TextField(blank=True, null=True)
+    test_type = models.CharField(max_length=30, choices=TEST_TYPES, default='test')
+    time_limit_minutes = models.IntegerField(blank=True, null=True)
+    passing_score = models.IntegerField(default=70)
+    max_attempts = models.IntegerField(default=1)
+    randomize_questions = models.BooleanField(default=False)
+    show_correct_answers = models.BooleanField(default=False)
+    points_possible = models.IntegerField(default=100)
+    is_mandatory = models.BooleanField(default=True)
+    # questions are referenced through TestQuestionLink, so one bank question can serve many tests
+    questions = models.ManyToManyField('TestQuestion', through='TestQuestionLink', related_name='used_in')
+    created_by = models.ForeignKey(Profile, on_delete=models.PROTECT, related_name='tests', db_column='created_by')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tests'
+        indexes = [models.Index(fields=['course'], name='idx_tests_course')]
+
+
+class TestQuestion(models.Model):
+    QUESTION_TYPES = [
+        ('mcq', 'Multiple Choice'),
+        ('true_false', 'True/False'),
+        ('short_answer', 'Short Answer'),
+        ('essay', 'Essay'),
+        ('fill_blank', 'Fill in the Blank'),
+    ]
+    DIFFICULTIES = [('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='question_id')
+    # the test a question was written for, when it is not a bank question
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='own_questions', blank=True, null=True, db_column='test_id')
+    test_bank = models.ForeignKey(TestBank, on_delete=models.CASCADE, related_name='questions', blank=True, null=True, db_column='test_bank_id')
+    question_text = models.TextField()
+    question_type = models.CharField(max_length=30, choices=QUESTION_TYPES)
+    options = models.JSONField(blank=True, null=True)
+    correct_answer = models.TextField(blank=True, null=True)
+    points = models.IntegerField(default=1)
+    difficulty = models.CharField(max_length=20, choices=DIFFICULTIES, blank=True, null=True)
+    explanation = models.TextField(blank=True, null=True)
+    sequence_order = models.IntegerField(blank=True, null=True)
+    # maintained by Postgres; text search over the bank goes through its GIN index
+    search_vector = models.GeneratedField(
+        expression=SearchVector('question_text', 'explanation', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'test_questions'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='idx_test_questions_search'),
+            models.Index(fields=['test_bank', 'question_type', 'difficulty'], name='idx_test_questions_filter'),
+            models.Index(fields=['created_at', 'id'], name='idx_test_questions_keyset'),
+        ]
+
+
+class TestQuestionLink(models.Model):
+    """A question's place in a test (not in the DDL, which could only copy questions into a test)."""
+
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(TestQuestion, on_delete=models.CASCADE, related_name='test_links')
+    sequence_order = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'test_question_links'
+        constraints = [models.UniqueConstraint(fields=['test', 'question'], name='uq_test_question_link')]
+        indexes = [
+            models.Index(fields=['test', 'sequence_order'], name='idx_test_question_link_order'),
+            models.Index(fields=['question'], name='idx_test_question_link_q'),
+        ]
+
+
+class TestAttempt(models.Model):
+    STATUSES = [
+        ('in_progress', 'In Progress'),
+        ('completed', 'Completed'),
+        ('abandoned', 'Abandoned'),
+        ('timed_out', 'Timed Out'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='attempt_id')
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='attempts', db_column='test_id')
+    user = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='test_attempts', db_column='user_id')
+    attempt_number = models.IntegerField()
+    # question order for randomized tests (courses.delivery)
+    seed = models.BigIntegerField(blank=True, null=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    time_spent_minutes = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=30, choices=STATUSES, default='in_progress')
+    score = models.IntegerField(blank=True, null=True)
+    points_earned = models.IntegerField(default=0)
+    passed = models.BooleanField(blank=True, null=True)
+    graded_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, related_name='+', blank=True, null=True, db_column='graded_by')
+    graded_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'test_attempts'
+        constraints = [models.UniqueConstraint(fields=['test', 'user', 'attempt_number'], name='uq_test_attempt')]
+        indexes = [
+            models.Index(fields=['user'], name='idx_test_attempts_user'),
+            models.Index(fields=['test'], name='idx_test_attempts_test'),
+        ]
+
+
+class TestAnswer(models.Model):
+    """One graded answer of an attempt; a row per question so results can be analysed per item."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='answer_id')
+    attempt = models.ForeignKey(TestAttempt, on_delete=models.CASCADE, related_name='answers', db_column='attempt_id')
+    question = models.ForeignKey(TestQuestion, on_delete=models.CASCADE, related_name='answers', db_column='question_id')
+    answer_text = models.TextField(blank=True, null=True)
+    selected_options = models.JSONField(blank=True, null=True)
+    is_correct = models.BooleanField(blank=True, null=True)
+    points_earned = models.IntegerField(default=0)
+    feedback = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'test_answers'
+        constraints = [models.UniqueConstraint(fields=['attempt', 'question'], name='uq_test_answer')]
+        indexes = [models.Index(fields=['question'], name='idx_test_answers_question')]
@@ -0,0 +1,373 @@
+"""MongoDB collections, validators and indexes, applied as a diff.
+
+``COLLECTIONS`` is the desired schema.  It used to live in
+``project/mongo_collection.py``, which is now a command-line wrapper around
+this module, as is the ``apply_mongo_schema`` management command.  Applying
+it takes three steps:
+
+* ``read_state(db)`` collects what the server has: collection options
+  (``listCollections``), indexes (``listIndexes``) and document counts and
+  sizes (``$collStats``).
+* ``plan(state)`` compares that with ``COLLECTIONS`` and returns only the
+  steps needed.  It creates a missing collection, runs ``collMod`` for a
+  validator that differs, creates a missing index, rebuilds one whose keys
+  or options changed, and drops undeclared indexes when ``prune`` is set.
+  An up-to-date database plans nothing, so running it again is free.
+* ``apply(db, steps)`` runs the steps in order.
+
+MongoDB 4.2+ builds every index without holding the collection lock for the
+build (only briefly at start and end), so writes carry on.  Older servers
+get ``background=True``.  Each index step carries an estimated size and
+build time, worked out from the collection's document count and a sample of
+key sizes, because the server gives no estimate of its own.
+
+Sample data is never written by ``apply``.  ``insert_sample`` is separate
+and idempotent, and both commands refuse it unless running in debug mode.
+"""
+from collections import namedtuple
+
+import bson
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+
+VALIDATION_LEVEL = 'moderate'
+VALIDATION_ACTION = 'error'
+# index options that change what an index is; anything else (v, ns, background) is ignored
+INDEX_OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds', 'collation')
+# rough figures for the estimates: per-entry overhead of a WiredTiger index key and
+# collection-scan throughput of a hybrid index build
+INDEX_ENTRY_OVERHEAD_BYTES = 16
+INDEX_BUILD_DOCS_PER_SECOND = 50_000
+KEY_SAMPLE_SIZE = 200
+
+Step = namedtuple('Step', 'action collection target spec note')
+
+
+# -----------------------------
+# Desired schema
+# -----------------------------
+module_content_items_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["module_id", "content_type", "title", "file_reference", "sequence_order", "created_at", "updated_at"],
+        "properties": {
+            "_id": {"bsonType": "objectId"},
+            "module_id": {"bsonType": "string", "description": "UUID string referencing PostgreSQL modules.module_id"},
+            "content_type": {
+                "bsonType": "string",
+                "enum": ["video", "pdf", "ppt", "document", "link"]
+            },
+            "title": {"bsonType": "string"},
+            "description": {"bsonType": ["string", "null"]},
+            "file_reference": {"bsonType": "string", "description": "S3 URL or file path"},
+            "file_size_bytes": {"bsonType": ["int", "long", "double"], "minimum": 0},
+            "duration_seconds": {"bsonType": ["int", "long", "double"], "minimum": 0},
+            "thumbnail_url": {"bsonType": ["string", "null"]},
+            "sequence_order": {"bsonType": ["int", "long"], "minimum": 0},
+            "metadata": {
+                "bsonType": "object",
+                "required": ["format", "mime_type"],
+                "properties": {
+                    "format": {"bsonType": "string"},         # mp4, pdf, pptx
+                    "resolution": {"bsonType": ["string", "null"]},  # 1080p, 720p
+                    "mime_type": {"bsonType": "string"}       # video/mp4, application/pdf
+                },
+                "additionalProperties": True
+            },
+            "created_at": {"bsonType": "date"},
+            "updated_at": {"bsonType": "date"}
+        },
+        "additionalProperties": True
+    }
+}
+
+media_files_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["file_type", "title", "file_path", "encoding_status", "created_at", "updated_at"],
+        "properties": {
+            "_id": {"bsonType": "objectId"},
+            "file_type": {
+                "bsonType": "string",
+                "enum": ["video", "audio", "pdf", "ppt", "image"]
+            },
+            "title": {"bsonType": "string"},
+            "file_path": {"bsonType": "string"},
+            "file_size_bytes": {"bsonType": ["int", "long", "double"], "minimum": 0},
+            "duration_seconds": {"bsonType": ["int", "long", "double"], "minimum": 0},
+            "thumbnail_path": {"bsonType": ["string", "null"]},
+            "upload_metadata": {
+                "bsonType": "object",
+                "required": ["uploaded_by", "upload_date", "original_filename"],
+                "properties": {
+                    "uploaded_by": {"bsonType": "string", "description": "UUID referencing PostgreSQL users.user_id"},
+                    "upload_date": {"bsonType": "date"},
+                    "original_filename": {"bsonType": "string"}
+                },
+                "additionalProperties": True
+            },
+            "encoding_status": {
+                "bsonType": "string",
+                "enum": ["pending", "processing", "completed", "failed"]
+            },
+            "created_at": {"bsonType": "date"},
+            "updated_at": {"bsonType": "date"}
+        },
+        "additionalProperties": True
+    }
+}
+
+test_question_media_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["question_id", "media_type", "file_reference", "created_at"],
+        "properties": {
+            "_id": {"bsonType": "objectId"},
+            "question_id": {"bsonType": "string", "description": "UUID referencing PostgreSQL test_questions.question_id"},
+            "media_type": {
+                "bsonType": "string",
+                "enum": ["image", "video", "audio"]
+            },
+            "file_reference": {"bsonType": "string"},
+            "file_size_bytes": {"bsonType": ["int", "long", "double"], "minimum": 0},
+            "metadata": {
+                "bsonType": "object",
+                "properties": {
+                    "format": {"bsonType": "string"},
+                    "dimensions": {"bsonType": ["string", "null"]},     # e.g., "1920x1080"
+                    "duration_seconds": {"bsonType": ["int", "long", "double", "null"], "minimum": 0}
+                },
+                "additionalProperties": True
+            },
+            "created_at": {"bsonType": "date"}
+        },
+        "additionalProperties": True
+    }
+}
+
+COLLECTIONS = {
+    "module_content_items": {
+        "validator": module_content_items_validator,
+        "indexes": [
+            ([("module_id", ASCENDING)], {"name": "idx_module_id"}),
+            ([("sequence_order", ASCENDING)], {"name": "idx_sequence_order"}),
+            ([("module_id", ASCENDING), ("sequence_order", ASCENDING)], {"name": "idx_module_id_sequence_order"}),
+        ],
+    },
+    "media_files": {
+        "validator": media_files_validator,
+        "indexes": [
+            ([("file_type", ASCENDING)], {"name": "idx_file_type"}),
+            ([("encoding_status", ASCENDING)], {"name": "idx_encoding_status"}),
+            ([("upload_metadata.uploaded_by", ASCENDING)], {"name": "idx_upload_metadata_uploaded_by"}),
+        ],
+    },
+    "test_question_media": {
+        "validator": test_question_media_validator,
+        "indexes": [
+            ([("question_id", ASCENDING)], {"name": "idx_question_id"}),
+            ([("media_type", ASCENDING)], {"name": "idx_media_type"}),
+        ],
+    },
+}
+
+
+# -----------------------------
+# Reading and diffing
+# -----------------------------
+def _index_spec(keys, options):
+    """Comparable form of an index: ((field, direction), ...) plus the options that matter."""
+    normalized = tuple((field, int(d) if isinstance(d, (int, float)) else d) for field, d in keys)
+    return normalized, {key: options[key] for key in INDEX_OPTIONS if options.get(key) not in (None, False)}
+
+
+def _spec_key(spec):
+    keys, options = spec
+    return repr((keys, sorted(options.items())))
+
+
+def read_state(db, collections=COLLECTIONS):
+    """What the server has for the managed collections: options, indexes and sizes."""
+    state = {}
+    for info in db.list_collections(filter={'name': {'$in': list(collections)}}):
+        name = info['name']
+        entry = state[name] = {'options': info.get('options', {}), 'indexes': {}, 'count': 0, 'avg_obj_size': 0,
+                               'index_sizes': {}, 'key_sizes': {}}
+        for index in db[name].list_indexes():
+            index = dict(index)
+            entry['indexes'][index.pop('name')] = _index_spec(list(index.pop('key').items()), index)
+        try:
+            stats = next(db[name].aggregate([{'$collStats': {'storageStats': {}}}]), {}).get('storageStats', {})
+        except OperationFailure:
+            stats = {}
+        entry['count'] = stats.get('count', 0)
+        entry['avg_obj_size'] = stats.get('avgObjSize', 0)
+        entry['index_sizes'] = stats.get('indexSizes', {})
+        if entry['count']:
+            entry['key_sizes'] = _sample_key_sizes(db[name], collections[name]['indexes'])
+    return state
+
+
+def _sample_key_sizes(collection, indexes):
+    """Average encoded size of each declared index's key fields, from a ``$sample`` of documents."""
+    fields = sorted({field for keys, _ in indexes for field, _ in keys})
+    sample = list(collection.aggregate([
+        {'$sample': {'size': KEY_SAMPLE_SIZE}},
+        {'$project': {'_id': 0, **{field: 1 for field in fields}}},
+    ]))
+    sizes = {}
+    for keys, options in indexes:
+        if sample:
+            total = 0
+            for doc in sample:
+                total += len(bson.encode({field: _get(doc, field) for field, _ in keys}))
+            sizes[options['name']] = total / len(sample)
+    return sizes
+
+
+def _get(doc, dotted):
+    for part in dotted.split('.'):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def _estimate(entry, name):
+    count = entry['count'] if entry else 0
+    if not count:
+        return 'empty collection, instant'
+    key_bytes = entry['key_sizes'].get(name)
+    size = f'~{_human(count * (key_bytes + INDEX_ENTRY_OVERHEAD_BYTES))}' if key_bytes else 'size unknown'
+    return f'{size}, ~{max(count / INDEX_BUILD_DOCS_PER_SECOND, 1):.0f}s for {count} documents'
+
+
+def _human(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def plan(state, collections=COLLECTIONS, prune=False):
+    """The steps that take the server from ``state`` to ``collections``; empty when nothing differs."""
+    steps = []
+    for name, desired in collections.items():
+        entry = state.get(name)
+        if entry is None:
+            steps.append(Step('create_collection', name, None, desired['validator'], 'with validator'))
+        else:
+            options = entry['options']
+            if (options.get('validator') != desired['validator']
+                    or options.get('validationLevel', 'strict') != VALIDATION_LEVEL
+                    or options.get('validationAction', 'error') != VALIDATION_ACTION):
+                steps.append(Step('update_validator', name, None, desired['validator'], 'collMod'))
+
+        existing = entry['indexes'] if entry else {}
+        by_spec = {_spec_key(spec): index_name for index_name, spec in existing.items()}
+        declared = set()
+        for keys, options in desired['indexes']:
+            index_name = options['name']
+            declared.add(index_name)
+            spec = _index_spec(keys, options)
+            current = existing.get(index_name)
+            if current == spec:
+                continue
+            if current is None and _spec_key(spec) in by_spec:
+                # the server refuses a second index on the same keys
+                steps.append(Step('conflict', name, index_name, (keys, options),
+                                  f'same keys already indexed as {by_spec[_spec_key(spec)]}; rename or drop it'))
+                continue
+            if current is not None:
+                steps.append(Step('drop_index', name, index_name, None, 'keys or options changed'))
+            extra = {key: value for key, value in options.items() if key != 'name'}
+            steps.append(Step('create_index', name, index_name, (keys, extra), _estimate(entry, index_name)))
+        if prune:
+            for index_name in existing:
+                if index_name != '_id_' and index_name not in declared:
+                    steps.append(Step('drop_index', name, index_name, None, 'not declared'))
+    return steps
+
+
+# -----------------------------
+# Applying and reporting
+# -----------------------------
+def server_version(db):
+    return tuple(db.client.server_info()['versionArray'][:2])
+
+
+def apply(db, steps, version=None):
+    """Run ``steps`` in order; ``conflict`` steps are reported, never run.  Returns the steps applied."""
+    background = version is not None and version < (4, 2)
+    applied = []
+    for step in steps:
+        collection = db[step.collection]
+        if step.action == 'create_collection':
+            db.create_collection(step.collection, validator=step.spec,
+                                 validationLevel=VALIDATION_LEVEL, validationAction=VALIDATION_ACTION)
+        elif step.action == 'update_validator':
+            db.command('collMod', step.collection, validator=step.spec,
+                       validationLevel=VALIDATION_LEVEL, validationAction=VALIDATION_ACTION)
+        elif step.action == 'drop_index':
+            collection.drop_index(step.target)
+        elif step.action == 'create_index':
+            keys, options = step.spec
+            if background:
+                options = {**options, 'background': True}
+            collection.create_index(keys, name=step.target, **options)
+        else:
+            continue
+        applied.append(step)
+    return applied
+
+
+def format_plan(steps):
+    if not steps:
+        return ['schema is up to date']
+    lines = []
+    for step in steps:
+        if step.action in ('create_index', 'drop_index', 'conflict'):
+            keys = ', '.join(f'{field}: {direction}' for field, direction in step.spec[0]) if step.spec else ''
+            target = f'{step.target} {{{keys}}}' if keys else step.target
+        else:
+            target = ''
+        label = step.action.replace('_', ' ')
+        lines.append(f'{step.collection}: {label} {target}'.rstrip() + f' ({step.note})')
+    return lines
+
+
+def index_report(state):
+    """Current size of every index on the managed collections."""
+    lines = []
+    for name, entry in sorted(state.items()):
+        for index_name, size in sorted(entry['index_sizes'].items()):
+            lines.append(f'{name}.{index_name}: {_human(size)}')
+    return lines
+
+
+SAMPLE_MODULE_ID = "b9f2e7f4-2a8a-4e8b-9f6f-123456789abc"
+
+
+def insert_sample(db, now):
+    """Upsert one demo content item (development only); repeated calls leave a single copy."""
+    db.module_content_items.update_one(
+        {"module_id": SAMPLE_MODULE_ID, "sequence_order": 1},
+        {"$setOnInsert": {
+            "module_id": SAMPLE_MODULE_ID,
+            "content_type": "video",
+            "title": "Intro to Compliance",
+            "description": "Overview video",
+            "file_reference": "s3://bucket/key/intro.mp4",
+            "file_size_bytes": 1024 * 1024 * 50,
+            "duration_seconds": 600,
+            "thumbnail_url": "s3://bucket/key/intro-thumb.jpg",
+            "sequence_order": 1,
+            "metadata": {
+                "format": "mp4",
+                "resolution": "1080p",
+                "mime_type": "video/mp4"
+            },
+            "created_at": now,
+            "updated_at": now
+        }},
+        upsert=True,
+    )
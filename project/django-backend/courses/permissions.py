@@ -1,4 +1,4 @@
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
 class IsTrainer(BasePermission):
@@ -11,4 +11,15 @@ class IsTrainer(BasePermission):
         # For superusers allow
         if getattr(user, 'is_superuser', False):
             return True
-        return getattr(user, 'primary_role', '') == 'trainer'
\ No newline at end of file
+        return getattr(user, 'primary_role', '') == 'trainer'
+
+class IsTrainerOrReadOnly(BasePermission):
+    """Reads for any signed-in user; writes only for trainers, managers, admins and superusers."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if request.method in SAFE_METHODS:
+            return True
+        return user.is_superuser or getattr(user, 'primary_role', '') in ('trainer', 'manager', 'admin')
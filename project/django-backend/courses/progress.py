@@ -0,0 +1,360 @@
+"""Incremental per-learner course rollups (the DDL ``user_progress`` table).
+
+Writes to ``UnitProgress``, ``ModuleCompletion``, ``QuizAttempt`` and
+``AssignmentSubmission`` are turned into delta ``UPDATE``s on the matching
+``UserProgress`` row (see ``courses.signals``); the same deltas feed the
+leaderboard.  ``Enrollment.progress_percentage`` is overwritten with the
+rollup's completion percentage whenever module completion (or a course's
+unit count) changes and on an explicit rebuild; other activity, such as a
+first quiz attempt seeding the rollup, leaves it as it was.  A module
+counts as completed when either its ``UnitProgress`` or its
+``ModuleCompletion`` says so.
+
+``rebuild_rollups`` recomputes rows from the source tables with grouped
+queries; it backs the ``rebuild_progress_rollups`` command and seeds a row
+the first time a learner/course pair sees activity.  Bulk writes
+(``bulk_create`` / ``update``) bypass signals, so callers that use them must
+apply deltas themselves or rebuild.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, IntegerField, Max, OuterRef, Q,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .leaderboard import record_points
+from .models import (
+    Assignment, AssignmentSubmission, Enrollment, ModuleCompletion, Quiz,
+    QuizAttempt, Unit, UnitProgress, UserProgress,
+)
+from .stats import invalidate_enrollment_stats
+
+
+# Field values remembered at load time so post_save can tell what changed.
+TRACKED_FIELDS = {
+    UnitProgress: ('status',),
+    ModuleCompletion: ('is_completed', 'time_spent_minutes'),
+    QuizAttempt: ('score', 'passed'),
+    AssignmentSubmission: ('status', 'score'),
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def remember_state(instance):
+    # read __dict__ directly so deferred fields are not fetched one by one
+    instance._rollup_state = {
+        field: instance.__dict__.get(field) for field in TRACKED_FIELDS[type(instance)]
+    }
+
+
+def _previous(instance, field, created):
+    if created:
+        return None
+    return getattr(instance, '_rollup_state', {}).get(field)
+
+
+# --- delta application -----------------------------------------------------
+
+def _completion_expression(modules_delta=0, total_delta=0):
+    done = F('modules_completed') + modules_delta
+    total = F('total_modules') + total_delta
+    return Case(
+        When(
+            Q(total_modules__gt=-total_delta),
+            then=Least(Value(100), Greatest(Value(0), ExpressionWrapper(done * 100 / total, output_field=IntegerField()))),
+        ),
+        default=Value(0),
+    )
+
+
+def _completed_at_expression(now, modules_delta=0, total_delta=0):
+    finished = Q(total_modules__gt=-total_delta) & Q(
+        modules_completed__gte=F('total_modules') + total_delta - modules_delta
+    )
+    return Case(When(finished, then=Coalesce(F('completed_at'), Value(now))), default=Value(None))
+
+
+def apply_delta(user_id, course_id, seed=True, modules=0, minutes=0, attempts=0, passed=0,
+                quiz_points=0, submitted=0, graded=0, assignment_points=0):
+    """Add the given deltas to one learner's rollup in a single UPDATE.
+
+    When the row does not exist yet and ``seed`` is set, it is built from the
+    source tables instead (which already include the triggering write).
+    """
+    now = timezone.now()
+    updates = {'last_activity': now, 'updated_at': now}
+    for field, delta in (
+        ('modules_completed', modules),
+        ('time_spent_minutes', minutes),
+        ('tests_attempted', attempts),
+        ('tests_passed', passed),
+        ('quiz_score_total', quiz_points),
+        ('assignments_submitted', submitted),
+        ('assignments_graded', graded),
+    ):
+        if delta:
+            updates[field] = F(field) + delta
+    if quiz_points or assignment_points:
+        updates['total_points_earned'] = F('total_points_earned') + quiz_points + assignment_points
+    if attempts or quiz_points:
+        updates['average_score'] = Case(
+            When(tests_attempted__gt=-attempts, then=ExpressionWrapper(
+                (F('quiz_score_total') + quiz_points) / (F('tests_attempted') + attempts),
+                output_field=IntegerField(),
+            )),
+            default=Value(0),
+        )
+    if modules:
+        updates['completion_percentage'] = _completion_expression(modules_delta=modules)
+        updates['completed_at'] = _completed_at_expression(now, modules_delta=modules)
+
+    record_points(user_id, course_id, units=modules, quiz=quiz_points, activity=assignment_points, create=seed)
+
+    updated = UserProgress.objects.filter(user_id=user_id, course_id=course_id).update(**updates)
+    if not updated:
+        if seed:
+            rebuild_rollups(course_ids=[course_id], user_ids=[user_id], sync_enrollments=bool(modules))
+        return
+    if modules:
+        sync_enrollment_progress(Q(user_id=user_id, course_id=course_id), course_ids=[course_id])
+
+
+def sync_enrollment_progress(enrollment_filter, course_ids=None):
+    """Copy rollup completion into ``Enrollment.progress_percentage`` with one UPDATE.
+
+    The UPDATE bypasses post_save, so the cached enrollment stats of
+    ``course_ids`` (by default every course the filter matches) are dropped here.
+    """
+    completion = UserProgress.objects.filter(
+        user_id=OuterRef('user_id'), course_id=OuterRef('course_id')
+    ).values('completion_percentage')[:1]
+    enrollments = Enrollment.objects.filter(enrollment_filter)
+    if course_ids is None:
+        course_ids = list(enrollments.values_list('course_id', flat=True).distinct().order_by())
+    enrollments.update(progress_percentage=Coalesce(Subquery(completion), Value(0)))
+    invalidate_enrollment_stats(*course_ids)
+
+
+def course_modules_changed(course_id, delta):
+    """A unit was added to / removed from a course: shift every learner's total."""
+    UserProgress.objects.filter(course_id=course_id).update(
+        total_modules=Greatest(Value(0), F('total_modules') + delta),
+        completion_percentage=_completion_expression(total_delta=delta),
+        completed_at=_completed_at_expression(timezone.now(), total_delta=delta),
+    )
+    sync_enrollment_progress(Q(course_id=course_id), course_ids=[course_id])
+
+
+# --- signal entry points -----------------------------------------------------
+
+def _module_flip(was, now):
+    if was == now:
+        return 0
+    return 1 if now else -1
+
+
+def unit_progress_changed(instance, created=False, deleted=False):
+    was = _previous(instance, 'status', created) == 'completed'
+    now = False if deleted else instance.status == 'completed'
+    delta = _module_flip(was, now)
+    if not deleted:
+        remember_state(instance)
+    if not delta:
+        return
+    pair = Enrollment.objects.filter(id=instance.enrollment_id).values_list('user_id', 'course_id').first()
+    if pair is None:
+        return
+    user_id, course_id = pair
+    also_done = ModuleCompletion.objects.filter(module_id=instance.unit_id, user_id=user_id, is_completed=True).exists()
+    if not also_done:
+        apply_delta(user_id, course_id, seed=not deleted, modules=delta)
+
+
+def module_completion_changed(instance, created=False, deleted=False):
+    was = bool(_previous(instance, 'is_completed', created))
+    now = False if deleted else bool(instance.is_completed)
+    old_minutes = _previous(instance, 'time_spent_minutes', created) or 0
+    minutes = (0 if deleted else instance.time_spent_minutes or 0) - old_minutes
+    delta = _module_flip(was, now)
+    if not deleted:
+        remember_state(instance)
+    if not delta and not minutes:
+        return
+    course_id = Unit.objects.filter(id=instance.module_id).values_list('course_id', flat=True).first()
+    if course_id is None:
+        return
+    if delta:
+        also_done = UnitProgress.objects.filter(
+            unit_id=instance.module_id, enrollment__user_id=instance.user_id, status='completed'
+        ).exists()
+        if also_done:
+            delta = 0
+    if delta or minutes:
+        apply_delta(instance.user_id, course_id, seed=not deleted, modules=delta, minutes=minutes)
+
+
+def quiz_attempt_changed(instance, created=False, deleted=False):
+    sign = -1 if deleted else 1
+    if created or deleted:
+        attempts = sign
+        passed = sign if instance.passed else 0
+        points = sign * (instance.score or 0)
+    else:
+        attempts = 0
+        passed = int(bool(instance.passed)) - int(bool(_previous(instance, 'passed', created)))
+        points = (instance.score or 0) - (_previous(instance, 'score', created) or 0)
+    if not deleted:
+        remember_state(instance)
+    if not (attempts or passed or points):
+        return
+    course_id = Quiz.objects.filter(id=instance.quiz_id).values_list('unit__course_id', flat=True).first()
+    if course_id is None:
+        return
+    apply_delta(instance.user_id, course_id, seed=not deleted, attempts=attempts, passed=passed, quiz_points=points)
+
+
+def assignment_submission_changed(instance, created=False, deleted=False):
+    sign = -1 if deleted else 1
+    if created or deleted:
+        submitted = sign
+        graded = sign if instance.status == 'graded' else 0
+        points = sign * (instance.score or 0)
+    else:
+        submitted = 0
+        graded = int(instance.status == 'graded') - int(_previous(instance, 'status', created) == 'graded')
+        points = (instance.score or 0) - (_previous(instance, 'score', created) or 0)
+    if not deleted:
+        remember_state(instance)
+    if not (submitted or graded or points):
+        return
+    course_id = Assignment.objects.filter(id=instance.assignment_id).values_list('unit__course_id', flat=True).first()
+    if course_id is None:
+        return
+    apply_delta(instance.user_id, course_id, seed=not deleted, submitted=submitted, graded=graded, assignment_points=points)
+
+
+# --- bulk rebuild ------------------------------------------------------------
+
+def _scope(qs, user_field, course_field, user_ids, course_ids):
+    if user_ids is not None:
+        qs = qs.filter(**{f'{user_field}__in': user_ids})
+    if course_ids is not None:
+        qs = qs.filter(**{f'{course_field}__in': course_ids})
+    return qs
+
+
+def _latest(*values):
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def rebuild_rollups(course_ids=None, user_ids=None, batch_size=REBUILD_BATCH_SIZE, sync_enrollments=True):
+    """Recompute ``user_progress`` rows from the source tables.
+
+    Limited to the given courses and/or users when provided.  Every source is
+    read with one grouped query, so the cost does not depend on how many
+    events a learner has.  ``sync_enrollments`` also copies the recomputed
+    completion into the matching enrollments.  Returns the number of rows written.
+    """
+    rows = defaultdict(dict)
+
+    totals = dict(
+        _scope(Unit.objects.all(), 'course_id', 'course_id', None, course_ids)
+        .values('course_id').order_by().annotate(n=Count('id')).values_list('course_id', 'n')
+    )
+
+    enrollments = _scope(Enrollment.objects.all(), 'user_id', 'course_id', user_ids, course_ids)
+    for user_id, course_id, assigned_at, started_at in enrollments.values_list(
+        'user_id', 'course_id', 'assigned_at', 'started_at'
+    ).iterator(chunk_size=batch_size):
+        rows[(user_id, course_id)]['started_at'] = started_at or assigned_at
+
+    # completed modules from either source; UNION removes the overlap
+    via_progress = _scope(
+        UnitProgress.objects.filter(status='completed'),
+        'enrollment__user_id', 'enrollment__course_id', user_ids, course_ids,
+    ).values_list('enrollment__user_id', 'enrollment__course_id', 'unit_id')
+    via_completion = _scope(
+        ModuleCompletion.objects.filter(is_completed=True),
+        'user_id', 'module__course_id', user_ids, course_ids,
+    ).values_list('user_id', 'module__course_id', 'module_id')
+    for user_id, course_id, _ in via_progress.union(via_completion).iterator(chunk_size=batch_size):
+        row = rows[(user_id, course_id)]
+        row['modules_completed'] = row.get('modules_completed', 0) + 1
+
+    time_spent = _scope(ModuleCompletion.objects.all(), 'user_id', 'module__course_id', user_ids, course_ids)
+    for item in time_spent.values('user_id', 'module__course_id').order_by().annotate(
+        minutes=Sum('time_spent_minutes'), last=Max('updated_at')
+    ):
+        row = rows[(item['user_id'], item['module__course_id'])]
+        row['time_spent_minutes'] = item['minutes'] or 0
+        row['last_activity'] = _latest(row.get('last_activity'), item['last'])
+
+    attempts = _scope(QuizAttempt.objects.all(), 'user_id', 'quiz__unit__course_id', user_ids, course_ids)
+    for item in attempts.values('user_id', 'quiz__unit__course_id').order_by().annotate(
+        attempted=Count('id'), passed=Count('id', filter=Q(passed=True)),
+        points=Sum('score'), last=Max('started_at'),
+    ):
+        row = rows[(item['user_id'], item['quiz__unit__course_id'])]
+        row['tests_attempted'] = item['attempted']
+        row['tests_passed'] = item['passed']
+        row['quiz_score_total'] = item['points'] or 0
+        row['last_activity'] = _latest(row.get('last_activity'), item['last'])
+
+    submissions = _scope(AssignmentSubmission.objects.all(), 'user_id', 'assignment__unit__course_id', user_ids, course_ids)
+    for item in submissions.values('user_id', 'assignment__unit__course_id').order_by().annotate(
+        submitted=Count('id'), graded=Count('id', filter=Q(status='graded')),
+        points=Sum('score'), last=Max('submitted_at'),
+    ):
+        row = rows[(item['user_id'], item['assignment__unit__course_id'])]
+        row['assignments_submitted'] = item['submitted']
+        row['assignments_graded'] = item['graded']
+        row['assignment_points'] = item['points'] or 0
+        row['last_activity'] = _latest(row.get('last_activity'), item['last'])
+
+    existing = _scope(UserProgress.objects.filter(completed_at__isnull=False), 'user_id', 'course_id', user_ids, course_ids)
+    completed_at = {(u, c): at for u, c, at in existing.values_list('user_id', 'course_id', 'completed_at')}
+
+    now = timezone.now()
+    objects = []
+    for (user_id, course_id), row in rows.items():
+        total = totals.get(course_id, 0)
+        done = row.get('modules_completed', 0)
+        completion = min(100, done * 100 // total) if total else 0
+        attempted = row.get('tests_attempted', 0)
+        quiz_points = row.get('quiz_score_total', 0)
+        objects.append(UserProgress(
+            user_id=user_id,
+            course_id=course_id,
+            completion_percentage=completion,
+            total_points_earned=quiz_points + row.get('assignment_points', 0),
+            average_score=quiz_points // attempted if attempted else 0,
+            time_spent_minutes=row.get('time_spent_minutes', 0),
+            modules_completed=done,
+            total_modules=total,
+            tests_passed=row.get('tests_passed', 0),
+            tests_attempted=attempted,
+            assignments_submitted=row.get('assignments_submitted', 0),
+            assignments_graded=row.get('assignments_graded', 0),
+            quiz_score_total=quiz_points,
+            started_at=row.get('started_at'),
+            completed_at=completed_at.get((user_id, course_id), now) if total and done >= total else None,
+            last_activity=row.get('last_activity'),
+        ))
+
+    with transaction.atomic():
+        _scope(UserProgress.objects.all(), 'user_id', 'course_id', user_ids, course_ids).delete()
+        UserProgress.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+        if sync_enrollments:
+            enrollment_filter = Q()
+            if user_ids is not None:
+                enrollment_filter &= Q(user_id__in=user_ids)
+            if course_ids is not None:
+                enrollment_filter &= Q(course_id__in=course_ids)
+            sync_enrollment_progress(enrollment_filter, course_ids=course_ids)
+    return len(objects)
@@ -0,0 +1,135 @@
+"""Regrade a quiz's submitted attempts after its answer key changes.
+
+``regrade_quiz`` compiles a fresh answer key, then reads the submitted
+attempts in primary-key order, ``REGRADE_CHUNK_SIZE`` at a time (keyset
+pages, so no long-lived cursor or transaction).  Each chunk is graded in
+memory.  Only the attempts whose ``score`` or ``passed`` changed are
+written, in one statement: on Postgres an ``UPDATE ... FROM unnest()`` of
+three arrays, elsewhere ``bulk_update``.  Building ``bulk_update``'s
+per-row ``CASE`` costs far more than grading.  The rollups follow in the
+same transaction:
+
+* When few learners are affected, each changed learner gets one
+  ``progress.apply_delta``, which also moves their leaderboard rows.  A run
+  that stops part-way therefore leaves every committed chunk fully
+  accounted for, and running it again picks up the rest.
+* Past ``QUIZ_REGRADE_REBUILD_THRESHOLD`` learners, per-learner deltas
+  (and their banded re-ranks) cost more than recomputing.  The course's
+  rollups and leaderboard are then rebuilt with the set-based
+  ``rebuild_rollups`` / ``rebuild_leaderboards`` once all chunks are
+  written (on every run, so running it again also repairs one that stopped
+  part-way).
+
+Afterwards each learner's best score is written to their ``UnitProgress``
+row for the quiz unit, and the quiz's item analysis is reset, since past
+per-question outcomes may have changed.  ``Enrollment.progress_percentage``
+is left alone: a regrade changes scores and pass counts, not which units
+a learner has completed.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .delivery import delivered_questions, draws_subset
+from .grading import answer_key, grade, invalidate_answer_key
+from .item_analysis import reset_item_analysis
+from .leaderboard import rebuild_leaderboards
+from .models import QuizAttempt, UnitProgress
+from .progress import apply_delta, rebuild_rollups
+
+
+REGRADE_CHUNK_SIZE = getattr(settings, 'QUIZ_REGRADE_CHUNK_SIZE', 2000)
+REBUILD_THRESHOLD = getattr(settings, 'QUIZ_REGRADE_REBUILD_THRESHOLD', 1000)
+
+
+def _write_scores(changed):
+    """Store ``[(pk, score, passed), ...]`` on their attempts."""
+    if connection.vendor != 'postgresql':
+        QuizAttempt.objects.bulk_update(
+            [QuizAttempt(pk=pk, score=score, passed=passed) for pk, score, passed in changed],
+            ['score', 'passed'], batch_size=1000,
+        )
+        return
+    ids, scores, passed = zip(*changed)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {QuizAttempt._meta.db_table} AS qa SET score = v.score, passed = v.passed
+            FROM unnest(%s::uuid[], %s::int[], %s::bool[]) AS v (id, score, passed)
+            WHERE qa.id = v.id
+        """, [list(ids), list(scores), list(passed)])
+
+
+def _best_scores_to_unit_progress(key, best):
+    rows = UnitProgress.objects.filter(unit_id=key.unit_id, enrollment__course_id=key.course_id).values_list(
+        'id', 'enrollment__user_id', 'score',
+    )
+    changed = [
+        UnitProgress(id=row_id, score=best[user_id])
+        for row_id, user_id, score in rows.iterator(chunk_size=REGRADE_CHUNK_SIZE)
+        if user_id in best and score != best[user_id]
+    ]
+    UnitProgress.objects.bulk_update(changed, ['score'], batch_size=1000)
+    return len(changed)
+
+
+def regrade_quiz(quiz_id, chunk_size=REGRADE_CHUNK_SIZE, dry_run=False):
+    """Rescore every submitted attempt of a quiz; returns counts of what changed.
+
+    ``dry_run`` grades and counts without writing anything.  Raises
+    ``Quiz.DoesNotExist`` for an unknown quiz.
+    """
+    invalidate_answer_key(quiz_id)
+    key = answer_key(quiz_id)
+    submitted = QuizAttempt.objects.filter(quiz_id=quiz_id, completed_at__isnull=False).order_by('pk')
+    rebuild = submitted.values('user_id').distinct().count() > REBUILD_THRESHOLD
+    # order does not affect a score, so the seed only matters when attempts drew a subset
+    drawn = draws_subset(key)
+    report = dict.fromkeys(('attempts', 'rescored', 'outcomes_changed', 'newly_passed', 'newly_failed'), 0)
+    best = {}
+    affected = set()
+    last = None
+
+    while True:
+        page = submitted if last is None else submitted.filter(pk__gt=last)
+        rows = list(page.values_list('pk', 'user_id', 'answers', 'score', 'passed', 'seed', 'reviews')[:chunk_size])
+        if not rows:
+            break
+        last = rows[-1][0]
+        changed = []
+        deltas = defaultdict(lambda: [0, 0])  # user_id -> [passed, points]
+        for pk, user_id, answers, score, passed, seed, reviews in rows:
+            delivered = delivered_questions(key, seed) if drawn else None
+            result = grade(key, answers if isinstance(answers, dict) else {}, delivered, reviews)
+            new_score, new_passed = result['score'], result['passed']
+            best[user_id] = max(best.get(user_id, 0), new_score)
+            if new_score == score and new_passed == passed:
+                continue
+            changed.append((pk, new_score, new_passed))
+            report['rescored'] += new_score != score
+            if new_passed != passed:
+                report['outcomes_changed'] += 1
+                if new_passed is not None:
+                    report['newly_passed' if new_passed else 'newly_failed'] += 1
+            delta = deltas[user_id]
+            delta[0] += int(bool(new_passed)) - int(bool(passed))
+            delta[1] += new_score - (score or 0)
+        report['attempts'] += len(rows)
+        affected.update(deltas)
+        if changed and not dry_run:
+            with transaction.atomic():
+                _write_scores(changed)
+                if not rebuild:
+                    for user_id, (passed, points) in deltas.items():
+                        apply_delta(user_id, key.course_id, passed=passed, quiz_points=points)
+
+    report['learners'] = len(affected)
+    report['unit_scores_updated'] = 0
+    if dry_run:
+        return report
+    if rebuild:
+        rebuild_rollups(course_ids=[key.course_id], sync_enrollments=False)
+        rebuild_leaderboards(course_ids=[key.course_id])
+    report['unit_scores_updated'] = _best_scores_to_unit_progress(key, best)
+    reset_item_analysis(quiz_id)
+    return report
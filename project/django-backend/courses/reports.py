@@ -0,0 +1,103 @@
+"""Course and learner reports computed with database aggregation.
+
+The figures match the ``CourseReport`` / ``LearnerReport`` shapes in
+``src/services/reportService.ts``, which used to derive them client-side from
+every enrollment and quiz-attempt row.  Each report is two aggregate queries.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Enrollment, QuizAttempt
+
+
+def parse_date_range(params):
+    """Read ``from`` / ``to`` query params (date or datetime) into aware datetimes.
+
+    A bare ``to`` date is inclusive.  Raises ``ValueError`` for unparseable input.
+    """
+    bounds = []
+    for name in ('from', 'to'):
+        raw = params.get(name)
+        if not raw:
+            bounds.append(None)
+            continue
+        value = parse_datetime(raw)
+        if value is None:
+            day = parse_date(raw)
+            if day is None:
+                raise ValueError(f"'{name}' must be an ISO date or datetime")
+            if name == 'to':
+                day += timedelta(days=1)
+            value = datetime.combine(day, time.min)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        bounds.append(value)
+    return tuple(bounds)
+
+
+def in_range(field, start, end):
+    q = Q()
+    if start is not None:
+        q &= Q(**{f'{field}__gte': start})
+    if end is not None:
+        q &= Q(**{f'{field}__lt': end})
+    return q
+
+
+def course_report(course, start=None, end=None):
+    """Enrollment and quiz-score summary for one course.
+
+    The date range applies to enrollment ``assigned_at`` and attempt ``started_at``.
+    """
+    totals = Enrollment.objects.filter(
+        in_range('assigned_at', start, end), course=course
+    ).aggregate(
+        total=Count('id'),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        completed=Count('id', filter=Q(status='completed')),
+        progress=Avg('progress_percentage'),
+    )
+    scores = QuizAttempt.objects.filter(
+        in_range('started_at', start, end), quiz__unit__course=course
+    ).aggregate(score=Avg('score'))
+
+    return {
+        'courseId': str(course.id),
+        'courseTitle': course.title,
+        'totalEnrollments': totals['total'],
+        'inProgress': totals['in_progress'],
+        'completed': totals['completed'],
+        'averageProgress': round(totals['progress'] or 0),
+        'averageScore': round(scores['score'] or 0),
+    }
+
+
+def learner_report(profile, start=None, end=None):
+    """Enrollment and quiz summary for one learner across all courses."""
+    totals = Enrollment.objects.filter(
+        in_range('assigned_at', start, end), user=profile
+    ).aggregate(
+        enrolled=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        progress=Avg('progress_percentage'),
+        last_activity=Max(Coalesce('started_at', 'assigned_at')),
+    )
+    quiz = QuizAttempt.objects.filter(
+        in_range('started_at', start, end), user=profile
+    ).aggregate(total=Sum('score'))
+
+    last_activity = totals['last_activity']
+    return {
+        'userId': str(profile.id),
+        'userName': profile.full_name,
+        'email': profile.email,
+        'coursesEnrolled': totals['enrolled'],
+        'coursesCompleted': totals['completed'],
+        'averageProgress': round(totals['progress'] or 0),
+        'totalQuizScore': quiz['total'] or 0,
+        'lastActivity': last_activity.isoformat() if last_activity else '',
+    }
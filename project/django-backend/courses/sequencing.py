@@ -0,0 +1,126 @@
+"""Course sequencing rules (``ModuleSequencing``).
+
+``replace_sequencing`` validates a full rule set up front (module IDs in one
+``in_bulk`` query, no prerequisite cycles), diffs it against the stored rules
+and applies the difference with one bulk delete, insert and update inside a
+single transaction, so a bad request never leaves the course half-sequenced.
+Any change drops the cached availability graph (``courses.availability``).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import DRIP_FEED_RULES, invalidate_course_graph
+from .enrollments import parse_uuids
+from .models import ModuleSequencing, Unit
+
+
+RULE_FIELDS = ('preceding_module_id', 'drip_feed_rule', 'drip_feed_delay_days', 'prerequisite_completed')
+
+
+def serialize_rule(rule):
+    return {
+        'sequence_id': str(rule.sequence_id),
+        'module_id': str(rule.module_id),
+        'preceding_module_id': str(rule.preceding_module_id) if rule.preceding_module_id else None,
+        'drip_feed_rule': rule.drip_feed_rule,
+        'drip_feed_delay_days': rule.drip_feed_delay_days,
+        'prerequisite_completed': rule.prerequisite_completed,
+    }
+
+
+def _parse_rules(rules):
+    """Normalize request rules to {module_id: field values}; raises ValueError."""
+    if not isinstance(rules, list):
+        raise ValueError("'rules' must be a list")
+    parsed = {}
+    for index, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f'rule {index} must be an object')
+        ids, invalid = parse_uuids([rule.get('module_id')])
+        preceding_raw = rule.get('preceding_module_id')
+        preceding, bad_preceding = parse_uuids([preceding_raw] if preceding_raw else [])
+        if invalid or bad_preceding:
+            raise ValueError(f'rule {index}: module ids must be UUIDs')
+        module_id = ids[0]
+        if module_id in parsed:
+            raise ValueError(f'rule {index}: module {module_id} has more than one rule')
+        try:
+            delay = int(rule.get('drip_feed_delay_days', 0) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f'rule {index}: drip_feed_delay_days must be an integer')
+        drip_feed_rule = rule.get('drip_feed_rule') or 'none'
+        if drip_feed_rule not in DRIP_FEED_RULES:
+            raise ValueError(f"rule {index}: drip_feed_rule must be one of {', '.join(DRIP_FEED_RULES)}")
+        parsed[module_id] = {
+            'preceding_module_id': preceding[0] if preceding else None,
+            'drip_feed_rule': drip_feed_rule,
+            'drip_feed_delay_days': delay,
+            'prerequisite_completed': bool(rule.get('prerequisite_completed', False)),
+        }
+    return parsed
+
+
+def find_cycle(edges):
+    """Return a prerequisite cycle as a list of module IDs, or None.
+
+    ``edges`` maps a module to its preceding module.  Each module has at most
+    one predecessor, so following the chain from every node, with nodes that
+    are already known to be acyclic skipped, is linear in the number of rules.
+    """
+    done = set()
+    for start in edges:
+        path, on_path = [], set()
+        node = start
+        while node is not None and node not in done:
+            if node in on_path:
+                return path[path.index(node):] + [node]
+            path.append(node)
+            on_path.add(node)
+            node = edges.get(node)
+        done.update(path)
+    return None
+
+
+def replace_sequencing(course, rules):
+    """Make ``course``'s rules exactly ``rules``; returns created/updated/deleted sequence IDs.
+
+    Raises ``ValueError`` (and changes nothing) if a rule is malformed, names a
+    module outside the course, or the prerequisites form a cycle.
+    """
+    parsed = _parse_rules(rules)
+    referenced = set(parsed) | {values['preceding_module_id'] for values in parsed.values()} - {None}
+    found = Unit.objects.filter(course=course).in_bulk(referenced)
+    missing = referenced - set(found)
+    if missing:
+        raise ValueError('modules not in this course: ' + ', '.join(sorted(str(m) for m in missing)))
+    cycle = find_cycle({module_id: values['preceding_module_id'] for module_id, values in parsed.items()})
+    if cycle:
+        raise ValueError('prerequisite cycle: ' + ' -> '.join(str(m) for m in cycle))
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {rule.module_id: rule for rule in ModuleSequencing.objects.select_for_update().filter(course=course)}
+        to_delete = [rule.sequence_id for module_id, rule in existing.items() if module_id not in parsed]
+        to_create, to_update = [], []
+        for module_id, values in parsed.items():
+            rule = existing.get(module_id)
+            if rule is None:
+                to_create.append(ModuleSequencing(course=course, module_id=module_id, **values))
+            elif any(getattr(rule, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(rule, field, value)
+                rule.updated_at = now  # bulk_update skips auto_now
+                to_update.append(rule)
+
+        if to_delete:
+            ModuleSequencing.objects.filter(sequence_id__in=to_delete).delete()
+        ModuleSequencing.objects.bulk_create(to_create)
+        ModuleSequencing.objects.bulk_update(to_update, RULE_FIELDS + ('updated_at',))
+        if to_delete or to_create or to_update:
+            invalidate_course_graph(course.pk)
+
+    return {
+        'created': [str(rule.sequence_id) for rule in to_create],
+        'updated': [str(rule.sequence_id) for rule in to_update],
+        'deleted': [str(sequence_id) for sequence_id in to_delete],
+    }
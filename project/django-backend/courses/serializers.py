@@ -3,8 +3,10 @@ from .models import (
     Profile, Course, Unit, VideoUnit, AudioUnit, PresentationUnit,
     TextUnit, PageUnit, Quiz, Question, Assignment, ScormPackage,
     Survey, Enrollment, UnitProgress, AssignmentSubmission,
-    QuizAttempt, Leaderboard, MediaMetadata
+    QuizAttempt, Leaderboard, MediaMetadata, EnrollmentJob,
+    TestBank, Test, TestQuestion, TestAttempt
 )
+from .jobs import estimate_remaining_seconds
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -51,13 +53,30 @@ class PageUnitSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class AnswerKeyHidingMixin:
+    """Learners get questions without the answer key."""
+
+    hidden_from_learners = ('correct_answer',)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and not (user.is_superuser or getattr(user, 'primary_role', '') in ('trainer', 'manager', 'admin')):
+            for field in self.hidden_from_learners:
+                data.pop(field, None)
+        return data
+
+
+class QuestionSerializer(AnswerKeyHidingMixin, serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = '__all__'
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(AnswerKeyHidingMixin, serializers.ModelSerializer):
+    # learners get their questions per attempt (GET /quiz-attempts/<id>/questions/), not the whole pool
+    hidden_from_learners = ('questions',)
     questions = QuestionSerializer(many=True, read_only=True)
 
     class Meta:
@@ -125,7 +144,9 @@ class UnitSerializer(serializers.ModelSerializer):
 
 class CourseSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
-    units_count = serializers.IntegerField(source='units.count', read_only=True)
+    # read from Course.objects.with_list_stats() annotations when present
+    units_count = serializers.SerializerMethodField()
+    enrollment_counts = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -133,6 +154,20 @@ class CourseSerializer(serializers.ModelSerializer):
         # created_by is set server-side in perform_create; mark it read-only so clients don't need to provide it
         read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
 
+    def get_units_count(self, obj):
+        count = getattr(obj, 'units_count', None)
+        return count if count is not None else obj.units.count()
+
+    def get_enrollment_counts(self, obj):
+        if getattr(obj, 'enrolled_count', None) is None:
+            return None
+        return {
+            'total': obj.enrolled_count,
+            'assigned': obj.assigned_count,
+            'in_progress': obj.in_progress_count,
+            'completed': obj.completed_count,
+        }
+
 
 class CourseDetailSerializer(serializers.ModelSerializer):
     units = UnitSerializer(many=True, read_only=True)
@@ -173,7 +208,9 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = QuizAttempt
-        fields = '__all__'
+        exclude = ['seed']
+        # set by courses.grading, never by the client
+        read_only_fields = ['user', 'score', 'passed', 'answers', 'reviews', 'started_at', 'completed_at']
 
 
 class LeaderboardSerializer(serializers.ModelSerializer):
@@ -189,3 +226,61 @@ class MediaMetadataSerializer(serializers.ModelSerializer):
     class Meta:
         model = MediaMetadata
         fields = '__all__'
+
+
+class EnrollmentJobSerializer(serializers.ModelSerializer):
+    eta_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EnrollmentJob
+        # the raw id lists can be very large; report progress only
+        fields = [
+            'id', 'course', 'requested_by', 'status', 'total', 'processed',
+            'created_count', 'skipped', 'last_chunk', 'eta_seconds', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_eta_seconds(self, obj):
+        return estimate_remaining_seconds(obj)
+
+
+class TestBankSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TestBank
+        fields = '__all__'
+        read_only_fields = ['created_by']
+
+
+class TestQuestionSerializer(AnswerKeyHidingMixin, serializers.ModelSerializer):
+    hidden_from_learners = ('correct_answer', 'explanation')
+
+    class Meta:
+        model = TestQuestion
+        exclude = ['search_vector']
+
+    def validate(self, attrs):
+        test = attrs.get('test', getattr(self.instance, 'test', None))
+        bank = attrs.get('test_bank', getattr(self.instance, 'test_bank', None))
+        if (test is None) == (bank is None):
+            raise serializers.ValidationError('A question belongs to either a test bank or a test.')
+        return attrs
+
+
+class TestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Test
+        fields = '__all__'
+        # linked with PUT /tests/<id>/questions/
+        read_only_fields = ['created_by', 'questions']
+
+
+class TestAttemptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TestAttempt
+        exclude = ['seed']
+        # set by courses.assessments, never by the client
+        read_only_fields = [
+            'test', 'user', 'attempt_number', 'started_at', 'submitted_at', 'time_spent_minutes', 'status', 'score',
+            'points_earned', 'passed', 'graded_by', 'graded_at',
+        ]
@@ -0,0 +1,119 @@
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import assessments, progress
+from .availability import invalidate_course_graph
+from .grading import invalidate_answer_key
+from .item_analysis import reset_item_analysis
+from .media_processing import fill_unit_details
+from .models import (
+    Enrollment, Unit, UnitProgress, ModuleCompletion, QuizAttempt,
+    AssignmentSubmission, ModuleSequencing, VideoUnit, AudioUnit, PresentationUnit, Quiz, Question,
+    Test, TestQuestion, TestQuestionLink,
+)
+from .stats import invalidate_enrollment_stats
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_enrollment_stats(instance.course_id)
+
+
+# --- user_progress rollups ---------------------------------------------------
+
+ROLLUP_HANDLERS = {
+    UnitProgress: progress.unit_progress_changed,
+    ModuleCompletion: progress.module_completion_changed,
+    QuizAttempt: progress.quiz_attempt_changed,
+    AssignmentSubmission: progress.assignment_submission_changed,
+}
+
+
+def remember_rollup_state(sender, instance, **kwargs):
+    progress.remember_state(instance)
+
+
+def rollup_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    ROLLUP_HANDLERS[sender](instance, created=created)
+
+
+def rollup_deleted(sender, instance, **kwargs):
+    ROLLUP_HANDLERS[sender](instance, deleted=True)
+
+
+for _model in ROLLUP_HANDLERS:
+    post_init.connect(remember_rollup_state, sender=_model)
+    post_save.connect(rollup_saved, sender=_model)
+    post_delete.connect(rollup_deleted, sender=_model)
+
+
+@receiver(post_save, sender=Unit)
+def unit_saved(sender, instance, created, raw=False, **kwargs):
+    invalidate_course_graph(instance.course_id)
+    if created and not raw:
+        progress.course_modules_changed(instance.course_id, 1)
+
+
+@receiver(post_delete, sender=Unit)
+def unit_deleted(sender, instance, **kwargs):
+    invalidate_course_graph(instance.course_id)
+    progress.course_modules_changed(instance.course_id, -1)
+
+
+# --- availability graph --------------------------------------------------------
+# replace_sequencing works in bulk and invalidates itself; these cover single-row edits
+
+@receiver(post_save, sender=ModuleSequencing)
+@receiver(post_delete, sender=ModuleSequencing)
+def sequencing_changed(sender, instance, **kwargs):
+    invalidate_course_graph(instance.course_id)
+
+
+# --- quiz answer keys ----------------------------------------------------------
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.quiz_id)
+    # the statistics were graded against the old question set
+    reset_item_analysis(instance.quiz_id)
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def test_changed(sender, instance, **kwargs):
+    assessments.invalidate_test_key(instance.pk)
+
+
+# pre_delete: a deleted question's links are gone by post_delete
+@receiver(post_save, sender=TestQuestion)
+@receiver(pre_delete, sender=TestQuestion)
+def test_question_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        assessments.question_changed(instance.pk)
+
+
+@receiver(post_save, sender=TestQuestionLink)
+@receiver(post_delete, sender=TestQuestionLink)
+def test_question_link_changed(sender, instance, **kwargs):
+    assessments.invalidate_test_key(instance.test_id)
+
+
+# --- media details -------------------------------------------------------------
+# files processed before the unit pointed at them; later ones are applied by the worker
+
+@receiver(pre_save, sender=VideoUnit)
+@receiver(pre_save, sender=AudioUnit)
+@receiver(pre_save, sender=PresentationUnit)
+def media_unit_saving(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fill_unit_details(instance)
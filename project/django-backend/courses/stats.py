@@ -0,0 +1,92 @@
+"""Per-course enrollment statistics.
+
+All counts come from one conditional-aggregation query per course (or one
+grouped query for a batch of courses) and are cached until an enrollment for
+that course changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from .models import Enrollment, Profile
+
+
+STATS_CACHE_SECONDS = getattr(settings, 'ENROLLMENT_STATS_CACHE_SECONDS', 300)
+_LEARNERS_KEY = 'enrollment_stats:total_learners'
+
+
+def stats_cache_key(course_id):
+    return f'enrollment_stats:{course_id}'
+
+
+def _aggregates():
+    return {
+        'total_enrolled': Count('id'),
+        'assigned': Count('id', filter=Q(status='assigned')),
+        'in_progress': Count('id', filter=Q(status='in_progress')),
+        'completed': Count('id', filter=Q(status='completed')),
+        'average_progress': Avg('progress_percentage'),
+    }
+
+
+def _finalize(row):
+    total = row.get('total_enrolled') or 0
+    completed = row.get('completed') or 0
+    average = row.get('average_progress')
+    return {
+        'total_enrolled': total,
+        'assigned': row.get('assigned') or 0,
+        'in_progress': row.get('in_progress') or 0,
+        'completed': completed,
+        'average_progress': round(average, 1) if average is not None else 0,
+        'completion_rate': round(completed * 100.0 / total, 1) if total else 0,
+    }
+
+
+def total_learners():
+    """Trainee head-count; org-wide rather than per course, so it is cached on a TTL only."""
+    count = cache.get(_LEARNERS_KEY)
+    if count is None:
+        count = Profile.objects.filter(primary_role='trainee').count()
+        cache.set(_LEARNERS_KEY, count, STATS_CACHE_SECONDS)
+    return count
+
+
+def enrollment_stats(course_id):
+    """Stats for one course, served from cache when possible."""
+    key = stats_cache_key(course_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _finalize(Enrollment.objects.filter(course_id=course_id).aggregate(**_aggregates()))
+        cache.set(key, stats, STATS_CACHE_SECONDS)
+    return stats
+
+
+def enrollment_stats_many(course_ids):
+    """Stats for many courses: one cache round-trip plus one grouped query for the misses."""
+    keys = {stats_cache_key(cid): str(cid) for cid in course_ids}
+    cached = cache.get_many(list(keys))
+    result = {keys[key]: stats for key, stats in cached.items()}
+
+    missing = [cid for key, cid in keys.items() if key not in cached]
+    if missing:
+        rows = (
+            Enrollment.objects.filter(course_id__in=missing)
+            .values('course_id').order_by().annotate(**_aggregates())
+        )
+        fresh = {cid: _finalize({}) for cid in missing}
+        for row in rows:
+            fresh[str(row['course_id'])] = _finalize(row)
+        cache.set_many({stats_cache_key(cid): stats for cid, stats in fresh.items()}, STATS_CACHE_SECONDS)
+        result.update(fresh)
+    return result
+
+
+def invalidate_enrollment_stats(*course_ids):
+    """Drop cached stats now and again after commit, so a reader cannot re-cache pre-commit data."""
+    keys = [stats_cache_key(cid) for cid in course_ids if cid is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,202 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses import assessments
+from courses.grading import AttemptError
+from courses.models import Profile, Course, TestBank, Test, TestQuestion, TestQuestionLink, TestAttempt, TestAnswer
+
+
+class AssessmentsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', primary_role='trainer')
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password', primary_role='trainee')
+        self.course = Course.objects.create(title='C', created_by=self.trainer)
+        self.bank = TestBank.objects.create(name='Safety', category='compliance', created_by=self.trainer)
+        other = TestBank.objects.create(name='Sales', category='sales', created_by=self.trainer)
+        self.mcq = TestQuestion.objects.create(
+            test_bank=self.bank, question_type='mcq', question_text='Which extinguisher is used on electrical fires?',
+            options=['Water', 'CO2', 'Foam'], correct_answer='CO2', points=2, difficulty='easy',
+            explanation='A CO2 extinguisher leaves no residue; a water extinguisher conducts.',
+        )
+        self.tf = TestQuestion.objects.create(
+            test_bank=self.bank, question_type='true_false', question_text='Running in corridors is allowed.',
+            correct_answer='false', difficulty='medium', explanation='Running causes falls.',
+        )
+        self.blanks = TestQuestion.objects.create(
+            test_bank=self.bank, question_type='fill_blank', question_text='Stop, drop and ___.',
+            correct_answer='["roll"]', difficulty='hard',
+        )
+        self.essay = TestQuestion.objects.create(
+            test_bank=self.bank, question_type='essay', question_text='Describe the evacuation plan.', points=3,
+        )
+        self.pitch = TestQuestion.objects.create(
+            test_bank=other, question_type='short_answer', question_text='Name the first step of a sales pitch.',
+            correct_answer='greeting', difficulty='easy',
+        )
+        self.test = self._test()
+        self.bank_ids = [self.mcq.id, self.tf.id, self.blanks.id, self.essay.id]
+        assessments.set_test_questions(self.test, self.bank_ids)
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def _test(self, **fields):
+        return Test.objects.create(course=self.course, created_by=self.trainer, **{'title': 'Fire safety', 'max_attempts': 2, **fields})
+
+    def test_bank_questions_are_referenced_not_copied(self):
+        second = self._test(title='Refresher')
+        assessments.set_test_questions(second, [self.tf.id, self.mcq.id])
+        self.assertEqual(TestQuestion.objects.count(), 5)
+        self.assertEqual(set(self.mcq.used_in.all()), {self.test, second})
+        self.assertEqual([q.id for q in assessments.test_key(second.id).questions], [str(self.tf.id), str(self.mcq.id)])
+
+        own = TestQuestion.objects.create(test=second, question_type='short_answer', question_text='Own', correct_answer='x')
+        with self.assertRaises(ValueError):
+            assessments.set_test_questions(self.test, [own.id])
+        with self.assertRaises(ValueError):
+            assessments.set_test_questions(self.test, [self.mcq.id, self.mcq.id])
+        assessments.set_test_questions(second, [own.id, self.mcq.id])
+        self.assertEqual(TestQuestionLink.objects.filter(test=second).count(), 2)
+
+        # editing the shared question reaches every test using it
+        self.mcq.correct_answer = 'Foam'
+        self.mcq.save()
+        for test in (self.test, second):
+            compiled = {q.id: q for q in assessments.test_key(test.id).questions}
+            self.assertEqual(compiled[str(self.mcq.id)].answer, 'Foam')
+
+    def test_submit_stores_a_graded_row_per_answer(self):
+        resp = self.client.post(f'/api/tests/{self.test.id}/start/')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['attempt_number'], 1)
+        self.assertNotIn('seed', resp.data)
+        self.assertNotIn('correct_answer', resp.data['questions'][0])
+
+        answers = {str(self.mcq.id): 1, str(self.tf.id): 'true', str(self.blanks.id): [' Roll '], str(self.essay.id): 'Walk out.'}
+        resp = self.client.post(f"/api/test-attempts/{resp.data['id']}/submit/", {'answers': answers}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        # mcq (2) + fill_blank (1) of 7 points; the essay waits for a trainer
+        self.assertEqual(resp.data['status'], 'completed')
+        self.assertEqual(resp.data['points_earned'], 3)
+        self.assertEqual(resp.data['score'], 43)
+        self.assertEqual(resp.data['grading']['pending_review'], [str(self.essay.id)])
+
+        rows = {a.question_id: a for a in TestAnswer.objects.all()}
+        self.assertEqual(len(rows), 4)
+        self.assertEqual((rows[self.mcq.id].is_correct, rows[self.mcq.id].points_earned), (True, 2))
+        self.assertEqual(rows[self.mcq.id].selected_options, 1)
+        self.assertEqual((rows[self.tf.id].is_correct, rows[self.tf.id].answer_text), (False, 'true'))
+        self.assertEqual(rows[self.blanks.id].selected_options, [' Roll '])
+        self.assertIsNone(rows[self.essay.id].is_correct)
+        self.assertIsNone(resp.data['passed'])
+
+        review = f"/api/test-attempts/{resp.data['id']}/review/"
+        self.assertEqual(self.client.post(review, {'reviews': {str(self.essay.id): True}}, format='json').status_code, 403)
+        self.client.force_authenticate(self.trainer)
+        reviewed = self.client.post(review, {'reviews': {str(self.essay.id): True}}, format='json')
+        self.assertEqual(reviewed.status_code, 200)
+        self.assertEqual((reviewed.data['points_earned'], reviewed.data['score'], reviewed.data['passed']), (6, 86, True))
+        self.assertEqual(reviewed.data['graded_by'], self.trainer.id)
+        self.assertEqual(TestAnswer.objects.get(question=self.essay).points_earned, 3)
+        self.client.force_authenticate(self.learner)
+
+        again = self.client.post(f'/api/test-attempts/{resp.data["id"]}/submit/', {'answers': answers}, format='json')
+        self.assertEqual(again.status_code, 409)
+        self.assertEqual(self.client.post(f'/api/tests/{self.test.id}/start/').data['attempt_number'], 2)
+        self.assertEqual(self.client.post(f'/api/tests/{self.test.id}/start/').status_code, 200)
+        TestAttempt.objects.filter(status='in_progress').update(status='abandoned')
+        self.assertEqual(self.client.post(f'/api/tests/{self.test.id}/start/').status_code, 403)
+
+    def test_time_limit(self):
+        timed = self._test(time_limit_minutes=10)
+        assessments.set_test_questions(timed, [self.tf.id])
+        start = timezone.now()
+        attempt, _ = assessments.start_test_attempt(timed.id, self.learner, now=start)
+        with self.assertRaises(AttemptError) as caught:
+            assessments.submit_test_attempt(attempt.id, self.learner, {str(self.tf.id): 'false'}, now=start + timedelta(minutes=20))
+        self.assertEqual(caught.exception.status, 409)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.score, attempt.passed), ('timed_out', 0, False))
+        self.assertFalse(TestAnswer.objects.exists())
+
+        # an abandoned attempt times out when the learner comes back, using up the attempt
+        late, _ = assessments.start_test_attempt(timed.id, self.learner, now=start + timedelta(minutes=20))
+        self.assertEqual(late.attempt_number, 2)
+        with self.assertRaises(AttemptError):
+            assessments.start_test_attempt(timed.id, self.learner, now=start + timedelta(minutes=40))
+        self.assertEqual(TestAttempt.objects.filter(status='timed_out').count(), 2)
+
+    def test_randomized_tests_deliver_a_stable_order(self):
+        shuffled = self._test(randomize_questions=True)
+        assessments.set_test_questions(shuffled, self.bank_ids)
+        first = self.client.post(f'/api/tests/{shuffled.id}/start/').data
+        resumed = self.client.post(f'/api/tests/{shuffled.id}/start/').data
+        self.assertEqual([q['id'] for q in first['questions']], [q['id'] for q in resumed['questions']])
+        self.assertEqual({q['id'] for q in first['questions']}, {str(qid) for qid in self.bank_ids})
+
+    def test_search(self):
+        def ids(**params):
+            resp = self.client.get('/api/test-questions/', params)
+            self.assertEqual(resp.status_code, 200)
+            return [row['id'] for row in resp.data['results']]
+
+        self.assertEqual(set(ids(category='compliance')), {str(q.id) for q in (self.mcq, self.tf, self.blanks, self.essay)})
+        self.assertEqual(ids(category='compliance', type='true_false'), [str(self.tf.id)])
+        self.assertEqual(set(ids(difficulty='easy')), {str(self.mcq.id), str(self.pitch.id)})
+        self.assertEqual(ids(test_bank=str(self.bank.id), difficulty='hard'), [str(self.blanks.id)])
+        # stemmed full text over question and explanation, newest first or best match first
+        self.assertEqual(ids(q='runs'), [str(self.tf.id)])
+        self.assertEqual(ids(q='extinguishers or running'), [str(self.tf.id), str(self.mcq.id)])
+        self.assertEqual(ids(q='extinguishers or running', ordering='relevance'), [str(self.mcq.id), str(self.tf.id)])
+        self.assertEqual(ids(q='fires -sales'), [str(self.mcq.id)])
+        self.assertEqual(ids(q='electrical extinguishers', category='sales'), [])
+        self.assertEqual(self.client.get('/api/test-questions/', {'test_bank': 'nope'}).status_code, 400)
+
+        row = self.client.get(f'/api/test-questions/{self.tf.id}/').data
+        self.assertNotIn('correct_answer', row)
+        self.assertNotIn('explanation', row)
+        self.assertNotIn('search_vector', row)
+
+    def test_learners_cannot_write_banks_questions_or_tests(self):
+        writes = [
+            ('post', '/api/test-banks/', {'name': 'Mine', 'category': 'hr'}),
+            ('patch', f'/api/test-banks/{self.bank.id}/', {'name': 'Renamed'}),
+            ('post', '/api/test-questions/', {'test_bank': str(self.bank.id), 'question_type': 'essay', 'question_text': 'x'}),
+            ('patch', f'/api/test-questions/{self.mcq.id}/', {'correct_answer': '0'}),
+            ('delete', f'/api/test-questions/{self.essay.id}/', None),
+            ('post', '/api/tests/', {'title': 'Mine', 'course': str(self.course.id)}),
+            ('patch', f'/api/tests/{self.test.id}/', {'passing_score': 0}),
+            ('delete', f'/api/tests/{self.test.id}/', None),
+        ]
+        for method, url, data in writes:
+            self.assertEqual(getattr(self.client, method)(url, data, format='json').status_code, 403, (method, url))
+        self.assertEqual(self.client.get('/api/test-banks/').status_code, 200)
+        # learners still take tests
+        self.assertEqual(self.client.post(f'/api/tests/{self.test.id}/start/').status_code, 201)
+
+        self.client.force_authenticate(self.trainer)
+        self.assertEqual(self.client.patch(f'/api/tests/{self.test.id}/', {'passing_score': 50}, format='json').status_code, 200)
+
+    def test_trainer_links_questions_over_the_api(self):
+        resp = self.client.put(f'/api/tests/{self.test.id}/questions/', {'question_ids': [str(self.tf.id)]}, format='json')
+        self.assertEqual(resp.status_code, 403)
+
+        self.client.force_authenticate(self.trainer)
+        resp = self.client.put(
+            f'/api/tests/{self.test.id}/questions/', {'question_ids': [str(self.pitch.id), str(self.tf.id)]}, format='json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([q['id'] for q in resp.data['questions']], [str(self.pitch.id), str(self.tf.id)])
+        self.assertEqual(resp.data['questions'][0]['correct_answer'], 'greeting')
+        bad = self.client.put(f'/api/tests/{self.test.id}/questions/', {'question_ids': ['nope']}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+        created = self.client.post('/api/test-banks/', {'name': 'New', 'category': 'hr'}, format='json')
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.data['created_by'], self.trainer.id)
+        orphan = self.client.post('/api/test-questions/', {'question_type': 'essay', 'question_text': 'x'}, format='json')
+        self.assertEqual(orphan.status_code, 400)
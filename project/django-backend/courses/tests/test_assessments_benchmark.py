@@ -0,0 +1,90 @@
+"""Timing benchmark for filtering and searching a 100k-question bank.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from courses.models import Profile, TestBank, TestQuestion
+
+
+WORDS = [
+    'fire', 'safety', 'ladder', 'chemical', 'spill', 'evacuation', 'customer', 'pricing', 'discount', 'contract',
+    'privacy', 'password', 'phishing', 'invoice', 'forklift', 'helmet', 'allergen', 'hygiene', 'refund', 'escalation',
+    'harassment', 'overtime', 'backup', 'encryption', 'audit', 'budget', 'forecast', 'warehouse', 'shipping', 'quality',
+]
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class QuestionBankBenchmark(TransactionTestCase):
+    questions = 100_000
+    banks = 40
+    budget_ms = 50
+
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        TestBank.objects.bulk_create(
+            TestBank(name=f'Bank {n}', category=f'category-{n % 8}', created_by=self.trainer) for n in range(self.banks)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO test_questions (question_id, test_bank_id, question_text, question_type, options,
+                                            correct_answer, points, difficulty, explanation, created_at, updated_at)
+                SELECT gen_random_uuid(), b.ids[1 + n %% %s],
+                       'Question ' || n || ': what is the rule for ' || w.words[1 + n %% 30] || ' and '
+                           || w.words[1 + (n * 7) %% 29] || ' during ' || w.words[1 + (n * 13) %% 23] || '?',
+                       (ARRAY['mcq', 'true_false', 'short_answer', 'essay', 'fill_blank'])[1 + n %% 5],
+                       '["a", "b", "c", "d"]', 'a', 1,
+                       (ARRAY['easy', 'medium', 'hard'])[1 + n %% 3],
+                       'See the ' || w.words[1 + (n * 11) %% 30] || ' policy.',
+                       now() - n * interval '1 minute', now()
+                FROM generate_series(1, %s) AS n,
+                     (SELECT array_agg(test_bank_id) AS ids FROM test_bank) AS b,
+                     (SELECT %s::text[] AS words) AS w
+            """, [self.banks, self.questions, WORDS])
+        # a settled table, as autovacuum leaves it: bitmap scans can skip all-visible pages
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE test_questions')
+            cursor.execute('VACUUM ANALYZE test_bank')
+
+    def test_filters_and_search(self):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        bank = TestQuestion.objects.filter(question_type='mcq', difficulty='hard').values_list('test_bank_id', flat=True)[0]
+        cases = {
+            'type': {'type': 'mcq'},
+            'bank + type + difficulty': {'test_bank': str(bank), 'type': 'mcq', 'difficulty': 'hard'},
+            'category': {'category': 'category-3'},
+            'category + difficulty': {'category': 'category-3', 'difficulty': 'easy'},
+            'text': {'q': 'forklift'},
+            'text, two words': {'q': 'chemical spill'},
+            'text + category + type': {'q': 'encryption', 'category': 'category-5', 'type': 'mcq'},
+        }
+        relevance = {'q': 'forklift', 'ordering': 'relevance'}
+        for label, params in cases.items():
+            for mode in ({}, {'pagination': 'cursor'}):
+                client.get('/api/test-questions/', {**params, **mode})  # warm caches and plans
+                timings = []
+                for _ in range(5):
+                    started = time.perf_counter()
+                    resp = client.get('/api/test-questions/', {**params, **mode})
+                    timings.append((time.perf_counter() - started) * 1000)
+                    self.assertEqual(resp.status_code, 200)
+                best = min(timings)
+                print(f"\n{label:26} {'cursor' if mode else 'pages ':6} {len(resp.data['results']):3} rows  {best:5.1f}ms")
+                self.assertLess(best, self.budget_ms, f'{label} took {best:.1f}ms')
+
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            client.get('/api/test-questions/', relevance)
+            timings.append((time.perf_counter() - started) * 1000)
+        # informational: ranking reads the vector of every match
+        print(f"\n{'text, by relevance':26} pages  {min(timings):5.1f}ms")
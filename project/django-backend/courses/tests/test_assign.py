@@ -32,3 +32,58 @@ class AssignFlowTest(TestCase):
         # Expect 2 enrollments created
         self.assertEqual(data.get('created'), 2)
         self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
+
+    def test_assign_skips_existing_and_reports_per_target(self):
+        Enrollment.objects.create(course=self.course, user=self.learner1, assigned_by=self.trainer)
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        payload = {
+            'user_ids': [str(self.learner2.id), 'not-a-uuid'],
+            'team_ids': [str(self.team.team_id)],
+        }
+        resp = client.post(f'/api/trainer/v1/course/{self.course.id}/assign/', payload, format='json')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['users']['created'], 1)
+        self.assertEqual(data['users']['not_found'], 1)
+        team = data['teams'][str(self.team.team_id)]
+        self.assertEqual(team['members'], 2)
+        self.assertEqual(team['already_enrolled'], 1)
+        self.assertEqual(team['duplicates'], 1)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
+
+    def test_assign_query_count_is_independent_of_audience_size(self):
+        from courses.enrollments import assign_course
+        learners = [
+            Profile(username=f'bulk{i}', email=f'bulk{i}@example.com', password='!')
+            for i in range(40)
+        ]
+        Profile.objects.bulk_create(learners)
+        TeamMember.objects.bulk_create([TeamMember(team=self.team, user=p) for p in learners[20:]])
+        # users lookup, team members, existing enrollments, savepoint + insert + release
+        with self.assertNumQueries(6):
+            result = assign_course(
+                self.course, self.trainer,
+                user_ids=[p.id for p in learners[:20]],
+                team_ids=[self.team.team_id],
+                batch_size=1000,
+            )
+        self.assertEqual(result['created'], 42)
+
+    def test_rows_dropped_as_conflicts_are_not_counted(self):
+        from unittest import mock
+        from courses import enrollments
+        real = enrollments.insert_enrollments
+
+        def racing_insert(course, assigned_by, user_ids, **kwargs):
+            # another assignment enrolls learner1 between the diff and the insert
+            Enrollment.objects.create(course=self.course, user=self.learner1, assigned_by=self.trainer)
+            return real(course, assigned_by, user_ids, **kwargs)
+
+        with mock.patch.object(enrollments, 'insert_enrollments', racing_insert):
+            result = enrollments.assign_course(self.course, self.trainer, team_ids=[self.team.team_id])
+        self.assertEqual((result['created'], result['skipped']), (1, 1))
+        team = result['teams'][str(self.team.team_id)]
+        self.assertEqual((team['created'], team['already_enrolled']), (1, 1))
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
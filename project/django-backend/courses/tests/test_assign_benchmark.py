@@ -0,0 +1,61 @@
+"""Timing benchmark for set-based course assignment.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import unittest
+
+from django.test import TransactionTestCase
+
+from courses.enrollments import assign_course
+from courses.models import Profile, Course, Team, TeamMember, Enrollment
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class AssignBenchmark(TransactionTestCase):
+    sizes = (10_000, 50_000, 100_000)
+    # seconds per 100k learners
+    budget = 20
+
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+
+    def _make_learners(self, prefix, count):
+        learners = [
+            Profile(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password='!')
+            for i in range(count)
+        ]
+        Profile.objects.bulk_create(learners, batch_size=5000)
+        return learners
+
+    def test_assign_scaling(self):
+        for size in self.sizes:
+            learners = self._make_learners(f'b{size}_', size)
+            # half explicit users, half spread across 300 teams
+            half = size // 2
+            teams = Team.objects.bulk_create([Team(team_name=f'bench-{size}-{i}') for i in range(300)])
+            TeamMember.objects.bulk_create(
+                [TeamMember(team=teams[i % len(teams)], user=p) for i, p in enumerate(learners[half:])],
+                batch_size=5000,
+            )
+            course = Course.objects.create(title=f'Compliance {size}', created_by=self.trainer)
+
+            started = time.perf_counter()
+            result = assign_course(
+                course, self.trainer,
+                user_ids=[p.id for p in learners[:half]],
+                team_ids=[t.team_id for t in teams],
+            )
+            elapsed = time.perf_counter() - started
+
+            self.assertEqual(result['created'], size)
+            self.assertEqual(Enrollment.objects.filter(course=course).count(), size)
+            print(f'\nassign_course: {size} learners in {elapsed:.2f}s')
+            self.assertLess(elapsed, self.budget * size / 100_000)
+
+            # a repeat finds everyone enrolled and inserts nothing
+            again = assign_course(course, self.trainer, user_ids=[p.id for p in learners])
+            self.assertEqual((again['created'], again['skipped']), (0, size))
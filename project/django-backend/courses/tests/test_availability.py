@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Enrollment, ModuleCompletion, ModuleSequencing, UnitProgress
+
+
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password')
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.units = [
+            Unit.objects.create(course=self.course, module_type='text', title=f'M{i}', sequence_order=i)
+            for i in range(5)
+        ]
+        self.assigned_at = timezone.now() - timedelta(days=2)
+        self.enrollment = Enrollment.objects.create(course=self.course, user=self.learner, assigned_at=self.assigned_at)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.learner)
+        self.url = f'/api/courses/{self.course.id}/availability/'
+
+    def _rule(self, index, preceding=None, **fields):
+        ModuleSequencing.objects.create(
+            course=self.course, module=self.units[index],
+            preceding_module=self.units[preceding] if preceding is not None else None, **fields,
+        )
+
+    def _complete(self, index, when):
+        ModuleCompletion.objects.create(module=self.units[index], user=self.learner, is_completed=True, completed_at=when)
+
+    def _modules(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()['modules']
+
+    def test_prerequisites_and_drip_feed(self):
+        done_at = timezone.now() - timedelta(hours=30)
+        self._rule(1, preceding=0, prerequisite_completed=True)
+        self._rule(2, preceding=1, prerequisite_completed=True)
+        self._rule(3, preceding=0, drip_feed_rule='completion_based', drip_feed_delay_days=1)
+        self._rule(4, drip_feed_rule='time_based', drip_feed_delay_days=5)
+        self._complete(0, done_at)
+
+        modules = self._modules()
+        self.assertEqual([m['module_id'] for m in modules], [str(u.id) for u in self.units])
+        self.assertTrue(modules[0]['available'])
+        # M0 completed, so M1 opens; M2 still waits on M1
+        self.assertTrue(modules[1]['available'])
+        self.assertFalse(modules[2]['available'])
+        self.assertIsNone(modules[2]['unlock_at'])
+        self.assertEqual(modules[2]['waiting_for'], str(self.units[1].id))
+        # one day after completing M0
+        self.assertTrue(modules[3]['available'])
+        self.assertEqual(modules[3]['unlock_at'], (done_at + timedelta(days=1)).isoformat())
+        # five days after enrollment
+        self.assertFalse(modules[4]['available'])
+        self.assertEqual(modules[4]['unlock_at'], (self.assigned_at + timedelta(days=5)).isoformat())
+
+    def test_unit_progress_counts_as_completion(self):
+        self._rule(1, preceding=0, prerequisite_completed=True)
+        self.assertFalse(self._modules()[1]['available'])
+        UnitProgress.objects.create(
+            enrollment=self.enrollment, unit=self.units[0], status='completed',
+            completed_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertTrue(self._modules()[1]['available'])
+
+    def test_ordering_inherits_predecessor_lock(self):
+        self._rule(1, preceding=0, drip_feed_rule='time_based', drip_feed_delay_days=3)
+        self._rule(2, preceding=1)
+        modules = self._modules()
+        self.assertFalse(modules[2]['available'])
+        self.assertEqual(modules[2]['unlock_at'], modules[1]['unlock_at'])
+
+    def test_graph_is_cached_and_invalidated_by_sequence_changes(self):
+        self._modules()
+        with CaptureQueriesContext(connection) as warm:
+            self._modules()
+        self._rule(1, preceding=0, prerequisite_completed=True)
+        with CaptureQueriesContext(connection) as cold:
+            modules = self._modules()
+        self.assertFalse(modules[1]['available'])
+        self.assertEqual(len(cold.captured_queries), len(warm.captured_queries) + 2)
+
+        trainer = APIClient()
+        trainer.force_authenticate(user=self.trainer)
+        resp = trainer.put(f'/api/courses/{self.course.id}/sequence/', {'rules': []}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(self._modules()[1]['available'])
+
+    def test_warm_query_count_does_not_grow_with_modules(self):
+        self._modules()
+        with CaptureQueriesContext(connection) as small:
+            self._modules()
+        for i in range(5, 80):
+            unit = Unit.objects.create(course=self.course, module_type='text', title=f'M{i}', sequence_order=i)
+            ModuleSequencing.objects.create(course=self.course, module=unit, preceding_module=self.units[-1])
+            self.units.append(unit)
+        self._modules()
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(len(self._modules()), 80)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_access(self):
+        other = Profile.objects.create_user(username='learner2', email='learner2@example.com', password='password')
+        self.assertEqual(self.client.get(self.url, {'user_id': str(other.id)}).status_code, 403)
+        trainer = APIClient()
+        trainer.force_authenticate(user=self.trainer)
+        self.assertEqual(trainer.get(self.url, {'user_id': str(self.learner.id)}).status_code, 200)
+        self.assertEqual(trainer.get(self.url, {'user_id': str(other.id)}).status_code, 404)
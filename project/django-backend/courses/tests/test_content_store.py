@@ -0,0 +1,123 @@
+import os
+import unittest
+import uuid
+from unittest import mock
+
+from django.test import TestCase
+from pymongo import ASCENDING, MongoClient
+from rest_framework.test import APIClient
+
+from courses import content_store
+from courses.models import Profile, Course, Unit
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+# MONGODB_TEST_URI runs these against a real mongod (database lms_test, dropped afterwards)
+TEST_URI = os.environ.get('MONGODB_TEST_URI')
+
+
+@unittest.skipUnless(TEST_URI or mongomock, 'needs mongomock or MONGODB_TEST_URI')
+class ContentStoreTest(TestCase):
+    def setUp(self):
+        self.db_patch = mock.patch.object(content_store, 'MONGODB_DB', 'lms_test')
+        self.db_patch.start()
+        self.previous = content_store.set_client(MongoClient(TEST_URI) if TEST_URI else mongomock.MongoClient())
+        db = content_store.get_db()
+        db[content_store.MODULE_ITEMS].create_index(
+            [('module_id', ASCENDING), ('sequence_order', ASCENDING)], name=content_store.MODULE_ORDER_INDEX,
+        )
+        self.module_id = str(uuid.uuid4())
+
+    def tearDown(self):
+        client = content_store.set_client(self.previous)
+        client.drop_database('lms_test')
+        self.db_patch.stop()
+
+    def _item(self, title, **extra):
+        return {'title': title, 'content_type': 'video', 'file_reference': f'blobs/aa/{title}.mp4', **extra}
+
+    def test_save_replaces_the_module_in_list_order(self):
+        first = content_store.save_module_items(self.module_id, [self._item('a'), self._item('b'), self._item('c')])
+        self.assertEqual((first['inserted'], first['deleted']), (3, 0))
+        other = str(uuid.uuid4())
+        content_store.save_module_items(other, [self._item('x')])
+
+        a, b, c = first['ids']
+        second = content_store.save_module_items(self.module_id, [
+            {**self._item('c'), 'id': c, 'duration_seconds': 30},
+            self._item('d'),
+            {**self._item('a renamed'), 'id': a},
+        ], ordered=False)
+        self.assertEqual((second['inserted'], second['updated'], second['deleted']), (1, 2, 1))
+
+        items = content_store.module_items(self.module_id)
+        self.assertEqual([item['title'] for item in items], ['c', 'd', 'a renamed'])
+        self.assertEqual([item['sequence_order'] for item in items], [0, 1, 2])
+        self.assertEqual(items[0]['id'], c)
+        self.assertEqual(items[0]['metadata'], {'mime_type': 'video/mp4'})
+        self.assertNotIn('created_at', items[0])
+        self.assertEqual(content_store.get_item(c)['metadata']['format'], 'mp4')
+        self.assertIsNone(content_store.get_item(b))
+
+        grouped = content_store.items_for_modules([self.module_id, other, str(uuid.uuid4())], fields=('title',))
+        self.assertEqual([len(items) for items in grouped.values()], [3, 1, 0])
+
+    def test_invalid_lists_write_nothing(self):
+        saved = content_store.save_module_items(self.module_id, [self._item('a')])
+        other = content_store.save_module_items(str(uuid.uuid4()), [self._item('x')])
+        for items in (
+            [self._item('b'), {'title': 'no type', 'file_reference': 'f.pdf'}],
+            [self._item('b', duration_seconds=-1)],
+            [self._item('b', id='not-an-object-id')],
+            [{**self._item('a'), 'id': saved['ids'][0]}, {**self._item('a2'), 'id': saved['ids'][0]}],
+            # another module's item cannot be pulled in
+            [{**self._item('stolen'), 'id': other['ids'][0]}],
+            'not a list',
+        ):
+            with self.assertRaises(ValueError):
+                content_store.save_module_items(self.module_id, items)
+        self.assertEqual([item['title'] for item in content_store.module_items(self.module_id)], ['a'])
+
+    def test_question_media_and_media_files(self):
+        question = str(uuid.uuid4())
+        saved = content_store.save_question_media(question, [
+            {'media_type': 'image', 'file_reference': 'blobs/bb/diagram.png'},
+            {'media_type': 'audio', 'file_reference': 'blobs/cc/prompt.mp3'},
+        ])
+        self.assertEqual(saved['inserted'], 2)
+        with self.assertRaises(ValueError):
+            content_store.save_question_media(question, [{'media_type': 'pdf', 'file_reference': 'x.pdf'}])
+        media = content_store.media_for_questions([question])[question]
+        self.assertEqual([m['media_type'] for m in media], ['image', 'audio'])
+
+        files = content_store.get_db()[content_store.MEDIA_FILES]
+        ids = files.insert_many([
+            {'file_type': 'video', 'title': f'v{i}', 'file_path': f'v{i}.mp4', 'encoding_status': 'pending',
+             'created_at': i, 'updated_at': i}
+            for i in range(3)
+        ]).inserted_ids
+        self.assertEqual(content_store.set_encoding_status([str(ids[0])], 'completed'), 1)
+        pending = content_store.media_files_by_status('pending', limit=1)
+        self.assertEqual([f['title'] for f in pending], ['v1'])
+        self.assertEqual(set(pending[0]), {'id', 'file_type', 'title', 'file_path', 'encoding_status'})
+
+    def test_module_content_items_endpoint(self):
+        trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        course = Course.objects.create(title='C', created_by=trainer)
+        unit = Unit.objects.create(course=course, module_type='video', title='M', sequence_order=0)
+        client = APIClient()
+        client.force_authenticate(user=trainer)
+        url = f'/api/units/{unit.id}/content-items/'
+
+        self.assertEqual(client.put(url, {'items': [self._item('a')]}, format='json').status_code, 403)
+        trainer.primary_role = 'trainer'
+        trainer.save()
+        resp = client.put(url, {'items': [self._item('a'), self._item('b')]}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()['inserted'], 2)
+        self.assertEqual(client.put(url, {'items': [{'title': 'x'}]}, format='json').status_code, 400)
+        self.assertEqual([i['title'] for i in client.get(url).json()['items']], ['a', 'b'])
+        self.assertEqual(client.get(f'/api/units/{uuid.uuid4()}/content-items/').status_code, 404)
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from courses.models import (
+    Profile, Course, Unit, VideoUnit, AudioUnit, TextUnit, Quiz, Question,
+    ScormPackage, Survey,
+)
+
+
+class CourseDetailQueryCountTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def _make_course(self, modules):
+        course = Course.objects.create(title=f'{modules} modules', created_by=self.trainer)
+        for i in range(modules):
+            kind = ('video', 'audio', 'text', 'quiz', 'scorm', 'survey')[i % 6]
+            unit = Unit.objects.create(course=course, module_type=kind, title=f'M{i}', sequence_order=i)
+            if kind == 'video':
+                VideoUnit.objects.create(unit=unit, duration=60)
+            elif kind == 'audio':
+                AudioUnit.objects.create(unit=unit, duration=30)
+            elif kind == 'text':
+                TextUnit.objects.create(unit=unit, content='body')
+            elif kind == 'quiz':
+                quiz = Quiz.objects.create(unit=unit)
+                for n in range(3):
+                    Question.objects.create(quiz=quiz, type='true_false', text=f'Q{n}', correct_answer=True, order=n)
+            elif kind == 'scorm':
+                ScormPackage.objects.create(unit=unit)
+            else:
+                Survey.objects.create(unit=unit)
+        return course
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), resp.json()
+
+    def test_retrieve_query_count_is_constant(self):
+        small = self._make_course(6)
+        large = self._make_course(60)
+        small_count, _ = self._count_queries(f'/api/courses/{small.id}/')
+        large_count, data = self._count_queries(f'/api/courses/{large.id}/')
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data['units']), 60)
+        quiz_unit = next(u for u in data['units'] if u['module_type'] == 'quiz')
+        self.assertEqual(len(quiz_unit['quiz_details']['questions']), 3)
+        self.assertIsNone(quiz_unit['video_details'])
+
+    def test_units_action_query_count_is_constant(self):
+        small = self._make_course(6)
+        large = self._make_course(60)
+        small_count, _ = self._count_queries(f'/api/trainer/v1/course/{small.id}/modules/')
+        large_count, data = self._count_queries(f'/api/trainer/v1/course/{large.id}/modules/')
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data), 60)
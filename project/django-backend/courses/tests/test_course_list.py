@@ -0,0 +1,54 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Enrollment
+
+
+class CourseListQueryCountTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', first_name='Tess', last_name='Trainer')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learners = [
+            Profile(username=f'learner{i}', email=f'learner{i}@example.com', password='!')
+            for i in range(3)
+        ]
+        Profile.objects.bulk_create(self.learners)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def _make_courses(self, count):
+        for c in range(count):
+            course = Course.objects.create(title=f'C{c}', created_by=self.trainer)
+            Unit.objects.bulk_create([
+                Unit(course=course, module_type='text', title=f'U{i}', sequence_order=i) for i in range(4)
+            ])
+            Enrollment.objects.create(course=course, user=self.learners[0], status='completed')
+            Enrollment.objects.create(course=course, user=self.learners[1], status='in_progress')
+            Enrollment.objects.create(course=course, user=self.learners[2])
+
+    def _list(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), resp.json()
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self._make_courses(2)
+        small_count, _ = self._list('/api/courses/')
+        self._make_courses(48)
+        large_count, data = self._list('/api/trainer/v1/course/')
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data['results']), 50)
+
+        row = data['results'][0]
+        self.assertEqual(row['units_count'], 4)
+        self.assertEqual(row['created_by_name'], 'Tess Trainer')
+        self.assertEqual(row['enrollment_counts'], {'total': 3, 'assigned': 1, 'in_progress': 1, 'completed': 1})
+
+    def test_create_response_still_reports_units_count(self):
+        resp = self.client.post('/api/courses/', {'title': 'New'}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()['units_count'], 0)
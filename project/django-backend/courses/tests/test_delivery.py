@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses import delivery, grading, regrading
+from courses.models import Profile, Course, Unit, Quiz, Question, QuizAttempt
+
+
+class DeliveryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', primary_role='trainer')
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password', primary_role='trainee')
+        course = Course.objects.create(title='C', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit, attempts_allowed=0, randomize_questions=True, questions_per_attempt=5)
+        Question.objects.bulk_create(
+            Question(quiz=self.quiz, type='true_false', text=f'Q{n}', correct_answer=n % 2 == 0, order=n)
+            for n in range(500)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def test_draw_is_deterministic_and_needs_no_queries(self):
+        key = grading.answer_key(self.quiz.id)
+        with self.assertNumQueries(0):
+            first = delivery.delivered_questions(key, 12345)
+        self.assertEqual(len(first), 5)
+        self.assertEqual(delivery.delivered_questions(key, 12345), first)
+        self.assertNotEqual(delivery.delivered_questions(key, 54321), first)
+        # unseeded attempts get everything in authored order
+        self.assertEqual(delivery.delivered_questions(key, None), key.questions)
+
+        in_order = key._replace(randomize_questions=False)
+        picked = delivery.delivered_questions(in_order, 12345)
+        self.assertEqual({q.id for q in picked}, {q.id for q in first})
+        self.assertEqual(list(picked), [q for q in key.questions if q in picked])
+
+    def test_pool_changes_move_at_most_one_question(self):
+        key = grading.answer_key(self.quiz.id)
+        for seed in range(50):
+            before = {q.id for q in delivery.delivered_questions(key, seed)}
+            extra = grading.compile_question(f'new-{seed}', 'true_false', [], True, 1)
+            grown = key._replace(questions=key.questions + (extra,))
+            self.assertLessEqual(len(before - {q.id for q in delivery.delivered_questions(grown, seed)}), 1)
+            shrunk = key._replace(questions=key.questions[1:])
+            self.assertLessEqual(len(before - {q.id for q in delivery.delivered_questions(shrunk, seed)}), 1)
+
+    def test_start_resume_and_submit(self):
+        resp = self.client.post(f'/api/quizzes/{self.quiz.id}/start/')
+        self.assertEqual(resp.status_code, 201)
+        self.assertNotIn('seed', resp.data)
+        questions = resp.data['questions']
+        self.assertEqual(len(questions), 5)
+        self.assertNotIn('correct_answer', questions[0])
+
+        resumed = self.client.post(f'/api/quizzes/{self.quiz.id}/start/')
+        self.assertEqual([q['id'] for q in resumed.data['questions']], [q['id'] for q in questions])
+        listed = self.client.get(f"/api/quiz-attempts/{resp.data['id']}/questions/")
+        self.assertEqual([q['id'] for q in listed.data['questions']], [q['id'] for q in questions])
+
+        correct = {q['id']: q['text'][1:].isdigit() and int(q['text'][1:]) % 2 == 0 for q in questions}
+        resp = self.client.post(f"/api/quiz-attempts/{resp.data['id']}/submit/", {'answers': correct}, format='json')
+        self.assertEqual(resp.data['score'], 100)
+        self.assertEqual(resp.data['grading']['total_points'], 5)
+
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual(set(attempt.answers), set(correct))
+        # regrading re-derives the same five questions from the seed
+        self.assertEqual(regrading.regrade_quiz(self.quiz.id)['rescored'], 0)
+
+        self.assertNotIn('correct_answer', self.client.get(f'/api/quiz-attempts/{attempt.id}/questions/').data['questions'][0])
+        self.quiz.show_answers = True
+        self.quiz.save()
+        self.assertIn('correct_answer', self.client.get(f'/api/quiz-attempts/{attempt.id}/questions/').data['questions'][0])
+
+    def test_answer_key_hidden_from_learners(self):
+        resp = self.client.get('/api/questions/', {'quiz_id': str(self.quiz.id)})
+        rows = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+        self.assertNotIn('correct_answer', rows[0])
+        self.client.force_authenticate(self.trainer)
+        resp = self.client.get('/api/questions/', {'quiz_id': str(self.quiz.id)})
+        rows = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+        self.assertIn('correct_answer', rows[0])
@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from courses.cloning import clone_course, SUBTYPE_MODELS
+from courses.models import (
+    Profile, Course, Unit, VideoUnit, AudioUnit, PresentationUnit, TextUnit, PageUnit,
+    Quiz, Question, Assignment, ScormPackage, Survey, ModuleSequencing,
+)
+
+
+KINDS = ('video', 'audio', 'presentation', 'text', 'page', 'quiz', 'assignment', 'scorm', 'survey')
+
+
+class DuplicateCourseTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def _make_course(self, modules, questions=3):
+        course = Course.objects.create(title='Source', status='published', created_by=self.trainer)
+        previous = None
+        for i in range(modules):
+            kind = KINDS[i % len(KINDS)]
+            unit = Unit.objects.create(course=course, module_type=kind, title=f'M{i}', sequence_order=i)
+            if kind == 'video':
+                VideoUnit.objects.create(unit=unit, video_url='https://cdn.example.com/v.mp4', video_storage_path='media/v.mp4', duration=60)
+            elif kind == 'audio':
+                AudioUnit.objects.create(unit=unit, audio_storage_path='media/a.mp3', duration=30)
+            elif kind == 'presentation':
+                PresentationUnit.objects.create(unit=unit, file_storage_path='media/p.pdf', slide_count=12)
+            elif kind == 'text':
+                TextUnit.objects.create(unit=unit, content='body')
+            elif kind == 'page':
+                PageUnit.objects.create(unit=unit, content=[{'type': 'heading', 'text': 'Hi'}])
+            elif kind == 'quiz':
+                quiz = Quiz.objects.create(unit=unit, passing_score=80)
+                Question.objects.bulk_create([
+                    Question(quiz=quiz, type='true_false', text=f'Q{n}', correct_answer=True, order=n)
+                    for n in range(questions)
+                ])
+            elif kind == 'assignment':
+                Assignment.objects.create(unit=unit, instructions='Write it up', max_score=50)
+            elif kind == 'scorm':
+                ScormPackage.objects.create(unit=unit, package_type='scorm_2004', file_storage_path='media/pkg.zip')
+            else:
+                Survey.objects.create(unit=unit, questions=[{'q': 'How was it?'}])
+            ModuleSequencing.objects.create(course=course, module=unit, preceding_module=previous, prerequisite_completed=previous is not None)
+            previous = unit
+        return course
+
+    def test_deep_copy_remaps_every_table(self):
+        course = self._make_course(18)
+        resp = self.client.post(f'/api/courses/{course.id}/duplicate/')
+        self.assertEqual(resp.status_code, 200)
+        dup = Course.objects.get(id=resp.json()['id'])
+        self.assertEqual(dup.title, 'Source (copy)')
+        self.assertEqual(dup.status, 'draft')
+        self.assertEqual(len(resp.json()['units']), 18)
+
+        old_units = set(Unit.objects.filter(course=course).values_list('id', flat=True))
+        new_units = set(Unit.objects.filter(course=dup).values_list('id', flat=True))
+        self.assertEqual(len(new_units), 18)
+        self.assertFalse(old_units & new_units)
+        for model in SUBTYPE_MODELS:
+            self.assertEqual(model.objects.filter(unit__course=dup).count(), 2, model.__name__)
+        self.assertEqual(Question.objects.filter(quiz__unit__course=dup).count(), 6)
+        self.assertEqual(
+            VideoUnit.objects.filter(unit__course=dup).first().video_storage_path, 'media/v.mp4'
+        )
+        self.assertEqual(Quiz.objects.filter(unit__course=dup).first().passing_score, 80)
+
+        rules = ModuleSequencing.objects.filter(course=dup).select_related('module', 'preceding_module')
+        self.assertEqual(rules.count(), 18)
+        for rule in rules:
+            self.assertEqual(rule.module.course_id, dup.id)
+            if rule.preceding_module_id:
+                self.assertEqual(rule.preceding_module.course_id, dup.id)
+                self.assertEqual(rule.preceding_module.sequence_order, rule.module.sequence_order - 1)
+
+    def test_query_count_is_constant(self):
+        small = self._make_course(9, questions=2)
+        large = self._make_course(90, questions=40)
+        with CaptureQueriesContext(connection) as small_ctx:
+            clone_course(small, self.trainer)
+        with CaptureQueriesContext(connection) as large_ctx:
+            clone_course(large, self.trainer)
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
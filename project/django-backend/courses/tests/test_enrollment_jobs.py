@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.jobs import process_enrollment_job
+from courses.models import Profile, Course, Team, TeamMember, Enrollment, EnrollmentJob
+
+
+class EnrollmentJobTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learners = [
+            Profile(username=f'learner{i}', email=f'learner{i}@example.com', password='!')
+            for i in range(5)
+        ]
+        Profile.objects.bulk_create(self.learners)
+        self.team = Team.objects.create(team_name='JobTeam', created_by=self.trainer)
+        TeamMember.objects.bulk_create([TeamMember(team=self.team, user=p) for p in self.learners[3:]])
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_async_assign_returns_job_and_reports_progress(self):
+        payload = {
+            'user_ids': [str(p.id) for p in self.learners[:3]],
+            'team_ids': [str(self.team.team_id)],
+            'async': True,
+        }
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            resp = self.client.post(f'/api/trainer/v1/course/{self.course.id}/assign/', payload, format='json')
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        job_id = resp.json()['id']
+        self.assertEqual(resp.json()['status'], 'queued')
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 0)
+
+        process_enrollment_job(job_id)
+
+        resp = self.client.get(f'/api/enrollment-jobs/{job_id}/')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(data['processed'], 5)
+        self.assertEqual(data['created_count'], 5)
+        self.assertEqual(data['eta_seconds'], 0)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 5)
+
+    def test_abandoned_job_resumes_after_last_checkpoint(self):
+        audience = sorted(p.id for p in self.learners)
+        # a worker wrote the first chunk, checkpointed it, then died
+        Enrollment.objects.bulk_create([Enrollment(course=self.course, user_id=uid) for uid in audience[:2]])
+        stale = timezone.now() - timedelta(hours=1)
+        job = EnrollmentJob.objects.create(
+            course=self.course, requested_by=self.trainer,
+            user_ids=[str(uid) for uid in audience], chunk_size=2,
+            status='running', total=5, processed=2, created_count=2, last_chunk=0,
+            started_at=stale, heartbeat_at=stale,
+        )
+
+        job = process_enrollment_job(job.id)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.last_chunk, 2)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(job.created_count, 5)
+        self.assertEqual(job.skipped, 0)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 5)
+
+    def test_running_job_with_fresh_heartbeat_is_not_claimed(self):
+        job = EnrollmentJob.objects.create(
+            course=self.course, requested_by=self.trainer, status='running',
+            heartbeat_at=timezone.now(),
+        )
+        self.assertIsNone(process_enrollment_job(job.id))
+
+    def test_resumed_job_keeps_the_audience_it_started_with(self):
+        job = EnrollmentJob.objects.create(
+            course=self.course, requested_by=self.trainer,
+            team_ids=[str(self.team.team_id)], user_ids=[str(p.id) for p in self.learners[:3]], chunk_size=2,
+        )
+        with mock.patch('courses.jobs.insert_enrollments', side_effect=[set(), RuntimeError('worker died')]) as insert:
+            with self.assertRaises(RuntimeError):
+                process_enrollment_job(job.id)
+        first_chunk = insert.call_args_list[0].args[2]
+        job.refresh_from_db()
+        self.assertEqual((job.total, job.last_chunk), (5, 0))
+
+        # re-resolving the audience now would pick up the new member and shift the chunk boundaries
+        newcomer = Profile.objects.create_user(username='newcomer', email='newcomer@example.com', password='password')
+        TeamMember.objects.create(team=self.team, user=newcomer)
+        EnrollmentJob.objects.filter(id=job.id).update(status='queued')
+        job = process_enrollment_job(job.id)
+
+        self.assertEqual((job.status, job.total, job.processed), ('completed', 5, 5))
+        enrolled = set(Enrollment.objects.filter(course=self.course).values_list('user_id', flat=True))
+        self.assertNotIn(newcomer.id, enrolled)
+        self.assertEqual(enrolled, {p.id for p in self.learners} - set(first_chunk))
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses.enrollments import assign_course
+from courses.models import Profile, Course, Enrollment
+from courses.stats import enrollment_stats, enrollment_stats_many
+
+
+class EnrollmentStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learners = [
+            Profile(username=f'learner{i}', email=f'learner{i}@example.com', password='!', primary_role='trainee')
+            for i in range(4)
+        ]
+        Profile.objects.bulk_create(self.learners)
+        self.course = Course.objects.create(title='A', created_by=self.trainer)
+        self.other = Course.objects.create(title='B', created_by=self.trainer)
+        Enrollment.objects.create(course=self.course, user=self.learners[0], status='completed', progress_percentage=100)
+        Enrollment.objects.create(course=self.course, user=self.learners[1], status='in_progress', progress_percentage=50)
+        Enrollment.objects.create(course=self.course, user=self.learners[2], status='assigned')
+        Enrollment.objects.create(course=self.other, user=self.learners[0], status='assigned')
+
+    def test_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            stats = enrollment_stats(self.course.id)
+        self.assertEqual(stats, {
+            'total_enrolled': 3, 'assigned': 1, 'in_progress': 1, 'completed': 1,
+            'average_progress': 50.0, 'completion_rate': 33.3,
+        })
+        with self.assertNumQueries(0):
+            enrollment_stats(self.course.id)
+
+    def test_cache_invalidated_when_enrollments_change(self):
+        enrollment_stats(self.course.id)
+        enrollment = Enrollment.objects.get(course=self.course, user=self.learners[2])
+        enrollment.status = 'completed'
+        enrollment.save()
+        self.assertEqual(enrollment_stats(self.course.id)['completed'], 2)
+
+        assign_course(self.course, self.trainer, user_ids=[self.learners[3].id])
+        self.assertEqual(enrollment_stats(self.course.id)['total_enrolled'], 4)
+
+    def test_batch_uses_one_query_for_misses(self):
+        empty = Course.objects.create(title='C', created_by=self.trainer)
+        enrollment_stats(self.course.id)
+        with self.assertNumQueries(1):
+            stats = enrollment_stats_many([self.course.id, self.other.id, empty.id])
+        self.assertEqual(stats[str(self.course.id)]['total_enrolled'], 3)
+        self.assertEqual(stats[str(self.other.id)]['total_enrolled'], 1)
+        self.assertEqual(stats[str(empty.id)]['completion_rate'], 0)
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        resp = client.get(f'/api/courses/{self.course.id}/enrollment_stats/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['total_learners'], 4)
+        self.assertEqual(resp.json()['completed'], 1)
+
+        resp = client.get('/api/courses/enrollment-stats/', {'course_ids': f'{self.course.id},{self.other.id}'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.json()['courses']), {str(self.course.id), str(self.other.id)})
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Quiz, QuizAttempt, Enrollment, UnitProgress, Team, TeamMember
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.course = Course.objects.create(title='Safety, "basics"', created_by=self.trainer)
+        self.other = Course.objects.create(title='Other', created_by=self.trainer)
+        self.learners = [
+            Profile.objects.create_user(username=f'learner{i}', email=f'learner{i}@example.com', password='password')
+            for i in range(4)
+        ]
+        old = timezone.now() - timedelta(days=30)
+        for i, learner in enumerate(self.learners):
+            Enrollment.objects.create(course=self.course, user=learner, assigned_at=old if i == 0 else timezone.now())
+        Enrollment.objects.create(course=self.other, user=self.learners[0])
+        team = Team.objects.create(team_name='Ops')
+        TeamMember.objects.create(team=team, user=self.learners[1])
+        TeamMember.objects.create(team=team, user=self.learners[2])
+        self.team = team
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def _get(self, url, **params):
+        resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return b''.join(resp.streaming_content).decode()
+
+    def test_csv_enrollments_with_course_filter(self):
+        body = self._get('/api/exports/enrollments.csv', course_id=str(self.course.id))
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['course_title'], 'Safety, "basics"')
+        # ordered by (assigned_at, id): the back-dated enrollment comes first
+        self.assertEqual(rows[0]['user_email'], 'learner0@example.com')
+        self.assertEqual(rows[0]['started_at'], '')
+
+    def test_ndjson_team_and_date_filters(self):
+        start = (timezone.now() - timedelta(days=1)).date().isoformat()
+        body = self._get('/api/exports/enrollments.ndjson', team_id=str(self.team.team_id), **{'from': start})
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(row['user_email'] for row in rows), ['learner1@example.com', 'learner2@example.com'])
+
+    def test_attempts_and_progress(self):
+        unit = Unit.objects.create(course=self.course, module_type='quiz', title='Final', sequence_order=0)
+        quiz = Quiz.objects.create(unit=unit)
+        QuizAttempt.objects.create(quiz=quiz, user=self.learners[1], score=80, passed=True)
+        enrollment = Enrollment.objects.get(course=self.course, user=self.learners[1])
+        UnitProgress.objects.create(enrollment=enrollment, unit=unit, status='completed')
+
+        attempts = [json.loads(line) for line in self._get('/api/exports/quiz-attempts.ndjson').splitlines()]
+        self.assertEqual(attempts[0]['unit_title'], 'Final')
+        self.assertIs(attempts[0]['passed'], True)
+        self.assertEqual(attempts[0]['course_id'], str(self.course.id))
+
+        progress = list(csv.DictReader(io.StringIO(self._get('/api/exports/unit-progress.csv', course_id=str(self.other.id)))))
+        self.assertEqual(progress, [])
+        progress = list(csv.DictReader(io.StringIO(self._get('/api/exports/unit-progress.csv'))))
+        self.assertEqual(progress[0]['user_email'], 'learner1@example.com')
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/exports/profiles.csv').status_code, 404)
+        self.assertEqual(self.client.get('/api/exports/enrollments.xml').status_code, 404)
+        self.assertEqual(self.client.get('/api/exports/enrollments.csv', {'course_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/enrollments.csv', {'from': 'soon'}).status_code, 400)
+        learner = APIClient()
+        learner.force_authenticate(user=self.learners[0])
+        self.assertEqual(learner.get('/api/exports/enrollments.csv').status_code, 403)
+
+    def test_trainers_only_export_their_own_courses(self):
+        other_trainer = Profile.objects.create_user(username='trainer2', email='trainer2@example.com', password='password')
+        other_trainer.primary_role = 'trainer'
+        other_trainer.save()
+        theirs = Course.objects.create(title='Theirs', created_by=other_trainer)
+        Enrollment.objects.create(course=theirs, user=self.learners[3])
+
+        self.assertEqual(self.client.get('/api/exports/enrollments.csv', {'course_id': str(theirs.id)}).status_code, 403)
+        missing = '00000000-0000-0000-0000-000000000000'
+        self.assertEqual(self.client.get('/api/exports/enrollments.csv', {'course_id': missing}).status_code, 404)
+        rows = list(csv.DictReader(io.StringIO(self._get('/api/exports/enrollments.csv'))))
+        self.assertEqual(len(rows), 5)
+        self.assertNotIn(str(theirs.id), {row['course_id'] for row in rows})
+
+        admin = APIClient()
+        admin.force_authenticate(user=Profile.objects.create_superuser(username='root', email='root@example.com', password='password'))
+        resp = admin.get('/api/exports/enrollments.csv', {'course_id': str(theirs.id)})
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(b''.join(resp.streaming_content).decode())))), 1)
+
+    def _auditor_export(self, role):
+        auditor = Profile.objects.create_user(username=role, email=f'{role}@example.com', password='password')
+        auditor.primary_role = role
+        auditor.save()
+        theirs = Course.objects.create(title='Theirs', created_by=Profile.objects.create_user(
+            username='trainer2', email='trainer2@example.com', password='password', primary_role='trainer',
+        ))
+        Enrollment.objects.create(course=theirs, user=self.learners[3])
+        self.client.force_authenticate(user=auditor)
+        rows = list(csv.DictReader(io.StringIO(self._get('/api/exports/enrollments.csv'))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['course_id'] for row in rows}, {str(self.course.id), str(self.other.id), str(theirs.id)})
+        rows = list(csv.DictReader(io.StringIO(self._get('/api/exports/enrollments.csv', course_id=str(theirs.id)))))
+        self.assertEqual(len(rows), 1)
+
+    def test_managers_export_every_course(self):
+        self._auditor_export('manager')
+
+    def test_admins_export_every_course(self):
+        self._auditor_export('admin')
@@ -0,0 +1,71 @@
+"""Throughput and memory benchmark for the streaming exports.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import tracemalloc
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class ExportBenchmark(TransactionTestCase):
+    sizes = (50_000, 250_000)
+
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+
+    def _seed(self, size):
+        course = Course.objects.create(title=f'Audit {size}', created_by=self.trainer)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (user_id, password_hash, is_superuser, username, first_name, last_name,
+                                   email, is_staff, is_active, date_joined, primary_role, created_at)
+                SELECT gen_random_uuid(), '!', false, %s || n, '', '', %s || n || '@example.com',
+                       false, true, now(), 'trainee', now()
+                FROM generate_series(1, %s) AS n
+            """, [f'ex{size}_', f'ex{size}_', size])
+            cursor.execute("""
+                INSERT INTO enrollments (id, course_id, user_id, status, progress_percentage, assigned_at)
+                SELECT gen_random_uuid(), %s, user_id, 'assigned', 0, now()
+                FROM users WHERE username LIKE %s
+            """, [course.id, f'ex{size}\\_%'])
+        return course
+
+    def test_memory_stays_flat(self):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        peaks = {}
+        for size in self.sizes:
+            course = self._seed(size)
+            for fmt in ('csv', 'ndjson'):
+                params = {'course_id': str(course.id)}
+                started = time.perf_counter()
+                resp = client.get(f'/api/exports/enrollments.{fmt}', params)
+                lines = sum(block.count(b'\n') for block in resp.streaming_content)
+                elapsed = time.perf_counter() - started
+                self.assertGreaterEqual(lines, size)
+
+                # second pass under tracemalloc, which slows Python down too much to time
+                tracemalloc.start()
+                resp = client.get(f'/api/exports/enrollments.{fmt}', params)
+                for _ in resp.streaming_content:
+                    pass
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f'\n{fmt} export of {size} rows: {elapsed:.2f}s, peak {peak / 2 ** 20:.1f} MiB')
+                peaks.setdefault(fmt, []).append(peak)
+
+        for fmt, (small, large) in peaks.items():
+            # a few chunks of rows are held at once, never the whole result
+            self.assertLess(large, 16 * 2 ** 20, fmt)
+            # five times the rows, about the same peak
+            self.assertLess(large, small * 1.5 + 2 ** 20, f'{fmt}: peaks {small} and {large} bytes')
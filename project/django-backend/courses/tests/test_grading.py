@@ -0,0 +1,207 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses import grading, regrading
+from courses.models import Profile, Course, Unit, Quiz, Question, QuizAttempt
+
+
+QUESTIONS = [
+    ('multiple_choice', ['Paris', 'Rome', 'Madrid'], 'Paris', 1),
+    ('multiple_answer', ['2', '3', '4', '5'], ['2', '3', '5'], 2),
+    ('true_false', ['True', 'False'], True, 1),
+    ('fill_blank', [], ['H2O', ['oxygen', 'O2']], 1),
+    ('matching', [], {'France': 'Paris', 'Italy': 'Rome'}, 2),
+    ('ordering', ['one', 'two', 'three'], ['one', 'two', 'three'], 2),
+    ('free_text', [], None, 1),
+]
+
+
+class GradingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', primary_role='trainer')
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password', primary_role='trainee')
+        course = Course.objects.create(title='C', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit, passing_score=60, attempts_allowed=2)
+        self.questions = [
+            Question.objects.create(quiz=self.quiz, type=kind, text=kind, options=options, correct_answer=answer, points=points, order=i)
+            for i, (kind, options, answer, points) in enumerate(QUESTIONS)
+        ]
+        self.ids = [str(q.id) for q in self.questions]
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def all_correct(self):
+        return dict(zip(self.ids, [
+            ' paris ', [3, '2', 1], 'true', ['h2o', 'O2'],
+            [['italy', 'rome'], ['France', 'Paris']], [0, 'Two', 2], 'anything',
+        ]))
+
+    def test_every_question_type(self):
+        key = grading.answer_key(self.quiz.id)
+        result = grading.grade(key, self.all_correct())
+        self.assertEqual(result['total_points'], 10)
+        self.assertEqual(result['earned_points'], 9)
+        self.assertEqual(result['score'], 90)
+        self.assertEqual(result['pending_review'], [self.ids[6]])
+
+        wrong = dict(zip(self.ids, [
+            'Rome', ['2', '3'], False, ['h2o'], {'France': 'Rome', 'Italy': 'Paris'}, ['two', 'one', 'three'], '',
+        ]))
+        result = grading.grade(key, wrong)
+        self.assertEqual(result['earned_points'], 0)
+        self.assertEqual([correct for _, correct, _ in result['questions']], [False] * 6 + [None])
+        # malformed and missing answers are wrong, not errors
+        malformed = dict(zip(self.ids, [True, 'x', 1, {'a': 1}, 'Paris', 5, None]))
+        self.assertEqual(grading.grade(key, malformed)['earned_points'], 0)
+        self.assertEqual(grading.grade(key, {})['score'], 0)
+
+    def test_free_text_with_accepted_answers_and_uncompilable_keys(self):
+        q = grading.compile_question('q', 'free_text', [], ['Photosynthesis', 'photo synthesis'], 1)
+        self.assertTrue(grading.QUESTION_GRADERS['free_text'][1]('  PHOTO   synthesis', q))
+        # a correct answer that is not one of the options cannot be graded automatically
+        self.assertIsNone(grading.compile_question('q', 'multiple_choice', ['a', 'b'], 'c', 1).expected)
+
+    def test_answer_key_is_cached_until_questions_change(self):
+        grading.answer_key(self.quiz.id)
+        with self.assertNumQueries(0):
+            grading.answer_key(self.quiz.id)
+        question = self.questions[0]
+        question.correct_answer = 'Rome'
+        question.save()
+        key = grading.answer_key(self.quiz.id)
+        self.assertEqual(key.questions[0].expected, 1)
+        self.quiz.passing_score = 95
+        self.quiz.save()
+        self.assertEqual(grading.answer_key(self.quiz.id).passing_score, 95)
+        question.delete()
+        self.assertEqual(len(grading.answer_key(self.quiz.id).questions), 6)
+
+    def test_start_and_submit(self):
+        resp = self.client.post(f'/api/quizzes/{self.quiz.id}/start/')
+        self.assertEqual(resp.status_code, 201)
+        attempt_id = resp.data['id']
+        # starting again resumes the open attempt
+        self.assertEqual(self.client.post(f'/api/quizzes/{self.quiz.id}/start/').data['id'], attempt_id)
+
+        answers = {**self.all_correct(), 'not-a-question': 'x'}
+        resp = self.client.post(f'/api/quiz-attempts/{attempt_id}/submit/', {'answers': answers}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['score'], 90)
+        # the free-text question waits for a trainer, so the outcome is open
+        self.assertIsNone(resp.data['passed'])
+        self.assertNotIn('correct_answer', resp.data['grading']['questions'][0])
+        attempt = QuizAttempt.objects.get(pk=attempt_id)
+        self.assertEqual(set(attempt.answers), set(self.ids))
+        self.assertIsNotNone(attempt.completed_at)
+
+        resp = self.client.post(f'/api/quiz-attempts/{attempt_id}/submit/', {'answers': {}}, format='json')
+        self.assertEqual(resp.status_code, 409)
+        other = Profile.objects.create_user(username='other', email='other@example.com', password='password', primary_role='trainee')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(f'/api/quiz-attempts/{attempt_id}/submit/', {'answers': {}}, format='json').status_code, 404)
+
+    def test_attempts_allowed(self):
+        for expected in (201, 201):
+            resp = self.client.post('/api/quiz-attempts/', {'quiz': str(self.quiz.id), 'answers': {}}, format='json')
+            self.assertEqual(resp.status_code, expected)
+            self.assertEqual(resp.data['score'], 0)
+        resp = self.client.post(f'/api/quizzes/{self.quiz.id}/start/')
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 2)
+
+    def test_client_cannot_set_score(self):
+        resp = self.client.post('/api/quiz-attempts/', {
+            'quiz': str(self.quiz.id), 'answers': {self.ids[0]: 'Madrid'}, 'score': 100, 'passed': True,
+        }, format='json')
+        self.assertEqual(resp.data['score'], 0)
+        self.assertFalse(resp.data['passed'])
+        attempt = QuizAttempt.objects.get(pk=resp.data['id'])
+        self.client.patch(f'/api/quiz-attempts/{attempt.id}/', {'score': 100, 'passed': True}, format='json')
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.passed), (0, None))
+
+    def test_attempts_cannot_be_edited_or_deleted(self):
+        resp = self.client.post('/api/quiz-attempts/', {'quiz': str(self.quiz.id), 'answers': {}}, format='json')
+        url = f"/api/quiz-attempts/{resp.data['id']}/"
+        other = Quiz.objects.create(unit=Unit.objects.create(course=self.quiz.unit.course, module_type='quiz', title='Other', sequence_order=9))
+        self.assertEqual(self.client.patch(url, {'quiz': str(other.id)}, format='json').status_code, 405)
+        self.assertEqual(self.client.put(url, {'quiz': str(other.id)}, format='json').status_code, 405)
+        # deleting an attempt would hand back one of attempts_allowed
+        self.assertEqual(self.client.delete(url).status_code, 405)
+        self.assertEqual(QuizAttempt.objects.get().quiz_id, self.quiz.id)
+
+    def test_one_step_attempts_only_for_untimed_quizzes_without_a_draw(self):
+        for settings in ({'time_limit': 10}, {'time_limit': None, 'questions_per_attempt': 3}):
+            Quiz.objects.filter(pk=self.quiz.pk).update(**settings)
+            cache.clear()
+            resp = self.client.post('/api/quiz-attempts/', {'quiz': str(self.quiz.id), 'answers': self.all_correct()}, format='json')
+            self.assertEqual(resp.status_code, 409)
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertEqual(self.client.post(f'/api/quizzes/{self.quiz.id}/start/').status_code, 201)
+
+    def test_question_pool_hidden_from_learners(self):
+        resp = self.client.get(f'/api/quizzes/{self.quiz.id}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('questions', resp.data)
+        self.client.force_authenticate(self.trainer)
+        self.assertEqual(len(self.client.get(f'/api/quizzes/{self.quiz.id}/').data['questions']), len(QUESTIONS))
+
+    def test_review_settles_pending_questions(self):
+        attempt, _ = grading.start_attempt(self.quiz.id, self.learner)
+        grading.submit_attempt(attempt.pk, self.learner, self.all_correct())
+        url = f'/api/quiz-attempts/{attempt.id}/review/'
+        essay = self.ids[6]
+        self.assertEqual(self.client.post(url, {'reviews': {essay: True}}, format='json').status_code, 403)
+        stranger = Profile.objects.create_user(username='trainer2', email='trainer2@example.com', password='password', primary_role='trainer')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.post(url, {'reviews': {essay: True}}, format='json').status_code, 403)
+
+        self.client.force_authenticate(self.trainer)
+        # only questions that wait for review can be settled
+        self.assertEqual(self.client.post(url, {'reviews': {self.ids[0]: False}}, format='json').status_code, 400)
+        resp = self.client.post(url, {'reviews': {essay: True}}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data['score'], resp.data['passed'], resp.data['grading']['pending_review']), (100, True, []))
+        self.assertEqual(self.client.post(url, {'reviews': {essay: False}}, format='json').status_code, 400)
+
+        # a regrade keeps the trainer's verdict
+        self.assertEqual(regrading.regrade_quiz(self.quiz.id)['rescored'], 0)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.passed, attempt.reviews), (100, True, {essay: True}))
+
+    def test_time_limit(self):
+        self.quiz.time_limit = 10
+        self.quiz.show_answers = True
+        self.quiz.save()
+        started = timezone.now() - timedelta(minutes=11)
+        attempt, _ = grading.start_attempt(self.quiz.id, self.learner, now=started)
+
+        resp = self.client.post(f'/api/quiz-attempts/{attempt.id}/submit/', {'answers': self.all_correct()}, format='json')
+        self.assertEqual(resp.status_code, 409)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 0)
+        self.assertEqual(attempt.completed_at, started + timedelta(minutes=10, seconds=grading.SUBMIT_GRACE_SECONDS))
+
+        # an expired open attempt is closed when the next one starts, and still counts
+        expired, _ = grading.start_attempt(self.quiz.id, self.learner, now=started)
+        self.assertNotEqual(expired.pk, attempt.pk)
+        with self.assertRaises(grading.AttemptError):
+            grading.start_attempt(self.quiz.id, self.learner)
+        expired.refresh_from_db()
+        self.assertIsNotNone(expired.completed_at)
+
+        # within the grace period the submission is graded, and answers are shown
+        self.quiz.attempts_allowed = 0
+        self.quiz.save()
+        attempt, _ = grading.start_attempt(self.quiz.id, self.learner, now=timezone.now() - timedelta(minutes=10, seconds=5))
+        with mock.patch.object(grading, 'SUBMIT_GRACE_SECONDS', 30):
+            attempt, result = grading.submit_attempt(attempt.pk, self.learner, self.all_correct())
+        self.assertEqual(attempt.score, 90)
+        self.assertEqual(result['questions'][0]['correct_answer'], 'Paris')
@@ -0,0 +1,45 @@
+"""Throughput benchmark for server-side quiz grading.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import random
+import time
+import unittest
+
+from django.test import TestCase
+
+from courses import grading
+from courses.models import Profile, Course, Unit, Quiz, Question
+from courses.tests.test_grading import QUESTIONS
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class GradingBenchmark(TestCase):
+    attempts = 50_000
+    questions = 20
+
+    def test_attempts_per_second(self):
+        trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        course = Course.objects.create(title='Big', created_by=trainer)
+        quiz = Quiz.objects.create(unit=Unit.objects.create(course=course, module_type='quiz', title='Q', sequence_order=0))
+        Question.objects.bulk_create(
+            Question(quiz=quiz, type=kind, text=kind, options=options, correct_answer=answer or 'ok', points=points, order=i)
+            for i, (kind, options, answer, points) in enumerate(QUESTIONS[n % len(QUESTIONS)] for n in range(self.questions))
+        )
+        key = grading.answer_key(quiz.id)
+        rng = random.Random(7)
+        # a right and a wrong answer per question; each attempt picks one of the two
+        choices = {
+            q.id: (q.answer, 'wrong') if q.type != 'true_false' else (True, False)
+            for q in key.questions
+        }
+        submissions = [{qid: pair[rng.random() < 0.3] for qid, pair in choices.items()} for _ in range(self.attempts)]
+
+        started = time.perf_counter()
+        scores = [grading.grade(key, answers)['score'] for answers in submissions]
+        elapsed = time.perf_counter() - started
+        rate = self.attempts / elapsed
+        print(f'\ngraded {self.attempts} attempts of {self.questions} questions in {elapsed:.2f}s: {rate:,.0f}/s')
+        self.assertGreater(sum(scores), 0)
+        self.assertGreaterEqual(rate, 10_000)
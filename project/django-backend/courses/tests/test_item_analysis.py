@@ -0,0 +1,168 @@
+import random
+import statistics
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses import item_analysis, regrading
+from courses.models import Profile, Course, Unit, Quiz, Question, QuizAttempt, QuestionStatistic, QuizAnalysisState
+
+
+class ItemAnalysisTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', primary_role='trainer')
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password', primary_role='trainee')
+        course = Course.objects.create(title='C', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit, attempts_allowed=0)
+        self.mc = Question.objects.create(quiz=self.quiz, type='multiple_choice', text='Pick B', options=['A', 'B', 'C', 'D'], correct_answer=1, order=0)
+        self.ma = Question.objects.create(quiz=self.quiz, type='multiple_answer', text='x and z', options=['x', 'y', 'z'], correct_answer=[0, 2], order=1)
+        self.tf = Question.objects.create(quiz=self.quiz, type='true_false', text='True?', correct_answer=True, order=2)
+        self.essay = Question.objects.create(quiz=self.quiz, type='free_text', text='Explain', order=3)
+        self.rng = random.Random(7)
+        self.base = timezone.now() - timedelta(days=1)
+        self.sent = []
+
+    def _attempts(self, count):
+        rows = []
+        for _ in range(count):
+            answers = {str(self.essay.id): 'words'}
+            mc = self.rng.choice([0, 1, 1, 2, 3, None])
+            if mc is not None:
+                answers[str(self.mc.id)] = ['A', 'B', 'C', 'D'][mc] if self.rng.random() < 0.5 else mc
+            answers[str(self.ma.id)] = self.rng.choice([[0, 2], [0], ['x', 'z'], [1, 2]])
+            answers[str(self.tf.id)] = self.rng.choice([True, 'false', 'true'])
+            rows.append(QuizAttempt(
+                quiz=self.quiz, user=self.learner, answers=answers, completed_at=self.base + timedelta(minutes=len(self.sent)),
+            ))
+            self.sent.append(answers)
+        QuizAttempt.objects.bulk_create(rows)
+
+    def _expected(self):
+        """Difficulty, discrimination and choice counts computed straight from the raw answers."""
+        outcomes = {'mc': [], 'ma': [], 'tf': []}
+        choices = {'mc': Counter(), 'tf': Counter()}
+        scores = []
+        for answers in self.sent:
+            mc = answers.get(str(self.mc.id))
+            mc = ['A', 'B', 'C', 'D'].index(mc) if isinstance(mc, str) else mc
+            ma = answers[str(self.ma.id)]
+            tf = answers[str(self.tf.id)] in (True, 'true')
+            right = {'mc': mc == 1, 'ma': sorted(['x', 'y', 'z'].index(v) if isinstance(v, str) else v for v in ma) == [0, 2], 'tf': tf}
+            for name, value in right.items():
+                outcomes[name].append(value)
+            if mc is not None:
+                choices['mc'][str(mc)] += 1
+            choices['tf'][str(tf).lower()] += 1
+            # four points, the essay never earned
+            scores.append(round(100 * sum(right.values()) / 4))
+        return {
+            name: (sum(flags) / len(flags), statistics.correlation([float(f) for f in flags], scores))
+            for name, flags in outcomes.items()
+        }, choices
+
+    def _report(self):
+        return {q['id']: q for q in item_analysis.item_statistics(self.quiz.id)['questions']}
+
+    def test_statistics_match_a_direct_computation(self):
+        self._attempts(60)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id, chunk_size=7), 60)
+        expected, choices = self._expected()
+        report = self._report()
+        for name, question in (('mc', self.mc), ('ma', self.ma), ('tf', self.tf)):
+            row = report[str(question.id)]
+            self.assertEqual(row['delivered'], 60)
+            self.assertAlmostEqual(row['difficulty'], expected[name][0], places=3)
+            self.assertAlmostEqual(row['discrimination'], expected[name][1], places=3)
+
+        mc = report[str(self.mc.id)]
+        self.assertEqual(mc['omitted'], 60 - sum(choices['mc'].values()))
+        self.assertEqual([d['count'] for d in mc['distractors']], [choices['mc'][str(i)] for i in range(4)])
+        self.assertEqual([d['correct'] for d in mc['distractors']], [False, True, False, False])
+        self.assertEqual([d['text'] for d in mc['distractors']], ['A', 'B', 'C', 'D'])
+        tf = report[str(self.tf.id)]
+        self.assertEqual([(d['option'], d['count']) for d in tf['distractors']], [(True, choices['tf']['true']), (False, choices['tf']['false'])])
+        ma = {d['option']: d['count'] for d in report[str(self.ma.id)]['distractors']}
+        self.assertEqual(ma[0], sum(1 for a in self.sent if {0, 'x'} & set(a[str(self.ma.id)])))
+
+        essay = report[str(self.essay.id)]
+        self.assertEqual((essay['graded'], essay['difficulty'], essay['discrimination'], essay['distractors']), (0, None, None, None))
+
+    def test_refresh_only_reads_new_attempts(self):
+        self._attempts(30)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 30)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 0)
+
+        self._attempts(12)
+        # unscored time-outs carry no answers and are skipped
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=0, completed_at=self.base)
+        # one chunk: lock the watermark, read the attempts, merge the sums, move the watermark
+        with self.assertNumQueries(8):
+            self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id, chunk_size=100), 12)
+        incremental = self._report()
+        self.assertEqual(QuizAnalysisState.objects.get().attempts, 42)
+
+        item_analysis.reset_item_analysis(self.quiz.id)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 42)
+        self.assertEqual(self._report(), incremental)
+
+    def test_recent_attempts_wait_for_the_next_refresh(self):
+        now = timezone.now()
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, answers={str(self.tf.id): True}, completed_at=now)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id, now=now), 0)
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id, now=now + timedelta(minutes=5)), 1)
+
+    def test_equal_answers_of_different_types_grade_apart(self):
+        # True == 1, but only the index picks option B
+        for answer in (1, True, 1, True):
+            QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, answers={str(self.mc.id): answer}, completed_at=self.base)
+        item_analysis.refresh_item_analysis(self.quiz.id)
+        mc = self._report()[str(self.mc.id)]
+        self.assertEqual((mc['correct'], mc['distractors'][1]['count']), (2, 2))
+
+    def test_regrade_resets_the_statistics(self):
+        self._attempts(20)
+        item_analysis.refresh_item_analysis(self.quiz.id)
+        before = self._report()[str(self.mc.id)]['difficulty']
+        self.mc.correct_answer = 2
+        self.mc.save()
+        regrading.regrade_quiz(self.quiz.id)
+        self.assertFalse(QuestionStatistic.objects.exists())
+        item_analysis.refresh_item_analysis(self.quiz.id)
+        after = self._report()[str(self.mc.id)]
+        self.assertNotEqual(after['difficulty'], before)
+        self.assertEqual([d['correct'] for d in after['distractors']], [False, False, True, False])
+
+    def test_question_edits_reset_the_statistics(self):
+        self._attempts(20)
+        item_analysis.refresh_item_analysis(self.quiz.id)
+        self.mc.correct_answer = 2
+        self.mc.save()
+        self.assertFalse(QuestionStatistic.objects.exists())
+        self.assertFalse(QuizAnalysisState.objects.exists())
+        item_analysis.refresh_item_analysis(self.quiz.id)
+        self.assertEqual([d['correct'] for d in self._report()[str(self.mc.id)]['distractors']], [False, False, True, False])
+
+        self.essay.delete()
+        self.assertFalse(QuestionStatistic.objects.exists())
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 20)
+
+    def test_endpoint(self):
+        self._attempts(10)
+        client = APIClient()
+        client.force_authenticate(self.learner)
+        self.assertEqual(client.get(f'/api/quizzes/{self.quiz.id}/item-analysis/').status_code, 403)
+        client.force_authenticate(Profile.objects.create_user(username='trainer2', email='trainer2@example.com', password='password', primary_role='trainer'))
+        self.assertEqual(client.get(f'/api/quizzes/{self.quiz.id}/item-analysis/').status_code, 403)
+
+        client.force_authenticate(self.trainer)
+        resp = client.get(f'/api/quizzes/{self.quiz.id}/item-analysis/')
+        self.assertEqual((resp.status_code, resp.data['attempts']), (200, 0))
+        resp = client.get(f'/api/quizzes/{self.quiz.id}/item-analysis/', {'refresh': 'true'})
+        self.assertEqual(resp.data['attempts'], 10)
+        self.assertEqual([q['id'] for q in resp.data['questions']], [str(q.id) for q in (self.mc, self.ma, self.tf, self.essay)])
@@ -0,0 +1,73 @@
+"""Timing benchmark for item analysis over 200k quiz attempts.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from courses import item_analysis
+from courses.models import Profile, Course, Unit, Quiz, Question
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class ItemAnalysisBenchmark(TransactionTestCase):
+    attempts = 200_000
+    questions = 20
+
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        course = Course.objects.create(title='Big', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit, passing_score=60)
+        question_ids = [
+            str(Question.objects.create(quiz=self.quiz, type='multiple_choice', text=f'Q{i}', options=['a', 'b', 'c', 'd'],
+                                        correct_answer='a', order=i).id)
+            for i in range(self.questions)
+        ]
+        self.answers = ', '.join(
+            f"'{qid}', (ARRAY['a','b','c','d'])[1 + floor(random() * 4)::int]" for qid in question_ids
+        )
+        self._insert(self.attempts, "now() - interval '1 day'")
+
+    def _insert(self, count, completed_at):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO quiz_attempts (id, quiz_id, user_id, score, passed, answers, started_at, completed_at)
+                SELECT gen_random_uuid(), %s, %s, 0, false, jsonb_build_object({self.answers}), now(),
+                       {completed_at} + n * interval '1 millisecond'
+                FROM generate_series(1, %s) AS n
+            """, [self.quiz.id, self.trainer.id, count])
+            cursor.execute('ANALYZE quiz_attempts')
+
+    def test_refresh_and_read(self):
+        started = time.perf_counter()
+        processed = item_analysis.refresh_item_analysis(self.quiz.id)
+        full = time.perf_counter() - started
+        self.assertEqual(processed, self.attempts)
+
+        self._insert(1000, "now() - interval '1 hour'")
+        started = time.perf_counter()
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 1000)
+        incremental = time.perf_counter() - started
+        started = time.perf_counter()
+        self.assertEqual(item_analysis.refresh_item_analysis(self.quiz.id), 0)
+        idle = time.perf_counter() - started
+
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        started = time.perf_counter()
+        resp = client.get(f'/api/quizzes/{self.quiz.id}/item-analysis/')
+        read = time.perf_counter() - started
+        self.assertEqual(resp.data['attempts'], self.attempts + 1000)
+
+        print(f'\nitem analysis of {self.attempts} attempts x {self.questions} questions: full refresh {full:.1f}s '
+              f'({self.attempts / full:.0f} attempts/s), 1000 new {incremental * 1000:.0f}ms, '
+              f'nothing new {idle * 1000:.1f}ms, read {read * 1000:.1f}ms')
+        self.assertLess(incremental, 2)
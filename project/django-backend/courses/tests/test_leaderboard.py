@@ -0,0 +1,125 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses import leaderboard
+from courses.models import Profile, Course, Unit, Quiz, QuizAttempt, Enrollment, UnitProgress, Leaderboard
+
+
+def expected_ranks(course_id):
+    rows = list(Leaderboard.objects.filter(course_id=course_id).values_list('user_id', 'total_points'))
+    return {uid: 1 + sum(1 for _, other in rows if other > points) for uid, points in rows}
+
+
+class LeaderboardRankingTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.learners = [
+            Profile(username=f'learner{i}', email=f'learner{i}@example.com', password='!')
+            for i in range(12)
+        ]
+        Profile.objects.bulk_create(self.learners)
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.other_course = Course.objects.create(title='U', created_by=self.trainer)
+
+    def test_incremental_ranks_match_full_recompute(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            learner = rng.choice(self.learners)
+            course = rng.choice([self.course, self.other_course])
+            leaderboard.record_points(
+                learner.id, course.id,
+                units=rng.choice([0, 1, -1]), quiz=rng.randint(-20, 40), activity=rng.choice([0, 5]),
+            )
+        # global rows are re-ranked in batches
+        self.assertFalse(Leaderboard.objects.filter(course__isnull=True, ranked_points__isnull=False).exists())
+        leaderboard.refresh_ranks()
+        for scope in (self.course.id, self.other_course.id, None):
+            stored = dict(Leaderboard.objects.filter(course_id=scope).values_list('user_id', 'rank'))
+            self.assertEqual(stored, expected_ranks(scope))
+
+    def test_global_row_sums_course_rows(self):
+        learner = self.learners[0]
+        leaderboard.record_points(learner.id, self.course.id, units=2, quiz=15)
+        leaderboard.record_points(learner.id, self.other_course.id, activity=7)
+        row = Leaderboard.objects.get(user=learner, course__isnull=True)
+        self.assertEqual(row.total_points, 2 * leaderboard.POINTS_PER_UNIT + 15 + 7)
+        self.assertEqual(row.completed_units, 2)
+
+    def test_rebuild_matches_incremental(self):
+        unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=0)
+        quiz = Quiz.objects.create(unit=unit)
+        for i, learner in enumerate(self.learners[:5]):
+            enrollment = Enrollment.objects.create(course=self.course, user=learner)
+            QuizAttempt.objects.create(quiz=quiz, user=learner, score=10 * i, passed=i > 2)
+            if i % 2:
+                UnitProgress.objects.create(enrollment=enrollment, unit=unit, status='completed')
+        leaderboard.refresh_ranks()
+        snapshot = set(Leaderboard.objects.values_list('user_id', 'course_id', 'total_points', 'rank'))
+
+        Leaderboard.objects.update(rank=0, total_points=0)
+        leaderboard.rebuild_leaderboards()
+        self.assertEqual(set(Leaderboard.objects.values_list('user_id', 'course_id', 'total_points', 'rank')), snapshot)
+
+    def test_refresh_reranks_only_moved_ranges(self):
+        for i, learner in enumerate(self.learners):
+            leaderboard.record_points(learner.id, self.course.id, quiz=i * 10)
+        leaderboard.refresh_ranks()
+        self.assertEqual(leaderboard.refresh_ranks(), 0)
+
+        # two disjoint moves: 20 -> 35 and 100 -> 85
+        leaderboard.record_points(self.learners[2].id, self.other_course.id, quiz=15)
+        leaderboard.record_points(self.learners[10].id, self.other_course.id, quiz=-15)
+        # pending check, savepoint, lock, scan of the moved rows, a count and an UPDATE per range, release
+        with self.assertNumQueries(9):
+            self.assertEqual(leaderboard.refresh_ranks(), 2)
+        stored = dict(Leaderboard.objects.filter(course__isnull=True).values_list('user_id', 'rank'))
+        self.assertEqual(stored, expected_ranks(None))
+
+    def test_global_reads_serve_the_last_refresh(self):
+        for i, learner in enumerate(self.learners):
+            leaderboard.record_points(learner.id, self.course.id, quiz=i * 10)
+        # reads never re-rank, and rows that were never ranked are left out
+        with self.assertNumQueries(1):
+            self.assertEqual(list(leaderboard.top(None, 3)), [])
+        self.assertIsNone(leaderboard.neighbours(self.learners[0].id, None, k=1))
+
+        call_command('refresh_leaderboard_ranks', stdout=StringIO())
+        self.assertEqual([row.total_points for row in leaderboard.top(None, 3)], [110, 100, 90])
+        self.assertEqual([row.rank for row in leaderboard.top(None, 3)], [1, 2, 3])
+        self.assertEqual([row.rank for row in leaderboard.neighbours(self.learners[0].id, None, k=1)], [11, 12])
+
+        leaderboard.record_points(self.learners[0].id, self.other_course.id, quiz=200)
+        self.assertEqual(leaderboard.top(None, 1)[0].user_id, self.learners[11].id)
+        self.assertTrue(Leaderboard.objects.filter(course__isnull=True, user=self.learners[0], rank=12).exists())
+        leaderboard.refresh_ranks()
+        self.assertEqual(leaderboard.top(None, 1)[0].user_id, self.learners[0].id)
+
+    def test_neighbours_across_ties(self):
+        for i, learner in enumerate(self.learners):
+            leaderboard.record_points(learner.id, self.course.id, quiz=[30, 20, 20, 20, 20, 10][i % 6])
+        ordered = list(Leaderboard.objects.filter(course=self.course).order_by('rank', 'user_id').values_list('user_id', flat=True))
+        for position, user_id in enumerate(ordered):
+            rows = leaderboard.neighbours(user_id, self.course.id, k=3)
+            self.assertEqual([row.user_id for row in rows], ordered[max(0, position - 3):position + 4])
+
+    def test_top_and_around_me_endpoints(self):
+        for i, learner in enumerate(self.learners):
+            leaderboard.record_points(learner.id, self.course.id, quiz=i * 10)
+        client = APIClient()
+        client.force_authenticate(user=self.learners[5])
+
+        resp = client.get('/api/leaderboard/top/', {'course_id': str(self.course.id), 'limit': 3})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([row['rank'] for row in resp.json()], [1, 2, 3])
+        self.assertEqual(resp.json()[0]['user'], str(self.learners[11].id))
+
+        resp = client.get('/api/leaderboard/around_me/', {'course_id': str(self.course.id), 'k': 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([row['total_points'] for row in resp.json()], [70, 60, 50, 40, 30])
+
+        resp = client.get('/api/leaderboard/around_me/', {'course_id': 'nope'})
+        self.assertEqual(resp.status_code, 400)
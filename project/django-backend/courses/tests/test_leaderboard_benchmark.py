@@ -0,0 +1,103 @@
+"""Timing benchmark for incremental leaderboard ranking over 1M rows.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import random
+import time
+import unittest
+
+from django.db import connection
+from django.db.models import F
+from django.test import TransactionTestCase
+
+from courses import leaderboard
+from courses.models import Profile, Course, Leaderboard
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class LeaderboardBenchmark(TransactionTestCase):
+    rows = 1_000_000
+
+    def setUp(self):
+        trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.course = Course.objects.create(title='Big', created_by=trainer)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (user_id, password_hash, is_superuser, username, first_name, last_name,
+                                   email, is_staff, is_active, date_joined, primary_role, created_at)
+                SELECT gen_random_uuid(), '!', false, 'lb' || n, '', '', 'lb' || n || '@example.com',
+                       false, true, now(), 'trainee', now()
+                FROM generate_series(1, %s) AS n
+            """, [self.rows])
+            cursor.execute("""
+                INSERT INTO leaderboard (id, user_id, course_id, total_points, completed_units,
+                                         quiz_score_total, activity_points, rank, updated_at)
+                SELECT gen_random_uuid(), user_id, %s, (random() * 5000)::int, 0, 0, 0, 0, now()
+                FROM users WHERE username LIKE 'lb%%'
+            """, [self.course.id])
+            cursor.execute('ANALYZE leaderboard')
+        started = time.perf_counter()
+        leaderboard.rebuild_leaderboards(course_ids=[])
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE leaderboard lb SET rank = r.rank, ranked_points = r.total_points FROM (
+                    SELECT id, total_points, RANK() OVER (ORDER BY total_points DESC) AS rank FROM leaderboard WHERE course_id = %s
+                ) r WHERE lb.id = r.id
+            """, [self.course.id])
+            # the set-up rewrote every row; measure against a vacuumed table, as in steady state
+            cursor.execute('VACUUM ANALYZE leaderboard')
+        print(f'\nfull window re-rank of {self.rows} rows: {time.perf_counter() - started:.2f}s')
+        self.sample = list(Leaderboard.objects.filter(course=self.course).values_list('user_id', flat=True)[:200])
+
+    def test_incremental_events_and_queries(self):
+        rng = random.Random(1)
+        timings = []
+        for user_id in self.sample:
+            started = time.perf_counter()
+            leaderboard.record_points(user_id, self.course.id, quiz=rng.randint(1, 20), create=False)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        median, p95 = timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+        print(f'\npoints event (course band + global row): median {median * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms')
+
+        # reads in both scopes, with the 200 global moves still waiting for a refresh
+        reads = {}
+        for scope in (self.course.id, None):
+            started = time.perf_counter()
+            for _ in range(50):
+                top = list(leaderboard.top(scope, 10))
+            top_ms = (time.perf_counter() - started) / 50 * 1000
+            started = time.perf_counter()
+            for user_id in self.sample[:50]:
+                leaderboard.neighbours(user_id, scope, k=5)
+            neighbours_ms = (time.perf_counter() - started) / 50 * 1000
+            reads[scope] = (top, top_ms, neighbours_ms)
+            print(f"{'course' if scope else 'global'} top-10: {top_ms:.2f}ms, rank +/- 5: {neighbours_ms:.2f}ms")
+        # reading did not re-rank anything
+        self.assertEqual(Leaderboard.objects.filter(course__isnull=True, ranked_points__isnull=False)
+                         .exclude(ranked_points=F('total_points')).count(), len(set(self.sample)))
+
+        started = time.perf_counter()
+        leaderboard.refresh_ranks()
+        refresh = time.perf_counter() - started
+        print(f'global re-rank after {len(self.sample)} events: {refresh * 1000:.0f}ms')
+
+        # the incremental and batched ranks agree with a full window re-rank
+        with connection.cursor() as cursor:
+            for scope in ('course_id = %s', 'course_id IS NULL'):
+                cursor.execute(f"""
+                    SELECT count(*) FROM leaderboard lb JOIN (
+                        SELECT id, RANK() OVER (ORDER BY total_points DESC) AS rank FROM leaderboard WHERE {scope}
+                    ) r ON r.id = lb.id
+                    WHERE lb.rank <> r.rank
+                """, [self.course.id] if '%s' in scope else [])
+                self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertLess(median, 0.25)
+        # a scheduled refresh, off the request path
+        self.assertLess(refresh, 10)
+        # top-N is one index read and neighbours up to five, whatever the scope size
+        for top, top_ms, neighbours_ms in reads.values():
+            self.assertEqual([row.rank for row in top], sorted(row.rank for row in top))
+            self.assertLess(top_ms, 10)
+            self.assertLess(neighbours_ms, 20)
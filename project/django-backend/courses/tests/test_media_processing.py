@@ -0,0 +1,167 @@
+import io
+import shutil
+import struct
+import tempfile
+import wave
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from courses.media_processing import process_media
+from courses.media_store import store_media
+from courses.models import Profile, Course, Unit, VideoUnit, AudioUnit, PresentationUnit, MediaMetadata
+
+
+def box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def make_mp4(seconds, width, height):
+    mvhd = box(b'mvhd', bytes(4) + struct.pack('>IIII', 0, 0, 1000, seconds * 1000) + bytes(80))
+    tkhd = box(b'tkhd', bytes(4) + bytes(72) + struct.pack('>II', width << 16, height << 16))
+    return box(b'ftyp', b'isom\x00\x00\x02\x00') + box(b'mdat', bytes(256)) + box(b'moov', mvhd + box(b'trak', tkhd))
+
+
+def make_mp3(frames):
+    # MPEG-1 Layer III, 128 kbit/s, 44.1 kHz: 417-byte frames
+    frame = b'\xff\xfb\x90\x64' + bytes(413)
+    return b'ID3\x03\x00\x00\x00\x00\x00\x0a' + bytes(10) + frame * frames
+
+
+def make_wav(seconds):
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes(seconds * 8000 * 2))
+    return out.getvalue()
+
+
+def make_png(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(out, 'PNG')
+    return out.getvalue()
+
+
+def make_pdf(pages):
+    objects = b''.join(b'%d 0 obj << /Type /Page /Parent 2 0 R >> endobj\n' % (n + 3) for n in range(pages))
+    return b'%PDF-1.4\n2 0 obj << /Type /Pages /Count ' + str(pages).encode() + b' >> endobj\n' + objects + b'%%EOF\n'
+
+
+def make_pptx(slides):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        for n in range(1, slides + 1):
+            archive.writestr(f'ppt/slides/slide{n}.xml', '<p:sld/>')
+            archive.writestr(f'ppt/slides/_rels/slide{n}.xml.rels', '<Relationships/>')
+    return out.getvalue()
+
+
+class MediaProcessingTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.course = Course.objects.create(title='Media', created_by=self.trainer)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _store(self, content, name, file_type='general'):
+        media, _ = store_media(
+            lambda: io.BytesIO(content), file_name=name, file_type=file_type,
+            mime_type=None, uploaded_by=self.trainer,
+        )
+        return media
+
+    def _unit(self, kind, order=0):
+        return Unit.objects.create(course=self.course, module_type=kind, title=kind, sequence_order=order)
+
+    def test_upload_only_queues_the_work(self):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            resp = client.post('/api/media/upload/', {
+                'file': SimpleUploadedFile('clip.mp4', make_mp4(95, 1280, 720), content_type='video/mp4'),
+            }, format='multipart')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        media = MediaMetadata.objects.get(id=resp.json()['metadata']['id'])
+        self.assertEqual(media.processing_status, 'pending')
+        self.assertIsNone(media.duration)
+
+    def test_extracts_details_and_updates_units(self):
+        video = self._store(make_mp4(95, 1280, 720), 'clip.mp4', 'video')
+        untouched = VideoUnit.objects.create(unit=self._unit('video'), video_storage_path=video.storage_path)
+        manual = VideoUnit.objects.create(unit=self._unit('video', 1), video_storage_path=video.storage_path, duration=90)
+
+        processed = process_media(video.id)
+        self.assertEqual(processed.processing_status, 'completed')
+        self.assertEqual((processed.duration, processed.width, processed.height), (95, 1280, 720))
+        self.assertIsNotNone(processed.processing_ms)
+        untouched.refresh_from_db()
+        manual.refresh_from_db()
+        self.assertEqual(untouched.duration, 95)
+        self.assertEqual(manual.duration, 90)
+        # attached after processing: filled in on save
+        later = VideoUnit.objects.create(unit=self._unit('video', 2), video_storage_path=video.storage_path)
+        self.assertEqual(later.duration, 95)
+        self.assertIsNone(process_media(video.id))
+
+        expected = {
+            ('talk.mp3', make_mp3(100)): {'duration': 3},
+            ('tone.wav', make_wav(2)): {'duration': 2},
+            ('deck.pdf', make_pdf(7)): {'page_count': 7},
+            ('deck.pptx', make_pptx(4)): {'page_count': 4},
+        }
+        for (name, content), details in expected.items():
+            media = process_media(self._store(content, name).id)
+            for field, value in details.items():
+                self.assertEqual(getattr(media, field), value, name)
+
+        slides = PresentationUnit.objects.create(unit=self._unit('presentation', 3), file_storage_path=media.storage_path)
+        self.assertEqual(slides.slide_count, 4)
+        audio = AudioUnit.objects.create(unit=self._unit('audio', 4), audio_storage_path='elsewhere/a.mp3')
+        self.assertEqual(audio.duration, 0)
+
+    def test_image_thumbnail_shared_by_duplicates(self):
+        png = make_png(1600, 900)
+        first = process_media(self._store(png, 'banner.png', 'image').id)
+        self.assertEqual((first.width, first.height), (1600, 900))
+        with default_storage.open(first.thumbnail_path, 'rb') as f, Image.open(f) as thumb:
+            self.assertEqual(thumb.size, (320, 180))
+
+        second = process_media(self._store(png, 'banner-again.png', 'image').id)
+        self.assertEqual(second.thumbnail_path, first.thumbnail_path)
+        self.assertEqual((second.width, second.height), (1600, 900))
+
+    def test_failures_and_metrics(self):
+        broken = make_mp4(10, 640, 360)[:-40]
+        media = self._store(broken + box(b'moov', box(b'mvhd', b'\x00')), 'broken.mp4', 'video')
+        with self.assertRaises(Exception):
+            process_media(media.id)
+        media.refresh_from_db()
+        self.assertEqual(media.processing_status, 'failed')
+        self.assertTrue(media.processing_error)
+        process_media(self._store(make_wav(1), 'ok.wav', 'audio').id)
+        self._store(make_wav(3), 'queued.wav', 'audio')
+
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        self.assertEqual(client.get('/api/media/processing-metrics/').status_code, 403)
+        self.trainer.primary_role = 'manager'
+        self.trainer.save()
+        metrics = client.get('/api/media/processing-metrics/').json()
+        self.assertEqual(metrics['queue'], {'pending': 1, 'processing': 0, 'completed': 1, 'failed': 1})
+        by_type = {row['file_type']: row for row in metrics['by_file_type']}
+        self.assertEqual((by_type['video']['jobs'], by_type['video']['failed']), (1, 1))
+        self.assertEqual(by_type['audio']['jobs'], 1)
+        self.assertIsNotNone(by_type['audio']['p95_ms'])
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from courses.media_store import store_media
+from courses.models import Profile, Course, Unit, VideoUnit, Enrollment
+
+
+class MediaServingTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password')
+        self.outsider = Profile.objects.create_user(username='learner2', email='learner2@example.com', password='password')
+        self.content = os.urandom(200_000)
+        self.media, _ = store_media(
+            lambda: io.BytesIO(self.content), file_name='lesson.mp4', file_type='video',
+            mime_type='video/mp4', uploaded_by=self.trainer,
+        )
+        self.url = f'/media/{self.media.storage_path}'
+        course = Course.objects.create(title='Video course', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='video', title='Lesson', sequence_order=0)
+        VideoUnit.objects.create(unit=unit, video_storage_path=self.media.storage_path)
+        Enrollment.objects.create(course=course, user=self.learner)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.learner)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _body(self, resp):
+        return b''.join(resp.streaming_content)
+
+    def test_full_and_ranged_reads(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._body(resp), self.content)
+        self.assertEqual(resp['Content-Type'], 'video/mp4')
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        self.assertEqual(resp['ETag'], f'"{hashlib.sha256(self.content).hexdigest()}"')
+        self.assertIn('immutable', resp['Cache-Control'])
+
+        for header, (start, end) in {
+            'bytes=100-199': (100, 199),
+            'bytes=199000-': (199000, 199999),
+            'bytes=-500': (199500, 199999),
+            'bytes=150000-999999': (150000, 199999),
+        }.items():
+            resp = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(resp.status_code, 206, header)
+            self.assertEqual(resp['Content-Range'], f'bytes {start}-{end}/200000')
+            self.assertEqual(resp['Content-Length'], str(end - start + 1))
+            self.assertEqual(self._body(resp), self.content[start:end + 1])
+
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=200000-')
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], 'bytes */200000')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-9').status_code, 200)
+
+        head = self.client.head(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual((head.status_code, head['Content-Length']), (206, '10'))
+
+    def test_conditional_requests(self):
+        first = self.client.get(self.url)
+        etag, modified = first['ETag'], first['Last-Modified']
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+        # If-Range with a stale validator gets the whole (changed) file
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(resp.status_code, 206)
+
+        # mutable paths get a weak validator and must be revalidated
+        default_storage.save('legacy/notes.txt', ContentFile(b'hello'))
+        self.client.force_authenticate(user=self.trainer)
+        resp = self.client.get('/media/legacy/notes.txt')
+        self.assertTrue(resp['ETag'].startswith('W/'))
+        self.assertEqual(resp['Cache-Control'], 'private, no-cache')
+
+    def test_access_control(self):
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(self.url).status_code, 401)
+        token = Token.objects.create(user=self.learner)
+        self.assertEqual(anonymous.get(self.url, HTTP_AUTHORIZATION=f'Token {token.key}').status_code, 200)
+
+        other = APIClient()
+        other.force_authenticate(user=self.outsider)
+        self.assertEqual(other.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/blobs/missing.mp4').status_code, 404)
+
+        signed = self.client.get('/api/media/signed-url/', {'path': self.media.storage_path}).json()['url']
+        self.assertEqual(anonymous.get(signed).status_code, 200)
+        self.assertEqual(anonymous.get(signed.replace('lesson', 'x').replace('.mp4', '.mp3')).status_code, 401)
+        self.assertEqual(other.get('/api/media/signed-url/', {'path': self.media.storage_path}).status_code, 404)
+
+    def test_offload_to_front_end_server(self):
+        with mock.patch('courses.media_serving.OFFLOAD', 'x-accel-redirect'):
+            resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['X-Accel-Redirect'], f'/protected-media/{self.media.storage_path}')
+        self.assertEqual(resp.content, b'')
+        self.assertIn('ETag', resp)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.cloning import clone_course
+from courses.media_store import collect_garbage, count_references
+from courses.models import Profile, Course, Unit, VideoUnit, MediaBlob, MediaMetadata
+
+
+class MediaStoreTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+        self.video = os.urandom(4096)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _upload(self, content, name='intro.mp4'):
+        resp = self.client.post('/api/media/upload/', {
+            'file': SimpleUploadedFile(name, content, content_type='video/mp4'), 'type': 'video',
+        }, format='multipart')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def _attach(self, course, path):
+        unit = Unit.objects.create(course=course, module_type='video', title='Intro', sequence_order=0)
+        return VideoUnit.objects.create(unit=unit, video_storage_path=path)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self._upload(self.video)
+        second = self._upload(self.video, name='intro-copy.mp4')
+        other = self._upload(os.urandom(100))
+
+        self.assertFalse(first['deduplicated'])
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(first['path'], second['path'])
+        self.assertNotEqual(first['path'], other['path'])
+        self.assertEqual(second['metadata']['file_name'], 'intro-copy.mp4')
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        self.assertEqual(MediaMetadata.objects.count(), 3)
+        with default_storage.open(first['path'], 'rb') as stored:
+            self.assertEqual(stored.read(), self.video)
+
+    def test_uploads_used_outside_units_are_kept(self):
+        upload = self._upload(self.video)
+        course = Course.objects.create(title='Onboarding', created_by=self.trainer)
+        unit = Unit.objects.create(course=course, module_type='video', title='Intro', sequence_order=0)
+        # referenced by URL rather than by storage path
+        VideoUnit.objects.create(unit=unit, video_url=upload['url'])
+        avatar = self._upload(os.urandom(100), name='me.png')
+        Profile.objects.filter(pk=self.trainer.pk).update(profile_image_url=f"https://cdn.example.com{avatar['url']}?v=2")
+        MediaMetadata.objects.update(uploaded_at=timezone.now() - timedelta(hours=25))
+        MediaBlob.objects.update(last_referenced_at=timezone.now() - timedelta(hours=25))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_garbage(), {'uploads': 0, 'blobs': 0, 'bytes': 0})
+        self.assertTrue(default_storage.exists(upload['path']))
+        self.assertEqual(MediaMetadata.objects.count(), 2)
+
+        unit.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_garbage(), {'uploads': 1, 'blobs': 1, 'bytes': 4096})
+        self.assertFalse(default_storage.exists(upload['path']))
+        self.assertTrue(default_storage.exists(avatar['path']))
+
+    def test_storage_report(self):
+        self._upload(self.video)
+        self._upload(self.video)
+        self._upload(self.video)
+        self.assertEqual(self.client.get('/api/media/storage-report/').status_code, 403)
+
+        self.trainer.primary_role = 'admin'
+        self.trainer.save()
+        report = self.client.get('/api/media/storage-report/').json()
+        self.assertEqual(report['blobs'], 1)
+        self.assertEqual(report['uploads'], 3)
+        self.assertEqual(report['stored_bytes'], 4096)
+        self.assertEqual(report['saved_bytes'], 2 * 4096)
+        self.assertEqual(report['unreferenced_blobs'], 1)
+
+    def test_garbage_collection_follows_unit_references(self):
+        path = self._upload(self.video)['path']
+        course = Course.objects.create(title='Onboarding', created_by=self.trainer)
+        video = self._attach(course, path)
+        copy = clone_course(course, self.trainer)
+        count_references()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+        thumbnail = default_storage.save('thumbnails/intro.jpg', ContentFile(b'jpg'))
+        MediaMetadata.objects.update(thumbnail_path=thumbnail, uploaded_at=timezone.now() - timedelta(hours=25))
+        MediaBlob.objects.update(last_referenced_at=timezone.now() - timedelta(hours=25))
+        video.unit.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            # the copy still uses it, so its upload record is kept too
+            self.assertEqual(collect_garbage(), {'uploads': 0, 'blobs': 0, 'bytes': 0})
+
+        Unit.objects.filter(course=copy).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_garbage(grace_hours=48)['blobs'], 0)  # still within the grace period
+            self.assertEqual(collect_garbage(dry_run=True), {'uploads': 1, 'blobs': 1, 'bytes': 4096})
+            self.assertTrue(default_storage.exists(path))
+            self.assertEqual(MediaMetadata.objects.count(), 1)
+            self.assertEqual(collect_garbage(), {'uploads': 1, 'blobs': 1, 'bytes': 4096})
+        self.assertFalse(default_storage.exists(path))
+        self.assertFalse(default_storage.exists(thumbnail))
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(MediaMetadata.objects.exists())
+
+        # the same content can be stored again afterwards
+        self.assertFalse(self._upload(self.video)['deduplicated'])
+        self.assertTrue(default_storage.exists(path))
@@ -0,0 +1,127 @@
+import copy
+import os
+import unittest
+
+from django.test import SimpleTestCase
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+from courses import mongo_schema
+from courses.mongo_schema import COLLECTIONS, VALIDATION_ACTION, VALIDATION_LEVEL, plan
+
+TEST_URI = os.environ.get('MONGODB_TEST_URI')
+
+
+def current_state(count=0):
+    """State of a server that already has exactly COLLECTIONS."""
+    state = {}
+    for name, desired in COLLECTIONS.items():
+        state[name] = {
+            'options': {'validator': copy.deepcopy(desired['validator']),
+                        'validationLevel': VALIDATION_LEVEL, 'validationAction': VALIDATION_ACTION},
+            'indexes': {'_id_': ((('_id', 1),), {})},
+            'count': count, 'avg_obj_size': 300, 'index_sizes': {'_id_': 4096}, 'key_sizes': {},
+        }
+        for keys, options in desired['indexes']:
+            state[name]['indexes'][options['name']] = (tuple(keys), {})
+            state[name]['key_sizes'][options['name']] = 40.0
+    return state
+
+
+class MongoSchemaPlanTest(SimpleTestCase):
+    def test_empty_server_gets_everything(self):
+        steps = plan({})
+        self.assertEqual([s.action for s in steps].count('create_collection'), 3)
+        self.assertEqual([s.action for s in steps].count('create_index'), 8)
+        self.assertTrue(all(s.note == 'with validator' or 'instant' in s.note for s in steps))
+
+    def test_up_to_date_server_plans_nothing(self):
+        self.assertEqual(plan(current_state()), [])
+        self.assertEqual(mongo_schema.format_plan([]), ['schema is up to date'])
+
+    def test_only_differences_are_planned(self):
+        state = current_state(count=2_000_000)
+        state['media_files']['options']['validator']['$jsonSchema']['required'].remove('title')
+        del state['module_content_items']['indexes']['idx_module_id_sequence_order']
+        state['test_question_media']['indexes']['idx_media_type'] = ((('media_type', -1),), {})
+        state['test_question_media']['indexes']['idx_legacy'] = ((('created_at', 1),), {})
+
+        steps = plan(state)
+        self.assertEqual(
+            [(s.action, s.collection, s.target) for s in steps],
+            [
+                ('create_index', 'module_content_items', 'idx_module_id_sequence_order'),
+                ('update_validator', 'media_files', None),
+                ('drop_index', 'test_question_media', 'idx_media_type'),
+                ('create_index', 'test_question_media', 'idx_media_type'),
+            ],
+        )
+        # 2M entries of 40+16 bytes, at 50k docs/s
+        self.assertEqual(steps[0].note, '~106.8 MiB, ~40s for 2000000 documents')
+        self.assertIn(
+            'module_content_items: create index idx_module_id_sequence_order {module_id: 1, sequence_order: 1} (~106.8 MiB',
+            mongo_schema.format_plan(steps)[0],
+        )
+
+        pruned = plan(state, prune=True)
+        self.assertIn(('drop_index', 'idx_legacy'), [(s.action, s.target) for s in pruned])
+        self.assertNotIn('_id_', [s.target for s in pruned])
+
+    def test_validation_level_and_renamed_index(self):
+        state = current_state()
+        state['media_files']['options']['validationLevel'] = 'strict'
+        spec = state['module_content_items']['indexes'].pop('idx_module_id')
+        state['module_content_items']['indexes']['module_id_1'] = spec
+
+        steps = plan(state)
+        self.assertEqual([(s.action, s.collection) for s in steps],
+                         [('conflict', 'module_content_items'), ('update_validator', 'media_files')])
+        self.assertIn('module_id_1', steps[0].note)
+
+        applied = mongo_schema.apply(_Recorder(), steps[:1])
+        self.assertEqual(applied, [])
+
+    def test_old_servers_build_in_background(self):
+        db = _Recorder()
+        mongo_schema.apply(db, plan({})[:2], version=(4, 0))
+        self.assertEqual(db.calls[1][2]['background'], True)
+        db = _Recorder()
+        mongo_schema.apply(db, plan({})[:2], version=(7, 0))
+        self.assertNotIn('background', db.calls[1][2])
+
+
+class _Recorder:
+    """Stands in for a Database/Collection pair and records the write calls made by apply()."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getitem__(self, name):
+        return self
+
+    def create_collection(self, name, **kwargs):
+        self.calls.append(('create_collection', name, kwargs))
+
+    def create_index(self, keys, **kwargs):
+        self.calls.append(('create_index', keys, kwargs))
+
+
+@unittest.skipUnless(TEST_URI, 'set MONGODB_TEST_URI to run against a mongod')
+class MongoSchemaApplyTest(SimpleTestCase):
+    def test_apply_is_idempotent(self):
+        client = MongoClient(TEST_URI)
+        db = client['lms_schema_test']
+        try:
+            db.create_collection('module_content_items')
+            db.module_content_items.create_index([('module_id', DESCENDING)], name='idx_module_id')
+            steps = plan(mongo_schema.read_state(db))
+            self.assertIn(('drop_index', 'idx_module_id'), [(s.action, s.target) for s in steps])
+            mongo_schema.apply(db, steps, version=mongo_schema.server_version(db))
+
+            self.assertEqual(plan(mongo_schema.read_state(db)), [])
+            indexes = db.module_content_items.index_information()
+            self.assertEqual(indexes['idx_module_id']['key'], [('module_id', ASCENDING)])
+            mongo_schema.insert_sample(db, now=__import__('datetime').datetime.now())
+            mongo_schema.insert_sample(db, now=__import__('datetime').datetime.now())
+            self.assertEqual(db.module_content_items.count_documents({}), 1)
+        finally:
+            client.drop_database('lms_schema_test')
@@ -0,0 +1,74 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Quiz, QuizAttempt, Enrollment
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        learners = [
+            Profile(username=f'learner{i}', email=f'learner{i}@example.com', password='!')
+            for i in range(120)
+        ]
+        Profile.objects.bulk_create(learners)
+        # bulk assignment gives many rows the same timestamp; the id breaks the tie
+        stamp = timezone.now()
+        Enrollment.objects.bulk_create([
+            Enrollment(course=self.course, user=learner, assigned_at=stamp if i % 3 else timezone.now())
+            for i, learner in enumerate(learners)
+        ])
+        self.learners = learners
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_cursor_walk_returns_every_row_once_in_key_order(self):
+        seen = []
+        url = '/api/enrollments/?pagination=cursor&page_size=50'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200)
+                self.assertNotIn('count', resp.json())
+                seen.extend(resp.json()['results'])
+                url = resp.json()['next']
+
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len({row['id'] for row in seen}), 120)
+        expected = list(
+            Enrollment.objects.order_by('-assigned_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([row['id'] for row in seen], [str(pk) for pk in expected])
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries.captured_queries))
+
+    def test_page_number_mode_is_unchanged(self):
+        resp = self.client.get('/api/enrollments/', {'page': 3})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['count'], 120)
+        self.assertEqual(len(resp.json()['results']), 20)
+
+    def test_invalid_cursor(self):
+        resp = self.client.get('/api/enrollments/', {'pagination': 'cursor', 'cursor': 'garbage'})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_learner_cursor_pages_only_cover_own_attempts(self):
+        unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=0)
+        quiz = Quiz.objects.create(unit=unit)
+        me, other = self.learners[:2]
+        for _ in range(3):
+            QuizAttempt.objects.create(quiz=quiz, user=me, score=5)
+        QuizAttempt.objects.create(quiz=quiz, user=other, score=5)
+
+        client = APIClient()
+        client.force_authenticate(user=me)
+        resp = client.get('/api/quiz-attempts/', {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(len(resp.json()['results']), 2)
+        resp = client.get(resp.json()['next'])
+        self.assertEqual(len(resp.json()['results']), 1)
+        self.assertIsNone(resp.json()['next'])
@@ -0,0 +1,63 @@
+"""Timing benchmark comparing deep page-number and keyset pages.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Enrollment
+from courses.pagination import KeysetPagination
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class PaginationBenchmark(TransactionTestCase):
+    rows = 200_000
+
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        course = Course.objects.create(title='Big', created_by=self.trainer)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (user_id, password_hash, is_superuser, username, first_name, last_name,
+                                   email, is_staff, is_active, date_joined, primary_role, created_at)
+                SELECT gen_random_uuid(), '!', false, 'pg' || n, '', '', 'pg' || n || '@example.com',
+                       false, true, now(), 'trainee', now()
+                FROM generate_series(1, %s) AS n
+            """, [self.rows])
+            cursor.execute("""
+                INSERT INTO enrollments (id, course_id, user_id, status, progress_percentage, assigned_at)
+                SELECT gen_random_uuid(), %s, user_id, 'assigned', 0, now() - (random() * interval '365 days')
+                FROM users WHERE username LIKE 'pg%%'
+            """, [course.id])
+            cursor.execute('ANALYZE enrollments')
+
+    def test_deep_pages(self):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        page = self.rows // 50 - 1
+
+        started = time.perf_counter()
+        resp = client.get('/api/enrollments/', {'page': page})
+        offset_time = time.perf_counter() - started
+        self.assertEqual(resp.status_code, 200)
+
+        # walk 20 keyset pages starting from a cursor deep in the table
+        last = Enrollment.objects.order_by('-assigned_at', '-id')[self.rows - 1000]
+        cursor = KeysetPagination('assigned_at').encode_cursor(last)
+        url = f'/api/enrollments/?pagination=cursor&cursor={cursor}'
+        started = time.perf_counter()
+        for _ in range(20):
+            resp = client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            url = resp.json()['next'] or url
+        keyset_time = (time.perf_counter() - started) / 20
+
+        print(f'\npage {page} of {self.rows} enrollments: page-number {offset_time * 1000:.0f}ms, '
+              f'keyset {keyset_time * 1000:.0f}ms')
@@ -0,0 +1,130 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from courses.models import (
+    Profile, Course, Unit, Quiz, Assignment, Enrollment, UnitProgress,
+    ModuleCompletion, QuizAttempt, AssignmentSubmission, UserProgress,
+)
+from courses.stats import enrollment_stats
+
+
+class ProgressRollupTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password')
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.units = [
+            Unit.objects.create(course=self.course, module_type='text', title=f'U{i}', sequence_order=i)
+            for i in range(3)
+        ]
+        self.quiz_unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=3)
+        self.quiz = Quiz.objects.create(unit=self.quiz_unit)
+        self.assignment = Assignment.objects.create(unit=Unit.objects.create(course=self.course, module_type='assignment', title='A', sequence_order=4))
+        self.enrollment = Enrollment.objects.create(course=self.course, user=self.learner)
+
+    def rollup(self):
+        return UserProgress.objects.get(user=self.learner, course=self.course)
+
+    def test_unit_completion_updates_rollup_and_enrollment(self):
+        progress = UnitProgress.objects.create(enrollment=self.enrollment, unit=self.units[0], status='in_progress')
+        progress.status = 'completed'
+        progress.save()
+        row = self.rollup()
+        self.assertEqual(row.total_modules, 5)
+        self.assertEqual(row.modules_completed, 1)
+        self.assertEqual(row.completion_percentage, 20)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 20)
+
+        # saving again without a status change is not counted twice
+        progress.watch_percentage = 100
+        progress.save()
+        self.assertEqual(self.rollup().modules_completed, 1)
+
+        progress.status = 'in_progress'
+        progress.save()
+        self.assertEqual(self.rollup().modules_completed, 0)
+
+    def test_completion_refreshes_cached_enrollment_stats(self):
+        cache.clear()
+        self.assertEqual(enrollment_stats(self.course.id)['average_progress'], 0)
+        UnitProgress.objects.create(enrollment=self.enrollment, unit=self.units[0], status='completed')
+        self.assertEqual(enrollment_stats(self.course.id)['average_progress'], 20)
+        Unit.objects.create(course=self.course, module_type='text', title='U5', sequence_order=5)
+        self.assertEqual(enrollment_stats(self.course.id)['average_progress'], 16)
+
+    def test_activity_without_module_changes_keeps_enrollment_progress(self):
+        Enrollment.objects.filter(id=self.enrollment.id).update(progress_percentage=60)
+        # the first quiz attempt seeds the rollup but completes no module
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=80, passed=True)
+        self.assertEqual(self.rollup().completion_percentage, 0)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 60)
+
+        UnitProgress.objects.create(enrollment=self.enrollment, unit=self.units[0], status='completed')
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 20)
+
+    def test_module_counted_once_across_sources(self):
+        UnitProgress.objects.create(enrollment=self.enrollment, unit=self.units[0], status='completed')
+        completion = ModuleCompletion.objects.create(module=self.units[0], user=self.learner, is_completed=True, time_spent_minutes=5)
+        row = self.rollup()
+        self.assertEqual(row.modules_completed, 1)
+        self.assertEqual(row.time_spent_minutes, 5)
+
+        completion.time_spent_minutes = 12
+        completion.save()
+        self.assertEqual(self.rollup().time_spent_minutes, 12)
+
+    def test_quiz_and_assignment_deltas(self):
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=80, passed=True)
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=40, passed=False)
+        row = self.rollup()
+        self.assertEqual((row.tests_attempted, row.tests_passed, row.average_score), (2, 1, 60))
+
+        attempt.score = 90
+        attempt.passed = True
+        attempt.save()
+        row = self.rollup()
+        self.assertEqual((row.tests_passed, row.average_score, row.total_points_earned), (2, 85, 170))
+
+        submission = AssignmentSubmission.objects.create(assignment=self.assignment, user=self.learner)
+        submission.status = 'graded'
+        submission.score = 30
+        submission.save()
+        row = self.rollup()
+        self.assertEqual((row.assignments_submitted, row.assignments_graded, row.total_points_earned), (1, 1, 200))
+
+        attempt.delete()
+        row = self.rollup()
+        self.assertEqual((row.tests_attempted, row.average_score), (1, 80))
+
+    def test_adding_and_removing_units_rescales_completion(self):
+        for unit in self.units:
+            UnitProgress.objects.create(enrollment=self.enrollment, unit=unit, status='completed')
+        self.assertEqual(self.rollup().completion_percentage, 60)
+        self.quiz_unit.delete()
+        self.assertEqual(self.rollup().completion_percentage, 75)
+        Unit.objects.filter(module_type='assignment').delete()
+        row = self.rollup()
+        self.assertEqual(row.completion_percentage, 100)
+        self.assertIsNotNone(row.completed_at)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 100)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        UnitProgress.objects.create(enrollment=self.enrollment, unit=self.units[0], status='completed')
+        ModuleCompletion.objects.create(module=self.units[1], user=self.learner, is_completed=True, time_spent_minutes=7)
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=70, passed=True)
+        fields = ['modules_completed', 'completion_percentage', 'time_spent_minutes', 'tests_attempted',
+                  'tests_passed', 'average_score', 'total_points_earned', 'total_modules']
+        incremental = UserProgress.objects.values(*fields).get(user=self.learner)
+
+        UserProgress.objects.all().delete()
+        Enrollment.objects.update(progress_percentage=0)
+        call_command('rebuild_progress_rollups', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(UserProgress.objects.values(*fields).get(user=self.learner), incremental)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 40)
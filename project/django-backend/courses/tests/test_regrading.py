@@ -0,0 +1,119 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses import grading, regrading
+from courses.models import (
+    Profile, Course, Unit, Quiz, Question, QuizAttempt, Enrollment, UnitProgress, UserProgress, Leaderboard,
+)
+
+
+class RegradeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password', primary_role='trainer')
+        self.course = Course.objects.create(title='C', created_by=self.trainer)
+        self.unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=self.unit, passing_score=50, attempts_allowed=0)
+        # the key is wrong: Rome is the capital
+        self.capital = Question.objects.create(quiz=self.quiz, type='multiple_choice', text='Capital of Italy?',
+                                               options=['Paris', 'Rome'], correct_answer='Paris', order=0)
+        self.sky = Question.objects.create(quiz=self.quiz, type='true_false', text='The sky is blue',
+                                           options=[], correct_answer=True, order=1)
+        self.learners = []
+        for i, picks in enumerate([['Rome', 'Paris'], ['Paris'], ['Rome']]):
+            learner = Profile.objects.create_user(username=f'l{i}', email=f'l{i}@example.com', password='password', primary_role='trainee')
+            enrollment = Enrollment.objects.create(course=self.course, user=learner)
+            UnitProgress.objects.create(enrollment=enrollment, unit=self.unit, status='in_progress')
+            for pick in picks:
+                attempt, _ = grading.start_attempt(self.quiz.id, learner)
+                grading.submit_attempt(attempt.pk, learner, {str(self.capital.id): pick, str(self.sky.id): True})
+            self.learners.append(learner)
+        # a started but unsubmitted attempt is left alone
+        grading.start_attempt(self.quiz.id, self.learners[2])
+
+    def state(self, learner):
+        progress = UserProgress.objects.get(user=learner, course=self.course)
+        return {
+            'scores': sorted(QuizAttempt.objects.filter(user=learner, completed_at__isnull=False).values_list('score', flat=True)),
+            'passed': progress.tests_passed,
+            'quiz_points': progress.quiz_score_total,
+            'board': Leaderboard.objects.get(user=learner, course=self.course).quiz_score_total,
+            'unit_score': UnitProgress.objects.get(enrollment__user=learner, unit=self.unit).score,
+        }
+
+    def fix_key(self):
+        self.capital.correct_answer = 'Rome'
+        self.capital.save()
+
+    def test_regrade_updates_attempts_and_rollups(self):
+        self.assertEqual(self.state(self.learners[0]), {
+            'scores': [50, 100], 'passed': 2, 'quiz_points': 150, 'board': 150, 'unit_score': 100,
+        })
+        self.fix_key()
+        self.assertEqual(regrading.regrade_quiz(self.quiz.id, dry_run=True)['rescored'], 4)
+        self.assertEqual(self.state(self.learners[1])['scores'], [100])
+
+        report = regrading.regrade_quiz(self.quiz.id, chunk_size=2)
+        self.assertEqual(report, {
+            'attempts': 4, 'rescored': 4, 'outcomes_changed': 0, 'newly_passed': 0, 'newly_failed': 0,
+            'learners': 3, 'unit_scores_updated': 2,
+        })
+        self.assertEqual(self.state(self.learners[0]), {
+            'scores': [50, 100], 'passed': 2, 'quiz_points': 150, 'board': 150, 'unit_score': 100,
+        })
+        self.assertEqual(self.state(self.learners[1]), {
+            'scores': [50], 'passed': 1, 'quiz_points': 50, 'board': 50, 'unit_score': 50,
+        })
+        self.assertEqual(self.state(self.learners[2])['unit_score'], 100)
+        self.assertEqual(QuizAttempt.objects.filter(completed_at__isnull=True).count(), 1)
+
+        # nothing left to change
+        self.assertEqual(regrading.regrade_quiz(self.quiz.id)['rescored'], 0)
+
+    def test_pass_flips_and_rebuild_path(self):
+        self.quiz.passing_score = 100
+        self.quiz.save()
+        self.fix_key()
+        with mock.patch.object(regrading, 'REBUILD_THRESHOLD', 0):
+            report = regrading.regrade_quiz(self.quiz.id)
+        # outcomes were recorded at 50%: only the attempts now scoring 50 flip
+        self.assertEqual((report['newly_passed'], report['newly_failed']), (0, 2))
+        self.assertEqual(self.state(self.learners[1]), {
+            'scores': [50], 'passed': 0, 'quiz_points': 50, 'board': 50, 'unit_score': 50,
+        })
+        self.assertEqual(self.state(self.learners[2])['passed'], 1)
+
+    def test_regrade_leaves_enrollment_progress_alone(self):
+        Enrollment.objects.filter(course=self.course).update(progress_percentage=40)
+        self.fix_key()
+        regrading.regrade_quiz(self.quiz.id)
+        with mock.patch.object(regrading, 'REBUILD_THRESHOLD', 0):
+            self.capital.correct_answer = 'Paris'
+            self.capital.save()
+            regrading.regrade_quiz(self.quiz.id)
+        self.assertEqual(
+            list(Enrollment.objects.filter(course=self.course).values_list('progress_percentage', flat=True)),
+            [40, 40, 40],
+        )
+
+    def test_endpoint_and_command(self):
+        client = APIClient()
+        client.force_authenticate(self.learners[0])
+        self.assertEqual(client.post(f'/api/quizzes/{self.quiz.id}/regrade/').status_code, 403)
+        # trainers only regrade quizzes in their own courses
+        client.force_authenticate(Profile.objects.create_user(username='trainer2', email='trainer2@example.com', password='password', primary_role='trainer'))
+        self.assertEqual(client.post(f'/api/quizzes/{self.quiz.id}/regrade/').status_code, 403)
+        self.fix_key()
+        client.force_authenticate(self.trainer)
+        resp = client.post(f'/api/quizzes/{self.quiz.id}/regrade/?dry_run=true')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['rescored'], 4)
+
+        out = StringIO()
+        call_command('regrade_quiz', str(self.quiz.id), stdout=out)
+        self.assertIn('rescored=4', out.getvalue())
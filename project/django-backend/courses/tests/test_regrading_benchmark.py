@@ -0,0 +1,59 @@
+"""Timing benchmark for regrading 1M quiz attempts.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import time
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from courses import regrading
+from courses.models import Profile, Course, Unit, Quiz, Question, QuizAttempt
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class RegradeBenchmark(TransactionTestCase):
+    attempts = 1_000_000
+    learners = 50_000
+    questions = 10
+
+    def setUp(self):
+        trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        self.course = Course.objects.create(title='Big', created_by=trainer)
+        unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit, passing_score=60)
+        self.question_ids = [
+            str(Question.objects.create(quiz=self.quiz, type='multiple_choice', text=f'Q{i}', options=['a', 'b', 'c', 'd'],
+                                        correct_answer='a', order=i).id)
+            for i in range(self.questions)
+        ]
+        answers = ', '.join(
+            f"'{qid}', (ARRAY['a','b','c','d'])[1 + floor(random() * 4)::int]" for qid in self.question_ids
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (user_id, password_hash, is_superuser, username, first_name, last_name,
+                                   email, is_staff, is_active, date_joined, primary_role, created_at)
+                SELECT gen_random_uuid(), '!', false, 'rg' || n, '', '', 'rg' || n || '@example.com',
+                       false, true, now(), 'trainee', now()
+                FROM generate_series(1, %s) AS n
+            """, [self.learners])
+            cursor.execute(f"""
+                INSERT INTO quiz_attempts (id, quiz_id, user_id, score, passed, answers, started_at, completed_at)
+                SELECT gen_random_uuid(), %s, u.user_id, 0, false, jsonb_build_object({answers}), now(), now()
+                FROM (SELECT user_id, row_number() OVER () AS n FROM users WHERE username LIKE 'rg%%') u
+                CROSS JOIN generate_series(1, %s) AS k
+            """, [self.quiz.id, self.attempts // self.learners])
+            cursor.execute('ANALYZE quiz_attempts')
+
+    def test_regrade(self):
+        started = time.perf_counter()
+        report = regrading.regrade_quiz(self.quiz.id)
+        elapsed = time.perf_counter() - started
+        print(f'\nregraded {report["attempts"]} attempts ({report["rescored"]} rescored, '
+              f'{report["outcomes_changed"]} outcomes changed) in {elapsed:.1f}s')
+        self.assertEqual(report['attempts'], self.attempts)
+        self.assertEqual(QuizAttempt.objects.filter(passed=True).count(), report['newly_passed'])
+        self.assertLess(elapsed, 600)
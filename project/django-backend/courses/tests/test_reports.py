@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Quiz, QuizAttempt, Enrollment
+
+
+class ReportTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.learner = Profile.objects.create_user(username='learner1', email='learner1@example.com', password='password', first_name='Lee', last_name='Learner')
+        self.other = Profile.objects.create_user(username='learner2', email='learner2@example.com', password='password')
+        self.course = Course.objects.create(title='Safety', created_by=self.trainer)
+        unit = Unit.objects.create(course=self.course, module_type='quiz', title='Q', sequence_order=0)
+        self.quiz = Quiz.objects.create(unit=unit)
+
+        now = timezone.now()
+        self.old = now - timedelta(days=30)
+        Enrollment.objects.create(course=self.course, user=self.learner, status='completed', progress_percentage=100, assigned_at=self.old, started_at=now)
+        Enrollment.objects.create(course=self.course, user=self.other, status='in_progress', progress_percentage=40, assigned_at=now)
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=90, started_at=now)
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.learner, score=70, started_at=self.old)
+        QuizAttempt.objects.create(quiz=self.quiz, user=self.other, score=50, started_at=now)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_course_report(self):
+        with self.assertNumQueries(3):
+            resp = self.client.get(f'/api/reports/course/{self.course.id}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            'courseId': str(self.course.id),
+            'courseTitle': 'Safety',
+            'totalEnrollments': 2,
+            'inProgress': 1,
+            'completed': 1,
+            'averageProgress': 70,
+            'averageScore': 70,
+        })
+
+    def test_course_report_date_range(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        resp = self.client.get(f'/api/reports/course/{self.course.id}/', {'from': since})
+        data = resp.json()
+        self.assertEqual(data['totalEnrollments'], 1)
+        self.assertEqual(data['averageScore'], 70)
+
+        resp = self.client.get(f'/api/reports/course/{self.course.id}/', {'from': 'yesterday'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_learner_report(self):
+        resp = self.client.get(f'/api/reports/learner/{self.learner.id}/')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['userName'], 'Lee Learner')
+        self.assertEqual(data['coursesEnrolled'], 1)
+        self.assertEqual(data['coursesCompleted'], 1)
+        self.assertEqual(data['averageProgress'], 100)
+        self.assertEqual(data['totalQuizScore'], 160)
+        self.assertTrue(data['lastActivity'])
+
+    def test_course_report_requires_course_owner(self):
+        client = APIClient()
+        client.force_authenticate(user=self.other)
+        resp = client.get(f'/api/reports/course/{self.course.id}/')
+        self.assertEqual(resp.status_code, 403)
+        resp = client.get(f'/api/reports/learner/{self.learner.id}/')
+        self.assertEqual(resp.status_code, 403)
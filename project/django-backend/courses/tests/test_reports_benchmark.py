@@ -0,0 +1,73 @@
+"""Latency benchmark for the aggregated report endpoints.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import os
+import random
+import time
+import unittest
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, Quiz, QuizAttempt, Enrollment
+
+
+# Server-side budget for one report request, measured as the median of several runs.
+REPORT_LATENCY_BUDGET_MS = 250
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class ReportBenchmark(TestCase):
+    learners = 50_000
+    attempts_per_learner = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = Profile.objects.create_user(username='bench_trainer', email='bench_trainer@example.com', password='password')
+        cls.trainer.primary_role = 'trainer'
+        cls.trainer.save()
+        profiles = [
+            Profile(username=f'r{i}', email=f'r{i}@example.com', password='!')
+            for i in range(cls.learners)
+        ]
+        Profile.objects.bulk_create(profiles, batch_size=5000)
+        cls.course = Course.objects.create(title='Big', created_by=cls.trainer)
+        quizzes = []
+        for i in range(5):
+            unit = Unit.objects.create(course=cls.course, module_type='quiz', title=f'Q{i}', sequence_order=i)
+            quizzes.append(Quiz.objects.create(unit=unit))
+        statuses = ('assigned', 'in_progress', 'completed')
+        Enrollment.objects.bulk_create(
+            [Enrollment(course=cls.course, user=p, status=random.choice(statuses), progress_percentage=random.randint(0, 100)) for p in profiles],
+            batch_size=5000,
+        )
+        QuizAttempt.objects.bulk_create(
+            [
+                QuizAttempt(quiz=random.choice(quizzes), user=p, score=random.randint(0, 100))
+                for p in profiles for _ in range(cls.attempts_per_learner)
+            ],
+            batch_size=5000,
+        )
+        cls.sample_learner = profiles[0]
+
+    def _median_ms(self, url, runs=5):
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            resp = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            self.assertEqual(resp.status_code, 200)
+        return sorted(timings)[len(timings) // 2]
+
+    def test_course_report_within_budget(self):
+        elapsed = self._median_ms(f'/api/reports/course/{self.course.id}/')
+        print(f'\ncourse report over {self.learners} learners: {elapsed:.1f}ms')
+        self.assertLess(elapsed, REPORT_LATENCY_BUDGET_MS)
+
+    def test_learner_report_within_budget(self):
+        elapsed = self._median_ms(f'/api/reports/learner/{self.sample_learner.id}/')
+        print(f'\nlearner report: {elapsed:.1f}ms')
+        self.assertLess(elapsed, REPORT_LATENCY_BUDGET_MS)
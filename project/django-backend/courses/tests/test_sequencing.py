@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit, ModuleSequencing
+from courses.sequencing import find_cycle
+
+
+class SequencingTest(TestCase):
+    def setUp(self):
+        self.trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.trainer.primary_role = 'trainer'
+        self.trainer.save()
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.units = [
+            Unit.objects.create(course=self.course, module_type='text', title=f'M{i}', sequence_order=i)
+            for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+        self.url = f'/api/courses/{self.course.id}/sequence/'
+
+    def _chain(self, units, **extra):
+        return [
+            {'module_id': str(unit.id), 'preceding_module_id': str(units[i - 1].id) if i else None, **extra}
+            for i, unit in enumerate(units)
+        ]
+
+    def test_put_diffs_against_existing_rules(self):
+        resp = self.client.put(self.url, {'rules': self._chain(self.units)}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['created']), 4)
+        original = dict(ModuleSequencing.objects.values_list('module_id', 'sequence_id'))
+
+        rules = self._chain(self.units[:3])
+        rules[2]['drip_feed_delay_days'] = 3
+        resp = self.client.put(self.url, {'rules': rules}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['created'], [])
+        self.assertEqual(resp.json()['updated'], [str(original[self.units[2].id])])
+        self.assertEqual(resp.json()['deleted'], [str(original[self.units[3].id])])
+        # untouched rules keep their identity
+        self.assertEqual(
+            ModuleSequencing.objects.get(module=self.units[0]).sequence_id, original[self.units[0].id]
+        )
+        self.assertEqual(ModuleSequencing.objects.get(module=self.units[2]).drip_feed_delay_days, 3)
+
+        resp = self.client.get(self.url)
+        self.assertEqual(len(resp.json()), 3)
+
+    def test_invalid_rule_sets_change_nothing(self):
+        self.client.put(self.url, {'rules': self._chain(self.units)}, format='json')
+        before = set(ModuleSequencing.objects.values_list('sequence_id', 'preceding_module_id'))
+
+        cyclic = self._chain(self.units)
+        cyclic[0]['preceding_module_id'] = str(self.units[3].id)
+        other_course = Course.objects.create(title='U', created_by=self.trainer)
+        foreign = Unit.objects.create(course=other_course, module_type='text', title='X', sequence_order=0)
+        for rules in (
+            cyclic,
+            self._chain(self.units) + [{'module_id': str(foreign.id)}],
+            self._chain(self.units) + [{'module_id': str(self.units[0].id)}],
+            [{'module_id': 'nope'}],
+        ):
+            resp = self.client.put(self.url, {'rules': rules}, format='json')
+            self.assertEqual(resp.status_code, 400, rules)
+        self.assertIn('cycle', self.client.put(self.url, {'rules': cyclic}, format='json').json()['error'])
+        self.assertEqual(set(ModuleSequencing.objects.values_list('sequence_id', 'preceding_module_id')), before)
+
+    def test_query_count_is_constant(self):
+        many = self.units + [
+            Unit.objects.create(course=self.course, module_type='text', title=f'N{i}', sequence_order=10 + i)
+            for i in range(60)
+        ]
+        counts = []
+        for units in (self.units, many):
+            ModuleSequencing.objects.all().delete()
+            self.client.put(self.url, {'rules': self._chain(units[:2])}, format='json')
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.put(self.url, {'rules': self._chain(units, drip_feed_rule='time_based')}, format='json')
+            self.assertEqual(resp.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_find_cycle(self):
+        self.assertIsNone(find_cycle({1: None, 2: 1, 3: 2}))
+        self.assertEqual(find_cycle({1: 1}), [1, 1])
+        self.assertEqual(find_cycle({1: 3, 2: 1, 3: 2}), [1, 3, 2, 1])
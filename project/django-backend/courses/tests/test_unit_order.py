@@ -0,0 +1,95 @@
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from courses.models import Profile, Course, Unit
+
+
+def make_trainer():
+    trainer = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+    trainer.primary_role = 'trainer'
+    trainer.save()
+    return trainer
+
+
+class ReorderTest(TestCase):
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.course = Course.objects.create(title='T', created_by=self.trainer)
+        self.units = [
+            Unit.objects.create(course=self.course, module_type='text', title=f'M{i}', sequence_order=i)
+            for i in range(30)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+        self.url = f'/api/courses/{self.course.id}/reorder/'
+
+    def _order(self):
+        return list(Unit.objects.filter(course=self.course).order_by('sequence_order').values_list('id', flat=True))
+
+    def test_reorder_is_one_update_statement(self):
+        new_order = [u.id for u in reversed(self.units)]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(self.url, {'unit_ids': [str(i) for i in new_order]}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._order(), new_order)
+        self.assertEqual(
+            sorted(Unit.objects.filter(course=self.course).values_list('sequence_order', flat=True)), list(range(30))
+        )
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+    def test_move_one_unit(self):
+        ids = [u.id for u in self.units]
+        ids.insert(0, ids.pop(17))
+        resp = self.client.post(f'/api/trainer/v1/course/{self.course.id}/modules/reorder/', {'unit_ids': [str(i) for i in ids]}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()[0], {'id': str(self.units[17].id), 'sequence_order': 0})
+        self.assertEqual(self._order(), ids)
+
+    def test_rejects_incomplete_or_foreign_orderings(self):
+        before = self._order()
+        other = Course.objects.create(title='U', created_by=self.trainer)
+        foreign = Unit.objects.create(course=other, module_type='text', title='X', sequence_order=0)
+        ids = [str(u.id) for u in self.units]
+        for unit_ids in (ids[:-1], ids[:-1] + [str(foreign.id)], ids + [ids[0]], ['nope'], None):
+            resp = self.client.post(self.url, {'unit_ids': unit_ids}, format='json')
+            self.assertEqual(resp.status_code, 400, unit_ids)
+        self.assertEqual(self._order(), before)
+
+    def test_create_appends_after_last_position(self):
+        Unit.objects.filter(id=self.units[-1].id).delete()
+        resp = self.client.post('/api/units/', {'course': str(self.course.id), 'type': 'text', 'module_type': 'text', 'title': 'New'}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()['sequence_order'], 29)
+
+
+class ConcurrentCreateTest(TransactionTestCase):
+    def test_concurrent_creates_get_distinct_positions(self):
+        trainer = make_trainer()
+        course = Course.objects.create(title='T', created_by=trainer)
+        statuses = []
+
+        def worker(n):
+            client = APIClient()
+            client.force_authenticate(user=trainer)
+            try:
+                for i in range(5):
+                    resp = client.post('/api/units/', {'course': str(course.id), 'type': 'text', 'module_type': 'text', 'title': f'{n}-{i}'}, format='json')
+                    statuses.append(resp.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [201] * 30)
+        self.assertEqual(
+            sorted(Unit.objects.filter(course=course).values_list('sequence_order', flat=True)), list(range(30))
+        )
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from courses.models import Profile, MediaMetadata, UploadSession
+
+
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.chunk_patch = mock.patch('courses.uploads.UPLOAD_CHUNK_SIZE', 1024)
+        self.chunk_patch.start()
+        self.user = Profile.objects.create_user(username='trainer1', email='trainer1@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.payload = os.urandom(3 * 1024 + 500)
+
+    def tearDown(self):
+        self.chunk_patch.stop()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _start(self, **extra):
+        data = {'file_name': 'intro video.mp4', 'file_size': len(self.payload), 'type': 'video', **extra}
+        resp = self.client.post('/api/upload-sessions/', data, format='json')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        return resp.json()
+
+    def _put(self, session_id, index, body, **headers):
+        return self.client.put(
+            f'/api/upload-sessions/{session_id}/chunks/{index}/', body,
+            content_type='application/octet-stream', **headers,
+        )
+
+    def _piece(self, index):
+        return self.payload[index * 1024:(index + 1) * 1024]
+
+    def test_out_of_order_resumable_upload(self):
+        session = self._start()
+        self.assertEqual(session['total_chunks'], 4)
+        for index in (3, 1):
+            self.assertEqual(self._put(session['id'], index, self._piece(index)).status_code, 200)
+
+        # client reconnects and asks where to resume
+        state = self.client.get(f"/api/upload-sessions/{session['id']}/").json()
+        self.assertEqual(state['received'], [1, 3])
+        self.assertEqual(state['missing'], [0, 2])
+
+        digest = hashlib.sha256(self._piece(0)).hexdigest()
+        resp = self._put(session['id'], 0, self._piece(0), HTTP_X_CHUNK_SHA256=digest)
+        self.assertEqual(resp.json()['sha256'], digest)
+        self.assertEqual(self.client.post(f"/api/upload-sessions/{session['id']}/complete/").status_code, 409)
+        self._put(session['id'], 2, self._piece(2))
+        # re-sending a chunk replaces it
+        self._put(session['id'], 1, self._piece(1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(f"/api/upload-sessions/{session['id']}/complete/")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        body = resp.json()
+        self.assertEqual(body['sha256'], hashlib.sha256(self.payload).hexdigest())
+        media = MediaMetadata.objects.get(id=body['metadata']['id'])
+        self.assertEqual(media.file_size, len(self.payload))
+        self.assertEqual(media.mime_type, 'video/mp4')
+        self.assertEqual(media.file_name, 'intro_video.mp4')
+        self.assertEqual(media.storage_path, f"blobs/{body['sha256'][:2]}/{body['sha256']}.mp4")
+        with default_storage.open(media.storage_path, 'rb') as stored:
+            self.assertEqual(stored.read(), self.payload)
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'upload_parts', session['id'])))
+        self.assertEqual(self._put(session['id'], 0, self._piece(0)).status_code, 409)
+
+    def test_rejects_bad_chunks(self):
+        session = self._start()
+        self.assertEqual(self._put(session['id'], 0, self._piece(0)[:10]).status_code, 400)
+        self.assertEqual(self._put(session['id'], 4, b'x').status_code, 400)
+        resp = self._put(session['id'], 0, self._piece(0), HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.client.get(f"/api/upload-sessions/{session['id']}/").json()['received'], [])
+
+    def test_abort_and_ownership(self):
+        session = self._start()
+        self._put(session['id'], 0, self._piece(0))
+        other = APIClient()
+        other.force_authenticate(user=Profile.objects.create_user(username='x', email='x@example.com', password='password'))
+        self.assertEqual(other.get(f"/api/upload-sessions/{session['id']}/").status_code, 404)
+
+        self.assertEqual(self.client.delete(f"/api/upload-sessions/{session['id']}/").status_code, 204)
+        self.assertEqual(UploadSession.objects.get(id=session['id']).status, 'aborted')
+        self.assertFalse(default_storage.exists(f"upload_parts/{session['id']}/000000.part"))
+
+    def test_start_validation(self):
+        for data in ({'file_name': 'a.mp4', 'file_size': -1}, {'file_name': '', 'file_size': 10},
+                     {'file_name': 'a.mp4', 'file_size': 'big'}):
+            self.assertEqual(self.client.post('/api/upload-sessions/', data, format='json').status_code, 400)
+        session = self._start(file_name='../../etc/passwd', type='../x')
+        self.assertEqual(session['file_name'], 'passwd')
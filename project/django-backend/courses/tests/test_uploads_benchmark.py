@@ -0,0 +1,60 @@
+"""Memory benchmark for chunked uploads.
+
+Skipped by default; run with ``LMS_BENCHMARKS=1 python manage.py test courses/tests``.
+"""
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from django.test import TransactionTestCase, override_settings
+
+from courses.models import Profile
+from courses.uploads import complete_upload, receive_chunk, start_upload
+
+
+@unittest.skipUnless(os.environ.get('LMS_BENCHMARKS'), 'set LMS_BENCHMARKS=1 to run benchmarks')
+class UploadBenchmark(TransactionTestCase):
+    file_size = 512 * 1024 * 1024
+    block = os.urandom(8 * 1024 * 1024)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = Profile.objects.create_user(username='bench_uploader', email='bench_uploader@example.com', password='password')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_memory_stays_flat(self):
+        session = start_upload(self.user, 'lecture.mp4', self.file_size, 'video')
+        self.assertEqual(session.chunk_size, len(self.block))
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        for index in range(session.total_chunks):
+            # the body stream stands in for the WSGI input; it is not allocated by the upload code
+            receive_chunk(session, index, io.BytesIO(self.block), len(self.block))
+        received = time.perf_counter() - started
+        _, chunk_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        session = complete_upload(session)
+        assembled = time.perf_counter() - started
+        _, complete_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(session.media.file_size, self.file_size)
+        mib = 1024 * 1024
+        print(
+            f'\n{self.file_size // mib} MiB upload: chunks {received:.2f}s peak {chunk_peak / mib:.1f} MiB, '
+            f'complete {assembled:.2f}s peak {complete_peak / mib:.1f} MiB'
+        )
+        # a few storage blocks, not the file
+        self.assertLess(max(chunk_peak, complete_peak), 8 * mib)
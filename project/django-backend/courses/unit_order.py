@@ -0,0 +1,64 @@
+"""Unit positions within a course (``Unit.sequence_order``).
+
+``uq_module_sequence`` is declared ``DEFERRABLE INITIALLY IMMEDIATE``, so
+Postgres checks it at the end of each statement rather than row by row.  A
+whole new ordering is therefore written as one ``bulk_update`` statement,
+with no temporary renumbering.  Writers that pick positions lock the course
+row first, so concurrent creates queue for the next free position instead of
+colliding on the constraint.
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .availability import invalidate_course_graph
+from .enrollments import parse_uuids
+from .models import Course, Unit
+
+
+def lock_course(course_id):
+    """Take the course row lock for the rest of the transaction; False if there is no such course."""
+    return Course.objects.select_for_update().filter(pk=course_id).values_list('pk', flat=True).first() is not None
+
+
+def next_sequence_order(course_id):
+    """Position after the last unit; call with the course locked."""
+    last = Unit.objects.filter(course_id=course_id).aggregate(last=Max('sequence_order'))['last']
+    return 0 if last is None else last + 1
+
+
+def reorder_units(course, unit_ids):
+    """Renumber ``course``'s units 0..n-1 in the order of ``unit_ids``.
+
+    ``unit_ids`` must list every unit of the course exactly once.  Raises
+    ``ValueError`` otherwise.  Returns ``[(unit_id, sequence_order), ...]``.
+    """
+    ids, invalid = parse_uuids(unit_ids if isinstance(unit_ids, list) else [])
+    if invalid or not isinstance(unit_ids, list):
+        raise ValueError("'unit_ids' must be a list of UUIDs")
+    if len(ids) != len(unit_ids):
+        raise ValueError("'unit_ids' contains duplicates")
+
+    with transaction.atomic():
+        lock_course(course.pk)
+        units = Unit.objects.filter(course=course).only('id', 'sequence_order').in_bulk()
+        if set(units) != set(ids):
+            missing = len(set(units) - set(ids))
+            foreign = len(set(ids) - set(units))
+            raise ValueError(
+                f"'unit_ids' must list every unit of the course exactly once "
+                f"({missing} missing, {foreign} not in this course)"
+            )
+        now = timezone.now()
+        changed = []
+        for position, unit_id in enumerate(ids):
+            unit = units[unit_id]
+            if unit.sequence_order != position:
+                unit.sequence_order = position
+                unit.updated_at = now  # bulk_update skips auto_now
+                changed.append(unit)
+        if changed:
+            # one statement, so the deferrable constraint only sees the final ordering
+            Unit.objects.bulk_update(changed, ['sequence_order', 'updated_at'])
+            invalidate_course_graph(course.pk)
+    return [(unit_id, position) for position, unit_id in enumerate(ids)]
@@ -0,0 +1,235 @@
+"""Chunked, resumable media uploads.
+
+Protocol::
+
+    POST   /upload-sessions/                      {file_name, file_size, type, mime_type}
+    PUT    /upload-sessions/<id>/chunks/<n>/      raw bytes of chunk n (0-based)
+    GET    /upload-sessions/<id>/                 which chunks have arrived (resume point)
+    POST   /upload-sessions/<id>/complete/        assemble and record MediaMetadata
+    DELETE /upload-sessions/<id>/                 abort
+
+Every chunk is streamed from the request body into its own part file in
+``default_storage`` in 64 KiB pieces (``File.chunks``), hashed on the way
+through, and recorded as an ``UploadChunk`` row.  A repeated PUT simply
+replaces that chunk, so a client resumes by re-sending whatever
+``missing`` lists.  Completion reads the parts back to back through the same
+storage API, block by block, hashes them and hands them to
+``media_store.store_media``, which writes a new blob only for content it has
+not seen.  No step holds more than one block of the file in memory and the
+code works unchanged on the filesystem backend.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .media_store import hash_stream, store_media
+from .models import UploadChunk, UploadSession
+
+
+UPLOAD_CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+UPLOAD_MAX_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 5 * 1024 ** 3)
+UPLOAD_SESSION_TTL_HOURS = getattr(settings, 'MEDIA_UPLOAD_SESSION_TTL_HOURS', 48)
+
+
+class UploadError(ValueError):
+    """Client error in the upload protocol; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class HashingReader:
+    """Read-only file-like wrapper that hashes and counts what passes through.
+
+    Stops after ``limit`` bytes, so a body longer than announced cannot
+    overrun the chunk.
+    """
+
+    def __init__(self, stream, limit=None):
+        self.stream = stream
+        self.limit = limit
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        if self.limit is not None:
+            remaining = self.limit - self.size
+            if remaining <= 0:
+                return b''
+            size = remaining if size is None or size < 0 else min(size, remaining)
+        data = self.stream.read(size)
+        self.size += len(data)
+        self.hash.update(data)
+        return data
+
+
+class ConcatReader:
+    """File-like object reading a list of storage files back to back."""
+
+    def __init__(self, names, storage):
+        self.names = list(names)
+        self.storage = storage
+        self.current = None
+
+    def read(self, size=-1):
+        while True:
+            if self.current is None:
+                if not self.names:
+                    return b''
+                self.current = self.storage.open(self.names.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+
+def part_name(session, index):
+    return f'upload_parts/{session.id}/{index:06d}.part'
+
+
+def _save_exact(name, content):
+    """Save to exactly ``name``, replacing an earlier copy instead of picking a new name."""
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, File(content, name=name))
+
+
+def _clean_name(value):
+    try:
+        return get_valid_filename(os.path.basename(str(value or '')))
+    except SuspiciousFileOperation:
+        return ''
+
+
+def start_upload(user, file_name, file_size, file_type='general', mime_type=None):
+    try:
+        file_size = int(file_size)
+    except (TypeError, ValueError):
+        raise UploadError('file_size must be an integer')
+    # both end up in the storage path
+    file_name = _clean_name(file_name)
+    file_type = _clean_name(file_type) or 'general'
+    if not file_name:
+        raise UploadError('file_name is required')
+    if file_size < 0 or file_size > UPLOAD_MAX_SIZE:
+        raise UploadError(f'file_size must be between 0 and {UPLOAD_MAX_SIZE} bytes')
+    return UploadSession.objects.create(
+        uploaded_by=user, file_name=file_name[:255], file_type=file_type[:50],
+        mime_type=mime_type or None, total_size=file_size, chunk_size=UPLOAD_CHUNK_SIZE,
+    )
+
+
+def _require_open(session):
+    if session.status != 'uploading':
+        raise UploadError(f'upload is {session.status}', status=409)
+
+
+def receive_chunk(session, index, stream, content_length, sha256=None):
+    """Stream one chunk into storage and record it; returns the ``UploadChunk``."""
+    _require_open(session)
+    if not 0 <= index < session.total_chunks:
+        raise UploadError(f'chunk index must be between 0 and {session.total_chunks - 1}')
+    expected = session.expected_chunk_size(index)
+    if content_length is not None and content_length != expected:
+        raise UploadError(f'chunk {index} must be {expected} bytes, got {content_length}')
+
+    reader = HashingReader(stream, limit=expected)
+    name = part_name(session, index)
+    _save_exact(name, reader)
+    digest = reader.hash.hexdigest()
+    if reader.size != expected:
+        default_storage.delete(name)
+        raise UploadError(f'chunk {index} must be {expected} bytes, received {reader.size}')
+    if sha256 and sha256.lower() != digest:
+        default_storage.delete(name)
+        raise UploadError(f'chunk {index} checksum mismatch')
+
+    chunk, _ = UploadChunk.objects.update_or_create(
+        session=session, index=index,
+        defaults={'size': reader.size, 'sha256': digest, 'received_at': timezone.now()},
+    )
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return chunk
+
+
+def upload_state(session):
+    received = sorted(session.chunks.values_list('index', flat=True))
+    have = set(received)
+    return {
+        'id': str(session.id),
+        'status': session.status,
+        'file_name': session.file_name,
+        'file_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received': received,
+        'missing': [index for index in range(session.total_chunks) if index not in have],
+        'media_id': str(session.media_id) if session.media_id else None,
+    }
+
+
+def complete_upload(session):
+    """Store the assembled file through ``media_store`` and write its ``MediaMetadata`` row."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        _require_open(session)
+        chunks = list(session.chunks.order_by('index').values_list('index', 'size'))
+        missing = session.total_chunks - len(chunks)
+        if missing:
+            raise UploadError(f'{missing} chunk(s) missing', status=409)
+
+        parts = [part_name(session, index) for index, _ in chunks]
+        # hash first: content that is already stored is only referenced, never copied
+        digest, size = hash_stream(ConcatReader(parts, default_storage))
+        if size != session.total_size:
+            raise UploadError('assembled size does not match file_size', status=409)
+        media, _ = store_media(
+            lambda: ConcatReader(parts, default_storage), file_name=session.file_name,
+            file_type=session.file_type, mime_type=session.mime_type, uploaded_by=session.uploaded_by,
+            digest=digest, size=size,
+        )
+        session.status = 'completed'
+        session.sha256 = digest
+        session.media = media
+        session.save(update_fields=['status', 'sha256', 'media', 'updated_at'])
+        transaction.on_commit(lambda: _delete_parts(parts))
+    return session
+
+
+def _delete_parts(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def abort_upload(session):
+    _require_open(session)
+    parts = [part_name(session, index) for index in session.chunks.values_list('index', flat=True)]
+    session.chunks.all().delete()
+    session.status = 'aborted'
+    session.save(update_fields=['status', 'updated_at'])
+    _delete_parts(parts)
+
+
+def purge_stale_sessions(older_than_hours=UPLOAD_SESSION_TTL_HOURS):
+    """Abort uploads idle for longer than the TTL and free their parts; returns how many."""
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    count = 0
+    for session in UploadSession.objects.filter(status='uploading', updated_at__lt=cutoff):
+        abort_upload(session)
+        count += 1
+    return count
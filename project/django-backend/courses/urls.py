@@ -7,7 +7,10 @@ from .views import (
     PageUnitViewSet, QuizViewSet, QuestionViewSet, AssignmentViewSet,
     ScormPackageViewSet, SurveyViewSet, EnrollmentViewSet,
     UnitProgressViewSet, AssignmentSubmissionViewSet, QuizAttemptViewSet,
-    LeaderboardViewSet, MediaUploadViewSet, token_by_email, register
+    LeaderboardViewSet, MediaUploadViewSet, EnrollmentJobViewSet, UploadSessionViewSet,
+    TestBankViewSet, TestViewSet, TestQuestionViewSet, TestAttemptViewSet,
+    token_by_email, register, course_report_view, learner_report_view,
+    export_view
 )
 
 router = DefaultRouter()
@@ -25,11 +28,17 @@ router.register(r'assignments', AssignmentViewSet)
 router.register(r'scorm-packages', ScormPackageViewSet)
 router.register(r'surveys', SurveyViewSet)
 router.register(r'enrollments', EnrollmentViewSet)
+router.register(r'enrollment-jobs', EnrollmentJobViewSet)
 router.register(r'unit-progress', UnitProgressViewSet)
 router.register(r'assignment-submissions', AssignmentSubmissionViewSet)
 router.register(r'quiz-attempts', QuizAttemptViewSet)
 router.register(r'leaderboard', LeaderboardViewSet)
+router.register(r'test-banks', TestBankViewSet)
+router.register(r'tests', TestViewSet)
+router.register(r'test-questions', TestQuestionViewSet)
+router.register(r'test-attempts', TestAttemptViewSet)
 router.register(r'media', MediaUploadViewSet, basename='media')
+router.register(r'upload-sessions', UploadSessionViewSet, basename='upload-session')
 
 # Trainer-specific alias routes (keeps frontend compatibility with /trainer/v1/* paths)
 from django.urls import path
@@ -44,6 +53,7 @@ trainer_urls = [
     path('trainer/v1/course/<uuid:pk>/sequence/', CourseViewSet.as_view({'get': 'sequence', 'put': 'sequence'}), name='trainer-course-sequence'),
     path('trainer/v1/course/<uuid:pk>/assign/', CourseViewSet.as_view({'post': 'assign'}), name='trainer-course-assign'),
     path('trainer/v1/course/<uuid:pk>/modules/', CourseViewSet.as_view({'get': 'units'}), name='trainer-course-modules'),
+    path('trainer/v1/course/<uuid:pk>/modules/reorder/', CourseViewSet.as_view({'post': 'reorder'}), name='trainer-course-modules-reorder'),
     # module-level preview
     path('trainer/module/<uuid:pk>/content/preview/', UnitViewSet.as_view({'post': 'preview_content'}), name='trainer-module-preview'),
 ]
@@ -52,6 +62,9 @@ urlpatterns = [
     path('auth/login/', obtain_auth_token, name='api_token_auth'),
     path('auth/register/', register, name='register'),
     path('auth/token_by_email/', token_by_email, name='token_by_email'),
+    path('reports/course/<uuid:course_id>/', course_report_view, name='course-report'),
+    path('reports/learner/<uuid:user_id>/', learner_report_view, name='learner-report'),
+    path('exports/<slug:kind>.<slug:fmt>', export_view, name='export'),
     path('', include(router.urls)),
 ]
 
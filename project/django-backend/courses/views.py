@@ -2,18 +2,27 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from pymongo.errors import PyMongoError
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.authtoken.models import Token
-from django.db import IntegrityError
+from rest_framework.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError as DjangoValidationError
+import io
 import os
 
 from .models import (
     Profile, Course, Unit, VideoUnit, AudioUnit, PresentationUnit,
     TextUnit, PageUnit, Quiz, Question, Assignment, ScormPackage,
     Survey, Enrollment, UnitProgress, AssignmentSubmission,
-    QuizAttempt, Leaderboard, MediaMetadata, Team, TeamMember
+    QuizAttempt, Leaderboard, MediaMetadata, Team, TeamMember, EnrollmentJob,
+    ModuleSequencing, UploadSession, TestBank, Test, TestQuestion, TestAttempt
 )
 from .serializers import (
     ProfileSerializer, CourseSerializer, CourseDetailSerializer,
@@ -22,8 +31,34 @@ from .serializers import (
     QuizSerializer, QuestionSerializer, AssignmentSerializer,
     ScormPackageSerializer, SurveySerializer, EnrollmentSerializer,
     UnitProgressSerializer, AssignmentSubmissionSerializer,
-    QuizAttemptSerializer, LeaderboardSerializer, MediaMetadataSerializer
+    QuizAttemptSerializer, LeaderboardSerializer, MediaMetadataSerializer,
+    EnrollmentJobSerializer, TestBankSerializer, TestSerializer,
+    TestQuestionSerializer, TestAttemptSerializer
 )
+from .enrollments import assign_course, parse_uuids
+from .jobs import submit_enrollment_job
+from .cloning import clone_course
+from .sequencing import replace_sequencing, serialize_rule
+from .availability import learner_availability
+from .unit_order import lock_course, next_sequence_order, reorder_units
+from .uploads import (
+    UploadError, start_upload, receive_chunk, upload_state, complete_upload, abort_upload,
+)
+from .stats import enrollment_stats, enrollment_stats_many, total_learners
+from .reports import parse_date_range, course_report, learner_report
+from .media_store import store_media, storage_report
+from .media_processing import processing_metrics
+from .media_serving import MediaNegotiation, can_access, media_response, sign_path, signed_user_id
+from .exports import EXPORTS, FORMATS as EXPORT_FORMATS, export_rows
+from .pagination import KeysetPaginationMixin
+from .permissions import IsTrainerOrReadOnly
+from .grading import AttemptError, answer_key, review_attempt, start_attempt, submit_attempt
+from .delivery import delivered_questions, question_payload
+from .regrading import regrade_quiz
+from .item_analysis import item_statistics, refresh_item_analysis
+from . import assessments
+from . import content_store
+from . import leaderboard
 
 
 @api_view(['POST'])
@@ -89,6 +124,87 @@ def register(request):
         return Response({'error': 'Signup failed'}, status=400)
 
 
+def _report_range(request):
+    try:
+        return parse_date_range(request.query_params), None
+    except ValueError as exc:
+        return None, Response({'error': str(exc)}, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def course_report_view(request, course_id):
+    """Aggregated course report. GET ?from=YYYY-MM-DD&to=YYYY-MM-DD (both optional)"""
+    user = request.user
+    try:
+        course = Course.objects.only('id', 'title', 'created_by_id').get(id=course_id)
+    except Course.DoesNotExist:
+        return Response({'error': 'Course not found'}, status=404)
+    if not (user.is_superuser or course.created_by_id == user.id):
+        return Response({'detail': 'Trainer permission required'}, status=403)
+    date_range, error = _report_range(request)
+    if error:
+        return error
+    return Response(course_report(course, *date_range))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def learner_report_view(request, user_id):
+    """Aggregated learner report. GET ?from=YYYY-MM-DD&to=YYYY-MM-DD (both optional)"""
+    user = request.user
+    if not (user.is_superuser or user.id == user_id or getattr(user, 'primary_role', '') in ('trainer', 'manager')):
+        return Response({'detail': 'Trainer permission required'}, status=403)
+    try:
+        profile = Profile.objects.get(id=user_id)
+    except Profile.DoesNotExist:
+        return Response({'error': 'user not found'}, status=404)
+    date_range, error = _report_range(request)
+    if error:
+        return error
+    return Response(learner_report(profile, *date_range))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_view(request, kind, fmt):
+    """Stream every matching row as CSV or NDJSON.
+    GET /exports/<enrollments|quiz-attempts|unit-progress>.<csv|ndjson>?course_id=&team_id=&from=&to=
+    """
+    user = request.user
+    if not (user.is_superuser or getattr(user, 'primary_role', '') in ('trainer', 'manager', 'admin')):
+        return Response({'detail': 'Trainer permission required'}, status=403)
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        return Response({'error': 'Unknown export'}, status=404)
+    filters = {}
+    for name in ('course_id', 'team_id'):
+        raw = request.query_params.get(name)
+        if raw:
+            valid, _ = parse_uuids([raw])
+            if not valid:
+                return Response({'error': f'{name} must be a UUID'}, status=400)
+            filters[name] = valid[0]
+    if not user.is_superuser and getattr(user, 'primary_role', '') == 'trainer':
+        # as for course reports, trainers only see the courses they created; managers and admins audit everything
+        course_id = filters.get('course_id')
+        if course_id:
+            owner_id = Course.objects.filter(id=course_id).values_list('created_by_id', flat=True).first()
+            if owner_id is None:
+                return Response({'error': 'Course not found'}, status=404)
+            if owner_id != user.id:
+                return Response({'detail': 'Trainer permission required'}, status=403)
+        filters['owner_id'] = user.id
+    date_range, error = _report_range(request)
+    if error:
+        return error
+    filters['start'], filters['end'] = date_range
+
+    rows = export_rows(kind, fmt, **filters)
+    response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
 class ProfileViewSet(viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
@@ -113,8 +229,17 @@ class CourseViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # align with Profile.primary_role mapping
         if getattr(user, 'primary_role', '') == 'trainer':
-            return Course.objects.filter(created_by=user)
-        return Course.objects.filter(enrollments__user=user)
+            queryset = Course.objects.filter(created_by=user)
+        else:
+            queryset = Course.objects.filter(enrollments__user=user)
+        if self.action == 'list':
+            queryset = queryset.with_list_stats()
+        elif self.action in ('retrieve', 'units'):
+            # nested UnitSerializer touches every subtype; load them in a fixed number of queries
+            queryset = queryset.select_related('created_by').prefetch_related(
+                Prefetch('units', queryset=Unit.objects.with_details())
+            )
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -126,6 +251,42 @@ class CourseViewSet(viewsets.ModelViewSet):
         serializer = UnitSerializer(units, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """Which modules a learner may open now, and unlock times for the rest. GET ?user_id= (trainers)"""
+        user = request.user
+        course = self.get_object()
+        target = request.query_params.get('user_id') or str(user.id)
+        if target != str(user.id) and not (user.is_superuser or getattr(user, 'primary_role', '') == 'trainer'):
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        valid, _ = parse_uuids([target])
+        if not valid:
+            return Response({'error': 'user_id must be a UUID'}, status=400)
+        try:
+            enrollment = Enrollment.objects.only('course_id', 'user_id', 'assigned_at').get(course=course, user_id=valid[0])
+        except Enrollment.DoesNotExist:
+            return Response({'error': 'Learner is not enrolled in this course'}, status=404)
+        now = timezone.now()
+        return Response({
+            'course_id': str(course.id),
+            'user_id': str(enrollment.user_id),
+            'evaluated_at': now.isoformat(),
+            'modules': learner_availability(enrollment, now),
+        })
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def reorder(self, request, pk=None):
+        """Apply a complete new unit ordering. Input: {"unit_ids": [...]} (every unit, new order). Trainer only."""
+        user = request.user
+        if not (user.is_superuser or getattr(user, 'primary_role', '') == 'trainer'):
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        course = self.get_object()
+        try:
+            order = reorder_units(course, request.data.get('unit_ids'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        return Response([{'id': str(unit_id), 'sequence_order': position} for unit_id, position in order])
+
     @action(detail=True, methods=['post'])
     def publish(self, request, pk=None):
         course = self.get_object()
@@ -136,48 +297,15 @@ class CourseViewSet(viewsets.ModelViewSet):
     # --- Trainer-only actions (aliases under /trainer/v1/* will point here) ---
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def duplicate(self, request, pk=None):
-        """Duplicate a course (deep-copy metadata + modules/questions). Trainer only."""
+        """Duplicate a course (deep-copy metadata, modules, all module content and sequencing). Trainer only."""
         user = request.user
         if not (getattr(user, 'is_superuser', False) or getattr(user, 'primary_role', '') == 'trainer'):
             return Response({'detail': 'Trainer permission required'}, status=403)
 
-        orig = self.get_object()
-        # shallow clone course fields
-        dup = Course.objects.create(
-            title=f"{orig.title} (copy)",
-            description=orig.description,
-            about=orig.about,
-            outcomes=orig.outcomes,
-            course_type=orig.course_type,
-            status='draft',
-            is_mandatory=orig.is_mandatory,
-            estimated_duration_hours=orig.estimated_duration_hours,
-            passing_criteria=orig.passing_criteria,
-            created_by=user
-        )
-        # clone units and their subtype data
-        for unit in orig.units.all():
-            new_unit = Unit.objects.create(
-                course=dup,
-                module_type=unit.module_type,
-                title=unit.title,
-                description=unit.description,
-                sequence_order=unit.sequence_order,
-                is_mandatory=unit.is_mandatory,
-                estimated_duration_minutes=unit.estimated_duration_minutes,
-                video_count=unit.video_count,
-                has_quizzes=unit.has_quizzes
-            )
-            # clone subtype data where available; be defensive if subtype tables are missing
-            try:
-                if hasattr(unit, 'quiz_details') and unit.quiz_details:
-                    quiz = unit.quiz_details
-                    new_quiz = Quiz.objects.create(unit=new_unit, time_limit=quiz.time_limit, passing_score=quiz.passing_score, attempts_allowed=quiz.attempts_allowed, show_answers=quiz.show_answers, randomize_questions=quiz.randomize_questions, mandatory_completion=quiz.mandatory_completion)
-                    for q in quiz.questions.all():
-                        Question.objects.create(quiz=new_quiz, type=q.type, text=q.text, options=q.options, correct_answer=q.correct_answer, points=q.points, order=q.order)
-            except Exception:
-                # If related subtype tables are absent (e.g., quizzes table missing), skip cloning subtype data.
-                continue
+        dup = clone_course(self.get_object(), user)
+        dup = Course.objects.select_related('created_by').prefetch_related(
+            Prefetch('units', Unit.objects.with_details())
+        ).get(pk=dup.pk)
         # Attempt to return a full detail representation; if nested subtype tables are
         # missing, fall back to a minimal CourseSerializer to avoid raising a 500.
         try:
@@ -197,36 +325,23 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         course = self.get_object()
         if request.method == 'GET':
-            seq = ModuleSequencing.objects.filter(course=course)
-            data = []
-            for s in seq:
-                data.append({
-                    'sequence_id': str(s.sequence_id),
-                    'module_id': str(s.module_id),
-                    'preceding_module_id': str(s.preceding_module_id) if s.preceding_module_id else None,
-                    'drip_feed_rule': s.drip_feed_rule,
-                    'drip_feed_delay_days': s.drip_feed_delay_days,
-                    'prerequisite_completed': s.prerequisite_completed
-                })
-            return Response(data)
-
-        # PUT: replace sequencing rules atomically
-        rules = request.data.get('rules', [])
-        # basic validation
-        ModuleSequencing.objects.filter(course=course).delete()
-        created = []
-        for r in rules:
-            module = Unit.objects.get(id=r['module_id'])
-            preceding = None
-            if r.get('preceding_module_id'):
-                preceding = Unit.objects.get(id=r['preceding_module_id'])
-            ms = ModuleSequencing.objects.create(course=course, module=module, preceding_module=preceding, drip_feed_rule=r.get('drip_feed_rule','none'), drip_feed_delay_days=r.get('drip_feed_delay_days',0), prerequisite_completed=r.get('prerequisite_completed', False))
-            created.append(str(ms.sequence_id))
-        return Response({'created': created})
+            rules = ModuleSequencing.objects.filter(course=course)
+            return Response([serialize_rule(rule) for rule in rules])
+
+        # PUT: replace the whole rule set; validated first, then applied as one bulk diff
+        try:
+            result = replace_sequencing(course, request.data.get('rules', []))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        return Response(result)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def assign(self, request, pk=None):
-        """Assign course to list of users or teams. Input: {"user_ids":[], "team_ids":[]}"""
+        """Assign course to list of users or teams. Input: {"user_ids":[], "team_ids":[], "async": false}
+
+        With ``async`` set the assignment runs as a background job and the
+        response is 202 with the job id to poll at /enrollment-jobs/{id}/.
+        """
         user = request.user
         if not (user.is_superuser or getattr(user, 'primary_role', '') == 'trainer'):
             return Response({'detail': 'Trainer permission required'}, status=403)
@@ -234,28 +349,12 @@ class CourseViewSet(viewsets.ModelViewSet):
         course = self.get_object()
         user_ids = request.data.get('user_ids', []) or []
         team_ids = request.data.get('team_ids', []) or []
-        created = 0
-        # assign explicit users
-        for uid in user_ids:
-            try:
-                u = Profile.objects.get(id=uid)
-                if not Enrollment.objects.filter(course=course, user=u).exists():
-                    Enrollment.objects.create(course=course, user=u, assigned_by=user, status='assigned')
-                    created += 1
-            except Profile.DoesNotExist:
-                continue
-        # assign team members
-        for tid in team_ids:
-            members = TeamMember.objects.filter(team_id=tid).values_list('user_id', flat=True)
-            for uid in members:
-                try:
-                    u = Profile.objects.get(id=uid)
-                    if not Enrollment.objects.filter(course=course, user=u).exists():
-                        Enrollment.objects.create(course=course, user=u, assigned_by=user, status='assigned')
-                        created += 1
-                except Profile.DoesNotExist:
-                    continue
-        return Response({'created': created})
+        if request.data.get('async'):
+            job = submit_enrollment_job(course, user, user_ids=user_ids, team_ids=team_ids)
+            return Response(EnrollmentJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        result = assign_course(course, user, user_ids=user_ids, team_ids=team_ids)
+        return Response(result)
+
     @action(detail=True, methods=['get'])
     def assignable_learners(self, request, pk=None):
         course = self.get_object()
@@ -268,14 +367,21 @@ class CourseViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def enrollment_stats(self, request, pk=None):
         course = self.get_object()
-        enrollments = Enrollment.objects.filter(course=course)
-        total_learners = Profile.objects.filter(role='learner').count()
+        stats = enrollment_stats(course.id)
+        return Response({**stats, 'total_learners': total_learners()})
+
+    @action(detail=False, methods=['get'], url_path='enrollment-stats')
+    def enrollment_stats_batch(self, request):
+        """Stats for many courses at once: GET ?course_ids=<id>,<id>,..."""
+        raw_ids = request.query_params.get('course_ids', '')
+        course_ids, _ = parse_uuids([cid for cid in raw_ids.split(',') if cid])
+        if not course_ids:
+            return Response({'error': 'course_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        # only report on courses visible to the caller
+        visible = self.get_queryset().filter(id__in=course_ids).values_list('id', flat=True).distinct()
         return Response({
-            'total_enrolled': enrollments.count(),
-            'total_learners': total_learners,
-            'completed': enrollments.filter(status='completed').count(),
-            'in_progress': enrollments.filter(status='in_progress').count(),
-            'assigned': enrollments.filter(status='assigned').count()
+            'courses': enrollment_stats_many(visible),
+            'total_learners': total_learners(),
         })
 
 
@@ -286,39 +392,34 @@ class UnitViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         course_id = self.request.query_params.get('course_id')
+        queryset = Unit.objects.with_details()
         if course_id:
-            return Unit.objects.filter(course_id=course_id)
-        return Unit.objects.all()
+            return queryset.filter(course_id=course_id)
+        return queryset
 
     def create(self, request, *args, **kwargs):
-        """Override create to auto-assign sequence_order and handle errors gracefully."""
+        """Override create to auto-assign sequence_order and handle errors gracefully.
+
+        The course row is locked while the position is picked and the unit
+        inserted, so concurrent creates get consecutive positions.
+        """
         data = request.data.copy()
         course_id = data.get('course') or data.get('course_id')
-        
-        # Auto-assign sequence_order if not provided
-        if data.get('sequence_order') is None and data.get('order') is None:
-            if not course_id:
-                return Response({'course': 'course is required'}, status=400)
-            try:
-                from django.db.models import Max
-                result = Unit.objects.filter(course_id=course_id).aggregate(Max('sequence_order'))
-                max_seq = result.get('sequence_order__max')
-                next_seq = (max_seq if max_seq is not None else -1) + 1
-                data['sequence_order'] = next_seq
-            except Exception as e:
-                return Response({'detail': f'Error calculating sequence order: {str(e)}'}, status=400)
-
-        serializer = self.get_serializer(data=data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=400)
-        
+        auto_order = data.get('sequence_order') is None and data.get('order') is None
+        if auto_order and not course_id:
+            return Response({'course': 'course is required'}, status=400)
+        course_ids, _ = parse_uuids([course_id] if course_id else [])
+
         try:
-            unit = serializer.save()
-        except Exception as exc:
-            from django.db import IntegrityError
-            if isinstance(exc, IntegrityError):
-                return Response({'detail': 'Sequence order conflict - this position is already used'}, status=400)
-            return Response({'detail': str(exc)}, status=500)
+            with transaction.atomic():
+                if course_ids and lock_course(course_ids[0]) and auto_order:
+                    data['sequence_order'] = next_sequence_order(course_ids[0])
+                serializer = self.get_serializer(data=data)
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=400)
+                unit = serializer.save()
+        except IntegrityError:
+            return Response({'detail': 'Sequence order conflict - this position is already used'}, status=400)
 
         resp = {
             'id': str(unit.id),
@@ -353,6 +454,25 @@ class UnitViewSet(viewsets.ModelViewSet):
         # For now, return success and echo a lightweight preview url placeholder
         return Response({'valid': True, 'preview_url': f"/preview/{module.id}/tmp"})
 
+    @action(detail=True, methods=['get', 'put'], url_path='content-items')
+    def content_items(self, request, pk=None):
+        """The module's Mongo content items; PUT replaces the whole list (?ordered=false for an unordered bulk write)."""
+        if not Unit.objects.filter(pk=pk).exists():
+            return Response({'error': 'Module not found'}, status=404)
+        try:
+            if request.method == 'GET':
+                return Response({'items': content_store.module_items(pk)})
+            user = request.user
+            if not (user.is_superuser or getattr(user, 'primary_role', '') == 'trainer'):
+                return Response({'detail': 'Trainer permission required'}, status=403)
+            ordered = request.query_params.get('ordered', 'true').lower() != 'false'
+            result = content_store.save_module_items(pk, request.data.get('items'), ordered=ordered)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        except PyMongoError:
+            return Response({'error': 'Content store unavailable'}, status=503)
+        return Response(result)
+
 
 class VideoUnitViewSet(viewsets.ModelViewSet):
     queryset = VideoUnit.objects.all()
@@ -384,11 +504,53 @@ class PageUnitViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
+def _is_trainer(user):
+    return user.is_superuser or getattr(user, 'primary_role', '') in ('trainer', 'manager', 'admin')
+
+
+def _manages_course(user, course_id):
+    """Superusers, and trainers on the courses they created."""
+    if user.is_superuser:
+        return True
+    return _is_trainer(user) and Course.objects.filter(id=course_id, created_by_id=user.id).exists()
+
+
 class QuizViewSet(viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Open an attempt (or resume the open one) with its questions; the time limit runs from here."""
+        try:
+            attempt, created = start_attempt(pk, request.user)
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        except DjangoValidationError:
+            return Response({'error': 'Quiz not found'}, status=404)
+        questions = question_payload(delivered_questions(answer_key(attempt.quiz_id), attempt.seed))
+        return Response({**QuizAttemptSerializer(attempt).data, 'questions': questions}, status=201 if created else 200)
+
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        """Rescore all submitted attempts against the current answer key (?dry_run=true to preview). Course trainer only."""
+        quiz = self.get_object()
+        if not _manages_course(request.user, quiz.unit.course_id):
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        dry_run = request.query_params.get('dry_run', 'false').lower() == 'true'
+        return Response(regrade_quiz(quiz.pk, dry_run=dry_run))
+
+    @action(detail=True, methods=['get'], url_path='item-analysis')
+    def item_analysis(self, request, pk=None):
+        """Per-question difficulty, discrimination and distractor counts (?refresh=true to fold in new attempts first). Course trainer only."""
+        quiz = self.get_object()
+        if not _manages_course(request.user, quiz.unit.course_id):
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        if request.query_params.get('refresh', 'false').lower() == 'true':
+            refresh_item_analysis(quiz.pk)
+        return Response(item_statistics(quiz.pk))
+
 
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
@@ -420,17 +582,18 @@ class SurveyViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_field = 'assigned_at'
 
     def get_queryset(self):
         user = self.request.user
         course_id = self.request.query_params.get('course_id')
 
-        queryset = Enrollment.objects.all()
-        if user.role == 'learner':
+        queryset = Enrollment.objects.select_related('user', 'course')
+        if not user.is_superuser and getattr(user, 'primary_role', '') == 'trainee':
             queryset = queryset.filter(user=user)
         elif course_id:
             queryset = queryset.filter(course_id=course_id)
@@ -463,46 +626,57 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        enrollments = []
-        for user_id in user_ids:
-            try:
-                user = Profile.objects.get(id=user_id)
-                if not Enrollment.objects.filter(course=course, user=user).exists():
-                    enrollments.append(Enrollment(
-                        course=course,
-                        user=user,
-                        assigned_by=request.user,
-                        status='assigned'
-                    ))
-            except Profile.DoesNotExist:
-                continue
-
-        if enrollments:
-            Enrollment.objects.bulk_create(enrollments)
+        if request.data.get('async'):
+            job = submit_enrollment_job(course, request.user, user_ids=user_ids)
+            return Response(EnrollmentJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        result = assign_course(course, request.user, user_ids=user_ids)
 
         return Response({
-            'created': len(enrollments),
-            'message': f'{len(enrollments)} learners enrolled successfully'
+            'created': result['created'],
+            'skipped': result['skipped'],
+            'not_found': result['users']['not_found'],
+            'message': f"{result['created']} learners enrolled successfully"
         })
 
 
-class UnitProgressViewSet(viewsets.ModelViewSet):
-    queryset = UnitProgress.objects.all()
+class EnrollmentJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progress polling for background assignment jobs."""
+    queryset = EnrollmentJob.objects.all()
+    serializer_class = EnrollmentJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = EnrollmentJob.objects.all()
+        if not user.is_superuser:
+            queryset = queryset.filter(requested_by=user)
+        course_id = self.request.query_params.get('course_id')
+        if course_id:
+            queryset = queryset.filter(course_id=course_id)
+        return queryset
+
+
+class UnitProgressViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = UnitProgress.objects.select_related('unit')
     serializer_class = UnitProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_field = 'created_at'
 
 
-class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
+class AssignmentSubmissionViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = AssignmentSubmission.objects.all()
     serializer_class = AssignmentSubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    keyset_field = 'submitted_at'
 
     def get_queryset(self):
         user = self.request.user
-        if user.role == 'trainer':
-            return AssignmentSubmission.objects.all()
-        return AssignmentSubmission.objects.filter(user=user)
+        queryset = AssignmentSubmission.objects.select_related('user')
+        if user.is_superuser or getattr(user, 'primary_role', '') == 'trainer':
+            return queryset
+        return queryset.filter(user=user)
 
     @action(detail=True, methods=['post'])
     def grade(self, request, pk=None):
@@ -515,16 +689,217 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
         return Response({'status': 'graded'})
 
 
-class QuizAttemptViewSet(viewsets.ModelViewSet):
+class QuizAttemptViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
+    """Attempts are only written by grading: create, start (on the quiz) and submit; no edits or deletes."""
     queryset = QuizAttempt.objects.all()
     serializer_class = QuizAttemptSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_field = 'started_at'
 
     def get_queryset(self):
         user = self.request.user
-        if user.role == 'learner':
-            return QuizAttempt.objects.filter(user=user)
-        return QuizAttempt.objects.all()
+        queryset = QuizAttempt.objects.select_related('user')
+        if not _is_trainer(user):
+            return queryset.filter(user=user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """Untimed one-step attempt: {"quiz": <id>, "answers": {...}}, graded on the server.
+
+        Timed quizzes and quizzes that draw a subset of questions answer 409: start them with
+        POST /quizzes/<id>/start/ and submit the attempt.
+        """
+        quiz_id = request.data.get('quiz')
+        answers = request.data.get('answers', {})
+        if not parse_uuids([quiz_id])[0]:
+            return Response({'error': "'quiz' must be a quiz id"}, status=400)
+        if not isinstance(answers, dict):
+            return Response({'error': "'answers' must be an object keyed by question id"}, status=400)
+        try:
+            attempt, _ = start_attempt(quiz_id, request.user, seeded=False)
+            attempt, result = submit_attempt(attempt.pk, request.user, answers)
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response({**self.get_serializer(attempt).data, 'grading': result}, status=201)
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """Grade an attempt opened with POST /quizzes/<id>/start/. Input: {"answers": {question_id: answer}}"""
+        try:
+            attempt, result = submit_attempt(pk, request.user, request.data.get('answers', {}))
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        except DjangoValidationError:
+            return Response({'error': 'Attempt not found'}, status=404)
+        return Response({**self.get_serializer(attempt).data, 'grading': result})
+
+    @action(detail=True, methods=['post'])
+    def review(self, request, pk=None):
+        """Settle questions waiting for review: {"reviews": {question_id: true|false}}. Course trainer only."""
+        try:
+            attempt = QuizAttempt.objects.filter(pk=pk).values('quiz__unit__course_id').first()
+        except DjangoValidationError:
+            attempt = None
+        if attempt is None:
+            return Response({'error': 'Attempt not found'}, status=404)
+        if not _manages_course(request.user, attempt['quiz__unit__course_id']):
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        try:
+            attempt, result = review_attempt(pk, request.data.get('reviews'))
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response({**self.get_serializer(attempt).data, 'grading': result})
+
+    @action(detail=True, methods=['get'])
+    def questions(self, request, pk=None):
+        """The caller's attempt's questions in delivery order, without answers (shown after submission if the quiz allows)."""
+        try:
+            attempt = QuizAttempt.objects.filter(pk=pk, user=request.user).first()
+        except DjangoValidationError:
+            attempt = None
+        if attempt is None:
+            return Response({'error': 'Attempt not found'}, status=404)
+        key = answer_key(attempt.quiz_id)
+        reveal = attempt.completed_at is not None and key.show_answers
+        return Response({
+            'attempt': str(attempt.pk),
+            'questions': question_payload(delivered_questions(key, attempt.seed), with_answers=reveal),
+        })
+
+
+class TestBankViewSet(viewsets.ModelViewSet):
+    queryset = TestBank.objects.order_by('name')
+    serializer_class = TestBankSerializer
+    permission_classes = [permissions.IsAuthenticated, IsTrainerOrReadOnly]
+
+    def get_queryset(self):
+        category = self.request.query_params.get('category')
+        if category:
+            return self.queryset.filter(category=category)
+        return self.queryset
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class TestQuestionViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
+    """Bank and test questions.
+
+    Filters: ``?test_bank``, ``?category`` (of the bank), ``?type``,
+    ``?difficulty``, ``?test_id`` (questions written for one test) and ``?q``
+    (full-text, newest first; ``&ordering=relevance`` for best matches first,
+    except when paging with ``?pagination=cursor``).
+    """
+    queryset = TestQuestion.objects.order_by('-created_at', '-id')
+    serializer_class = TestQuestionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsTrainerOrReadOnly]
+    keyset_field = 'created_at'
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        if params.get('test_id'):
+            if not parse_uuids([params['test_id']])[0]:
+                raise ValidationError({'test_id': 'Must be a valid UUID.'})
+            queryset = queryset.filter(test_id=params['test_id'])
+        try:
+            return assessments.search_questions(queryset, params)
+        except ValueError as exc:
+            raise ValidationError({'error': str(exc)})
+
+
+class TestViewSet(viewsets.ModelViewSet):
+    queryset = Test.objects.order_by('-created_at')
+    serializer_class = TestSerializer
+    permission_classes = [permissions.IsAuthenticated, IsTrainerOrReadOnly]
+
+    def get_queryset(self):
+        course_id = self.request.query_params.get('course_id')
+        if course_id:
+            return self.queryset.filter(course_id=course_id)
+        return self.queryset
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['get', 'put'])
+    def questions(self, request, pk=None):
+        """The test's questions in order. PUT {"question_ids": [...]} links bank questions (or the test's own). Trainer only for PUT."""
+        test = self.get_object()
+        if request.method == 'PUT':
+            try:
+                assessments.set_test_questions(test, request.data.get('question_ids'))
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=400)
+        key = assessments.test_key(test.pk)
+        return Response({
+            'test': str(test.pk),
+            'questions': assessments.question_payload(key.questions, with_answers=_is_trainer(request.user)),
+        })
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def start(self, request, pk=None):
+        """Open an attempt (or resume the open one) with its questions; the time limit runs from here."""
+        try:
+            attempt, created = assessments.start_test_attempt(pk, request.user)
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        except DjangoValidationError:
+            return Response({'error': 'Test not found'}, status=404)
+        key = assessments.test_key(attempt.test_id)
+        questions = assessments.question_payload(delivered_questions(key, attempt.seed))
+        return Response({**TestAttemptSerializer(attempt).data, 'questions': questions}, status=201 if created else 200)
+
+
+class TestAttemptViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = TestAttempt.objects.all()
+    serializer_class = TestAttemptSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    keyset_field = 'started_at'
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = TestAttempt.objects.order_by('-started_at', '-id')
+        if not _is_trainer(user):
+            queryset = queryset.filter(user=user)
+        test_id = self.request.query_params.get('test_id')
+        if test_id:
+            queryset = queryset.filter(test_id=test_id)
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """Grade an attempt opened with POST /tests/<id>/start/. Input: {"answers": {question_id: answer}}"""
+        try:
+            attempt, result = assessments.submit_test_attempt(pk, request.user, request.data.get('answers', {}))
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        except DjangoValidationError:
+            return Response({'error': 'Attempt not found'}, status=404)
+        return Response({**self.get_serializer(attempt).data, 'grading': result})
+
+    @action(detail=True, methods=['post'])
+    def review(self, request, pk=None):
+        """Mark answers waiting for review: {"reviews": {question_id: true|false}}. Trainer of the test's course only."""
+        try:
+            attempt = TestAttempt.objects.select_related('test').filter(pk=pk).first()
+        except DjangoValidationError:
+            attempt = None
+        if attempt is None:
+            return Response({'error': 'Attempt not found'}, status=404)
+        test = attempt.test
+        allowed = _manages_course(request.user, test.course_id) if test.course_id else (
+            request.user.is_superuser or (_is_trainer(request.user) and test.created_by_id == request.user.id)
+        )
+        if not allowed:
+            return Response({'detail': 'Trainer permission required'}, status=403)
+        try:
+            attempt = assessments.review_test_attempt(pk, request.user, request.data.get('reviews'))
+        except AttemptError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response(self.get_serializer(attempt).data)
 
 
 class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
@@ -534,10 +909,112 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         course_id = self.request.query_params.get('course_id')
-        queryset = Leaderboard.objects.all().order_by('rank')
+        queryset = Leaderboard.objects.select_related('user', 'course').order_by('rank')
         if course_id:
-            queryset = queryset.filter(course_id=course_id)
-        return queryset
+            return queryset.filter(course_id=course_id)
+        # global rows get their first rank from refresh_leaderboard_ranks
+        return queryset.exclude(course__isnull=True, ranked_points__isnull=True)
+
+    def _scope_param(self, request):
+        """``course_id`` query param, or None for the global leaderboard."""
+        course_id = request.query_params.get('course_id')
+        if not course_id:
+            return None
+        parsed, _ = parse_uuids([course_id])
+        if not parsed:
+            raise ValidationError({'course_id': 'Must be a valid UUID.'})
+        return parsed[0]
+
+    def _int_param(self, request, name, default, maximum):
+        try:
+            return max(1, min(int(request.query_params.get(name, default)), maximum))
+        except (TypeError, ValueError):
+            raise ValidationError({name: 'Must be an integer.'})
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """Best-ranked learners. GET ?course_id=<id>&limit=10 (no course_id = global)"""
+        rows = leaderboard.top(self._scope_param(request), self._int_param(request, 'limit', 10, 100))
+        return Response(self.get_serializer(rows, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def around_me(self, request):
+        """The caller's rank with k neighbours either side. GET ?course_id=<id>&k=5"""
+        rows = leaderboard.neighbours(request.user.id, self._scope_param(request), self._int_param(request, 'k', 5, 50))
+        if rows is None:
+            return Response({'detail': 'Not ranked yet'}, status=404)
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+class UploadSessionViewSet(viewsets.ViewSet):
+    """Chunked, resumable uploads; the protocol is described in courses/uploads.py."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _session(self, request, pk):
+        try:
+            return UploadSession.objects.get(pk=pk, uploaded_by=request.user)
+        except (UploadSession.DoesNotExist, DjangoValidationError):
+            return None
+
+    def create(self, request):
+        data = request.data
+        try:
+            session = start_upload(
+                request.user, data.get('file_name'), data.get('file_size'),
+                file_type=data.get('type', 'general'), mime_type=data.get('mime_type'),
+            )
+        except UploadError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response(upload_state(session), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        return Response(upload_state(session))
+
+    def destroy(self, request, pk=None):
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            abort_upload(session)
+        except UploadError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """Raw chunk body; optional X-Chunk-SHA256 header is verified against what was received."""
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Invalid Content-Length'}, status=400)
+        try:
+            chunk = receive_chunk(session, int(index), request.stream or io.BytesIO(), length,
+                                  sha256=request.headers.get('X-Chunk-SHA256'))
+        except UploadError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response({'index': chunk.index, 'size': chunk.size, 'sha256': chunk.sha256})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            session = complete_upload(session)
+        except UploadError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response({
+            'url': default_storage.url(session.media.storage_path),
+            'path': session.media.storage_path,
+            'sha256': session.sha256,
+            'metadata': MediaMetadataSerializer(session.media).data,
+        })
 
 
 class MediaUploadViewSet(viewsets.ViewSet):
@@ -552,22 +1029,69 @@ class MediaUploadViewSet(viewsets.ViewSet):
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
-        filename = f"{user.id}/{file_type}/{file.name}"
-        path = default_storage.save(filename, ContentFile(file.read()))
-        url = default_storage.url(path)
-
-        metadata = MediaMetadata.objects.create(
-            storage_path=path,
-            file_name=file.name,
-            file_type=file_type,
-            file_size=file.size,
-            mime_type=file.content_type,
-            uploaded_by=user
+        def open_file():
+            file.seek(0)
+            return file
+
+        # large files go through /upload-sessions/
+        metadata, deduplicated = store_media(
+            open_file, file_name=file.name, file_type=file_type,
+            mime_type=file.content_type, uploaded_by=request.user,
         )
 
         return Response({
-            'url': url,
-            'path': path,
+            'url': default_storage.url(metadata.storage_path),
+            'path': metadata.storage_path,
+            'deduplicated': deduplicated,
             'metadata': MediaMetadataSerializer(metadata).data
         })
+
+    @action(detail=False, methods=['get'], url_path='storage-report')
+    def storage_report(self, request):
+        """Blob storage used and bytes saved by deduplication."""
+        user = request.user
+        if not (user.is_superuser or getattr(user, 'primary_role', '') in ('manager', 'admin')):
+            return Response({'detail': 'Manager permission required'}, status=403)
+        return Response(storage_report())
+
+    @action(detail=False, methods=['get'], url_path='processing-metrics')
+    def processing_metrics(self, request):
+        """Background processing queue depth and job timings."""
+        user = request.user
+        if not (user.is_superuser or getattr(user, 'primary_role', '') in ('manager', 'admin')):
+            return Response({'detail': 'Manager permission required'}, status=403)
+        return Response(processing_metrics())
+
+    @action(detail=False, methods=['get'], url_path='signed-url')
+    def signed_url(self, request):
+        """Short-lived URL for ?path= that works without an Authorization header (<video src>, <img src>)."""
+        path = request.query_params.get('path', '')
+        if not path or not can_access(request.user, path):
+            return Response({'error': 'Media not found'}, status=404)
+        url = reverse('media-file', kwargs={'path': path}) + '?sig=' + sign_path(path, request.user)
+        return Response({'url': request.build_absolute_uri(url)})
+
+
+class MediaFileView(APIView):
+    """GET/HEAD /media/<path> with Range, ETag and Last-Modified; see courses/media_serving.py."""
+    # access is checked per file below, and ?sig= URLs carry no credentials
+    permission_classes = [AllowAny]
+    content_negotiation_class = MediaNegotiation
+
+    def get(self, request, path):
+        token = request.query_params.get('sig')
+        if token:
+            user_id = signed_user_id(path, token)
+            user = Profile.objects.filter(pk=user_id).first() if user_id else None
+        else:
+            user = request.user if request.user.is_authenticated else None
+        if user is None:
+            return Response({'detail': 'Authentication credentials were not provided.'}, status=401,
+                            headers={'WWW-Authenticate': 'Token'})
+        if not can_access(user, path):
+            return Response({'error': 'Media not found'}, status=404)
+        media = MediaMetadata.objects.filter(storage_path=path).only('mime_type').first()
+        response = media_response(request, path, content_type=media.mime_type if media else None)
+        if response is None:
+            return Response({'error': 'Media not found'}, status=404)
+        return response
@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -117,6 +118,65 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50,
 }
 
+# Use a shared backend (e.g. Redis/Memcached) when running more than one process,
+# otherwise cache invalidation only reaches the process that made the change.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='trainer-lms'),
+    }
+}
+
+ENROLLMENT_STATS_CACHE_SECONDS = config('ENROLLMENT_STATS_CACHE_SECONDS', default=300, cast=int)
+# Cached prerequisite graphs are invalidated on change; the TTL only bounds staleness across processes
+COURSE_GRAPH_CACHE_SECONDS = config('COURSE_GRAPH_CACHE_SECONDS', default=3600, cast=int)
+
+# Points a learner earns per completed unit (courses.leaderboard)
+LEADERBOARD_POINTS_PER_UNIT = config('LEADERBOARD_POINTS_PER_UNIT', default=10, cast=int)
+
+# Background course assignment (courses.jobs)
+ENROLLMENT_JOB_WORKERS = config('ENROLLMENT_JOB_WORKERS', default=2, cast=int)
+ENROLLMENT_JOB_CHUNK_SIZE = config('ENROLLMENT_JOB_CHUNK_SIZE', default=1000, cast=int)
+ENROLLMENT_JOB_STALE_SECONDS = config('ENROLLMENT_JOB_STALE_SECONDS', default=300, cast=int)
+
+# Chunked media uploads (courses.uploads)
+MEDIA_UPLOAD_CHUNK_SIZE = config('MEDIA_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+MEDIA_UPLOAD_MAX_SIZE = config('MEDIA_UPLOAD_MAX_SIZE', default=5 * 1024 ** 3, cast=int)
+MEDIA_UPLOAD_SESSION_TTL_HOURS = config('MEDIA_UPLOAD_SESSION_TTL_HOURS', default=48, cast=int)
+# Unused blobs younger than this survive collect_media_garbage (courses.media_store)
+MEDIA_GC_GRACE_HOURS = config('MEDIA_GC_GRACE_HOURS', default=24, cast=int)
+
+# Background media processing (courses.media_processing)
+MEDIA_PROCESSING_WORKERS = config('MEDIA_PROCESSING_WORKERS', default=2, cast=int)
+MEDIA_PROCESSING_STALE_SECONDS = config('MEDIA_PROCESSING_STALE_SECONDS', default=600, cast=int)
+
+# Media serving (courses.media_serving): '' streams from Django, or hand the body to the
+# front-end server with 'x-accel-redirect' (nginx internal location) or 'x-sendfile'
+MEDIA_SERVE_OFFLOAD = config('MEDIA_SERVE_OFFLOAD', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+MEDIA_SIGNED_URL_SECONDS = config('MEDIA_SIGNED_URL_SECONDS', default=3600, cast=int)
+MEDIA_ACCESS_CACHE_SECONDS = config('MEDIA_ACCESS_CACHE_SECONDS', default=60, cast=int)
+
+# MongoDB content store (courses.content_store); one pooled client per process
+MONGODB_URI = config('MONGODB_URI', default='mongodb://localhost:27017')
+MONGODB_DB = config('MONGODB_DB', default='lms')
+MONGODB_MAX_POOL_SIZE = config('MONGODB_MAX_POOL_SIZE', default=50, cast=int)
+MONGODB_TIMEOUT_MS = config('MONGODB_TIMEOUT_MS', default=5000, cast=int)
+
+# Quiz grading (courses.grading): compiled answer keys are invalidated on change; the TTL only
+# bounds staleness across processes.  Submissions this long after the time limit are still graded.
+QUIZ_ANSWER_KEY_CACHE_SECONDS = config('QUIZ_ANSWER_KEY_CACHE_SECONDS', default=3600, cast=int)
+QUIZ_SUBMIT_GRACE_SECONDS = config('QUIZ_SUBMIT_GRACE_SECONDS', default=30, cast=int)
+# Regrades (courses.regrading) past this many learners rebuild the course rollups instead of applying deltas
+QUIZ_REGRADE_CHUNK_SIZE = config('QUIZ_REGRADE_CHUNK_SIZE', default=2000, cast=int)
+QUIZ_REGRADE_REBUILD_THRESHOLD = config('QUIZ_REGRADE_REBUILD_THRESHOLD', default=1000, cast=int)
+# Item analysis (courses.item_analysis) leaves attempts this recent for the next refresh, so late commits are not skipped
+ITEM_ANALYSIS_CHUNK_SIZE = config('ITEM_ANALYSIS_CHUNK_SIZE', default=5000, cast=int)
+ITEM_ANALYSIS_SETTLE_SECONDS = config('ITEM_ANALYSIS_SETTLE_SECONDS', default=60, cast=int)
+
+# Rows fetched per server-side cursor round-trip by the streaming exports (courses.exports)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
     default='http://localhost:3000,http://localhost:5173,http://localhost:5174,http://127.0.0.1:3000,http://127.0.0.1:5173,http://127.0.0.1:5174',
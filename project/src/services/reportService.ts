@@ -21,99 +21,36 @@ export interface LearnerReport {
   lastActivity: string;
 }
 
-export const reportService = {
-  async getCourseReport(courseId: string): Promise<CourseReport> {
-    const { data: course } = await supabase
-      .from('courses')
-      .select('id, title')
-      .eq('id', courseId)
-      .single();
-
-    const { data: enrollments } = await supabase
-      .from('enrollments')
-      .select('*')
-      .eq('course_id', courseId);
-
-    const totalEnrollments = enrollments?.length || 0;
-    const inProgress = enrollments?.filter(e => e.status === 'in_progress').length || 0;
-    const completed = enrollments?.filter(e => e.status === 'completed').length || 0;
-    const averageProgress = totalEnrollments > 0
-      ? enrollments!.reduce((sum, e) => sum + e.progress_percentage, 0) / totalEnrollments
-      : 0;
-
-    const { data: units } = await supabase
-      .from('units')
-      .select('id')
-      .eq('course_id', courseId)
-      .eq('type', 'quiz');
-
-    const quizUnitIds = units?.map(u => u.id) || [];
-    const { data: quizzes } = await supabase
-      .from('quizzes')
-      .select('id')
-      .in('unit_id', quizUnitIds);
-
-    const quizIds = quizzes?.map(q => q.id) || [];
-    const { data: attempts } = await supabase
-      .from('quiz_attempts')
-      .select('score')
-      .in('quiz_id', quizIds);
+export interface ReportDateRange {
+  from?: string;
+  to?: string;
+}
 
-    const averageScore = attempts?.length
-      ? attempts.reduce((sum, a) => sum + a.score, 0) / attempts.length
-      : 0;
+async function fetchReport<T>(path: string, range?: ReportDateRange): Promise<T> {
+  const token = localStorage.getItem('trainerToken') || '';
+  const params = new URLSearchParams();
+  if (range?.from) params.set('from', range.from);
+  if (range?.to) params.set('to', range.to);
+  const query = params.toString();
+
+  const resp = await fetch(`${path}${query ? `?${query}` : ''}`, {
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Token ${token}`
+    }
+  });
+  if (!resp.ok) throw new Error(`Report request failed: ${resp.status}`);
+  return await resp.json();
+}
 
-    return {
-      courseId: course?.id || '',
-      courseTitle: course?.title || '',
-      totalEnrollments,
-      inProgress,
-      completed,
-      averageProgress: Math.round(averageProgress),
-      averageScore: Math.round(averageScore)
-    };
+export const reportService = {
+  // Figures are aggregated server-side; see courses/reports.py
+  async getCourseReport(courseId: string, range?: ReportDateRange): Promise<CourseReport> {
+    return fetchReport<CourseReport>(`/api/reports/course/${courseId}/`, range);
   },
 
-  async getLearnerReport(userId: string): Promise<LearnerReport> {
-    const { data: profile } = await supabase
-      .from('profiles')
-      .select('*')
-      .eq('id', userId)
-      .single();
-
-    const { data: enrollments } = await supabase
-      .from('enrollments')
-      .select('*')
-      .eq('user_id', userId);
-
-    const coursesEnrolled = enrollments?.length || 0;
-    const coursesCompleted = enrollments?.filter(e => e.status === 'completed').length || 0;
-    const averageProgress = coursesEnrolled > 0
-      ? enrollments!.reduce((sum, e) => sum + e.progress_percentage, 0) / coursesEnrolled
-      : 0;
-
-    const { data: attempts } = await supabase
-      .from('quiz_attempts')
-      .select('score')
-      .eq('user_id', userId);
-
-    const totalQuizScore = attempts?.reduce((sum, a) => sum + a.score, 0) || 0;
-
-    const lastActivity = enrollments?.sort((a, b) =>
-      new Date(b.started_at || b.assigned_at).getTime() -
-      new Date(a.started_at || a.assigned_at).getTime()
-    )[0]?.started_at || enrollments?.[0]?.assigned_at || '';
-
-    return {
-      userId: profile?.id || '',
-      userName: profile?.full_name || '',
-      email: profile?.email || '',
-      coursesEnrolled,
-      coursesCompleted,
-      averageProgress: Math.round(averageProgress),
-      totalQuizScore,
-      lastActivity
-    };
+  async getLearnerReport(userId: string, range?: ReportDateRange): Promise<LearnerReport> {
+    return fetchReport<LearnerReport>(`/api/reports/learner/${userId}/`, range);
   },
 
   async exportCourseReportCSV(courseId: string): Promise<string> {
@@ -127,16 +127,19 @@ export const unitService = {
   },
 
   async reorderUnits(courseId: string, unitIds: string[]): Promise<void> {
-    const updates = unitIds.map((id, index) => ({
-      id,
-      order: index
-    }));
-
-    for (const update of updates) {
-      await supabase
-        .from('units')
-        .update({ order: update.order })
-        .eq('id', update.id);
+    // One request applies the whole ordering atomically (unitIds must list every unit of the course)
+    const token = localStorage.getItem('trainerToken') || '';
+    const resp = await fetch(`/api/courses/${courseId}/reorder/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { 'Authorization': `Token ${token}` } : {})
+      },
+      body: JSON.stringify({ unit_ids: unitIds })
+    });
+    if (!resp.ok) {
+      const text = await resp.text().catch(() => 'Unknown error');
+      throw new Error(`Failed to reorder units: ${resp.status} ${text.substring(0, 200)}`);
     }
   },
 